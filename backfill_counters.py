@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Recompute the materialized per-player kill counters and kill rollup.
+Migrations 5 and 6 do this once automatically; run this if the aggregates
+ever drift from player_kills (e.g. after editing the table by hand).
+"""
+import asyncio
+import os
+import aiosqlite
+
+from src.db.counters import backfill_player_counters, rebuild_kill_rollup
+from src.db.migrations import migrate
+from src.db.retention import default_archive_path, upgrade_archive
+
+# Path to the database (inside Docker volume)
+DB_PATH = os.getenv('DATABASE_PATH', 'data/willowbot.db')
+
+async def backfill():
+    """Rebuild players.kills and player_kill_rollup from player_kills"""
+    if not os.path.exists(DB_PATH):
+        print(f"Database not found at {DB_PATH}")
+        print("Make sure you're running this from the willowbot directory")
+        return
+    
+    async with aiosqlite.connect(DB_PATH) as db:
+        await migrate(db)
+        
+        # Archived kills still count towards the aggregates
+        archive_path = default_archive_path(DB_PATH)
+        include_archive = os.path.exists(archive_path)
+        if include_archive:
+            await db.execute('ATTACH DATABASE ? AS archive', (archive_path,))
+            await upgrade_archive(db)
+            print(f"Including archived kills from {archive_path}")
+        
+        updated = await backfill_player_counters(db, include_archive)
+        rollup_rows = await rebuild_kill_rollup(db, include_archive)
+        await db.commit()
+    
+    print(f"✅ Backfilled kill counters for {updated} player(s)")
+    print(f"✅ Rebuilt {rollup_rows} kill rollup row(s)")
+
+if __name__ == '__main__':
+    print("Player Counter Backfill Tool")
+    print("=" * 40)
+    asyncio.run(backfill())
@@ -30,7 +30,8 @@ def clear_active_quests():
     
     print(f"Found {count} active quest(s)")
     
-    # Delete all active quests
+    # Delete all active quests and their objective progress
+    cursor.execute('DELETE FROM quest_objective_progress')
     cursor.execute('DELETE FROM active_quests')
     conn.commit()
     
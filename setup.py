@@ -1,151 +1,37 @@
 import asyncio
 import aiosqlite
 import os
-from pathlib import Path
-import yaml
+
+from src.db.migrations import migrate
+from src.models.game_data import GameData
 
 async def setup_database():
     db_path = os.getenv('DATABASE_PATH', 'willowbot.db')
     async with aiosqlite.connect(db_path) as db:
-        # Create players table
-        await db.execute('''
-            CREATE TABLE IF NOT EXISTS players (
-                id INTEGER PRIMARY KEY,
-                name TEXT NOT NULL,
-                level INTEGER DEFAULT 1,
-                xp INTEGER DEFAULT 0,
-                health INTEGER DEFAULT 100,
-                max_health INTEGER DEFAULT 100,
-                mana INTEGER DEFAULT 100,
-                max_mana INTEGER DEFAULT 100,
-                damage_bonus INTEGER DEFAULT 0,
-                magic_damage_bonus INTEGER DEFAULT 0,
-                defense INTEGER DEFAULT 0,
-                magic_defense INTEGER DEFAULT 0,
-                crit_chance_bonus REAL DEFAULT 0.0,
-                flee_chance_bonus REAL DEFAULT 0.0,
-                health_bonus INTEGER DEFAULT 0,
-                mana_bonus INTEGER DEFAULT 0,
-                in_combat BOOLEAN DEFAULT FALSE,
-                current_enemy TEXT DEFAULT NULL
-            )
-        ''')
-
-        # Create inventory table
-        await db.execute('''
-            CREATE TABLE IF NOT EXISTS inventory (
-                player_id INTEGER,
-                item_id TEXT,
-                count INTEGER DEFAULT 1,
-                FOREIGN KEY(player_id) REFERENCES players(id),
-                PRIMARY KEY(player_id, item_id)
-            )
-        ''')
-
-        # Create equipment table
-        await db.execute('''
-            CREATE TABLE IF NOT EXISTS equipment (
-                player_id INTEGER PRIMARY KEY,
-                helmet_id TEXT DEFAULT NULL,
-                armor_id TEXT DEFAULT NULL,
-                pants_id TEXT DEFAULT NULL,
-                boots_id TEXT DEFAULT NULL,
-                weapon_id TEXT DEFAULT NULL,
-                ring1_id TEXT DEFAULT NULL,
-                ring2_id TEXT DEFAULT NULL,
-                amulet_id TEXT DEFAULT NULL,
-                FOREIGN KEY(player_id) REFERENCES players(id)
-            )
-        ''')
-
-        # Active quests table
-        await db.execute('''
-            CREATE TABLE IF NOT EXISTS active_quests (
-                player_id INTEGER,
-                quest_id TEXT,
-                completed BOOLEAN DEFAULT FALSE,
-                rewards_claimed BOOLEAN DEFAULT FALSE,
-                objectives_progress TEXT,
-                FOREIGN KEY(player_id) REFERENCES players(id),
-                PRIMARY KEY (player_id, quest_id)
-            )
-        ''')
+        version = await migrate(db)
+        print(f"Database schema is at version {version}")
 
-        # Player kills tracking table
-        await db.execute('''
-            CREATE TABLE IF NOT EXISTS player_kills (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                player_id INTEGER,
-                enemy_name TEXT NOT NULL,
-                enemy_level INTEGER NOT NULL,
-                killed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY(player_id) REFERENCES players(id)
-            )
-        ''')
-        
-        # Player death history table
-        await db.execute('''
-            CREATE TABLE IF NOT EXISTS death_history (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                player_id INTEGER,
-                enemy_name TEXT NOT NULL,
-                enemy_level INTEGER NOT NULL,
-                player_level INTEGER NOT NULL,
-                player_health INTEGER NOT NULL,
-                player_max_health INTEGER NOT NULL,
-                player_mana INTEGER NOT NULL,
-                player_max_mana INTEGER NOT NULL,
-                died_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY(player_id) REFERENCES players(id)
-            )
-        ''')
-        
-        # Completed quest chains table
-        await db.execute('''
-            CREATE TABLE IF NOT EXISTS completed_quest_chains (
-                player_id INTEGER,
-                chain_id TEXT,
-                completed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (player_id) REFERENCES players(id),
-                PRIMARY KEY (player_id, chain_id)
-            )
-        ''')
-
-        await db.commit()
-        print("Database schema created successfully!")
-
-def create_items_config():
-    """Load items configuration from items.yaml file"""
-    config_path = Path('src/config')
-    config_path.mkdir(parents=True, exist_ok=True)
-    
-    items_file = config_path / 'items.yaml'
-    
+def compile_game_data():
+    """Validate items.yaml, quests.yaml and enemies.yaml and write the snapshot the bot loads"""
     try:
-        with open(items_file, 'r') as f:
-            items = yaml.safe_load(f)
-            if not items or 'items' not in items:
-                raise ValueError("Invalid items.yaml format")
-            print("Items configuration loaded successfully")
-            return items
-    except FileNotFoundError:
-        print(f"Error: items.yaml not found at {items_file}")
-        return None
+        return GameData.compile()
+    except FileNotFoundError as e:
+        print(f"Error: game data file not found: {e.filename}")
     except Exception as e:
-        print(f"Error loading items.yaml: {e}")
-        return None
+        print(f"Error loading game data: {e}")
+    return None
 
 async def main():
     # Create database
     await setup_database()
     
-    # Load items configuration
-    items = create_items_config()
-    if not items:
-        print("Failed to load items configuration")
+    # Compile items, quests and enemies configuration
+    game_data = compile_game_data()
+    if not game_data:
+        print("Failed to load game data configuration")
         return
     
-    print(f"Loaded {len(items['items'])} items from configuration")
+    print(f"Loaded {len(game_data.items)} items and {len(game_data.quests)} quests from configuration")
 
 if __name__ == "__main__":
     asyncio.run(main())
\ No newline at end of file
@@ -1,9 +1,22 @@
 import os
 import discord
 import logging
-import aiosqlite
+from typing import Optional
 from discord.ext import commands
 from dotenv import load_dotenv
+from src.db.backend import create_backend
+from src.db.backup import DatabaseBackup, default_backup_dir
+from src.db.contention import BusyPolicy
+from src.db.enemies import sync_enemy_lookup
+from src.db.maintenance import DatabaseMaintenance
+from src.db.migrations import migrate
+from src.db.repository import Repositories
+from src.db.writer import GroupCommitWriter
+from src.db.retention import EventArchiver
+from src.models.game_data import GameData
+from src.models.game_data_reloader import GameDataReloader
+from src.models.inventory_cache import InventoryCache
+from src.models.player_state import PlayerStateCache
 
 # Configure logging
 logging.basicConfig(
@@ -14,7 +27,7 @@ logging.basicConfig(
 logger = logging.getLogger('willowbot')
 
 class WillowBot(commands.Bot):
-    def __init__(self):
+    def __init__(self, game_data: Optional[GameData] = None):
         # Load environment variables
         load_dotenv()
         
@@ -38,9 +51,64 @@ class WillowBot(commands.Bot):
         
         super().__init__(command_prefix='!w ', intents=intents)
         
+        # Items, quests and enemies, parsed once and shared by every cog
+        self.game_data = game_data or GameData.load()
+        
+        # Swaps in edited config on `!w reload`, or on its own when polling is on
+        self.game_data_reloader = GameDataReloader(
+            self,
+            poll_seconds=float(os.environ.get('GAME_DATA_RELOAD_SECONDS', '0'))
+        )
+        
         # Set database path to Docker volume
         self.db_path = os.environ.get('DATABASE_PATH', '/app/data/willowbot.db')
         
+        # On-disk SQLite by default; 'memory' keeps everything in RAM
+        self.storage = create_backend(os.environ.get('DATABASE_BACKEND', 'sqlite'), self.db_path)
+        
+        # Long-lived connection pool shared by all cogs and managers
+        self.db_pool = self.storage.create_pool(
+            size=int(os.environ.get('DATABASE_POOL_SIZE', '4'))
+        )
+        
+        # Typed queries shared by all cogs and managers
+        self.repos = Repositories(self.db_pool, BusyPolicy.from_env(), GroupCommitWriter.from_env)
+        
+        # In-combat player state, written back at most this many seconds late
+        self.player_states = PlayerStateCache(
+            self.repos,
+            flush_seconds=float(os.environ.get('DATABASE_PLAYER_FLUSH_SECONDS', '5'))
+        )
+        
+        # Inventory and equipment rows shared by every cog's InventoryManager
+        self.inventory_cache = InventoryCache(
+            max_players=int(os.environ.get('INVENTORY_CACHE_PLAYERS', '1024'))
+        )
+        
+        # Move old kill/death events to the archive database (0 disables)
+        retention_days = float(os.environ.get('DATABASE_RETENTION_DAYS', '180'))
+        archiver = None
+        if retention_days > 0:
+            archiver = EventArchiver(
+                self.db_pool,
+                self.storage.archive_path,
+                max_age_days=retention_days,
+                chunk_size=int(os.environ.get('DATABASE_RETENTION_CHUNK', '500'))
+            )
+        
+        # Background archival, WAL checkpoint and PRAGMA optimize
+        self.db_maintenance = DatabaseMaintenance(
+            self.db_pool,
+            interval_minutes=float(os.environ.get('DATABASE_MAINTENANCE_MINUTES', '15')),
+            archiver=archiver
+        )
+        
+        # Rotating online snapshots; DATABASE_BACKUP_HOURS=0 leaves only
+        # on-demand backups from the dashboard
+        self.db_backup = DatabaseBackup.from_env(
+            self.storage.database, default_backup_dir(self.db_path), uri=self.storage.uri
+        )
+        
         # Initialize extensions
         self.initial_extensions = [
             'src.commands.player',
@@ -87,126 +155,27 @@ class WillowBot(commands.Bot):
                 return False
         return True
     
-    async def db_connect(self):
-        """Create a new database connection as an async context manager"""
-        return aiosqlite.connect(self.db_path)
-
     async def setup_hook(self):
         logger.info("Starting bot setup")
         # Set environment
         os.environ['DATABASE_PATH'] = self.db_path
-        logger.info(f"Database path set to: {self.db_path}")
-        
-        # Setup core database schema
-        from setup import setup_database, create_items_config
-        from src.models.quest_manager import QuestManager
-        from src.models.inventory_manager import InventoryManager
-        
-        logger.info("Setting up database schema")
-        
-        await setup_database()  # Core schema
-        
-        # Initialize schemas for each component
-        async with await self.db_connect() as db:
-            await db.execute('''
-                CREATE TABLE IF NOT EXISTS players (
-                    id INTEGER PRIMARY KEY,
-                    name TEXT NOT NULL,
-                    level INTEGER DEFAULT 1,
-                    xp INTEGER DEFAULT 0,
-                    health INTEGER DEFAULT 100,
-                    max_health INTEGER DEFAULT 100,
-                    mana INTEGER DEFAULT 100,
-                    max_mana INTEGER DEFAULT 100,
-                    damage_bonus INTEGER DEFAULT 0,
-                    magic_damage_bonus INTEGER DEFAULT 0,
-                    defense INTEGER DEFAULT 0,
-                    magic_defense INTEGER DEFAULT 0,
-                    crit_chance_bonus REAL DEFAULT 0.0,
-                    flee_chance_bonus REAL DEFAULT 0.0,
-                    health_bonus INTEGER DEFAULT 0,
-                    mana_bonus INTEGER DEFAULT 0,
-                    gold INTEGER DEFAULT 0,
-                    current_title TEXT DEFAULT NULL,
-                    in_combat BOOLEAN DEFAULT FALSE,
-                    current_enemy TEXT DEFAULT NULL,
-                    deaths INTEGER DEFAULT 0
-                )
-            ''')
-            
-            # Migration: Add gold column if it doesn't exist
-            try:
-                await db.execute('SELECT gold FROM players LIMIT 1')
-            except:
-                logger.info("Adding gold column to players table")
-                await db.execute('ALTER TABLE players ADD COLUMN gold INTEGER DEFAULT 0')
-                await db.commit()
-            
-            # Migration: Add deaths column if it doesn't exist
-            try:
-                await db.execute('SELECT deaths FROM players LIMIT 1')
-            except:
-                logger.info("Adding deaths column to players table")
-                await db.execute('ALTER TABLE players ADD COLUMN deaths INTEGER DEFAULT 0')
-                await db.commit()
-
-            # Active quests table
-            await db.execute('''
-                CREATE TABLE IF NOT EXISTS active_quests (
-                    player_id INTEGER,
-                    quest_id TEXT,
-                    completed BOOLEAN DEFAULT FALSE,
-                    rewards_claimed BOOLEAN DEFAULT FALSE,
-                    objectives_progress TEXT,  -- JSON string of objective progress
-                    FOREIGN KEY(player_id) REFERENCES players(id),
-                    PRIMARY KEY (player_id, quest_id)
-                )
-            ''')
-
-            # Player kills tracking table
-            await db.execute('''
-                CREATE TABLE IF NOT EXISTS player_kills (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    player_id INTEGER,
-                    enemy_name TEXT NOT NULL,
-                    enemy_level INTEGER NOT NULL,
-                    killed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY(player_id) REFERENCES players(id)
-                )
-            ''')
-            
-            # Player death history table
-            await db.execute('''
-                CREATE TABLE IF NOT EXISTS death_history (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    player_id INTEGER,
-                    enemy_name TEXT NOT NULL,
-                    enemy_level INTEGER NOT NULL,
-                    player_level INTEGER NOT NULL,
-                    player_health INTEGER NOT NULL,
-                    player_max_health INTEGER NOT NULL,
-                    player_mana INTEGER NOT NULL,
-                    player_max_mana INTEGER NOT NULL,
-                    died_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY(player_id) REFERENCES players(id)
-                )
-            ''')
-            
-            # Completed quest chains table
-            await db.execute('''
-                CREATE TABLE IF NOT EXISTS completed_quest_chains (
-                    player_id INTEGER,
-                    chain_id TEXT,
-                    completed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (player_id) REFERENCES players(id),
-                    PRIMARY KEY (player_id, chain_id)
-                )
-            ''')
-
-            await db.commit()
+        logger.info(f"Database path set to: {self.db_path} ({self.storage.name} backend)")
         
-        # Load items configuration
-        create_items_config()
+        # Open the connection pool and bring the schema up to date
+        self.storage.open()
+        await self.db_pool.open()
+        async with self.db_pool.acquire() as db:
+            version = await migrate(db)
+            # Pick up enemies appended to enemies.yaml since the last start
+            await sync_enemy_lookup(db, self.game_data.enemy_catalog)
+            await db.commit()
+        logger.info(f"Database schema at version {version}")
+        self.repos.writer.start()
+        self.player_states.start()
+        self.db_maintenance.start()
+        self.game_data_reloader.start()
+        if float(os.environ.get('DATABASE_BACKUP_HOURS', '24')) > 0:
+            self.db_backup.start()
         
         # Load extensions
         for extension in self.initial_extensions:
@@ -221,6 +190,14 @@ class WillowBot(commands.Bot):
         
     async def close(self):
         await super().close()
+        self.db_maintenance.stop()
+        self.db_backup.stop()
+        self.game_data_reloader.stop()
+        # Commit the writes still queued before the connections go away
+        await self.player_states.close()
+        await self.repos.writer.stop()
+        await self.db_pool.close()
+        self.storage.close()
 
 # Run bot when executed directly
 if __name__ == '__main__':
@@ -2,13 +2,14 @@ import discord
 import logging
 import asyncio
 from discord.ext import commands
-from ..models.player import Player
 from ..models.enemy import EnemyGenerator
+from ..models.game_data import GameData
 from ..models.combat import Attack, CombatEntity
 from ..models.inventory_manager import InventoryManager
 from ..models.quest_manager import QuestManager
 from ..models.inventory import ItemType
-from ..models.quest import QuestType, ObjectiveType
+from ..models.quest import QuestProgressResult, QuestType, ObjectiveType
+from ..models.player import Player
 import random
 
 logger = logging.getLogger('willowbot.combat')
@@ -16,7 +17,6 @@ logger = logging.getLogger('willowbot.combat')
 class CombatCommands(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.enemy_generator = EnemyGenerator()
         self.inventory_manager = InventoryManager(bot)
         self.quest_manager = QuestManager(bot)
         # Track active combat sessions
@@ -39,6 +39,16 @@ class CombatCommands(commands.Cog):
         self.defeat_emojis = [self.RESTART_EMOJI, self.LEAVE_EMOJI]
         logger.info("Combat Commands initialized with emojis: %s", self.combat_emojis)
     
+    @property
+    def enemy_generator(self) -> EnemyGenerator:
+        """Generates enemies from the current game data generation"""
+        data = self.bot.game_data
+        return EnemyGenerator(data.enemies, data.enemy_catalog)
+    
+    def session_game_data(self, combat_data: dict) -> GameData:
+        """The game data a fight started with; a reload applies from the next fight"""
+        return combat_data.get('game_data') or self.bot.game_data
+    
     def format_combat_history(self, turn_history: list, last_n: int = 10) -> str:
         """Format combat history with the last message in bold"""
         recent_history = turn_history[-last_n:]
@@ -52,66 +62,35 @@ class CombatCommands(commands.Cog):
         
         return "\n".join(recent_history)
     
-    def generate_loot(self, enemy: CombatEntity) -> list:
-        """Generate random loot drops based on enemy level"""
-        loot = []
-        
-        # Equipment loot pools by level (using correct item IDs from items.yaml)
-        # Level 1-3: Basic equipment
-        basic_equipment = ['weapon_1', 'helmet_1', 'armor_1', 'pants_1', 'boots_1']  # Rusty Sword, Leather Cap, etc.
-        # Level 3-6: Common equipment
-        common_equipment = ['weapon_2', 'weapon_3', 'helmet_2', 'armor_2', 'armor_3', 'pants_2', 'boots_2']
-        # Level 5+: Uncommon equipment
-        uncommon_equipment = ['weapon_4', 'weapon_5', 'helmet_3', 'helmet_4', 'armor_4', 'pants_3', 'boots_3']
-        
-        # Consumables by tier (using correct item IDs)
-        basic_consumables = ['consumable_1', 'consumable_2']  # Health Potion, Mana Potion
-        advanced_consumables = ['consumable_3', 'consumable_4']  # Greater Health/Mana Potions
-        
-        # Gold always drops
-        gold_amount = random.randint(15 * enemy.level, 30 * enemy.level)
-        
-        # GUARANTEED: 1 piece of equipment always drops
-        # Choose equipment tier based on enemy level
-        if enemy.level <= 3:
-            item_id = random.choice(basic_equipment)
-        elif enemy.level <= 6:
-            # 60% common, 40% basic
-            if random.random() < 0.6:
-                item_id = random.choice(common_equipment)
-            else:
-                item_id = random.choice(basic_equipment)
-        else:
-            # 50% uncommon, 35% common, 15% basic
-            roll = random.random()
-            if roll < 0.5:
-                item_id = random.choice(uncommon_equipment)
-            elif roll < 0.85:
-                item_id = random.choice(common_equipment)
-            else:
-                item_id = random.choice(basic_equipment)
-        
-        loot.append((item_id, 1))
-        
-        # GUARANTEED: 1 consumable always drops (health or mana potion)
-        # Choose consumable based on enemy level
-        if enemy.level >= 5 and random.random() < 0.5:
-            # 50% chance for advanced consumable at level 5+
-            consumable = random.choice(advanced_consumables)
-        else:
-            consumable = random.choice(basic_consumables)
-        
-        loot.append((consumable, 1))
-        
-        # BONUS: 30% chance for additional consumable
-        if random.random() < 0.3:
-            if enemy.level >= 5:
-                bonus_consumable = random.choice(basic_consumables + advanced_consumables)
-            else:
-                bonus_consumable = random.choice(basic_consumables)
-            loot.append((bonus_consumable, 1))
-        
-        return loot, gold_amount
+    async def award_victory_xp(self, player: Player, enemy: CombatEntity,
+                               quest_result: QuestProgressResult) -> tuple:
+        """Add a won fight's XP to the player and level them up if it is enough
+
+        Quest rewards earned by the same victory are already stored, so the
+        player's level, XP and max stats are reloaded first; otherwise
+        finish_victory would overwrite them with the values from before the
+        fight. Returns (xp_gained, old_level).
+        """
+        if quest_result.rewards:
+            progression = await self.bot.repos.players.progression(player.id)
+            if progression:
+                player.level, player.xp = progression.level, progression.xp
+                player.max_health, player.max_mana = progression.max_health, progression.max_mana
+            # Leveling up from quest rewards restores health and mana
+            if quest_result.leveled_up:
+                player.health, player.mana = player.max_health, player.max_mana
+
+        xp_gained = 50 + (enemy.level * 10)
+        player.xp += xp_gained
+        old_level = player.level
+        if player.xp >= player.xp_needed_for_next_level():
+            player.level_up()
+        return xp_gained, old_level
+    
+    def generate_loot(self, enemy: CombatEntity, game_data: GameData) -> tuple:
+        """Roll ([(item_id, count), ...], gold) from the loot tables in loot.yaml"""
+        enemy_type = game_data.enemy_catalog.parts(enemy.identity)[0] if enemy.identity else None
+        return game_data.loot.roll(enemy_type, enemy.level)
     
     async def get_or_create_player_thread(self, channel, user_id: int, player_name: str):
         """Get existing player thread or create a new one"""
@@ -195,146 +174,120 @@ class CombatCommands(commands.Cog):
         if user_id in self.active_combats:
             logger.warning(f"User {user_id} is already in combat, clearing existing state")
             del self.active_combats[user_id]
+            await self.bot.player_states.release(user_id)
         
-        async with await self.bot.db_connect() as db:
-            # Reset any existing combat state in database
-            await db.execute('''
-                UPDATE players 
-                SET in_combat = FALSE, current_enemy = NULL
-                WHERE id = ?
-            ''', (user_id,))
-            await db.commit()
-            
-            cursor = await db.execute('SELECT * FROM players WHERE id = ?', (user_id,))
-            player_data = await cursor.fetchone()
-            
-            if not player_data:
-                logger.error(f"No player data found for user {user_id}")
-                await channel.send("Error: Player data not found. Please try again.")
-                return
-                
-            # Create player object
-            player = Player(
-                id=player_data[0],
-                name=player_data[1],
-                level=player_data[2],
-                xp=player_data[3],
-                health=player_data[4],
-                max_health=player_data[5],
-                mana=player_data[6],
-                max_mana=player_data[7]
-            )
+        # Reset any existing combat state in database
+        await self.bot.repos.write(lambda: self.bot.repos.players.reset_combat(user_id))
 
-            # Verify player health
-            if player.health <= 0:
-                logger.info(f"Restoring health for player {user_id} before combat")
-                player.health = player.max_health // 2  # Restore 50% health
-                await db.execute('UPDATE players SET health = ? WHERE id = ?', (player.health, user_id))
-                await db.commit()
-            logger.info(f"Created player object for {player.name} (Level {player.level})")
-            
-            # Generate enemy based on player level
-            enemy = self.enemy_generator.generate_enemy(player.level)
-            logger.info(f"Generated enemy: {enemy.name} (Level {enemy.level})")
-            
-            # Get or create persistent player thread
-            user = await self.bot.fetch_user(user_id)
-            thread = await self.get_or_create_player_thread(channel, user_id, player.name)
-            logger.info(f"Using player thread (ID: {thread.id}) for combat")
-            
-            # Update thread name to show combat status (non-blocking)
-            self.update_thread_name(user_id, player.name, player.level, f"⚔️ Fighting {enemy.name}")
-            
-            # Send combat start message to thread
-            await thread.send(f"{user.mention} **⚔️ Combat has begun!** React to the message below to take actions.")
-            
-            # Get healing item count
-            healing_item_count = await self.get_healing_consumable_count(user_id)
-            
-            # Get equipment bonuses
-            equipment = await self.inventory_manager.get_equipment(user_id)
-            equipment_stats = equipment.get_total_stats() if equipment else {}
-            
-            # Initialize combat
-            init_embed = discord.Embed(
-                title="⚔️ Combat Started!",
-                description=f"You are fighting a level {enemy.level} {enemy.name}!",
-                color=discord.Color.red()
-            )
-            
-            # Build player stats with equipment bonuses
-            player_stats_text = f"Health: {player.health}/{player.max_health}\nMana: {player.mana}/{player.max_mana}"
-            if equipment_stats:
-                bonus_parts = []
-                if equipment_stats.get('damage', 0) > 0:
-                    bonus_parts.append(f"⚔️ +{equipment_stats['damage']} Attack")
-                if equipment_stats.get('magic_damage', 0) > 0:
-                    bonus_parts.append(f"🔮 +{equipment_stats['magic_damage']} Magic")
-                if equipment_stats.get('defense', 0) > 0:
-                    bonus_parts.append(f"🛡️ +{equipment_stats['defense']} Defense")
-                if equipment_stats.get('magic_defense', 0) > 0:
-                    bonus_parts.append(f"✨ +{equipment_stats['magic_defense']} Magic Def")
-                if equipment_stats.get('crit_chance', 0) > 0:
-                    bonus_parts.append(f"💥 +{equipment_stats['crit_chance']}% Crit")
-                if bonus_parts:
-                    player_stats_text += "\n" + " | ".join(bonus_parts)
-            
-            init_embed.add_field(
-                name="Your Stats", 
-                value=player_stats_text,
-                inline=True
-            )
-            init_embed.add_field(
-                name="Enemy Stats", 
-                value=f"Health: {enemy.health}/{enemy.max_health}\nMana: {enemy.mana}/{enemy.max_mana}",
-                inline=True
-            )
-            
-            actions_text = f"{self.MELEE_EMOJI} Melee Attack\n{self.MAGIC_EMOJI} Magic Attack\n{self.ITEM_EMOJI} Use Item"
-            if healing_item_count > 0:
-                actions_text += f" ({healing_item_count} healing items)"
-            
-            # Always show pray option
-            actions_text += f"\n{self.PRAY_EMOJI} Pray (restore mana)"
-            actions_text += f"\n{self.FLEE_EMOJI} Flee"
-            
-            init_embed.add_field(
-                name="Actions",
-                value=actions_text,
-                inline=False
-            )
-            
-            combat_msg = await thread.send(embed=init_embed)
-            logger.info("Sent combat initialization message to thread")
-            
-            # Store combat session IMMEDIATELY before adding reactions
-            # Store both message_id and thread_id for later use
-            self.active_combats[user_id] = {
-                'message_id': combat_msg.id,
-                'thread_id': thread.id,
-                'player': player,
-                'enemy': enemy,
-                'turn_history': [],  # Track all combat turns
-            }
-            logger.info(f"Stored combat session for user {user_id} in thread {thread.id}")
-            
-            # Add combat action reactions AFTER storing the session
-            for emoji in self.combat_emojis:
-                await combat_msg.add_reaction(emoji)
-            
-            # Always add pray emoji
-            await combat_msg.add_reaction(self.PRAY_EMOJI)
-            
-            logger.info("Added combat reaction emojis")
-            
-            # Update player state in database
-            await db.execute('''
-                UPDATE players 
-                SET in_combat = TRUE, current_enemy = ?
-                WHERE id = ?
-            ''', (enemy.name, user_id))
-            await db.commit()
-            logger.info(f"Updated player combat state in database for user {user_id}")
+        player = await self.bot.repos.players.load(user_id)
+        if not player:
+            logger.error(f"No player data found for user {user_id}")
+            await channel.send("Error: Player data not found. Please try again.")
+            return
+
+        # Verify player health
+        if player.health <= 0:
+            logger.info(f"Restoring health for player {user_id} before combat")
+            player.health = player.max_health // 2  # Restore 50% health
+            await self.bot.repos.write(lambda: self.bot.repos.players.set_health(user_id, player.health))
+        logger.info(f"Created player object for {player.name} (Level {player.level})")
+        
+        # Generate enemy based on player level
+        enemy = self.enemy_generator.generate_enemy(player.level)
+        logger.info(f"Generated enemy: {enemy.name} (Level {enemy.level})")
+        
+        # Get or create persistent player thread
+        user = await self.bot.fetch_user(user_id)
+        thread = await self.get_or_create_player_thread(channel, user_id, player.name)
+        logger.info(f"Using player thread (ID: {thread.id}) for combat")
+        
+        # Update thread name to show combat status (non-blocking)
+        self.update_thread_name(user_id, player.name, player.level, f"⚔️ Fighting {enemy.name}")
+        
+        # Send combat start message to thread
+        await thread.send(f"{user.mention} **⚔️ Combat has begun!** React to the message below to take actions.")
+        
+        # Get healing item count
+        healing_item_count = await self.get_healing_consumable_count(user_id)
+        
+        # Initialize combat
+        init_embed = discord.Embed(
+            title="⚔️ Combat Started!",
+            description=f"You are fighting a level {enemy.level} {enemy.name}!",
+            color=discord.Color.red()
+        )
+        
+        # Build player stats with equipment bonuses
+        player_stats_text = f"Health: {player.health}/{player.max_health}\nMana: {player.mana}/{player.max_mana}"
+        # Equipment totals were loaded with the player
+        bonus_parts = []
+        if player.damage_bonus > 0:
+            bonus_parts.append(f"⚔️ +{player.damage_bonus} Attack")
+        if player.magic_damage_bonus > 0:
+            bonus_parts.append(f"🔮 +{player.magic_damage_bonus} Magic")
+        if player.defense > 0:
+            bonus_parts.append(f"🛡️ +{player.defense} Defense")
+        if player.magic_defense > 0:
+            bonus_parts.append(f"✨ +{player.magic_defense} Magic Def")
+        if player.crit_chance_bonus > 0:
+            bonus_parts.append(f"💥 +{player.crit_chance_bonus}% Crit")
+        if bonus_parts:
+            player_stats_text += "\n" + " | ".join(bonus_parts)
+        
+        init_embed.add_field(
+            name="Your Stats", 
+            value=player_stats_text,
+            inline=True
+        )
+        init_embed.add_field(
+            name="Enemy Stats", 
+            value=f"Health: {enemy.health}/{enemy.max_health}\nMana: {enemy.mana}/{enemy.max_mana}",
+            inline=True
+        )
+        
+        actions_text = f"{self.MELEE_EMOJI} Melee Attack\n{self.MAGIC_EMOJI} Magic Attack\n{self.ITEM_EMOJI} Use Item"
+        if healing_item_count > 0:
+            actions_text += f" ({healing_item_count} healing items)"
+        
+        # Always show pray option
+        actions_text += f"\n{self.PRAY_EMOJI} Pray (restore mana)"
+        actions_text += f"\n{self.FLEE_EMOJI} Flee"
+        
+        init_embed.add_field(
+            name="Actions",
+            value=actions_text,
+            inline=False
+        )
+        
+        combat_msg = await thread.send(embed=init_embed)
+        logger.info("Sent combat initialization message to thread")
+        
+        # Store combat session IMMEDIATELY before adding reactions
+        # Store both message_id and thread_id for later use
+        self.active_combats[user_id] = {
+            'message_id': combat_msg.id,
+            'thread_id': thread.id,
+            'player': player,
+            'enemy': enemy,
+            'turn_history': [],  # Track all combat turns
+            'game_data': self.bot.game_data,
+        }
+        # Turns update the player in memory; the cache writes it back
+        self.bot.player_states.track(player)
+        logger.info(f"Stored combat session for user {user_id} in thread {thread.id}")
+        
+        # Add combat action reactions AFTER storing the session
+        for emoji in self.combat_emojis:
+            await combat_msg.add_reaction(emoji)
+        
+        # Always add pray emoji
+        await combat_msg.add_reaction(self.PRAY_EMOJI)
+        
+        logger.info("Added combat reaction emojis")
+        
+        # Update player state in database
+        await self.bot.repos.write(lambda: self.bot.repos.players.enter_combat(user_id, enemy.identity.key))
+        logger.info(f"Updated player combat state in database for user {user_id}")
             
             
         return combat_msg
@@ -349,6 +302,8 @@ class CombatCommands(commands.Cog):
         enemy = combat_data['enemy']
         message_id = combat_data['message_id']
         turn_history = combat_data.get('turn_history', [])
+        # Loot comes from the game data the fight started with
+        game_data = self.session_game_data(combat_data)
         
         # Get the combat message to edit
         try:
@@ -410,58 +365,19 @@ class CombatCommands(commands.Cog):
         
         # Check if enemy is defeated
         if not enemy.is_alive():
-            # Record the kill
-            async with await self.bot.db_connect() as db:
-                await db.execute('''
-                    INSERT INTO player_kills (player_id, enemy_name, enemy_level)
-                    VALUES (?, ?, ?)
-                ''', (user_id, enemy.name, enemy.level))
-                await db.commit()
-            
-            # Update quest progress
-            # Parse enemy name to get type/prefix/suffix
-            enemy_name_parts = enemy.name.split()
-            enemy_type = None
-            enemy_prefix = None
-            enemy_suffix = None
-            
-            # Try to identify enemy parts from the name
-            # This is a simple heuristic - could be improved
-            if len(enemy_name_parts) == 1:
-                enemy_type = enemy_name_parts[0]
-            elif len(enemy_name_parts) >= 2:
-                # Check if last part is "of Something" (suffix)
-                if "of" in enemy.name:
-                    of_index = enemy_name_parts.index("of")
-                    enemy_prefix = enemy_name_parts[0] if of_index > 0 else None
-                    enemy_type = " ".join(enemy_name_parts[1:of_index]) if of_index > 1 else enemy_name_parts[of_index - 1]
-                    enemy_suffix = " ".join(enemy_name_parts[of_index:]) if of_index < len(enemy_name_parts) - 1 else None
-                else:
-                    # Assume first word is prefix, rest is type
-                    enemy_prefix = enemy_name_parts[0]
-                    enemy_type = " ".join(enemy_name_parts[1:])
+            # Record the kill together with its counter and rollup
+            await self.bot.repos.write(lambda: self.bot.repos.kills.record_kill(user_id, enemy.identity, enemy.level))
             
             # Update quest progress for combat
-            quest_results, quest_old_level, quest_new_level = await self.quest_manager.update_quest_progress(
+            quest_result = await self.quest_manager.update_quest_progress(
                 user_id,
-                enemy_type=enemy_type,
-                enemy_prefix=enemy_prefix,
-                enemy_suffix=enemy_suffix
+                enemy=enemy.identity
             )
             
-            # Check if quest rewards triggered a level-up
-            quest_leveled_up = quest_new_level > quest_old_level
-            
             # Calculate rewards
-            xp_gained = 50 + (enemy.level * 10)
-            loot_items, gold_dropped = self.generate_loot(enemy)
-            player.xp += xp_gained
-            
-            # Check for level up
-            leveled_up = player.xp >= player.xp_needed_for_next_level()
-            old_level = player.level
-            if leveled_up:
-                player.level_up()
+            xp_gained, old_level = await self.award_victory_xp(player, enemy, quest_result)
+            leveled_up = player.level > old_level
+            loot_items, gold_dropped = self.generate_loot(enemy, game_data)
             
             # Add loot to inventory
             added_items = []
@@ -470,20 +386,16 @@ class CombatCommands(commands.Cog):
                 # Convert item IDs to Item objects
                 items_to_add = []
                 for item_id, count in loot_items:
-                    item = self.inventory_manager.items.get(item_id)
+                    item = game_data.items.get(item_id)
                     if item:
                         items_to_add.append((item, count))
                 
                 if items_to_add:
                     added_items, failed_items = await self.inventory_manager.add_items(user_id, items_to_add)
             
-            # Auto-equip better gear from inventory
+            # Auto-equip better gear from inventory; it stores the new stat totals if it changes anything
             await self.inventory_manager.auto_equip_better_gear(user_id)
             
-            # Refresh player stats after equipment changes
-            equipment = await self.inventory_manager.get_equipment(user_id)
-            await self.inventory_manager.update_player_stats(user_id, equipment)
-            
             # Create victory message
             victory_embed = discord.Embed(
                 title="🎉 Victory!",
@@ -526,31 +438,21 @@ class CombatCommands(commands.Cog):
                 )
             
             # Show quest progress/completion
-            if quest_results:
+            if quest_result.updates:
                 quest_text = []
-                for quest, was_completed in quest_results:
-                    if was_completed:
-                        quest_text.append(f"✅ **{quest.title}** - COMPLETED!")
-                    else:
-                        # Get current progress
-                        async with await self.bot.db_connect() as db:
-                            cursor = await db.execute(
-                                'SELECT objectives_progress FROM active_quests WHERE player_id = ? AND quest_id = ?',
-                                (user_id, quest.id)
-                            )
-                            row = await cursor.fetchone()
-                            if row:
-                                import json
-                                progress = json.loads(row[0])
-                                # Show first incomplete objective
-                                for i, obj in enumerate(quest.objectives):
-                                    if progress[i] < obj.count:
-                                        quest_text.append(f"📜 **{quest.title}**: {progress[i]}/{obj.count} {obj.description}")
-                                        break
+                for update in quest_result.updates:
+                    if update.completed:
+                        quest_text.append(f"✅ **{update.quest.title}** - COMPLETED!")
+                    elif next_objective := update.next_objective():
+                        # Show first incomplete objective
+                        obj, current = next_objective
+                        quest_text.append(f"📜 **{update.quest.title}**: {current}/{obj.count} {obj.description}")
                 
                 # Add quest level-up notification if occurred
-                if quest_leveled_up:
-                    quest_text.append(f"🎉 **Level Up!** {quest_old_level} → {quest_new_level} (from quest rewards!)")
+                if quest_result.leveled_up:
+                    quest_text.append(
+                        f"🎉 **Level Up!** {quest_result.old_level} → {quest_result.new_level} (from quest rewards!)"
+                    )
                 
                 if quest_text:
                     victory_embed.add_field(
@@ -559,59 +461,27 @@ class CombatCommands(commands.Cog):
                         inline=False
                     )
             
-            # Get updated player stats
-            async with await self.bot.db_connect() as db:
-                # Update gold
-                await db.execute('''
-                    UPDATE players 
-                    SET gold = gold + ?
-                    WHERE id = ?
-                ''', (gold_dropped, user_id))
-                
-                # Update player stats (including max_health and max_mana if leveled up)
-                await db.execute('''
-                    UPDATE players 
-                    SET health = ?, mana = ?, xp = ?, level = ?, 
-                        max_health = ?, max_mana = ?,
-                        in_combat = FALSE, current_enemy = NULL
-                    WHERE id = ?
-                ''', (player.health, player.mana, player.xp, player.level, 
-                      player.max_health, player.max_mana, player.id))
-                
-                # Get updated stats for display including deaths and kills
-                cursor = await db.execute('''
-                    SELECT level, health, max_health, mana, max_mana, xp, gold, deaths,
-                           damage_bonus, magic_damage_bonus, defense, magic_defense, 
-                           crit_chance_bonus
-                    FROM players WHERE id = ?
-                ''', (user_id,))
-                stats = await cursor.fetchone()
-                
-                cursor = await db.execute('''
-                    SELECT COUNT(*) FROM player_kills WHERE player_id = ?
-                ''', (user_id,))
-                kills_row = await cursor.fetchone()
-                kills = kills_row[0] if kills_row else 0
-                
-                await db.commit()
+            # Save gold and stats (including max_health and max_mana if leveled up)
+            # and get the updated stats for display in one statement
+            self.bot.player_states.discard(user_id)
+            stats = await self.bot.repos.write(lambda: self.bot.repos.players.finish_victory(player, gold_dropped))
             
             # Add stats footer
             if stats:
-                level, hp, max_hp, mana, max_mana, xp, gold, deaths, damage_bonus, magic_damage_bonus, defense, magic_defense, crit_chance_bonus = stats
-                xp_needed = level * 100
+                xp_needed = stats.level * 100
                 
                 # Format combat stats
-                combat_stats = f"⚔️ Damage: +{damage_bonus} | 🔮 Magic: +{magic_damage_bonus}\n"
-                combat_stats += f"🛡️ Defense: {defense} | 🌟 Magic Def: {magic_defense}\n"
-                combat_stats += f"💥 Crit Chance: +{crit_chance_bonus:.1f}%"
+                combat_stats = f"⚔️ Damage: +{stats.damage_bonus} | 🔮 Magic: +{stats.magic_damage_bonus}\n"
+                combat_stats += f"🛡️ Defense: {stats.defense} | 🌟 Magic Def: {stats.magic_defense}\n"
+                combat_stats += f"💥 Crit Chance: +{stats.crit_chance_bonus:.1f}%"
                 
                 victory_embed.add_field(
                     name="📊 Your Stats",
-                    value=f"**Level {level}**\n"
-                          f"HP: {hp}/{max_hp} | Mana: {mana}/{max_mana}\n"
-                          f"XP: {xp}/{xp_needed} | Gold: {gold}\n"
+                    value=f"**Level {stats.level}**\n"
+                          f"HP: {stats.health}/{stats.max_health} | Mana: {stats.mana}/{stats.max_mana}\n"
+                          f"XP: {stats.xp}/{xp_needed} | Gold: {stats.gold}\n"
                           f"{combat_stats}\n"
-                          f"💀 Deaths: {deaths} | ⚔️ Kills: {kills}",
+                          f"💀 Deaths: {stats.deaths} | ⚔️ Kills: {stats.kills}",
                     inline=False
                 )
             
@@ -700,43 +570,15 @@ class CombatCommands(commands.Cog):
                 enemy.health = 0
                 
                 # Update quest progress
-                enemy_name_parts = enemy.name.split()
-                enemy_type = None
-                enemy_prefix = None
-                enemy_suffix = None
-                
-                if len(enemy_name_parts) == 1:
-                    enemy_type = enemy_name_parts[0]
-                elif len(enemy_name_parts) >= 2:
-                    if "of" in enemy.name:
-                        of_index = enemy_name_parts.index("of")
-                        enemy_prefix = enemy_name_parts[0] if of_index > 0 else None
-                        enemy_type = " ".join(enemy_name_parts[1:of_index]) if of_index > 1 else enemy_name_parts[of_index - 1]
-                        enemy_suffix = " ".join(enemy_name_parts[of_index:]) if of_index < len(enemy_name_parts) - 1 else None
-                    else:
-                        enemy_prefix = enemy_name_parts[0]
-                        enemy_type = " ".join(enemy_name_parts[1:])
-                
-                quest_results, quest_old_level, quest_new_level = await self.quest_manager.update_quest_progress(
+                quest_result = await self.quest_manager.update_quest_progress(
                     user_id,
-                    enemy_type=enemy_type,
-                    enemy_prefix=enemy_prefix,
-                    enemy_suffix=enemy_suffix
+                    enemy=enemy.identity
                 )
                 
-                # Check if quest rewards triggered a level-up
-                quest_leveled_up = quest_new_level > quest_old_level
-                
                 # Calculate rewards
-                xp_gained = 50 + (enemy.level * 10)
-                loot_items, gold_dropped = self.generate_loot(enemy)
-                player.xp += xp_gained
-                
-                # Check for level up
-                leveled_up = player.xp >= player.xp_needed_for_next_level()
-                old_level = player.level
-                if leveled_up:
-                    player.level_up()
+                xp_gained, old_level = await self.award_victory_xp(player, enemy, quest_result)
+                leveled_up = player.level > old_level
+                loot_items, gold_dropped = self.generate_loot(enemy, game_data)
                 
                 # Add loot to inventory
                 added_items = []
@@ -744,20 +586,16 @@ class CombatCommands(commands.Cog):
                 if loot_items:
                     items_to_add = []
                     for item_id, count in loot_items:
-                        item = self.inventory_manager.items.get(item_id)
+                        item = game_data.items.get(item_id)
                         if item:
                             items_to_add.append((item, count))
                     
                     if items_to_add:
                         added_items, failed_items = await self.inventory_manager.add_items(user_id, items_to_add)
                 
-                # Auto-equip better gear from inventory
+                # Auto-equip better gear from inventory; it stores the new stat totals if it changes anything
                 await self.inventory_manager.auto_equip_better_gear(user_id)
                 
-                # Refresh player stats after equipment changes
-                equipment = await self.inventory_manager.get_equipment(user_id)
-                await self.inventory_manager.update_player_stats(user_id, equipment)
-                
                 # Create victory message
                 victory_embed = discord.Embed(
                     title="🎉 Victory!",
@@ -800,25 +638,14 @@ class CombatCommands(commands.Cog):
                     )
                 
                 # Show quest progress/completion
-                if quest_results:
+                if quest_result.updates:
                     quest_text = []
-                    for quest, was_completed in quest_results:
-                        if was_completed:
-                            quest_text.append(f"✅ **{quest.title}** - COMPLETED!")
-                        else:
-                            async with await self.bot.db_connect() as db:
-                                cursor = await db.execute(
-                                    'SELECT objectives_progress FROM active_quests WHERE player_id = ? AND quest_id = ?',
-                                    (user_id, quest.id)
-                                )
-                                row = await cursor.fetchone()
-                                if row:
-                                    import json
-                                    progress = json.loads(row[0])
-                                    for i, obj in enumerate(quest.objectives):
-                                        if progress[i] < obj.count:
-                                            quest_text.append(f"📜 **{quest.title}**: {progress[i]}/{obj.count} {obj.description}")
-                                            break
+                    for update in quest_result.updates:
+                        if update.completed:
+                            quest_text.append(f"✅ **{update.quest.title}** - COMPLETED!")
+                        elif next_objective := update.next_objective():
+                            obj, current = next_objective
+                            quest_text.append(f"📜 **{update.quest.title}**: {current}/{obj.count} {obj.description}")
                     
                     if quest_text:
                         victory_embed.add_field(
@@ -827,47 +654,24 @@ class CombatCommands(commands.Cog):
                             inline=False
                         )
                 
-                # Get updated player stats
-                async with await self.bot.db_connect() as db:
-                    await db.execute('''
-                        UPDATE players 
-                        SET gold = gold + ?
-                        WHERE id = ?
-                    ''', (gold_dropped, user_id))
-                    
-                    await db.execute('''
-                        UPDATE players 
-                        SET health = ?, mana = ?, xp = ?, level = ?, 
-                            max_health = ?, max_mana = ?,
-                            in_combat = FALSE, current_enemy = NULL
-                        WHERE id = ?
-                    ''', (player.health, player.mana, player.xp, player.level, 
-                          player.max_health, player.max_mana, user_id))
-                    
-                    cursor = await db.execute('''
-                        SELECT level, health, max_health, mana, max_mana, xp, gold,
-                               damage_bonus, magic_damage_bonus, defense, magic_defense,
-                               crit_chance_bonus
-                        FROM players WHERE id = ?
-                    ''', (user_id,))
-                    stats = await cursor.fetchone()
-                    await db.commit()
+                # Save gold and stats and get the updated stats for display
+                self.bot.player_states.discard(user_id)
+                stats = await self.bot.repos.write(lambda: self.bot.repos.players.finish_victory(player, gold_dropped))
                 
                 # Add stats footer
                 if stats:
-                    level, hp, max_hp, mana, max_mana, xp, gold, damage_bonus, magic_damage_bonus, defense, magic_defense, crit_chance_bonus = stats
-                    xp_needed = level * 100
+                    xp_needed = stats.level * 100
                     
                     # Format combat stats
-                    combat_stats = f"⚔️ Damage: +{damage_bonus} | 🔮 Magic: +{magic_damage_bonus}\n"
-                    combat_stats += f"🛡️ Defense: {defense} | 🌟 Magic Def: {magic_defense}\n"
-                    combat_stats += f"💥 Crit Chance: +{crit_chance_bonus:.1f}%"
+                    combat_stats = f"⚔️ Damage: +{stats.damage_bonus} | 🔮 Magic: +{stats.magic_damage_bonus}\n"
+                    combat_stats += f"🛡️ Defense: {stats.defense} | 🌟 Magic Def: {stats.magic_defense}\n"
+                    combat_stats += f"💥 Crit Chance: +{stats.crit_chance_bonus:.1f}%"
                     
                     victory_embed.add_field(
                         name="📊 Your Stats",
-                        value=f"**Level {level}**\n"
-                              f"HP: {hp}/{max_hp} | Mana: {mana}/{max_mana}\n"
-                              f"XP: {xp}/{xp_needed} | Gold: {gold}\n"
+                        value=f"**Level {stats.level}**\n"
+                              f"HP: {stats.health}/{stats.max_health} | Mana: {stats.mana}/{stats.max_mana}\n"
+                              f"XP: {stats.xp}/{xp_needed} | Gold: {stats.gold}\n"
                               f"{combat_stats}",
                         inline=False
                     )
@@ -930,39 +734,23 @@ class CombatCommands(commands.Cog):
         enemy_embed.add_field(name="Enemy Stats", value=f"HP: {enemy.health}/{enemy.max_health}\nMana: {enemy.mana}/{enemy.max_mana}", inline=True)
         await combat_msg.edit(embed=enemy_embed)
         
-        # Update stats in database
-        async with await self.bot.db_connect() as db:
-            await db.execute('''
-                UPDATE players 
-                SET health = ?, mana = ?
-                WHERE id = ?
-            ''', (player.health, player.mana, player.id))
-            await db.commit()
+        # A surviving player's vitals stay in the write-behind cache; a defeat
+        # writes them with the respawn below
         
         # Check if player is defeated
         if not player.is_alive():
-            # Record death in history before updating player
-            async with await self.bot.db_connect() as db:
-                await db.execute('''
-                    INSERT INTO death_history (
-                        player_id, enemy_name, enemy_level, 
-                        player_level, player_health, player_max_health,
-                        player_mana, player_max_mana
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (user_id, enemy.name, enemy.level, 
-                      player.level, 0, player.max_health,
-                      player.mana, player.max_mana))
-                await db.commit()
-            
-            # Get current stats for display
-            async with await self.bot.db_connect() as db:
-                cursor = await db.execute('SELECT deaths FROM players WHERE id = ?', (user_id,))
-                deaths_row = await cursor.fetchone()
-                deaths = deaths_row[0] if deaths_row else 0
-                
-                cursor = await db.execute('SELECT COUNT(*) FROM player_kills WHERE player_id = ?', (user_id,))
-                kills_row = await cursor.fetchone()
-                kills = kills_row[0] if kills_row else 0
+            # Record the death, respawn at 50% health and bump the death
+            # counter in one transaction
+            async def record_death():
+                await self.bot.repos.kills.record_death(user_id, enemy.identity, enemy.level, player)
+                return await self.bot.repos.players.respawn_after_death(
+                    player.id, player.max_health // 2, player.max_mana
+                )
+            
+            self.bot.player_states.discard(user_id)
+            deaths, kills = await self.bot.repos.write(record_death)
+            player.health = player.max_health // 2
+            player.mana = player.max_mana
             
             defeat_embed = discord.Embed(
                 title="💀 Defeat",
@@ -987,19 +775,6 @@ class CombatCommands(commands.Cog):
                 'player': player
             }
             
-            # Restore 50% health
-            player.health = player.max_health // 2
-            player.mana = player.max_mana
-            
-            # Update database - keep quest active for potential restart and increment deaths
-            async with await self.bot.db_connect() as db:
-                await db.execute('''
-                    UPDATE players 
-                    SET health = ?, mana = ?, in_combat = FALSE, current_enemy = NULL, deaths = deaths + 1
-                    WHERE id = ?
-                ''', (player.health, player.mana, player.id))
-                await db.commit()
-            
             # Update thread name to show defeated status (non-blocking)
             self.update_thread_name(user_id, player.name, player.level, "💀 Defeated")
             del self.active_combats[user_id]
@@ -1129,6 +904,7 @@ class CombatCommands(commands.Cog):
                 enemy.health = 0
                 # Victory sequence would be handled by checking enemy.health
                 del self.active_combats[user_id]
+                await self.bot.player_states.release(user_id)
                 return
             else:
                 turn_history.append(f"🏃 {enemy.name} tried to flee but failed!")
@@ -1160,39 +936,23 @@ class CombatCommands(commands.Cog):
         enemy_embed.add_field(name="Enemy Stats", value=f"HP: {enemy.health}/{enemy.max_health}\nMana: {enemy.mana}/{enemy.max_mana}", inline=True)
         await combat_msg.edit(embed=enemy_embed)
         
-        # Update stats in database
-        async with await self.bot.db_connect() as db:
-            await db.execute('''
-                UPDATE players 
-                SET health = ?, mana = ?
-                WHERE id = ?
-            ''', (player.health, player.mana, player.id))
-            await db.commit()
+        # A surviving player's vitals stay in the write-behind cache; a defeat
+        # writes them with the respawn below
         
         # Check if player is defeated
         if not player.is_alive():
-            # Record death and handle defeat (same as handle_combat_round)
-            async with await self.bot.db_connect() as db:
-                await db.execute('''
-                    INSERT INTO death_history (
-                        player_id, enemy_name, enemy_level, 
-                        player_level, player_health, player_max_health,
-                        player_mana, player_max_mana
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (user_id, enemy.name, enemy.level, 
-                      player.level, 0, player.max_health,
-                      player.mana, player.max_mana))
-                await db.commit()
-            
-            # Get current stats for display
-            async with await self.bot.db_connect() as db:
-                cursor = await db.execute('SELECT deaths FROM players WHERE id = ?', (user_id,))
-                deaths_row = await cursor.fetchone()
-                deaths = deaths_row[0] if deaths_row else 0
-                
-                cursor = await db.execute('SELECT COUNT(*) FROM player_kills WHERE player_id = ?', (user_id,))
-                kills_row = await cursor.fetchone()
-                kills = kills_row[0] if kills_row else 0
+            # Record the death, respawn at 50% health and bump the death
+            # counter in one transaction
+            async def record_death():
+                await self.bot.repos.kills.record_death(user_id, enemy.identity, enemy.level, player)
+                return await self.bot.repos.players.respawn_after_death(
+                    player.id, player.max_health // 2, player.max_mana
+                )
+            
+            self.bot.player_states.discard(user_id)
+            deaths, kills = await self.bot.repos.write(record_death)
+            player.health = player.max_health // 2
+            player.mana = player.max_mana
             
             defeat_embed = discord.Embed(
                 title="💀 Defeat",
@@ -1215,17 +975,6 @@ class CombatCommands(commands.Cog):
                 'player': player
             }
             
-            player.health = player.max_health // 2
-            player.mana = player.max_mana
-            
-            async with await self.bot.db_connect() as db:
-                await db.execute('''
-                    UPDATE players 
-                    SET health = ?, mana = ?, in_combat = FALSE, current_enemy = NULL, deaths = deaths + 1
-                    WHERE id = ?
-                ''', (player.health, player.mana, player.id))
-                await db.commit()
-            
             # Update thread name to show defeated status (non-blocking)
             self.update_thread_name(user_id, player.name, player.level, "💀 Defeated")
             del self.active_combats[user_id]
@@ -1286,12 +1035,7 @@ class CombatCommands(commands.Cog):
     
     async def get_healing_consumable_count(self, user_id: int) -> int:
         """Get the count of healing consumables in player's inventory"""
-        async with await self.bot.db_connect() as db:
-            cursor = await db.execute('''
-                SELECT item_id, count FROM inventory 
-                WHERE player_id = ? AND count > 0
-            ''', (user_id,))
-            items = await cursor.fetchall()
+        items = await self.inventory_manager.get_stacks(user_id)
         
         total_healing_items = 0
         for item_id, count in items:
@@ -1313,13 +1057,8 @@ class CombatCommands(commands.Cog):
             enemy = combat_data['enemy']
             
             # Update player state in database
-            async with await self.bot.db_connect() as db:
-                await db.execute('''
-                    UPDATE players 
-                    SET health = ?, mana = ?, in_combat = FALSE, current_enemy = NULL
-                    WHERE id = ?
-                ''', (player.health, player.mana, user.id))
-                await db.commit()
+            self.bot.player_states.discard(user.id)
+            await self.bot.repos.write(lambda: self.bot.repos.players.leave_combat(user.id, player.health, player.mana))
             
             # Clear reactions from combat message
             message = await channel.fetch_message(combat_data['message_id'])
@@ -1417,12 +1156,7 @@ class CombatCommands(commands.Cog):
     
     async def has_mana_restore_items(self, user_id):
         """Check if player has any mana restore consumables"""
-        async with await self.bot.db_connect() as db:
-            cursor = await db.execute('''
-                SELECT item_id, count FROM inventory 
-                WHERE player_id = ? AND count > 0
-            ''', (user_id,))
-            items = await cursor.fetchall()
+        items = await self.inventory_manager.get_stacks(user_id)
         
         for item_id, count in items:
             item = self.inventory_manager.items.get(item_id)
@@ -1436,21 +1170,17 @@ class CombatCommands(commands.Cog):
     async def handle_item_usage(self, channel, user, combat_data):
         """Handle consumable item usage during combat"""
         # Get player's consumable items
-        async with await self.bot.db_connect() as db:
-            cursor = await db.execute('''
-                SELECT item_id, count FROM inventory 
-                WHERE player_id = ? AND count > 0
-            ''', (user.id,))
-            items = await cursor.fetchall()
+        items = await self.inventory_manager.get_stacks(user.id)
         
         if not items:
             await channel.send(f"{user.mention} You have no items in your inventory!")
             return
         
         # Filter consumables
+        definitions = self.session_game_data(combat_data).items
         consumables = []
         for item_id, count in items:
-            item = self.inventory_manager.items.get(item_id)
+            item = definitions.get(item_id)
             if item and item.type == ItemType.CONSUMABLE:
                 consumables.append((item, count))
         
@@ -1515,20 +1245,8 @@ class CombatCommands(commands.Cog):
                     effects_applied.append(f"Dealt {effect.value} damage to {enemy.name}")
             
             # Remove item from inventory
-            async with await self.bot.db_connect() as db:
-                await db.execute('''
-                    UPDATE inventory 
-                    SET count = count - 1 
-                    WHERE player_id = ? AND item_id = ?
-                ''', (user.id, selected_item.id))
-                
-                # Remove if count reaches 0
-                await db.execute('''
-                    DELETE FROM inventory 
-                    WHERE player_id = ? AND item_id = ? AND count <= 0
-                ''', (user.id, selected_item.id))
-                
-                await db.commit()
+            await self.bot.repos.write(lambda: self.bot.repos.inventory.consume(user.id, selected_item.id))
+            self.inventory_manager.invalidate(user.id)
             
             # Update combat data
             self.active_combats[user.id]['player'] = player
@@ -1747,287 +1465,266 @@ class CombatCommands(commands.Cog):
     
     async def handle_next_quest(self, channel, user):
         """Activate the next available quest"""
-        async with await self.bot.db_connect() as db:
-            # Get the player's current level
-            cursor = await db.execute('''
-                SELECT level FROM players WHERE id = ?
-            ''', (user.id,))
-            player_data = await cursor.fetchone()
-            
-            if not player_data:
-                await channel.send(f"{user.mention} No player data found!")
-                return
-            
-            player_level = player_data[0]
-            
-            # Get all quests for the player
-            cursor = await db.execute('''
-                SELECT quest_id, completed FROM active_quests 
-                WHERE player_id = ?
-                ORDER BY completed ASC
-            ''', (user.id,))
-            active_quests = await cursor.fetchall()
-            
-            logger.info(f"Next Quest - Active quests for user {user.id}: {active_quests}")
-            
-            # Build lists - completed should be 1 (TRUE) or 0 (FALSE)
-            active_incomplete = []
-            completed_quest_ids = []
-            
-            for quest_id, completed in active_quests:
-                logger.info(f"Quest {quest_id}: completed={completed} (type: {type(completed)})")
-                # SQLite returns 0 or 1 for boolean
-                if completed == 1 or completed == True:
-                    completed_quest_ids.append(quest_id)
-                else:
-                    active_incomplete.append(quest_id)
-            
-            logger.info(f"Incomplete quests: {active_incomplete}")
-            logger.info(f"Completed quests: {completed_quest_ids}")
-            
-            # Check if there's an incomplete quest that is the next quest in the chain
-            next_quest_in_chain = None
-            for completed_id in completed_quest_ids:
-                completed_quest = self.quest_manager.quests.get(completed_id)
-                if completed_quest and hasattr(completed_quest, 'next_quest') and completed_quest.next_quest:
-                    if completed_quest.next_quest in active_incomplete:
-                        # The next quest is already active but incomplete - this is fine, continue it
-                        next_quest_in_chain = completed_quest.next_quest
+        # Get the player's current level
+        player_level = await self.bot.repos.players.level(user.id)
+        
+        if player_level is None:
+            await channel.send(f"{user.mention} No player data found!")
+            return
+        
+        # Get all quests for the player, unfinished ones first
+        active_quests = sorted(
+            await self.bot.repos.quests.statuses(user.id),
+            key=lambda status: status.completed
+        )
+        
+        logger.info(f"Next Quest - Active quests for user {user.id}: {active_quests}")
+        
+        # Build lists - completed should be 1 (TRUE) or 0 (FALSE)
+        active_incomplete = []
+        completed_quest_ids = []
+        
+        for status in active_quests:
+            logger.info(f"Quest {status.quest_id}: completed={status.completed} (type: {type(status.completed)})")
+            # SQLite returns 0 or 1 for boolean
+            if status.completed == 1 or status.completed == True:
+                completed_quest_ids.append(status.quest_id)
+            else:
+                active_incomplete.append(status.quest_id)
+        
+        logger.info(f"Incomplete quests: {active_incomplete}")
+        logger.info(f"Completed quests: {completed_quest_ids}")
+        
+        # Check if there's an incomplete quest that is the next quest in the chain
+        next_quest_in_chain = None
+        for completed_id in completed_quest_ids:
+            completed_quest = self.quest_manager.quests.get(completed_id)
+            if completed_quest and hasattr(completed_quest, 'next_quest') and completed_quest.next_quest:
+                if completed_quest.next_quest in active_incomplete:
+                    # The next quest is already active but incomplete - this is fine, continue it
+                    next_quest_in_chain = completed_quest.next_quest
+                    break
+        
+        # If there's an active incomplete quest, use it as the quest to continue
+        current_quest_id = next_quest_in_chain if next_quest_in_chain else (active_incomplete[0] if active_incomplete else None)
+        
+        # If we have an active quest, start combat for it if it's a combat quest
+        if current_quest_id:
+            quest = self.quest_manager.quests.get(current_quest_id)
+            
+            # If it's a combat quest, start combat automatically
+            if quest and quest.type == QuestType.COMBAT:
+                await channel.send(f"⚔️ {user.mention} Continuing quest: **{quest.title}**")
+                # Start combat for the quest
+                await self.start_quest_combat(channel, user.id)
+            elif quest and quest.objectives and quest.objectives[0].type == ObjectiveType.COMBAT:
+                # Check if first objective is combat (for exploration/collection quests with combat objectives)
+                await channel.send(f"⚔️ {user.mention} Continuing quest: **{quest.title}**")
+                await self.start_quest_combat(channel, user.id)
+            elif quest:
+                await channel.send(f"📜 {user.mention} Continue your quest: **{quest.title}**\n{quest.description}")
+            return
+        
+        # Find the next quest based on completed quests
+        next_quest = None
+        
+        # Check if any completed quest has a next_quest defined
+        for completed_id in completed_quest_ids:
+            completed_quest = self.quest_manager.quests.get(completed_id)
+            if completed_quest and hasattr(completed_quest, 'next_quest') and completed_quest.next_quest:
+                # Check if this next quest hasn't been started yet
+                all_quest_ids = [q.quest_id for q in active_quests]
+                logger.info(f"Checking next_quest '{completed_quest.next_quest}' from completed quest '{completed_id}'")
+                logger.info(f"All quest IDs: {all_quest_ids}")
+                if completed_quest.next_quest not in all_quest_ids:
+                    potential_quest = self.quest_manager.quests.get(completed_quest.next_quest)
+                    if potential_quest and potential_quest.requirements.get('level', 1) <= player_level:
+                        logger.info(f"Found next quest: {potential_quest.title}")
+                        next_quest = potential_quest
                         break
-            
-            # If there's an active incomplete quest, use it as the quest to continue
-            current_quest_id = next_quest_in_chain if next_quest_in_chain else (active_incomplete[0] if active_incomplete else None)
-            
-            # If we have an active quest, start combat for it if it's a combat quest
-            if current_quest_id:
-                quest = self.quest_manager.quests.get(current_quest_id)
+        
+        # If no next quest found from completed quests, find first available quest
+        if not next_quest:
+            all_active_ids = [q.quest_id for q in active_quests]
+            for quest_id, quest in self.quest_manager.quests.items():
+                if quest_id not in all_active_ids:
+                    if quest.requirements.get('level', 1) <= player_level:
+                        # Check if it requires a previous quest
+                        if 'previous_quest' in quest.requirements:
+                            if quest.requirements['previous_quest'] in completed_quest_ids:
+                                next_quest = quest
+                                break
+                        else:
+                            next_quest = quest
+                            break
+        
+        if next_quest:
+            logger.info(f"Starting next quest: {next_quest.id}")
+            # Start the quest
+            success = await self.quest_manager.start_quest(user.id, next_quest.id)
+            if success:
+                await channel.send(f"✅ {user.mention} Started quest: **{next_quest.title}**\n{next_quest.description}")
                 
-                # If it's a combat quest, start combat automatically
-                if quest and quest.type == QuestType.COMBAT:
-                    await channel.send(f"⚔️ {user.mention} Continuing quest: **{quest.title}**")
-                    # Start combat for the quest
+                # Auto-start combat if it's a combat quest
+                if next_quest.type == QuestType.COMBAT:
+                    logger.info(f"Auto-starting combat for quest {next_quest.id}")
                     await self.start_quest_combat(channel, user.id)
-                elif quest and quest.objectives and quest.objectives[0].type == ObjectiveType.COMBAT:
+                elif next_quest.objectives and next_quest.objectives[0].type == ObjectiveType.COMBAT:
                     # Check if first objective is combat (for exploration/collection quests with combat objectives)
-                    await channel.send(f"⚔️ {user.mention} Continuing quest: **{quest.title}**")
+                    logger.info(f"Auto-starting combat for {next_quest.type.value} quest {next_quest.id}")
                     await self.start_quest_combat(channel, user.id)
-                elif quest:
-                    await channel.send(f"📜 {user.mention} Continue your quest: **{quest.title}**\n{quest.description}")
-                return
-            
-            # Find the next quest based on completed quests
-            next_quest = None
-            
-            # Check if any completed quest has a next_quest defined
-            for completed_id in completed_quest_ids:
-                completed_quest = self.quest_manager.quests.get(completed_id)
-                if completed_quest and hasattr(completed_quest, 'next_quest') and completed_quest.next_quest:
-                    # Check if this next quest hasn't been started yet
-                    all_quest_ids = [q[0] for q in active_quests]
-                    logger.info(f"Checking next_quest '{completed_quest.next_quest}' from completed quest '{completed_id}'")
-                    logger.info(f"All quest IDs: {all_quest_ids}")
-                    if completed_quest.next_quest not in all_quest_ids:
-                        potential_quest = self.quest_manager.quests.get(completed_quest.next_quest)
-                        if potential_quest and potential_quest.requirements.get('level', 1) <= player_level:
-                            logger.info(f"Found next quest: {potential_quest.title}")
-                            next_quest = potential_quest
-                            break
-            
-            # If no next quest found from completed quests, find first available quest
-            if not next_quest:
-                all_active_ids = [q[0] for q in active_quests]
-                for quest_id, quest in self.quest_manager.quests.items():
-                    if quest_id not in all_active_ids:
-                        if quest.requirements.get('level', 1) <= player_level:
-                            # Check if it requires a previous quest
-                            if 'previous_quest' in quest.requirements:
-                                if quest.requirements['previous_quest'] in completed_quest_ids:
-                                    next_quest = quest
-                                    break
-                            else:
-                                next_quest = quest
-                                break
-            
-            if next_quest:
-                logger.info(f"Starting next quest: {next_quest.id}")
-                # Start the quest
-                success = await self.quest_manager.start_quest(user.id, next_quest.id)
-                if success:
-                    await channel.send(f"✅ {user.mention} Started quest: **{next_quest.title}**\n{next_quest.description}")
-                    
-                    # Auto-start combat if it's a combat quest
-                    if next_quest.type == QuestType.COMBAT:
-                        logger.info(f"Auto-starting combat for quest {next_quest.id}")
-                        await self.start_quest_combat(channel, user.id)
-                    elif next_quest.objectives and next_quest.objectives[0].type == ObjectiveType.COMBAT:
-                        # Check if first objective is combat (for exploration/collection quests with combat objectives)
-                        logger.info(f"Auto-starting combat for {next_quest.type.value} quest {next_quest.id}")
-                        await self.start_quest_combat(channel, user.id)
-                else:
-                    await channel.send(f"{user.mention} Failed to start quest.")
             else:
-                logger.info("No next quest found")
-                await channel.send(f"{user.mention} No new quests available at the moment!")
+                await channel.send(f"{user.mention} Failed to start quest.")
+        else:
+            logger.info("No next quest found")
+            await channel.send(f"{user.mention} No new quests available at the moment!")
     
     async def handle_show_inventory(self, channel, user):
         """Display the player's inventory"""
-        async with await self.bot.db_connect() as db:
-            cursor = await db.execute('''
-                SELECT item_id, count FROM inventory 
-                WHERE player_id = ? AND count > 0
-                ORDER BY item_id
-            ''', (user.id,))
-            items = await cursor.fetchall()
-            
-            if not items:
-                await channel.send(f"{user.mention} Your inventory is empty!")
-                return
-            
-            embed = discord.Embed(
-                title=f"🎒 {user.display_name}'s Inventory",
-                color=discord.Color.blue()
-            )
-            
-            # Group items by type
-            weapons = []
-            armor = []
-            consumables = []
-            other = []
-            
-            for item_id, count in items:
-                item = self.inventory_manager.items.get(item_id)
-                if item:
-                    item_text = f"{item.name} x{count}"
-                    if item.type == ItemType.WEAPON:
-                        weapons.append(item_text)
-                    elif item.type in [ItemType.HELMET, ItemType.ARMOR, ItemType.PANTS, ItemType.BOOTS]:
-                        armor.append(item_text)
-                    elif item.type == ItemType.CONSUMABLE:
-                        consumables.append(item_text)
-                    else:
-                        other.append(item_text)
-            
-            if weapons:
-                embed.add_field(name="⚔️ Weapons", value="\n".join(weapons), inline=False)
-            if armor:
-                embed.add_field(name="🛡️ Armor", value="\n".join(armor), inline=False)
-            if consumables:
-                embed.add_field(name="🧪 Consumables", value="\n".join(consumables), inline=False)
-            if other:
-                embed.add_field(name="📦 Other", value="\n".join(other), inline=False)
-            
-            # Add action buttons
-            embed.add_field(
-                name="Actions",
-                value="🛏️ Rest | ▶️ Next Quest | 📊 Stats | 🛡️ Equipment",
-                inline=False
-            )
-            
-            # Check if we should edit existing message or send new one
-            victory_data = self.victory_messages.get(user.id)
-            if victory_data and victory_data.get('message_id'):
-                try:
-                    # Try to fetch and edit the existing message
-                    msg = await channel.fetch_message(victory_data['message_id'])
-                    await msg.edit(embed=embed)
-                    # Clear old reactions
-                    await msg.clear_reactions()
-                    inv_msg = msg
-                except (discord.NotFound, discord.Forbidden, discord.HTTPException):
-                    # If we can't edit, send a new message
-                    inv_msg = await channel.send(embed=embed)
-            else:
+        items = await self.inventory_manager.get_stacks(user.id)
+        
+        if not items:
+            await channel.send(f"{user.mention} Your inventory is empty!")
+            return
+        
+        embed = discord.Embed(
+            title=f"🎒 {user.display_name}'s Inventory",
+            color=discord.Color.blue()
+        )
+        
+        # Group items by type
+        weapons = []
+        armor = []
+        consumables = []
+        other = []
+        
+        for item_id, count in items:
+            item = self.inventory_manager.items.get(item_id)
+            if item:
+                item_text = f"{item.name} x{count}"
+                if item.type == ItemType.WEAPON:
+                    weapons.append(item_text)
+                elif item.type in [ItemType.HELMET, ItemType.ARMOR, ItemType.PANTS, ItemType.BOOTS]:
+                    armor.append(item_text)
+                elif item.type == ItemType.CONSUMABLE:
+                    consumables.append(item_text)
+                else:
+                    other.append(item_text)
+        
+        if weapons:
+            embed.add_field(name="⚔️ Weapons", value="\n".join(weapons), inline=False)
+        if armor:
+            embed.add_field(name="🛡️ Armor", value="\n".join(armor), inline=False)
+        if consumables:
+            embed.add_field(name="🧪 Consumables", value="\n".join(consumables), inline=False)
+        if other:
+            embed.add_field(name="📦 Other", value="\n".join(other), inline=False)
+        
+        # Add action buttons
+        embed.add_field(
+            name="Actions",
+            value="🛏️ Rest | ▶️ Next Quest | 📊 Stats | 🛡️ Equipment",
+            inline=False
+        )
+        
+        # Check if we should edit existing message or send new one
+        victory_data = self.victory_messages.get(user.id)
+        if victory_data and victory_data.get('message_id'):
+            try:
+                # Try to fetch and edit the existing message
+                msg = await channel.fetch_message(victory_data['message_id'])
+                await msg.edit(embed=embed)
+                # Clear old reactions
+                await msg.clear_reactions()
+                inv_msg = msg
+            except (discord.NotFound, discord.Forbidden, discord.HTTPException):
+                # If we can't edit, send a new message
                 inv_msg = await channel.send(embed=embed)
-            
-            # Add reaction buttons
-            await inv_msg.add_reaction("🛏️")  # Rest
-            await inv_msg.add_reaction("▶️")  # Next quest
-            await inv_msg.add_reaction("📊")  # Stats
-            await inv_msg.add_reaction("🛡️")  # Equipment
-            
-            # Store message for reaction handling
-            self.victory_messages[user.id] = {
-                'message_id': inv_msg.id,
-                'channel_id': channel.id,
-                'type': 'inventory'
-            }
+        else:
+            inv_msg = await channel.send(embed=embed)
+        
+        # Add reaction buttons
+        await inv_msg.add_reaction("🛏️")  # Rest
+        await inv_msg.add_reaction("▶️")  # Next quest
+        await inv_msg.add_reaction("📊")  # Stats
+        await inv_msg.add_reaction("🛡️")  # Equipment
+        
+        # Store message for reaction handling
+        self.victory_messages[user.id] = {
+            'message_id': inv_msg.id,
+            'channel_id': channel.id,
+            'type': 'inventory'
+        }
     
     async def handle_show_stats(self, channel, user):
         """Display the player's stats"""
-        async with await self.bot.db_connect() as db:
-            cursor = await db.execute('''
-                SELECT name, level, health, max_health, mana, max_mana, xp, gold,
-                       damage_bonus, health_bonus, mana_bonus, crit_chance_bonus
-                FROM players WHERE id = ?
-            ''', (user.id,))
-            player_data = await cursor.fetchone()
-            
-            if not player_data:
-                await channel.send(f"{user.mention} No player data found!")
-                return
-            
-            name, level, hp, max_hp, mana, max_mana, xp, gold, dmg, hp_bonus, mana_bonus, crit = player_data
-            xp_needed = level * 100
-            
-            embed = discord.Embed(
-                title=f"📊 {name}'s Stats",
-                color=discord.Color.green()
-            )
-            
-            embed.add_field(
-                name="Core Stats",
-                value=f"**Level:** {level}\n"
-                      f"**HP:** {hp}/{max_hp}\n"
-                      f"**Mana:** {mana}/{max_mana}\n"
-                      f"**XP:** {xp}/{xp_needed}\n"
-                      f"**Gold:** {gold}",
-                inline=True
-            )
-            
-            embed.add_field(
-                name="Combat Bonuses",
-                value=f"**Damage:** +{dmg}\n"
-                      f"**Health:** +{hp_bonus}\n"
-                      f"**Mana:** +{mana_bonus}\n"
-                      f"**Crit Chance:** +{crit}%",
-                inline=True
-            )
-            
-            # Add action buttons
-            embed.add_field(
-                name="Actions",
-                value="🛏️ Rest | ▶️ Next Quest | 🎒 Inventory | 🛡️ Equipment",
-                inline=False
-            )
-            
-            # Check if we should edit existing message or send new one
-            victory_data = self.victory_messages.get(user.id)
-            if victory_data and victory_data.get('message_id'):
-                try:
-                    # Try to fetch and edit the existing message
-                    msg = await channel.fetch_message(victory_data['message_id'])
-                    await msg.edit(embed=embed)
-                    # Clear old reactions
-                    await msg.clear_reactions()
-                    stats_msg = msg
-                except (discord.NotFound, discord.Forbidden, discord.HTTPException):
-                    # If we can't edit, send a new message
-                    stats_msg = await channel.send(embed=embed)
-            else:
+        stats = await self.bot.repos.players.stats(user.id)
+        
+        if not stats:
+            await channel.send(f"{user.mention} No player data found!")
+            return
+        
+        xp_needed = stats.level * 100
+        
+        embed = discord.Embed(
+            title=f"📊 {stats.name}'s Stats",
+            color=discord.Color.green()
+        )
+        
+        embed.add_field(
+            name="Core Stats",
+            value=f"**Level:** {stats.level}\n"
+                  f"**HP:** {stats.health}/{stats.max_health}\n"
+                  f"**Mana:** {stats.mana}/{stats.max_mana}\n"
+                  f"**XP:** {stats.xp}/{xp_needed}\n"
+                  f"**Gold:** {stats.gold}",
+            inline=True
+        )
+        
+        embed.add_field(
+            name="Combat Bonuses",
+            value=f"**Damage:** +{stats.damage_bonus}\n"
+                  f"**Health:** +{stats.health_bonus}\n"
+                  f"**Mana:** +{stats.mana_bonus}\n"
+                  f"**Crit Chance:** +{stats.crit_chance_bonus}%",
+            inline=True
+        )
+        
+        # Add action buttons
+        embed.add_field(
+            name="Actions",
+            value="🛏️ Rest | ▶️ Next Quest | 🎒 Inventory | 🛡️ Equipment",
+            inline=False
+        )
+        
+        # Check if we should edit existing message or send new one
+        victory_data = self.victory_messages.get(user.id)
+        if victory_data and victory_data.get('message_id'):
+            try:
+                # Try to fetch and edit the existing message
+                msg = await channel.fetch_message(victory_data['message_id'])
+                await msg.edit(embed=embed)
+                # Clear old reactions
+                await msg.clear_reactions()
+                stats_msg = msg
+            except (discord.NotFound, discord.Forbidden, discord.HTTPException):
+                # If we can't edit, send a new message
                 stats_msg = await channel.send(embed=embed)
-            
-            # Add reaction buttons
-            await stats_msg.add_reaction("🛏️")  # Rest
-            await stats_msg.add_reaction("▶️")  # Next quest
-            await stats_msg.add_reaction("🎒")  # Inventory
-            await stats_msg.add_reaction("🛡️")  # Equipment
-            
-            # Store message for reaction handling
-            self.victory_messages[user.id] = {
-                'message_id': stats_msg.id,
-                'channel_id': channel.id,
-                'type': 'stats'
-            }
+        else:
+            stats_msg = await channel.send(embed=embed)
+        
+        # Add reaction buttons
+        await stats_msg.add_reaction("🛏️")  # Rest
+        await stats_msg.add_reaction("▶️")  # Next quest
+        await stats_msg.add_reaction("🎒")  # Inventory
+        await stats_msg.add_reaction("🛡️")  # Equipment
+        
+        # Store message for reaction handling
+        self.victory_messages[user.id] = {
+            'message_id': stats_msg.id,
+            'channel_id': channel.id,
+            'type': 'stats'
+        }
     
     async def handle_show_equipment(self, channel, user):
         """Display the player's equipped items in Diablo 2 style layout"""
@@ -2157,89 +1854,78 @@ class CombatCommands(commands.Cog):
     
     async def handle_rest(self, channel, user):
         """Allow the player to rest and restore HP and Mana"""
-        async with await self.bot.db_connect() as db:
-            # Get player data
-            cursor = await db.execute('''
-                SELECT name, health, max_health, mana, max_mana FROM players WHERE id = ?
-            ''', (user.id,))
-            player_data = await cursor.fetchone()
-            
-            if not player_data:
-                await channel.send(f"{user.mention} No player data found!")
-                return
-            
-            name, current_hp, max_hp, current_mana, max_mana = player_data
-            
-            # Calculate HP and Mana restored
-            hp_restored = max_hp - current_hp
-            mana_restored = max_mana - current_mana
-            
-            # Update player to full HP and Mana
-            await db.execute('''
-                UPDATE players
-                SET health = max_health, mana = max_mana
-                WHERE id = ?
-            ''', (user.id,))
-            await db.commit()
-            
-            # Create rest message
-            embed = discord.Embed(
-                title="🛏️ Rest",
-                description=f"{name} takes a moment to rest and recover...",
-                color=discord.Color.blue()
-            )
-            
-            if hp_restored > 0 or mana_restored > 0:
-                recovery_text = []
-                if hp_restored > 0:
-                    recovery_text.append(f"❤️ HP: {current_hp} → {max_hp} (+{hp_restored})")
-                if mana_restored > 0:
-                    recovery_text.append(f"💙 Mana: {current_mana} → {max_mana} (+{mana_restored})")
-                
-                embed.add_field(
-                    name="Recovery",
-                    value="\n".join(recovery_text),
-                    inline=False
-                )
-            else:
-                embed.add_field(
-                    name="Status",
-                    value="You're already at full health and mana!",
-                    inline=False
-                )
+        # Restore player to full HP and Mana
+        vitals = await self.bot.repos.write(lambda: self.bot.repos.players.rest(user.id))
+        
+        if not vitals:
+            await channel.send(f"{user.mention} No player data found!")
+            return
+        
+        name, max_hp, max_mana = vitals.name, vitals.max_health, vitals.max_mana
+        current_hp, current_mana = vitals.health, vitals.mana
+        
+        # Calculate HP and Mana restored
+        hp_restored = max_hp - current_hp
+        mana_restored = max_mana - current_mana
+        
+        # Create rest message
+        embed = discord.Embed(
+            title="🛏️ Rest",
+            description=f"{name} takes a moment to rest and recover...",
+            color=discord.Color.blue()
+        )
+        
+        if hp_restored > 0 or mana_restored > 0:
+            recovery_text = []
+            if hp_restored > 0:
+                recovery_text.append(f"❤️ HP: {current_hp} → {max_hp} (+{hp_restored})")
+            if mana_restored > 0:
+                recovery_text.append(f"💙 Mana: {current_mana} → {max_mana} (+{mana_restored})")
             
             embed.add_field(
-                name="Ready for Battle",
-                value="You feel refreshed and ready to continue your adventure!",
+                name="Recovery",
+                value="\n".join(recovery_text),
                 inline=False
             )
-            
+        else:
             embed.add_field(
-                name="What would you like to do?",
-                value=f"▶️ Next Quest\n🔄 Continue Quest Line\n🎒 View Inventory\n📊 View Stats\n🛡️ View Equipment",
+                name="Status",
+                value="You're already at full health and mana!",
                 inline=False
             )
-            
-            rest_msg = await channel.send(embed=embed)
-            
-            # Add reaction buttons
-            await rest_msg.add_reaction("▶️")  # Next quest
-            await rest_msg.add_reaction("🔄")  # Continue Quest Line
-            await rest_msg.add_reaction("🎒")  # Inventory
-            await rest_msg.add_reaction("📊")  # Stats
-            await rest_msg.add_reaction("🛡️")  # Equipment
-            
-            # Store rest message for reaction handling (reuse victory_messages)
-            # Clean up old victory message first
-            if user.id in self.victory_messages:
-                del self.victory_messages[user.id]
-            
-            # Store new rest message
-            self.victory_messages[user.id] = {
-                'message_id': rest_msg.id,
-                'channel_id': channel.id,
-                'type': 'rest'
-            }
+        
+        embed.add_field(
+            name="Ready for Battle",
+            value="You feel refreshed and ready to continue your adventure!",
+            inline=False
+        )
+        
+        embed.add_field(
+            name="What would you like to do?",
+            value=f"▶️ Next Quest\n🔄 Continue Quest Line\n🎒 View Inventory\n📊 View Stats\n🛡️ View Equipment",
+            inline=False
+        )
+        
+        rest_msg = await channel.send(embed=embed)
+        
+        # Add reaction buttons
+        await rest_msg.add_reaction("▶️")  # Next quest
+        await rest_msg.add_reaction("🔄")  # Continue Quest Line
+        await rest_msg.add_reaction("🎒")  # Inventory
+        await rest_msg.add_reaction("📊")  # Stats
+        await rest_msg.add_reaction("🛡️")  # Equipment
+        
+        # Store rest message for reaction handling (reuse victory_messages)
+        # Clean up old victory message first
+        if user.id in self.victory_messages:
+            del self.victory_messages[user.id]
+        
+        # Store new rest message
+        self.victory_messages[user.id] = {
+            'message_id': rest_msg.id,
+            'channel_id': channel.id,
+            'type': 'rest'
+        }
     
     async def handle_flee_retry(self, channel, user):
         """Handle retrying combat after fleeing"""
@@ -2253,63 +1939,39 @@ class CombatCommands(commands.Cog):
     
     async def handle_defeat_restart(self, channel, user):
         """Handle defeat restart - heal fully, apply penalties, and restart quest"""
-        async with await self.bot.db_connect() as db:
-            # Get player data
-            cursor = await db.execute('''
-                SELECT max_health, max_mana, gold, xp, level FROM players WHERE id = ?
-            ''', (user.id,))
-            player_data = await cursor.fetchone()
-            
-            if not player_data:
-                await channel.send(f"{user.mention} No player data found!")
-                return
+        # Update to full health and mana, apply 10% penalty to gold and XP
+        penalty = await self.bot.repos.write(lambda: self.bot.repos.players.apply_death_penalty(user.id, 0.1))
+        
+        if not penalty:
+            await channel.send(f"{user.mention} No player data found!")
+            return
+        
+        max_hp, max_mana, gold_penalty, xp_penalty = penalty
+        
+        # Get current quest
+        quest_id = await self.bot.repos.quests.current(user.id)
+        
+        penalty_msg = ""
+        if gold_penalty > 0 or xp_penalty > 0:
+            penalty_msg = f"\n**Penalty:** -{gold_penalty} gold, -{xp_penalty} XP"
+        
+        if quest_id:
+            quest = self.quest_manager.quests.get(quest_id)
             
-            max_hp, max_mana, gold, xp, level = player_data
-            
-            # Apply 10% penalty to gold and XP
-            gold_penalty = int(gold * 0.1)
-            xp_penalty = int(xp * 0.1)
-            new_gold = max(0, gold - gold_penalty)
-            new_xp = max(0, xp - xp_penalty)
-            
-            # Update to full health and mana, apply penalties
-            await db.execute('''
-                UPDATE players 
-                SET health = ?, mana = ?, gold = ?, xp = ?
-                WHERE id = ?
-            ''', (max_hp, max_mana, new_gold, new_xp, user.id))
-            await db.commit()
-            
-            # Get current quest
-            cursor = await db.execute('''
-                SELECT quest_id FROM active_quests 
-                WHERE player_id = ? AND completed = FALSE
-                LIMIT 1
-            ''', (user.id,))
-            quest_data = await cursor.fetchone()
-            
-            penalty_msg = ""
-            if gold_penalty > 0 or xp_penalty > 0:
-                penalty_msg = f"\n**Penalty:** -{gold_penalty} gold, -{xp_penalty} XP"
-            
-            if quest_data:
-                quest_id = quest_data[0]
-                quest = self.quest_manager.quests.get(quest_id)
-                
-                await channel.send(
-                    f"✨ {user.mention} You have rested and recovered!\n"
-                    f"**HP:** {max_hp}/{max_hp} | **Mana:** {max_mana}/{max_mana}{penalty_msg}\n"
-                    f"Restarting quest: **{quest.title}**"
-                )
-                
-                # Start quest combat
-                await self.start_quest_combat(channel, user.id)
-            else:
-                await channel.send(
-                    f"✨ {user.mention} You have rested and recovered!\n"
-                    f"**HP:** {max_hp}/{max_hp} | **Mana:** {max_mana}/{max_mana}{penalty_msg}\n"
-                    f"No active quest to restart. Use `!w quests` to view available quests."
-                )
+            await channel.send(
+                f"✨ {user.mention} You have rested and recovered!\n"
+                f"**HP:** {max_hp}/{max_hp} | **Mana:** {max_mana}/{max_mana}{penalty_msg}\n"
+                f"Restarting quest: **{quest.title}**"
+            )
+            
+            # Start quest combat
+            await self.start_quest_combat(channel, user.id)
+        else:
+            await channel.send(
+                f"✨ {user.mention} You have rested and recovered!\n"
+                f"**HP:** {max_hp}/{max_hp} | **Mana:** {max_mana}/{max_mana}{penalty_msg}\n"
+                f"No active quest to restart. Use `!w quests` to view available quests."
+            )
     
     async def handle_defeat_leave(self, channel, user):
         """Handle defeat leave - show stats, inventory, and current quest"""
@@ -2320,43 +1982,35 @@ class CombatCommands(commands.Cog):
         await self.handle_show_inventory(channel, user)
         
         # Show current quest progress
-        async with await self.bot.db_connect() as db:
-            cursor = await db.execute('''
-                SELECT quest_id, objectives_progress FROM active_quests 
-                WHERE player_id = ? AND completed = FALSE
-                LIMIT 1
-            ''', (user.id,))
-            quest_data = await cursor.fetchone()
-            
-            if quest_data:
-                quest_id, objectives_progress_json = quest_data
-                quest = self.quest_manager.quests.get(quest_id)
+        quest_id = await self.bot.repos.quests.current(user.id)
+        
+        if quest_id:
+            quest = self.quest_manager.quests.get(quest_id)
+            
+            if quest:
+                objectives_progress = await self.quest_manager.get_objective_progress(user.id, quest_id)
                 
-                if quest:
-                    import json
-                    objectives_progress = json.loads(objectives_progress_json)
-                    
-                    embed = discord.Embed(
-                        title="📜 Current Quest",
-                        description=f"**{quest.title}**\n{quest.description}",
-                        color=discord.Color.gold()
-                    )
-                    
-                    # Show progress for each objective
-                    progress_text = []
-                    for i, obj in enumerate(quest.objectives):
-                        current = objectives_progress[i] if i < len(objectives_progress) else 0
-                        progress_text.append(f"{obj.description}: {current}/{obj.count}")
-                    
-                    embed.add_field(
-                        name="Progress",
-                        value="\n".join(progress_text),
-                        inline=False
-                    )
-                    
-                    await channel.send(embed=embed)
-            else:
-                await channel.send(f"{user.mention} You don't have an active quest. Use `!w quests` to view available quests.")
+                embed = discord.Embed(
+                    title="📜 Current Quest",
+                    description=f"**{quest.title}**\n{quest.description}",
+                    color=discord.Color.gold()
+                )
+                
+                # Show progress for each objective
+                progress_text = []
+                for i, obj in enumerate(quest.objectives):
+                    current = objectives_progress[i] if i < len(objectives_progress) else 0
+                    progress_text.append(f"{obj.description}: {current}/{obj.count}")
+                
+                embed.add_field(
+                    name="Progress",
+                    value="\n".join(progress_text),
+                    inline=False
+                )
+                
+                await channel.send(embed=embed)
+        else:
+            await channel.send(f"{user.mention} You don't have an active quest. Use `!w quests` to view available quests.")
             
     async def process_combat_round(self, player, enemy, player_attack):
         """Process a round of combat and return the embed"""
@@ -2414,13 +2068,7 @@ class CombatCommands(commands.Cog):
                     value=loot_msg,
                     inline=False
                 )            # Update database
-            async with await self.bot.db_connect() as db:
-                await db.execute('''
-                    UPDATE players 
-                    SET health = ?, mana = ?, xp = ?, level = ?, in_combat = FALSE, current_enemy = NULL
-                    WHERE id = ?
-                ''', (player.health, player.mana, player.xp, player.level, player.id))
-                await db.commit()
+            await self.bot.repos.write(lambda: self.bot.repos.players.save_progress(player))
 
             return embed
 
@@ -2471,12 +2119,7 @@ class CombatCommands(commands.Cog):
             player.mana = player.max_mana
 
             # Update database and increment deaths
-            async with self.bot.db.execute('''
-                UPDATE players 
-                SET health = ?, mana = ?, in_combat = FALSE, current_enemy = NULL, deaths = deaths + 1
-                WHERE id = ?
-            ''', (player.health, player.mana, player.id)) as cursor:
-                await self.bot.db.commit()
+            await self.bot.repos.write(lambda: self.bot.repos.players.respawn_after_death(player.id, player.health, player.mana))
             
             # Return embed with defeat reactions flag
             embed.defeat_reactions = True
@@ -2484,12 +2127,7 @@ class CombatCommands(commands.Cog):
 
         else:
             # Update database with current combat state
-            async with self.bot.db.execute('''
-                UPDATE players 
-                SET health = ?, mana = ?
-                WHERE id = ?
-            ''', (player.health, player.mana, player.id)) as cursor:
-                await self.bot.db.commit()
+            await self.bot.repos.write(lambda: self.bot.repos.players.set_vitals(player.id, player.health, player.mana))
 
             # Add action buttons reminder
             embed.add_field(
@@ -2513,219 +2151,189 @@ class CombatCommands(commands.Cog):
             logger.info(f"Using pre-generated enemy: {enemy.name} (Level {enemy.level})")
         
         # Get player
-        async with await self.bot.db_connect() as db:
-            async with db.execute('SELECT * FROM players WHERE id = ?', (user.id,)) as cursor:
-                if not (row := await cursor.fetchone()):
-                    logger.warning(f"No character found for user {user.id}")
-                    await channel.send(f"{user.mention} You need to create a character first! Use `!w start`")
-                    return
-                logger.info(f"Found character for user {user.id}: Level {row[2]}")
-                
-                # Display enemy stats
-                # Display enemy stats and initiative roll
-                initiative_embed = discord.Embed(
-                    title="⚔️ Combat Initiative",
-                    description="🎲 Rolling for initiative...",
-                    color=discord.Color.blue()
-                )
-                initiative_msg = await channel.send(embed=initiative_embed)
-                
-                # Roll for initiative (50/50 chance)
-                player_first = random.choice([True, False])
-                await asyncio.sleep(1)  # Add a small delay for dramatic effect
-                
-                # Update initiative message
-                initiative_embed.description = f"{'You' if player_first else enemy.name} won the initiative roll!"
-                await initiative_msg.edit(embed=initiative_embed)
-                await asyncio.sleep(1)  # Another small delay
-                
-                # Display enemy stats
-                enemy_embed = discord.Embed(
-                    title="⚔️ Enemy Stats",
-                    description=f"You face a level {enemy.level} {enemy.name}!",
-                    color=discord.Color.red()
-                )
-                enemy_embed.add_field(
-                    name="Enemy Stats",
-                    value=f"Health: {enemy.health}/{enemy.max_health}\nMana: {enemy.mana}/{enemy.max_mana}",
+        if not (player := await self.bot.repos.players.load(user.id)):
+            logger.warning(f"No character found for user {user.id}")
+            await channel.send(f"{user.mention} You need to create a character first! Use `!w start`")
+            return
+        logger.info(f"Found character for user {user.id}: Level {player.level}")
+        
+        # Display enemy stats
+        # Display enemy stats and initiative roll
+        initiative_embed = discord.Embed(
+            title="⚔️ Combat Initiative",
+            description="🎲 Rolling for initiative...",
+            color=discord.Color.blue()
+        )
+        initiative_msg = await channel.send(embed=initiative_embed)
+        
+        # Roll for initiative (50/50 chance)
+        player_first = random.choice([True, False])
+        await asyncio.sleep(1)  # Add a small delay for dramatic effect
+        
+        # Update initiative message
+        initiative_embed.description = f"{'You' if player_first else enemy.name} won the initiative roll!"
+        await initiative_msg.edit(embed=initiative_embed)
+        await asyncio.sleep(1)  # Another small delay
+        
+        # Display enemy stats
+        enemy_embed = discord.Embed(
+            title="⚔️ Enemy Stats",
+            description=f"You face a level {enemy.level} {enemy.name}!",
+            color=discord.Color.red()
+        )
+        enemy_embed.add_field(
+            name="Enemy Stats",
+            value=f"Health: {enemy.health}/{enemy.max_health}\nMana: {enemy.mana}/{enemy.max_mana}",
+            inline=False
+        )
+        try:
+            await channel.send(embed=enemy_embed)
+            logger.info("Successfully sent enemy stats embed")
+        except Exception as e:
+            logger.error(f"Failed to send enemy stats embed: {str(e)}")
+        
+        # If enemy goes first, process their attack
+        if not player_first:
+            enemy_attack = random.choice(enemy.attacks)
+            enemy_result = enemy_attack.execute(enemy, player)
+            
+            # Send enemy attack result
+            attack_embed = discord.Embed(
+                title="Enemy Attack!",
+                description=f"{enemy.name} attacks first!",
+                color=discord.Color.red()
+            )
+            if enemy_result['success']:
+                attack_embed.add_field(
+                    name="Attack Result",
+                    value=f"{enemy_result['message']}\nDamage: {enemy_result['damage']}",
                     inline=False
                 )
-                try:
-                    await channel.send(embed=enemy_embed)
-                    logger.info("Successfully sent enemy stats embed")
-                except Exception as e:
-                    logger.error(f"Failed to send enemy stats embed: {str(e)}")
-                
-                # If enemy goes first, process their attack
-                if not player_first:
-                    enemy_attack = random.choice(enemy.attacks)
-                    enemy_result = enemy_attack.execute(enemy, player)
-                    
-                    # Send enemy attack result
-                    attack_embed = discord.Embed(
-                        title="Enemy Attack!",
-                        description=f"{enemy.name} attacks first!",
-                        color=discord.Color.red()
-                    )
-                    if enemy_result['success']:
-                        attack_embed.add_field(
-                            name="Attack Result",
-                            value=f"{enemy_result['message']}\nDamage: {enemy_result['damage']}",
-                            inline=False
-                        )
-                    else:
-                        attack_embed.add_field(
-                            name="Attack Result",
-                            value=enemy_result['message'],
-                            inline=False
-                        )
-                    await channel.send(embed=attack_embed)
-                    
-                    # Update database with player's new health
-                    async with await self.bot.db_connect() as db:
-                        await db.execute('''
-                            UPDATE players 
-                            SET health = ?
-                            WHERE id = ?
-                        ''', (player.health, player.id))
-                        await db.commit()
-                
-                # Send combat options message
-                options_embed = discord.Embed(
-                    title="Your Turn",
-                    description="Choose your action:",
-                    color=discord.Color.blue()
-                )
-                options_embed.add_field(
-                    name="Options",
-                    value=f"{self.MELEE_EMOJI} Melee Attack\n{self.MAGIC_EMOJI} Magic Attack\n{self.FLEE_EMOJI} Flee",
+            else:
+                attack_embed.add_field(
+                    name="Attack Result",
+                    value=enemy_result['message'],
                     inline=False
                 )
-                combat_msg = await channel.send(embed=options_embed)
-                
-                # Add reaction buttons
-                for emoji in self.combat_emojis:
-                    await combat_msg.add_reaction(emoji)
-                
-                # Store combat session
-                self.active_combats[user.id] = {
-                    'player': player,
-                    'enemy': enemy,
-                    'message_id': combat_msg.id,
-                    'turn_history': []  # Track all combat turns
-                }
-                
-                # Determine who goes first (50/50 chance)
-                player_goes_first = random.choice([True, False])
-                turn_message = discord.Embed(
-                    title="Combat Initiative!",
-                    description="🎲 Rolling for initiative...",
-                    color=discord.Color.blue()
-                )
-                turn_msg = await channel.send(embed=turn_message)
-                
-                # Create the player object
-                player = Player(
-                    id=row[0],
-                    name=row[1],
-                    level=row[2],
-                    xp=row[3],
-                    health=row[4],
-                    max_health=row[5],
-                    mana=row[6],
-                    max_mana=row[7]
-                )
+            await channel.send(embed=attack_embed)
+            
+            # Update database with player's new health
+            await self.bot.repos.write(lambda: self.bot.repos.players.set_health(player.id, player.health))
+        
+        # Send combat options message
+        options_embed = discord.Embed(
+            title="Your Turn",
+            description="Choose your action:",
+            color=discord.Color.blue()
+        )
+        options_embed.add_field(
+            name="Options",
+            value=f"{self.MELEE_EMOJI} Melee Attack\n{self.MAGIC_EMOJI} Magic Attack\n{self.FLEE_EMOJI} Flee",
+            inline=False
+        )
+        combat_msg = await channel.send(embed=options_embed)
+        
+        # Add reaction buttons
+        for emoji in self.combat_emojis:
+            await combat_msg.add_reaction(emoji)
+        
+        # Store combat session
+        self.active_combats[user.id] = {
+            'player': player,
+            'enemy': enemy,
+            'message_id': combat_msg.id,
+            'turn_history': [],  # Track all combat turns
+            'game_data': self.bot.game_data,
+        }
+        
+        # Determine who goes first (50/50 chance)
+        player_goes_first = random.choice([True, False])
+        turn_message = discord.Embed(
+            title="Combat Initiative!",
+            description="🎲 Rolling for initiative...",
+            color=discord.Color.blue()
+        )
+        turn_msg = await channel.send(embed=turn_message)
 
-                if player.in_combat:
-                    await channel.send(f"{user.mention} You're already in combat!")
-                    return
+        if player.in_combat:
+            await channel.send(f"{user.mention} You're already in combat!")
+            return
 
-            # If enemy wasn't provided, generate one
-            if not enemy:
-                enemy = self.enemy_generator.generate_enemy(player.level)
-            player.current_enemy = enemy
-            player.in_combat = True
+        # If enemy wasn't provided, generate one
+        if not enemy:
+            enemy = self.enemy_generator.generate_enemy(player.level)
+        player.current_enemy = enemy
+        player.in_combat = True
 
-            # Save initial combat state
-            async with await self.bot.db_connect() as db:
-                await db.execute('''
-                    UPDATE players 
-                    SET in_combat = ?, current_enemy = ?
-                    WHERE id = ?
-                ''', (True, enemy.name, player.id))
-                await db.commit()
+        # Save initial combat state
+        await self.bot.repos.write(lambda: self.bot.repos.players.enter_combat(player.id, enemy.identity.key if enemy.identity else None))
 
-            # Update initiative message
-            await turn_msg.edit(embed=discord.Embed(
-                title="Combat Initiative!",
-                description=f"{'You' if player_goes_first else enemy.name} won the initiative roll!",
-                color=discord.Color.blue()
-            ))
+        # Update initiative message
+        await turn_msg.edit(embed=discord.Embed(
+            title="Combat Initiative!",
+            description=f"{'You' if player_goes_first else enemy.name} won the initiative roll!",
+            color=discord.Color.blue()
+        ))
 
-            # Create combat embed
-            embed = discord.Embed(
-                title="⚔️ Combat Started!",
-                description=f"Combat with {enemy.name} (Level {enemy.level}) has begun!",
-                color=discord.Color.red()
-            )
+        # Create combat embed
+        embed = discord.Embed(
+            title="⚔️ Combat Started!",
+            description=f"Combat with {enemy.name} (Level {enemy.level}) has begun!",
+            color=discord.Color.red()
+        )
 
-            # If enemy goes first, process their attack
-            if not player_goes_first:
-                enemy_attack = random.choice(enemy.attacks)
-                enemy_result = enemy_attack.execute(enemy, player)
-                
-                # Update player health in database
-                async with await self.bot.db_connect() as db:
-                    await db.execute('''
-                        UPDATE players 
-                        SET health = ?
-                        WHERE id = ?
-                    ''', (player.health, player.id))
-                    await db.commit()
+        # If enemy goes first, process their attack
+        if not player_goes_first:
+            enemy_attack = random.choice(enemy.attacks)
+            enemy_result = enemy_attack.execute(enemy, player)
+            
+            # Update player health in database
+            await self.bot.repos.write(lambda: self.bot.repos.players.set_health(player.id, player.health))
 
-                if enemy_result['success']:
-                    embed.add_field(
-                        name=f"{enemy.name} Attacks First!",
-                        value=f"{enemy_result['message']}\nDamage: {enemy_result['damage']}",
-                        inline=False
-                    )
-                else:
-                    embed.add_field(
-                        name=f"{enemy.name} Attacks First!",
-                        value=enemy_result['message'],
-                        inline=False
-                    )
+            if enemy_result['success']:
+                embed.add_field(
+                    name=f"{enemy.name} Attacks First!",
+                    value=f"{enemy_result['message']}\nDamage: {enemy_result['damage']}",
+                    inline=False
+                )
+            else:
+                embed.add_field(
+                    name=f"{enemy.name} Attacks First!",
+                    value=enemy_result['message'],
+                    inline=False
+                )
 
-            # Add current stats
-            embed.add_field(
-                name=f"{enemy.name}'s Stats",
-                value=f"Health: {enemy.health}/{enemy.max_health}\nMana: {enemy.mana}/{enemy.max_mana}",
-                inline=False
-            )
-            embed.add_field(
-                name="Your Stats",
-                value=f"Health: {player.health}/{player.max_health}\nMana: {player.mana}/{player.max_mana}",
-                inline=False
-            )
-            embed.add_field(
-                name="Actions",
-                value=f"{self.MELEE_EMOJI} Melee Attack\n{self.MAGIC_EMOJI} Magic Attack\n{self.FLEE_EMOJI} Flee",
-                inline=False
-            )
+        # Add current stats
+        embed.add_field(
+            name=f"{enemy.name}'s Stats",
+            value=f"Health: {enemy.health}/{enemy.max_health}\nMana: {enemy.mana}/{enemy.max_mana}",
+            inline=False
+        )
+        embed.add_field(
+            name="Your Stats",
+            value=f"Health: {player.health}/{player.max_health}\nMana: {player.mana}/{player.max_mana}",
+            inline=False
+        )
+        embed.add_field(
+            name="Actions",
+            value=f"{self.MELEE_EMOJI} Melee Attack\n{self.MAGIC_EMOJI} Magic Attack\n{self.FLEE_EMOJI} Flee",
+            inline=False
+        )
 
-            combat_message = await channel.send(embed=embed)
-            
-            # Add reaction buttons
-            for emoji in self.combat_emojis:
-                await combat_message.add_reaction(emoji)
+        combat_message = await channel.send(embed=embed)
+        
+        # Add reaction buttons
+        for emoji in self.combat_emojis:
+            await combat_message.add_reaction(emoji)
 
-            # Store combat message ID for reaction handling
-            self.active_combats[user.id] = {
-                'message_id': combat_message.id,
-                'player': player,
-                'enemy': enemy,
-                'turn_history': []  # Track all combat turns
-            }
+        # Store combat message ID for reaction handling
+        self.active_combats[user.id] = {
+            'message_id': combat_message.id,
+            'player': player,
+            'enemy': enemy,
+            'turn_history': [],  # Track all combat turns
+            'game_data': self.bot.game_data,
+        }
 
     @commands.Cog.listener()
     async def on_reaction_add(self, reaction, user):
@@ -2827,15 +2435,12 @@ class CombatCommands(commands.Cog):
         # Check if this is the initial combat start reaction
         if str(reaction.emoji) == self.MELEE_EMOJI:
             logger.info(f"Combat start emoji detected for user {user.id}")
-            async with await self.bot.db_connect() as db:
-                cursor = await db.execute('SELECT * FROM players WHERE id = ?', (user.id,))
-                player_data = await cursor.fetchone()
-                if player_data:
-                    logger.info(f"Found player data for user {user.id}")
-                    await self.start_quest_combat(reaction.message.channel, user.id)
-                    return
-                else:
-                    logger.warning(f"No player data found for user {user.id}")
+            if await self.bot.repos.players.level(user.id) is not None:
+                logger.info(f"Found player data for user {user.id}")
+                await self.start_quest_combat(reaction.message.channel, user.id)
+                return
+            else:
+                logger.warning(f"No player data found for user {user.id}")
 
         combat_data = self.active_combats.get(user.id)
         logger.info(f"Combat data for user {user.id}: {combat_data is not None}")
@@ -2867,176 +2472,135 @@ class CombatCommands(commands.Cog):
 
         # Get player
         channel = reaction.message.channel
-        async with await self.bot.db_connect() as db:
-            async with db.execute('SELECT * FROM players WHERE id = ?', (user.id,)) as cursor:
-                if not (row := await cursor.fetchone()):
-                    await channel.send(f"{user.mention} You need to create a character first! Use `!w start`")
-                    return
-
-                player = Player(
-                    id=row[0],
-                    name=row[1],
-                    level=row[2],
-                    xp=row[3],
-                health=row[4],
-                max_health=row[5],
-                mana=row[6],
-                max_mana=row[7]
-            )
+        if not (player := await self.bot.repos.players.load(user.id)):
+            await channel.send(f"{user.mention} You need to create a character first! Use `!w start`")
+            return
 
-            if not player.in_combat or not player.current_enemy:
-                await channel.send(f"{user.mention} You're not in combat! Use `!w fight` to start a fight")
-                return
+        if not player.in_combat or not player.current_enemy:
+            await channel.send(f"{user.mention} You're not in combat! Use `!w fight` to start a fight")
+            return
 
-            # Player's turn
-            attack = next((a for a in player.basic_attacks if a.attack_type == attack_type), None)
-            if not attack:
-                await channel.send(f"{user.mention} No {attack_type} attack available!")
-                return
+        # Player's turn
+        attack = next((a for a in player.basic_attacks if a.attack_type == attack_type), None)
+        if not attack:
+            await channel.send(f"{user.mention} No {attack_type} attack available!")
+            return
 
-            result = attack.execute(player, player.current_enemy)
-            
-            embed = discord.Embed(
-                title="⚔️ Combat Round",
-                color=discord.Color.blue()
+        result = attack.execute(player, player.current_enemy)
+        
+        embed = discord.Embed(
+            title="⚔️ Combat Round",
+            color=discord.Color.blue()
+        )
+        
+        if result['success']:
+            embed.add_field(
+                name="Your Attack",
+                value=f"{result['message']}\nDamage: {result['damage']}",
+                inline=False
             )
+        else:
+            embed.add_field(
+                name="Your Attack",
+                value=result['message'],
+                inline=False
+            )
+
+        # Check if enemy is defeated
+        if not player.current_enemy.is_alive():
+            # Calculate XP gained (base 50 XP + 10 per enemy level)
+            xp_gained = 50 + (player.current_enemy.level * 10)
+            player.xp += xp_gained
             
-            if result['success']:
-                embed.add_field(
-                    name="Your Attack",
-                    value=f"{result['message']}\nDamage: {result['damage']}",
-                    inline=False
-                )
-            else:
-                embed.add_field(
-                    name="Your Attack",
-                    value=result['message'],
-                    inline=False
-                )
+            # Check for level up
+            leveled_up = player.xp >= player.xp_needed_for_next_level()
+            if leveled_up:
+                player.level_up()
 
-            # Check if enemy is defeated
-            if not player.current_enemy.is_alive():
-                # Calculate XP gained (base 50 XP + 10 per enemy level)
-                xp_gained = 50 + (player.current_enemy.level * 10)
-                player.xp += xp_gained
-                
-                # Check for level up
-                leveled_up = player.xp >= player.xp_needed_for_next_level()
-                if leveled_up:
-                    player.level_up()
+            embed.add_field(
+                name="Victory!",
+                value=f"You defeated {player.current_enemy.name}!\nXP gained: {xp_gained}" + 
+                      (f"\n🎉 Level Up! You are now level {player.level}!" if leveled_up else ""),
+                inline=False
+            )
 
-                embed.add_field(
-                    name="Victory!",
-                    value=f"You defeated {player.current_enemy.name}!\nXP gained: {xp_gained}" + 
-                          (f"\n🎉 Level Up! You are now level {player.level}!" if leveled_up else ""),
-                    inline=False
-                )
+            # Reset combat state
+            player.in_combat = False
+            player.current_enemy = None
 
-                # Reset combat state
-                player.in_combat = False
-                player.current_enemy = None
+            # Save player state
+            await self.bot.repos.write(lambda: self.bot.repos.players.save_progress(player))
 
-                # Save player state
-                async with await self.bot.db_connect() as db:
-                    await db.execute('''
-                        UPDATE players 
-                        SET health = ?, mana = ?, xp = ?, level = ?, in_combat = ?, current_enemy = NULL
-                        WHERE id = ?
-                    ''', (player.health, player.mana, player.xp, player.level, False, player.id))
-                    await db.commit()
+            await channel.send(embed=embed)
+            return
 
-                await channel.send(embed=embed)
-                return
+        # Enemy's turn
+        player.regenerate_mana(0.2)  # Regenerate 20% mana
+        
+        # Enemy regenerates mana to sustain the fight
+        if player.current_enemy.mana < player.current_enemy.max_mana:
+            mana_regen = int(player.current_enemy.max_mana * 0.3)  # 30% mana regeneration per turn
+            player.current_enemy.mana = min(player.current_enemy.max_mana, player.current_enemy.mana + mana_regen)
+        
+        enemy_attack = random.choice(player.current_enemy.attacks)
+        enemy_result = enemy_attack.execute(player.current_enemy, player)
 
-            # Enemy's turn
-            player.regenerate_mana(0.2)  # Regenerate 20% mana
-            
-            # Enemy regenerates mana to sustain the fight
-            if player.current_enemy.mana < player.current_enemy.max_mana:
-                mana_regen = int(player.current_enemy.max_mana * 0.3)  # 30% mana regeneration per turn
-                player.current_enemy.mana = min(player.current_enemy.max_mana, player.current_enemy.mana + mana_regen)
-            
-            enemy_attack = random.choice(player.current_enemy.attacks)
-            enemy_result = enemy_attack.execute(player.current_enemy, player)
+        if enemy_result['success']:
+            embed.add_field(
+                name="Enemy's Attack",
+                value=f"{enemy_result['message']}\nDamage: {enemy_result['damage']}",
+                inline=False
+            )
+        else:
+            embed.add_field(
+                name="Enemy's Attack",
+                value=enemy_result['message'],
+                inline=False
+            )
 
-            if enemy_result['success']:
-                embed.add_field(
-                    name="Enemy's Attack",
-                    value=f"{enemy_result['message']}\nDamage: {enemy_result['damage']}",
-                    inline=False
-                )
-            else:
-                embed.add_field(
-                    name="Enemy's Attack",
-                    value=enemy_result['message'],
-                    inline=False
-                )
+        # Add current stats
+        embed.add_field(
+            name="Current Stats",
+            value=f"You: {player.health}/{player.max_health} HP, {player.mana}/{player.max_mana} Mana\n" +
+                  f"Enemy: {player.current_enemy.health}/{player.current_enemy.max_health} HP, {player.current_enemy.mana}/{player.current_enemy.max_mana} Mana",
+            inline=False
+        )
 
-            # Add current stats
+        # Check if player is defeated
+        if not player.is_alive():
             embed.add_field(
-                name="Current Stats",
-                value=f"You: {player.health}/{player.max_health} HP, {player.mana}/{player.max_mana} Mana\n" +
-                      f"Enemy: {player.current_enemy.health}/{player.current_enemy.max_health} HP, {player.current_enemy.mana}/{player.current_enemy.max_mana} Mana",
+                name="💀 Defeat!",
+                value=f"You have died. Would you like to rest and play again?\n\n"
+                      f"{self.RESTART_EMOJI} Rest and restart (penalty: 10% gold & XP)\n"
+                      f"{self.LEAVE_EMOJI} Leave battle and view your status",
                 inline=False
             )
+            
+            # Restore 50% health and reset combat
+            player.health = player.max_health // 2
+            player.mana = player.max_mana
+            player.in_combat = False
+            player.current_enemy = None
 
-            # Check if player is defeated
-            if not player.is_alive():
-                embed.add_field(
-                    name="💀 Defeat!",
-                    value=f"You have died. Would you like to rest and play again?\n\n"
-                          f"{self.RESTART_EMOJI} Rest and restart (penalty: 10% gold & XP)\n"
-                          f"{self.LEAVE_EMOJI} Leave battle and view your status",
-                    inline=False
-                )
-                
-                # Restore 50% health and reset combat
-                player.health = player.max_health // 2
-                player.mana = player.max_mana
-                player.in_combat = False
-                player.current_enemy = None
-
-            # Save player state and increment deaths if defeated
-            async with await self.bot.db_connect() as db:
-                if not player.is_alive():
-                    await db.execute('''
-                        UPDATE players 
-                        SET health = ?, mana = ?, in_combat = ?, current_enemy = ?, deaths = deaths + 1
-                        WHERE id = ?
-                    ''', (
-                        player.health,
-                        player.mana,
-                        player.in_combat,
-                        player.current_enemy.name if player.current_enemy else None,
-                        player.id
-                    ))
-                else:
-                    await db.execute('''
-                        UPDATE players 
-                        SET health = ?, mana = ?, in_combat = ?, current_enemy = ?
-                        WHERE id = ?
-                    ''', (
-                        player.health,
-                        player.mana,
-                        player.in_combat,
-                        player.current_enemy.name if player.current_enemy else None,
-                        player.id
-                    ))
-                await db.commit()
+        # Save player state and increment deaths if defeated
+        if not player.is_alive():
+            await self.bot.repos.write(lambda: self.bot.repos.players.respawn_after_death(player.id, player.health, player.mana))
+        else:
+            await self.bot.repos.write(lambda: self.bot.repos.players.save_combat_state(player))
 
-            defeat_msg = await reaction.message.channel.send(embed=embed)
+        defeat_msg = await reaction.message.channel.send(embed=embed)
+        
+        # Add defeat reactions if player was defeated
+        if not player.is_alive() or player.health <= player.max_health // 2:
+            for emoji in self.defeat_emojis:
+                await defeat_msg.add_reaction(emoji)
             
-            # Add defeat reactions if player was defeated
-            if not player.is_alive() or player.health <= player.max_health // 2:
-                for emoji in self.defeat_emojis:
-                    await defeat_msg.add_reaction(emoji)
-                
-                # Store defeat message for reaction handling
-                self.victory_messages[user.id] = {
-                    'message_id': defeat_msg.id,
-                    'type': 'defeat',
-                    'player': player
-                }
+            # Store defeat message for reaction handling
+            self.victory_messages[user.id] = {
+                'message_id': defeat_msg.id,
+                'type': 'defeat',
+                'player': player
+            }
 
 async def setup(bot):
     await bot.add_cog(CombatCommands(bot))
\ No newline at end of file
@@ -443,110 +443,101 @@ class InventoryCommands(commands.Cog):
             await ctx.send(f"You can't use {item.name}. Only consumable items can be used.")
             return
 
-        # Apply item effects
-        async with self.bot.db.execute(
-            'SELECT health, max_health, mana, max_mana FROM players WHERE id = ?',
-            (ctx.author.id,)
-        ) as cursor:
-            row = await cursor.fetchone()
-            if not row:
-                await ctx.send("Error: Could not find player data.")
-                return
-
-            health, max_health, mana, max_mana = row
-            updates = []
-            effects_text = []
+        # Apply item effects; a player in combat is held in memory
+        in_combat = self.bot.player_states.get(ctx.author.id)
+        vitals = in_combat or await self.bot.repos.players.vitals(ctx.author.id)
+        if not vitals:
+            await ctx.send("Error: Could not find player data.")
+            return
 
-            for effect in item.effects:
-                if effect.type == 'heal':
-                    new_health = min(max_health, health + effect.value)
-                    healing_done = new_health - health
-                    health = new_health
-                    updates.append(('health', health))
-                    effects_text.append(f"Restored {healing_done} health")
-
-                elif effect.type == 'mana':
-                    new_mana = min(max_mana, mana + effect.value)
-                    mana_restored = new_mana - mana
-                    mana = new_mana
-                    updates.append(('mana', mana))
-                    effects_text.append(f"Restored {mana_restored} mana")
-
-            if updates:
-                # Update player stats
-                update_query = 'UPDATE players SET ' + ', '.join(f'{field} = ?' for field, _ in updates)
-                update_values = [value for _, value in updates]
-                update_values.append(ctx.author.id)
-                
-                await self.bot.db.execute(
-                    update_query + ' WHERE id = ?',
-                    update_values
-                )
+        health, max_health, mana, max_mana = vitals.health, vitals.max_health, vitals.mana, vitals.max_mana
+        updates = []
+        effects_text = []
+
+        for effect in item.effects:
+            if effect.type == 'heal':
+                new_health = min(max_health, health + effect.value)
+                healing_done = new_health - health
+                health = new_health
+                updates.append(('health', health))
+                effects_text.append(f"Restored {healing_done} health")
+
+            elif effect.type == 'mana':
+                new_mana = min(max_mana, mana + effect.value)
+                mana_restored = new_mana - mana
+                mana = new_mana
+                updates.append(('mana', mana))
+                effects_text.append(f"Restored {mana_restored} mana")
+
+        if updates:
+            # Update player stats
+            if in_combat:
+                # Written back by the player state cache with the rest of the combat
+                in_combat.health, in_combat.mana = health, mana
+            else:
+                await self.bot.repos.write(lambda: self.bot.repos.players.set_vitals(ctx.author.id, health, mana))
 
-                # Remove one item from inventory
-                inventory.remove_item(item.id, 1)
-                await self.inventory_manager.save_inventory(inventory)
+            # Remove one item from inventory
+            inventory.remove_item(item.id, 1)
+            await self.inventory_manager.save_inventory(inventory)
 
-                # Send success message
-                embed = discord.Embed(
-                    title=f"Used {item.name}",
-                    description="\n".join(effects_text),
-                    color=discord.Color.green()
-                )
-                embed.add_field(
-                    name="Current Stats",
-                    value=f"Health: {health}/{max_health}\nMana: {mana}/{max_mana}"
-                )
-                await ctx.send(embed=embed)
+            # Send success message
+            embed = discord.Embed(
+                title=f"Used {item.name}",
+                description="\n".join(effects_text),
+                color=discord.Color.green()
+            )
+            embed.add_field(
+                name="Current Stats",
+                value=f"Health: {health}/{max_health}\nMana: {mana}/{max_mana}"
+            )
+            await ctx.send(embed=embed)
     
-    @commands.command(name='refreshstats', aliases=['recalc', 'fixstats'])
-    async def refresh_stats(self, ctx):
-        """Recalculate your stats based on level and equipment"""
-        # Get equipment
-        equipment = await self.inventory_manager.get_equipment(ctx.author.id)
-        
-        # Recalculate and update stats
-        await self.inventory_manager.update_player_stats(ctx.author.id, equipment)
-        
-        # Get updated stats
-        async with await self.bot.db_connect() as db:
-            cursor = await db.execute('''
-                SELECT level, health, max_health, mana, max_mana, xp, gold,
-                       damage_bonus, magic_damage_bonus, defense, magic_defense,
-                       crit_chance_bonus, health_bonus, mana_bonus
-                FROM players WHERE id = ?
-            ''', (ctx.author.id,))
-            stats = await cursor.fetchone()
-        
-        if not stats:
+    @commands.command(name='checkstats', aliases=['refreshstats', 'recalc', 'fixstats'])
+    async def check_stats(self, ctx):
+        """Check your stored stats against your level and equipment, fixing any drift"""
+        drift = await self.inventory_manager.check_player_stats(ctx.author.id)
+        if drift is None:
             await ctx.send("You don't have a character yet! Use `!w start` to create one.")
             return
         
-        level, hp, max_hp, mana, max_mana, xp, gold, dmg, magic_dmg, defense, magic_def, crit, hp_bonus, mana_bonus = stats
+        # Get updated stats
+        stats = await self.bot.repos.players.stats(ctx.author.id)
         
-        embed = discord.Embed(
-            title="✨ Stats Recalculated",
-            description=f"Your stats have been updated based on your equipment and level!",
-            color=discord.Color.blue()
-        )
+        if drift:
+            fixed = "\n".join(
+                f"• {column.replace('_', ' ').title()}: {stored} → {expected}"
+                for column, (stored, expected) in drift.items()
+            )
+            embed = discord.Embed(
+                title="✨ Stats Repaired",
+                description=f"These stats didn't match your level and equipment:\n{fixed}",
+                color=discord.Color.blue()
+            )
+        else:
+            embed = discord.Embed(
+                title="✅ Stats Checked",
+                description="Your stats already match your level and equipment.",
+                color=discord.Color.blue()
+            )
         
         embed.add_field(
             name="📊 Core Stats",
-            value=f"**Level {level}**\n"
-                  f"HP: {hp}/{max_hp} (+{hp_bonus} bonus)\n"
-                  f"Mana: {mana}/{max_mana} (+{mana_bonus} bonus)\n"
-                  f"XP: {xp}/{level * 100}\n"
-                  f"Gold: {gold}",
+            value=f"**Level {stats.level}**\n"
+                  f"HP: {stats.health}/{stats.max_health} (+{stats.health_bonus} bonus)\n"
+                  f"Mana: {stats.mana}/{stats.max_mana} (+{stats.mana_bonus} bonus)\n"
+                  f"XP: {stats.xp}/{stats.level * 100}\n"
+                  f"Gold: {stats.gold}",
             inline=False
         )
         
         embed.add_field(
             name="⚔️ Combat Stats",
-            value=f"Damage: +{dmg}\n"
-                  f"Magic Damage: +{magic_dmg}\n"
-                  f"Defense: +{defense}\n"
-                  f"Magic Defense: +{magic_def}\n"
-                  f"Crit Chance: +{crit * 100:.1f}%",
+            value=f"Damage: +{stats.damage_bonus}\n"
+                  f"Magic Damage: +{stats.magic_damage_bonus}\n"
+                  f"Defense: +{stats.defense}\n"
+                  f"Magic Defense: +{stats.magic_defense}\n"
+                  f"Crit Chance: +{stats.crit_chance_bonus:.1f}%",
             inline=False
         )
         
@@ -2,77 +2,50 @@ import discord
 from discord.ext import commands
 from src.models.player import Player
 from src.models.quest_manager import QuestManager
-import aiosqlite
 import os
 import logging
 
 logger = logging.getLogger(__name__)
 
+def is_admin():
+    """The dashboard admin (ADMIN_USER_ID) or the application owner"""
+    async def predicate(ctx):
+        return str(ctx.author.id) == os.getenv('ADMIN_USER_ID') or await ctx.bot.is_owner(ctx.author)
+    return commands.check(predicate)
+
 class PlayerCommands(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
         # Remove default help command so we can override it
         self.bot.remove_command('help')
         self.help_pages = {}
+        self.quest_manager = QuestManager(bot)
     
     async def get_player(self, user_id: int, ctx=None) -> Player:
         """Get a player by ID, creating them if they don't exist"""
-        async with await self.bot.db_connect() as db:
-            async with db.execute('SELECT * FROM players WHERE id = ?', (user_id,)) as cursor:
-                row = await cursor.fetchone()
-                if row is None and ctx:
-                    # Create new player
-                    name = ctx.author.display_name
-                    await db.execute('''
-                        INSERT INTO players (id, name, level, xp, health, max_health, mana, max_mana)
-                        VALUES (?, ?, 1, 0, 100, 100, 100, 100)
-                    ''', (user_id, name))
-                    
-                    # Give starting items: 3 mana potions
-                    await db.execute('''
-                        INSERT INTO inventory (player_id, item_id, count)
-                        VALUES (?, 'mana_potion', 3)
-                    ''', (user_id,))
-                    
-                    await db.commit()
-                    
-                    # Start the first quest automatically
-                    quest_manager = QuestManager(self.bot)
-                    first_quest = await quest_manager.start_quest(user_id, 'quest_1_1')
-                    if first_quest:
-                        logger.info(f"Auto-started quest_1_1 for new player {user_id}")
-                    
-                    return await self.get_player(user_id)
-                elif row:
-                    return Player(
-                        id=row[0],
-                        name=row[1],
-                        level=row[2],
-                        xp=row[3],
-                        health=row[4],
-                        max_health=row[5],
-                        mana=row[6],
-                        max_mana=row[7]
-                    )
-                return None
+        repos = self.bot.repos
+        player = await repos.players.load(user_id)
+        if player or not ctx:
+            return player
+
+        # Create new player and give starting items: 3 mana potions
+        async def create():
+            await repos.players.create(user_id, ctx.author.display_name)
+            await repos.inventory.add(user_id, [('mana_potion', 3)])
+
+        await repos.write(create)
+        # Drop anything cached for a player id reset from the dashboard
+        self.bot.inventory_cache.invalidate(user_id)
+
+        # Start the first quest automatically
+        first_quest = await self.quest_manager.start_quest(user_id, 'quest_1_1')
+        if first_quest:
+            logger.info(f"Auto-started quest_1_1 for new player {user_id}")
+
+        return await self.get_player(user_id)
 
     async def save_player(self, player: Player):
-        async with aiosqlite.connect(self.bot.db_path) as db:
-            await db.execute('''
-                INSERT OR REPLACE INTO players 
-                (id, name, level, xp, health, max_health, mana, max_mana)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                player.id,
-                player.name,
-                player.level,
-                player.xp,
-                player.health,
-                player.max_health,
-                player.mana,
-                player.max_mana
-            ))
-            await db.commit()
+        await self.bot.repos.write(lambda: self.bot.repos.players.save(player))
 
     @commands.command(name='start')
     async def start(self, ctx):
@@ -88,8 +61,7 @@ class PlayerCommands(commands.Cog):
         await self.save_player(player)
         
         # Start the first quest automatically
-        quest_manager = QuestManager(self.bot)
-        first_quest = await quest_manager.start_quest(ctx.author.id, 'quest_1_1')
+        first_quest = await self.quest_manager.start_quest(ctx.author.id, 'quest_1_1')
         
         embed = discord.Embed(
             title="Welcome to the Adventure!",
@@ -125,15 +97,8 @@ class PlayerCommands(commands.Cog):
     async def stats(self, ctx):
         """View your character stats"""
         if player := await self.get_player(ctx.author.id, ctx):
-            # Get deaths and kills from database
-            async with await self.bot.db_connect() as db:
-                cursor = await db.execute('SELECT deaths FROM players WHERE id = ?', (ctx.author.id,))
-                deaths_row = await cursor.fetchone()
-                deaths = deaths_row[0] if deaths_row else 0
-                
-                cursor = await db.execute('SELECT COUNT(*) FROM player_kills WHERE player_id = ?', (ctx.author.id,))
-                kills_row = await cursor.fetchone()
-                kills = kills_row[0] if kills_row else 0
+            # Get deaths and kills from the counters on the player row
+            deaths, kills = await self.bot.repos.kills.totals(ctx.author.id)
             
             embed = discord.Embed(
                 title=f"{player.name}'s Stats",
@@ -189,6 +154,23 @@ class PlayerCommands(commands.Cog):
         # Add start button
         await message.add_reaction("▶️")
 
+    @commands.command(name='reload')
+    @is_admin()
+    async def reload_game_data(self, ctx):
+        """Reload items, quests and enemies from src/config without restarting"""
+        reloader = self.bot.game_data_reloader
+        try:
+            data = await reloader.reload()
+        except Exception as e:
+            logger.error(f"Game data reload failed: {e}")
+            await ctx.send(f"❌ Reload failed, the current game data stays live:\n```{e}```")
+            return
+        await ctx.send(
+            f"✅ Game data generation {reloader.generation} is live: {len(data.items)} items, "
+            f"{len(data.quests)} quests, {len(data.enemy_catalog.types)} enemy types. "
+            f"Fights already under way finish with the previous data."
+        )
+
     @commands.Cog.listener()
     async def on_reaction_add(self, reaction, user):
         """Handle help navigation via reactions"""
@@ -1,11 +1,9 @@
-import json
 import discord
 import logging
 import asyncio
 from discord.ext import commands
 from ..models.quest_manager import QuestManager
 from ..models.inventory_manager import InventoryManager
-from ..models.enemy import EnemyGenerator
 from ..models.quest import QuestType
 
 logger = logging.getLogger('willowbot.quests')
@@ -15,7 +13,6 @@ class QuestCommands(commands.Cog):
         self.bot = bot
         self.quest_manager = QuestManager(bot)
         self.inventory_manager = InventoryManager(bot)
-        self.enemy_generator = EnemyGenerator()
         self.quest_pages = {}
 
     def get_quest_embed(self, quest, page_num, total_pages):
@@ -125,7 +122,7 @@ class QuestCommands(commands.Cog):
             try:
                 logger.info("=== ENTERING TRY BLOCK ===")
                 # Get the current progress
-                progress = getattr(started_quest, 'objectives_progress', [0] * len(started_quest.objectives))
+                progress = await self.quest_manager.get_objective_progress(user.id, started_quest.id)
                 logger.info(f"Got progress: {progress}")
                 
                 # Get the first objective
@@ -242,32 +239,31 @@ class QuestCommands(commands.Cog):
     @commands.command(name='quest_progress')
     async def quest_progress(self, ctx):
         """Check your current quest progress"""
-        async with await self.bot.db_connect() as db:
-            async with db.execute(
-                '''SELECT quest_id, objectives_progress, completed, rewards_claimed
-                   FROM active_quests 
-                   WHERE player_id = ?''',
-                (ctx.author.id,)
-            ) as cursor:
-                active_quests = await cursor.fetchall()
-
-            if not active_quests:
-                await ctx.send("You have no active quests!")
-                return
+        active_quests = await self.bot.repos.quests.statuses(ctx.author.id)
+        if not active_quests:
+            await ctx.send("You have no active quests!")
+            return
 
         embed = discord.Embed(
             title="📋 Quest Progress",
             color=discord.Color.blue()
         )
 
-        for quest_id, objectives_progress, completed, rewards_claimed in active_quests:
-            quest = self.quest_manager.quests[quest_id]
-            progress = json.loads(objectives_progress)
+        # One query for every unfinished quest; finished ones have met every objective
+        active_progress = await self.bot.repos.quests.active_progress(ctx.author.id)
+
+        for quest_status in active_quests:
+            quest = self.quest_manager.quests[quest_status.quest_id]
+            if quest_status.completed:
+                progress = [obj.count for obj in quest.objectives]
+            else:
+                stored = active_progress.get(quest_status.quest_id, {})
+                progress = [stored.get(i, 0) for i in range(len(quest.objectives))]
             
-            status = "✅ Complete" if completed else "⏳ In Progress"
-            if completed and rewards_claimed:
+            status = "✅ Complete" if quest_status.completed else "⏳ In Progress"
+            if quest_status.completed and quest_status.rewards_claimed:
                 status += " (Rewards Claimed)"
-            elif completed:
+            elif quest_status.completed:
                 status += " (Rewards Available!)"
 
             objectives_text = "\n".join([
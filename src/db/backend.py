@@ -0,0 +1,109 @@
+import itertools
+import logging
+import os
+import sqlite3
+from typing import Dict, Optional, Type
+
+import aiosqlite
+
+from src.db.pool import ConnectionPool
+from src.db.retention import default_archive_path
+
+logger = logging.getLogger('willowbot.db')
+
+
+class StorageBackend:
+    """Where the bot's database lives and how connections to it are opened.
+
+    Everything above this layer (pool, migrations, repositories, archiver)
+    only sees the ``database`` and ``archive_path`` strings a backend hands
+    out, so it runs unchanged on every implementation.
+    """
+    name = ''
+    # Whether ``database`` and ``archive_path`` are SQLite URI filenames
+    uri = False
+
+    def __init__(self, database: str, archive_path: str):
+        self.database = database
+        self.archive_path = archive_path
+
+    def create_pool(self, size: int = 4) -> ConnectionPool:
+        return ConnectionPool(self.database, size=size, uri=self.uri)
+
+    def connect(self) -> aiosqlite.Connection:
+        """A standalone aiosqlite connection (use with ``async with`` or await it)"""
+        return aiosqlite.connect(self.database, uri=self.uri)
+
+    def connect_sync(self) -> sqlite3.Connection:
+        """A standalone plain sqlite3 connection"""
+        return sqlite3.connect(self.database, uri=self.uri)
+
+    def open(self):
+        """Prepare the storage before the first connection is made"""
+
+    def close(self):
+        """Release the storage once every connection is closed"""
+
+    def __repr__(self) -> str:
+        return f'{type(self).__name__}({self.database!r})'
+
+
+class SQLiteBackend(StorageBackend):
+    """The database and its archive are files on disk"""
+    name = 'sqlite'
+
+    def __init__(self, path: str, archive_path: Optional[str] = None):
+        super().__init__(path, archive_path or default_archive_path(path))
+
+
+class MemoryBackend(StorageBackend):
+    """The database and its archive live in memory and vanish on ``close()``.
+
+    Uses SQLite's ``memdb`` VFS rather than ``:memory:``: every connection
+    opened with the same name sees the same database, with the usual
+    locking, so the pool, the archiver and ``BEGIN IMMEDIATE`` behave as
+    they do on a file. Only WAL is unavailable (the journal stays in
+    memory). Nothing touches the disk, which suits unit tests and load
+    benchmarks with thousands of simulated players.
+    """
+    name = 'memory'
+    uri = True
+    _names = itertools.count(1)
+
+    def __init__(self, name: Optional[str] = None):
+        name = name or f'willowbot-{os.getpid()}-{next(self._names)}'
+        super().__init__(f'file:/{name}?vfs=memdb', f'file:/{name}-archive?vfs=memdb')
+        self._anchor: Optional[sqlite3.Connection] = None
+
+    def open(self):
+        # A memdb database is freed when its last connection closes, so one
+        # connection (with the archive attached) is held for the backend's
+        # lifetime to keep data across pool restarts and archiver runs.
+        if self._anchor is None:
+            self._anchor = sqlite3.connect(self.database, uri=True, check_same_thread=False)
+            self._anchor.execute('ATTACH DATABASE ? AS archive', (self.archive_path,))
+
+    def close(self):
+        if self._anchor is not None:
+            self._anchor.close()
+            self._anchor = None
+
+
+BACKENDS: Dict[str, Type[StorageBackend]] = {
+    SQLiteBackend.name: SQLiteBackend,
+    MemoryBackend.name: MemoryBackend,
+}
+
+
+def create_backend(name: str, path: str) -> StorageBackend:
+    """Build the backend selected by ``DATABASE_BACKEND``.
+
+    ``path`` is the database file for ``sqlite`` and the database name for
+    ``memory``.
+    """
+    backend = BACKENDS.get(name.lower())
+    if backend is None:
+        raise ValueError(f"Unknown database backend {name!r}, expected one of {sorted(BACKENDS)}")
+    if backend is MemoryBackend:
+        return MemoryBackend(os.path.splitext(os.path.basename(path))[0] or None)
+    return backend(path)
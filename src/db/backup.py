@@ -0,0 +1,177 @@
+import asyncio
+import glob
+import logging
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from discord.ext import tasks
+
+from src.db.storage import apply_storage_profile_sync
+
+logger = logging.getLogger('willowbot.db')
+
+
+def default_backup_dir(db_path: str) -> str:
+    return os.environ.get('DATABASE_BACKUP_DIR', os.path.join(os.path.dirname(db_path), 'backups'))
+
+
+@dataclass
+class BackupReport:
+    """Outcome of one snapshot"""
+    path: str
+    pages: int
+    size: int
+    seconds: float
+    steps: int
+    finished_at: str
+
+    @property
+    def bytes_per_second(self) -> float:
+        return self.size / self.seconds if self.seconds else 0.0
+
+    def to_dict(self) -> dict:
+        return {**asdict(self), 'bytes_per_second': round(self.bytes_per_second)}
+
+
+class DatabaseBackup:
+    """Online snapshots of the live database with the SQLite backup API.
+
+    The copy runs in a worker thread, ``pages_per_step`` pages at a time
+    with a short pause between steps, so the event loop and the pool's
+    writers are never blocked. The source connection holds one read
+    transaction for the whole copy: in WAL mode that doesn't stop writers,
+    and it keeps the snapshot consistent instead of letting SQLite restart
+    the backup every time a combat round commits. The newest ``keep``
+    snapshots are kept.
+    """
+
+    def __init__(self, db_path: str, backup_dir: str, keep: int = 7,
+                 interval_hours: float = 24, pages_per_step: int = 256,
+                 step_pause: float = 0.005, uri: bool = False):
+        self.db_path = db_path
+        self.backup_dir = backup_dir
+        self.keep = max(1, keep)
+        self.interval_hours = interval_hours
+        self.pages_per_step = pages_per_step
+        self.step_pause = step_pause
+        self.uri = uri
+        self.last_report: Optional[BackupReport] = None
+        # Scheduled and dashboard backups may overlap; only one copies at a time
+        self._lock = threading.Lock()
+        # Check hourly whether a snapshot is due rather than sleeping a full
+        # interval, so restarts don't push the next backup back
+        self.run.change_interval(hours=min(1, interval_hours))
+
+    @classmethod
+    def from_env(cls, database: str, backup_dir: str, uri: bool = False) -> 'DatabaseBackup':
+        """Configure from the DATABASE_BACKUP_* variables shared by the bot and dashboard"""
+        return cls(
+            database,
+            backup_dir,
+            keep=int(os.environ.get('DATABASE_BACKUP_KEEP', '7')),
+            interval_hours=float(os.environ.get('DATABASE_BACKUP_HOURS', '24')) or 24,
+            pages_per_step=int(os.environ.get('DATABASE_BACKUP_PAGES', '256')),
+            uri=uri,
+        )
+
+    def start(self):
+        if not self.run.is_running():
+            self.run.start()
+
+    def stop(self):
+        self.run.cancel()
+
+    def snapshots(self) -> List[str]:
+        """Snapshot paths, oldest first"""
+        return sorted(glob.glob(os.path.join(self.backup_dir, 'willowbot-*.db')))
+
+    def rotate(self) -> List[str]:
+        """Delete all but the newest ``keep`` snapshots and return what was removed"""
+        removed = self.snapshots()[:-self.keep]
+        for path in removed:
+            os.remove(path)
+        return removed
+
+    def _copy(self, target_path: str, progress) -> Tuple[int, int]:
+        """Run the backup into target_path; returns (page_count, page_size)"""
+        source = sqlite3.connect(self.db_path, uri=self.uri)
+        target = sqlite3.connect(target_path)
+        try:
+            apply_storage_profile_sync(source)
+            # Pin one read snapshot for every step of the copy
+            source.execute('BEGIN')
+            source.execute('SELECT 1 FROM sqlite_master LIMIT 1').fetchall()
+            source.backup(target, pages=self.pages_per_step, progress=progress)
+            pages, = source.execute('PRAGMA page_count').fetchone()
+            page_size, = source.execute('PRAGMA page_size').fetchone()
+        finally:
+            target.close()
+            source.close()
+        return pages, page_size
+
+    def backup_sync(self) -> BackupReport:
+        """Copy the database to a new snapshot; blocks, so call off the event loop"""
+        with self._lock:
+            os.makedirs(self.backup_dir, exist_ok=True)
+            path = os.path.join(self.backup_dir, f"willowbot-{datetime.now():%Y%m%d-%H%M%S-%f}.db")
+            partial = f'{path}.partial'
+            steps = 0
+
+            def pause(status, remaining, total):
+                nonlocal steps
+                steps += 1
+                time.sleep(self.step_pause)
+
+            started = time.perf_counter()
+            try:
+                pages, page_size = self._copy(partial, pause)
+            except Exception:
+                if os.path.exists(partial):
+                    os.remove(partial)
+                raise
+            # Only complete snapshots ever carry the final name
+            os.replace(partial, path)
+
+            report = BackupReport(
+                path=path,
+                pages=pages,
+                size=pages * page_size,
+                seconds=time.perf_counter() - started,
+                steps=steps,
+                finished_at=datetime.now().isoformat(timespec='seconds'),
+            )
+            self.last_report = report
+            removed = self.rotate()
+
+        logger.info(
+            f"Backed up {report.size / 1048576:.1f} MiB to {path} in {report.seconds:.2f}s "
+            f"({report.bytes_per_second / 1048576:.1f} MiB/s, {steps} steps); "
+            f"removed {len(removed)} old snapshots"
+        )
+        return report
+
+    async def backup(self) -> BackupReport:
+        """Take a snapshot without blocking the event loop"""
+        return await asyncio.to_thread(self.backup_sync)
+
+    def is_due(self) -> bool:
+        """Whether the newest snapshot is older than the schedule interval"""
+        snapshots = self.snapshots()
+        if not snapshots:
+            return True
+        age_hours = (time.time() - os.path.getmtime(snapshots[-1])) / 3600
+        return age_hours >= self.interval_hours
+
+    @tasks.loop(hours=1)
+    async def run(self):
+        if not self.is_due():
+            return
+        try:
+            await self.backup()
+        except Exception as e:
+            logger.error(f"Database backup failed: {e}")
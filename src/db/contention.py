@@ -0,0 +1,100 @@
+import asyncio
+import os
+import random
+import sqlite3
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Iterator, Optional, TypeVar
+
+T = TypeVar('T')
+
+# Primary result codes; extended codes (e.g. SQLITE_BUSY_SNAPSHOT) share the low byte
+SQLITE_BUSY = 5
+SQLITE_LOCKED = 6
+
+
+def is_busy(error: BaseException) -> bool:
+    """Whether an error means another connection holds the lock we need"""
+    if not isinstance(error, sqlite3.OperationalError):
+        return False
+    code = getattr(error, 'sqlite_errorcode', None)
+    if code is not None:
+        return code & 0xff in (SQLITE_BUSY, SQLITE_LOCKED)
+    return 'locked' in str(error) or 'busy' in str(error)
+
+
+@dataclass(slots=True)
+class BusyPolicy:
+    """How long to keep retrying an operation that fails with SQLITE_BUSY.
+
+    Each attempt already waits up to ``busy_timeout`` inside SQLite; this
+    covers the busy errors SQLite returns without waiting (a writer that
+    would deadlock, a stale WAL snapshot) and writers that outlast the
+    timeout, such as a dashboard reset.
+    """
+    deadline: float = 10.0
+    base_delay: float = 0.005
+    max_delay: float = 0.25
+
+    @classmethod
+    def from_env(cls) -> 'BusyPolicy':
+        return cls(deadline=float(os.environ.get('DATABASE_BUSY_RETRY_SECONDS', '10')))
+
+    def delays(self) -> Iterator[float]:
+        """Exponential backoff with full jitter, so waiting writers spread out"""
+        ceiling = self.base_delay
+        while True:
+            yield random.uniform(0, ceiling)
+            ceiling = min(ceiling * 2, self.max_delay)
+
+
+@dataclass(slots=True)
+class Attempts:
+    """Busy errors met by one operation and the time lost to them"""
+    busy: int = 0
+    waited: float = 0.0
+    gave_up: bool = False
+
+
+async def retry_busy(operation: Callable[[], Awaitable[T]], policy: Optional[BusyPolicy],
+                     attempts: Attempts, reset: Optional[Callable[[], Awaitable]] = None) -> T:
+    """Run ``operation``, retrying busy errors until ``policy.deadline``.
+
+    ``reset`` runs after each busy error to undo a partial attempt (e.g.
+    roll back an implicitly opened transaction). Without a policy the
+    busy error is only counted. Failed attempts and backoff sleeps are
+    added to ``attempts.waited``.
+    """
+    started = time.perf_counter()
+    delays = policy.delays() if policy else None
+    while True:
+        attempt_started = time.perf_counter()
+        try:
+            return await operation()
+        except sqlite3.OperationalError as e:
+            if not is_busy(e):
+                raise
+            attempts.busy += 1
+            attempts.waited += time.perf_counter() - attempt_started
+            delay = next(delays) if delays else 0
+            if not policy or time.perf_counter() - started + delay > policy.deadline:
+                attempts.gave_up = True
+                raise
+            if reset:
+                await reset()
+            await asyncio.sleep(delay)
+            attempts.waited += delay
+
+
+def retry_busy_sync(operation: Callable[[], T], policy: BusyPolicy) -> T:
+    """Blocking ``retry_busy`` for plain sqlite3 callers such as the dashboard"""
+    started = time.perf_counter()
+    delays = policy.delays()
+    while True:
+        try:
+            return operation()
+        except sqlite3.OperationalError as e:
+            delay = next(delays)
+            if not is_busy(e) or time.perf_counter() - started + delay > policy.deadline:
+                raise
+            time.sleep(delay)
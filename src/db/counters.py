@@ -0,0 +1,54 @@
+import aiosqlite
+
+
+def _kill_log(include_archive: bool) -> str:
+    """Kill log to aggregate over, optionally including the attached archive"""
+    if not include_archive:
+        return 'main.player_kills'
+    columns = 'player_id, enemy_type_id, enemy_name_id, enemy_prefix_id, enemy_suffix_id, enemy_level, killed_at'
+    return (
+        f'(SELECT {columns} FROM main.player_kills '
+        'UNION ALL '
+        f'SELECT {columns} FROM archive.player_kills)'
+    )
+
+
+async def backfill_player_counters(db: aiosqlite.Connection, include_archive: bool = False) -> int:
+    """Recompute the materialized kill counter on every player row.
+
+    Live code keeps ``players.kills`` in step with ``player_kills`` by
+    updating both in the same transaction; this is only needed for rows
+    written before the counter existed. Once events have been archived the
+    archive must be attached as ``archive`` and ``include_archive`` set, or
+    the archived kills are lost from the count. Does not commit, so it can
+    run inside a migration. Returns the number of player rows updated.
+    """
+    cursor = await db.execute(f'''
+        UPDATE players
+        SET kills = (SELECT COUNT(*) FROM {_kill_log(include_archive)} AS k WHERE k.player_id = players.id)
+    ''')
+    updated = cursor.rowcount
+    await cursor.close()
+    return updated
+
+
+async def rebuild_kill_rollup(db: aiosqlite.Connection, include_archive: bool = False) -> int:
+    """Rebuild player_kill_rollup from the raw kill log.
+
+    See ``backfill_player_counters`` for ``include_archive``. Does not
+    commit. Returns the number of rollup rows written.
+    """
+    await db.execute('DELETE FROM player_kill_rollup')
+    cursor = await db.execute(f'''
+        INSERT INTO player_kill_rollup (
+            player_id, enemy_type_id, enemy_name_id, enemy_prefix_id, enemy_suffix_id, enemy_level,
+            kill_count, first_killed_at, last_killed_at
+        )
+        SELECT player_id, enemy_type_id, enemy_name_id, enemy_prefix_id, enemy_suffix_id, enemy_level,
+               COUNT(*), MIN(killed_at), MAX(killed_at)
+        FROM {_kill_log(include_archive)}
+        GROUP BY player_id, enemy_type_id, enemy_name_id, enemy_prefix_id, enemy_suffix_id, enemy_level
+    ''')
+    written = cursor.rowcount
+    await cursor.close()
+    return written
@@ -0,0 +1,86 @@
+import logging
+from typing import List
+
+import aiosqlite
+
+from src.models.enemy import EnemyCatalog
+
+logger = logging.getLogger('willowbot.db')
+
+ENEMY_ID_COLUMNS = ('enemy_type_id', 'enemy_name_id', 'enemy_prefix_id', 'enemy_suffix_id')
+
+# Legacy enemy names that enemies.yaml doesn't know. Rows naming one get
+# enemy type 0 with enemy_name_id pointing here, so the text survives the
+# conversion. Kept in the main database for archived rows too.
+LEGACY_NAMES_SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS main.enemy_legacy_names (
+        id INTEGER PRIMARY KEY,
+        name TEXT NOT NULL UNIQUE
+    )
+'''
+
+
+async def sync_enemy_lookup(db: aiosqlite.Connection, catalog: EnemyCatalog):
+    """Upsert the enemy_lookup table from enemies.yaml. Does not commit."""
+    await db.executemany('''
+        INSERT INTO enemy_lookup (kind, type_id, id, name)
+        VALUES (?, ?, ?, ?)
+        ON CONFLICT(kind, type_id, id) DO UPDATE SET name = excluded.name
+    ''', catalog.lookup_rows())
+
+
+async def _column_names(db: aiosqlite.Connection, schema: str, table: str) -> List[str]:
+    async with db.execute(f'PRAGMA {schema}.table_info({table})') as cursor:
+        return [row[1] for row in await cursor.fetchall()]
+
+
+async def convert_enemy_name_column(db: aiosqlite.Connection, table: str, catalog: EnemyCatalog,
+                                    schema: str = 'main', drop_name: bool = True):
+    """Replace a free-text enemy_name column with the four enemy ID columns.
+
+    Each distinct legacy name is parsed once and written back with a single
+    UPDATE, then enemy_name is dropped unless ``drop_name`` is False (it
+    can't be while it is part of the primary key). Names the catalog can't
+    fully resolve are stored in enemy_legacy_names rather than lost, and
+    their rows become type 0 with enemy_name_id set to the stored name's
+    id. Indexes on enemy_name must be dropped by the caller first. Does
+    not commit; a no-op if already converted.
+    """
+    columns = await _column_names(db, schema, table)
+    if 'enemy_name' not in columns:
+        return
+
+    for column in ENEMY_ID_COLUMNS:
+        if column not in columns:
+            await db.execute(f'ALTER TABLE {schema}.{table} ADD COLUMN {column} INTEGER NOT NULL DEFAULT 0')
+
+    async with db.execute(f'SELECT DISTINCT enemy_name FROM {schema}.{table}') as cursor:
+        names = [row[0] for row in await cursor.fetchall()]
+
+    rows = []
+    unresolved = []
+    for name in names:
+        identity = catalog.parse(name)
+        if identity.type_id:
+            rows.append(identity.as_row() + (name,))
+        else:
+            unresolved.append(name)
+    if unresolved:
+        await db.execute(LEGACY_NAMES_SCHEMA)
+        await db.executemany(
+            'INSERT OR IGNORE INTO main.enemy_legacy_names (name) VALUES (?)', [(name,) for name in unresolved]
+        )
+        for name in unresolved:
+            async with db.execute('SELECT id FROM main.enemy_legacy_names WHERE name = ?', (name,)) as cursor:
+                legacy_id = (await cursor.fetchone())[0]
+            rows.append((0, legacy_id, 0, 0, name))
+        logger.warning(
+            f"{len(unresolved)} enemy names in {schema}.{table} are not in enemies.yaml; "
+            f"kept them in enemy_legacy_names"
+        )
+
+    assignments = ', '.join(f'{column} = ?' for column in ENEMY_ID_COLUMNS)
+    await db.executemany(f'UPDATE {schema}.{table} SET {assignments} WHERE enemy_name = ?', rows)
+    if drop_name:
+        await db.execute(f'ALTER TABLE {schema}.{table} DROP COLUMN enemy_name')
+    logger.info(f"Converted {len(names)} distinct enemy names in {schema}.{table} to enemy IDs")
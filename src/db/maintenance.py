@@ -0,0 +1,67 @@
+import logging
+import time
+from typing import Optional
+
+from discord.ext import tasks
+
+from src.db.pool import ConnectionPool
+from src.db.retention import EventArchiver
+
+logger = logging.getLogger('willowbot.db')
+
+
+class DatabaseMaintenance:
+    """Periodic WAL checkpoint and query planner upkeep on the bot loop.
+
+    In WAL mode the -wal file only shrinks when it is checkpointed with
+    TRUNCATE, and ``PRAGMA optimize`` refreshes planner statistics for
+    tables whose contents changed noticeably since the last run. When an
+    archiver is configured, old events are moved out first so the checkpoint
+    picks up the deletes.
+    """
+
+    def __init__(self, pool: ConnectionPool, interval_minutes: float = 15,
+                 archiver: Optional[EventArchiver] = None):
+        self.pool = pool
+        self.archiver = archiver
+        self.run.change_interval(minutes=interval_minutes)
+
+    def start(self):
+        if not self.run.is_running():
+            self.run.start()
+
+    def stop(self):
+        self.run.cancel()
+
+    async def checkpoint(self):
+        """Checkpoint and truncate the WAL, logging how long it took"""
+        started = time.perf_counter()
+        async with self.pool.acquire() as db:
+            async with db.execute('PRAGMA wal_checkpoint(TRUNCATE)') as cursor:
+                busy, log_frames, checkpointed = await cursor.fetchone()
+        elapsed_ms = (time.perf_counter() - started) * 1000
+
+        if busy:
+            logger.warning(
+                f"WAL checkpoint blocked by readers after {elapsed_ms:.1f}ms "
+                f"({checkpointed}/{log_frames} frames checkpointed)"
+            )
+        else:
+            logger.info(f"WAL checkpoint of {checkpointed} frames took {elapsed_ms:.1f}ms")
+
+    async def optimize(self):
+        started = time.perf_counter()
+        async with self.pool.acquire() as db:
+            async with db.execute('PRAGMA optimize') as cursor:
+                await cursor.fetchall()
+        logger.info(f"PRAGMA optimize took {(time.perf_counter() - started) * 1000:.1f}ms")
+
+    @tasks.loop(minutes=15)
+    async def run(self):
+        try:
+            if self.archiver:
+                await self.archiver.run()
+            await self.checkpoint()
+            await self.optimize()
+        except Exception as e:
+            logger.error(f"Database maintenance failed: {e}")
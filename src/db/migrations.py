@@ -0,0 +1,348 @@
+import logging
+from typing import Awaitable, Callable, List, Tuple, Union
+
+import aiosqlite
+
+from src.db.counters import backfill_player_counters
+from src.db.enemies import LEGACY_NAMES_SCHEMA, convert_enemy_name_column, sync_enemy_lookup
+from src.models.enemy import EnemyCatalog
+
+logger = logging.getLogger('willowbot.db')
+
+# A migration step is either a list of SQL statements or a coroutine
+# function taking the connection, for steps that need to inspect the
+# existing schema before changing it.
+MigrationStep = Union[List[str], Callable[[aiosqlite.Connection], Awaitable[None]]]
+
+
+BASE_SCHEMA = [
+    '''
+    CREATE TABLE IF NOT EXISTS players (
+        id INTEGER PRIMARY KEY,
+        name TEXT NOT NULL,
+        level INTEGER DEFAULT 1,
+        xp INTEGER DEFAULT 0,
+        health INTEGER DEFAULT 100,
+        max_health INTEGER DEFAULT 100,
+        mana INTEGER DEFAULT 100,
+        max_mana INTEGER DEFAULT 100,
+        damage_bonus INTEGER DEFAULT 0,
+        magic_damage_bonus INTEGER DEFAULT 0,
+        defense INTEGER DEFAULT 0,
+        magic_defense INTEGER DEFAULT 0,
+        crit_chance_bonus REAL DEFAULT 0.0,
+        flee_chance_bonus REAL DEFAULT 0.0,
+        health_bonus INTEGER DEFAULT 0,
+        mana_bonus INTEGER DEFAULT 0,
+        gold INTEGER DEFAULT 0,
+        current_title TEXT DEFAULT NULL,
+        in_combat BOOLEAN DEFAULT FALSE,
+        current_enemy TEXT DEFAULT NULL,
+        deaths INTEGER DEFAULT 0
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS inventory (
+        player_id INTEGER,
+        item_id TEXT,
+        count INTEGER DEFAULT 1,
+        FOREIGN KEY(player_id) REFERENCES players(id),
+        PRIMARY KEY(player_id, item_id)
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS equipment (
+        player_id INTEGER PRIMARY KEY,
+        helmet_id TEXT DEFAULT NULL,
+        armor_id TEXT DEFAULT NULL,
+        pants_id TEXT DEFAULT NULL,
+        boots_id TEXT DEFAULT NULL,
+        weapon_id TEXT DEFAULT NULL,
+        ring1_id TEXT DEFAULT NULL,
+        ring2_id TEXT DEFAULT NULL,
+        amulet_id TEXT DEFAULT NULL,
+        FOREIGN KEY(player_id) REFERENCES players(id)
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS active_quests (
+        player_id INTEGER,
+        quest_id TEXT,
+        completed BOOLEAN DEFAULT FALSE,
+        rewards_claimed BOOLEAN DEFAULT FALSE,
+        objectives_progress TEXT,  -- JSON string of objective progress
+        FOREIGN KEY(player_id) REFERENCES players(id),
+        PRIMARY KEY (player_id, quest_id)
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS player_kills (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        player_id INTEGER,
+        enemy_name TEXT NOT NULL,
+        enemy_level INTEGER NOT NULL,
+        killed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY(player_id) REFERENCES players(id)
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS death_history (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        player_id INTEGER,
+        enemy_name TEXT NOT NULL,
+        enemy_level INTEGER NOT NULL,
+        player_level INTEGER NOT NULL,
+        player_health INTEGER NOT NULL,
+        player_max_health INTEGER NOT NULL,
+        player_mana INTEGER NOT NULL,
+        player_max_mana INTEGER NOT NULL,
+        died_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY(player_id) REFERENCES players(id)
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS completed_quest_chains (
+        player_id INTEGER,
+        chain_id TEXT,
+        completed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (player_id) REFERENCES players(id),
+        PRIMARY KEY (player_id, chain_id)
+    )
+    ''',
+]
+
+
+async def _column_names(db: aiosqlite.Connection, table: str) -> List[str]:
+    async with db.execute(f'PRAGMA table_info({table})') as cursor:
+        return [row[1] for row in await cursor.fetchall()]
+
+
+async def _backfill_legacy_columns(db: aiosqlite.Connection):
+    """Bring databases created by older versions of setup.py up to date.
+
+    Those databases already have a players table, so the CREATE TABLE IF NOT
+    EXISTS in the base schema is a no-op for them and the columns added since
+    have to be patched in.
+    """
+    columns = await _column_names(db, 'players')
+    for name, definition in (
+        ('gold', 'INTEGER DEFAULT 0'),
+        ('current_title', 'TEXT DEFAULT NULL'),
+        ('deaths', 'INTEGER DEFAULT 0'),
+    ):
+        if name not in columns:
+            logger.info(f"Adding {name} column to players table")
+            await db.execute(f'ALTER TABLE players ADD COLUMN {name} {definition}')
+
+    await db.execute('''
+        CREATE TABLE IF NOT EXISTS player_titles (
+            player_id INTEGER,
+            title_id TEXT,
+            earned_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY(player_id) REFERENCES players(id),
+            PRIMARY KEY (player_id, title_id)
+        )
+    ''')
+
+
+async def _add_kill_counter(db: aiosqlite.Connection):
+    if 'kills' not in await _column_names(db, 'players'):
+        await db.execute('ALTER TABLE players ADD COLUMN kills INTEGER DEFAULT 0')
+    updated = await backfill_player_counters(db)
+    logger.info(f"Backfilled kill counters for {updated} players")
+
+
+async def _add_kill_rollup(db: aiosqlite.Connection):
+    await db.execute('''
+        CREATE TABLE IF NOT EXISTS player_kill_rollup (
+            player_id INTEGER,
+            enemy_name TEXT NOT NULL,
+            enemy_level INTEGER NOT NULL,
+            kill_count INTEGER NOT NULL DEFAULT 0,
+            first_killed_at TIMESTAMP,
+            last_killed_at TIMESTAMP,
+            FOREIGN KEY(player_id) REFERENCES players(id),
+            PRIMARY KEY (player_id, enemy_name, enemy_level)
+        )
+    ''')
+    await db.execute(
+        'CREATE INDEX IF NOT EXISTS idx_player_kill_rollup_recent '
+        'ON player_kill_rollup (player_id, last_killed_at)'
+    )
+    cursor = await db.execute('''
+        INSERT INTO player_kill_rollup (
+            player_id, enemy_name, enemy_level, kill_count, first_killed_at, last_killed_at
+        )
+        SELECT player_id, enemy_name, enemy_level, COUNT(*), MIN(killed_at), MAX(killed_at)
+        FROM player_kills
+        GROUP BY player_id, enemy_name, enemy_level
+    ''')
+    logger.info(f"Built {cursor.rowcount} kill rollup rows")
+    await cursor.close()
+
+
+async def _structured_enemy_identity(db: aiosqlite.Connection):
+    """Replace free-text enemy names with integer IDs into enemies.yaml.
+
+    Names enemies.yaml doesn't know are kept in enemy_legacy_names.
+    """
+    catalog = EnemyCatalog.load()
+
+    await db.execute('''
+        CREATE TABLE IF NOT EXISTS enemy_lookup (
+            kind TEXT NOT NULL,  -- type, name, prefix or suffix
+            type_id INTEGER NOT NULL DEFAULT 0,  -- owning type for base names
+            id INTEGER NOT NULL,
+            name TEXT NOT NULL,
+            PRIMARY KEY (kind, type_id, id)
+        ) WITHOUT ROWID
+    ''')
+    await sync_enemy_lookup(db, catalog)
+
+    # Event logs: the old index includes enemy_name, which blocks DROP COLUMN
+    await db.execute('DROP INDEX IF EXISTS idx_player_kills_player_enemy')
+    await convert_enemy_name_column(db, 'player_kills', catalog)
+    await convert_enemy_name_column(db, 'death_history', catalog)
+    await db.execute(
+        'CREATE INDEX IF NOT EXISTS idx_player_kills_player_type '
+        'ON player_kills (player_id, enemy_type_id, enemy_level)'
+    )
+
+    # The rollup is keyed on the enemy, so it is rebuilt under the new key
+    # from its own rows (the kill log may already be partly archived)
+    await db.execute('DROP INDEX IF EXISTS idx_player_kill_rollup_recent')
+    await db.execute('ALTER TABLE player_kill_rollup RENAME TO player_kill_rollup_legacy')
+    await convert_enemy_name_column(db, 'player_kill_rollup_legacy', catalog, drop_name=False)
+    await db.execute('''
+        CREATE TABLE player_kill_rollup (
+            player_id INTEGER,
+            enemy_type_id INTEGER NOT NULL,
+            enemy_name_id INTEGER NOT NULL,
+            enemy_prefix_id INTEGER NOT NULL,
+            enemy_suffix_id INTEGER NOT NULL,
+            enemy_level INTEGER NOT NULL,
+            kill_count INTEGER NOT NULL DEFAULT 0,
+            first_killed_at TIMESTAMP,
+            last_killed_at TIMESTAMP,
+            FOREIGN KEY(player_id) REFERENCES players(id),
+            PRIMARY KEY (player_id, enemy_type_id, enemy_name_id, enemy_prefix_id, enemy_suffix_id, enemy_level)
+        )
+    ''')
+    await db.execute('''
+        INSERT INTO player_kill_rollup
+        SELECT player_id, enemy_type_id, enemy_name_id, enemy_prefix_id, enemy_suffix_id, enemy_level,
+               SUM(kill_count), MIN(first_killed_at), MAX(last_killed_at)
+        FROM player_kill_rollup_legacy
+        GROUP BY player_id, enemy_type_id, enemy_name_id, enemy_prefix_id, enemy_suffix_id, enemy_level
+    ''')
+    await db.execute('DROP TABLE player_kill_rollup_legacy')
+    await db.execute(
+        'CREATE INDEX IF NOT EXISTS idx_player_kill_rollup_recent '
+        'ON player_kill_rollup (player_id, last_killed_at)'
+    )
+
+    # players.current_enemy held the display name; only the packed key is kept
+    columns = await _column_names(db, 'players')
+    if 'current_enemy' in columns:
+        await db.execute('ALTER TABLE players DROP COLUMN current_enemy')
+    if 'current_enemy_key' not in columns:
+        await db.execute('ALTER TABLE players ADD COLUMN current_enemy_key INTEGER DEFAULT NULL')
+
+
+async def _normalize_quest_progress(db: aiosqlite.Connection):
+    """Move active_quests.objectives_progress JSON into one row per objective"""
+    await db.execute('''
+        CREATE TABLE IF NOT EXISTS quest_objective_progress (
+            player_id INTEGER NOT NULL,
+            quest_id TEXT NOT NULL,
+            objective_index INTEGER NOT NULL,
+            progress INTEGER NOT NULL DEFAULT 0,
+            FOREIGN KEY(player_id, quest_id) REFERENCES active_quests(player_id, quest_id),
+            PRIMARY KEY (player_id, quest_id, objective_index)
+        ) WITHOUT ROWID
+    ''')
+    if 'objectives_progress' not in await _column_names(db, 'active_quests'):
+        return
+
+    cursor = await db.execute('''
+        INSERT OR IGNORE INTO quest_objective_progress (player_id, quest_id, objective_index, progress)
+        SELECT q.player_id, q.quest_id, CAST(p.key AS INTEGER), CAST(p.value AS INTEGER)
+        FROM active_quests AS q, json_each(q.objectives_progress) AS p
+        WHERE json_valid(q.objectives_progress)
+    ''')
+    logger.info(f"Moved {cursor.rowcount} quest objective progress values out of JSON")
+    await cursor.close()
+    await db.execute('ALTER TABLE active_quests DROP COLUMN objectives_progress')
+
+
+# Ordered list of (version, description, step). Versions must be strictly
+# increasing; never edit a step that has shipped, append a new one instead.
+MIGRATIONS: List[Tuple[int, str, MigrationStep]] = [
+    (1, 'base schema', BASE_SCHEMA),
+    (2, 'legacy player columns and player_titles', _backfill_legacy_columns),
+    (3, 'indexes for per-player history lookups', [
+        'CREATE INDEX IF NOT EXISTS idx_player_kills_player ON player_kills (player_id)',
+        'CREATE INDEX IF NOT EXISTS idx_death_history_player ON death_history (player_id, died_at)',
+    ]),
+    (4, 'covering indexes for per-player lookups', [
+        # Superseded by the wider index below, which also covers the
+        # dashboard's per-enemy breakdown without touching the table
+        'DROP INDEX IF EXISTS idx_player_kills_player',
+        'CREATE INDEX IF NOT EXISTS idx_player_kills_player_enemy '
+        'ON player_kills (player_id, enemy_name, enemy_level, killed_at)',
+        'CREATE INDEX IF NOT EXISTS idx_active_quests_player_completed '
+        'ON active_quests (player_id, completed, quest_id)',
+        'CREATE INDEX IF NOT EXISTS idx_inventory_player_count '
+        'ON inventory (player_id, item_id, count)',
+    ]),
+    (5, 'materialized kill counter on players', _add_kill_counter),
+    (6, 'per-player, per-enemy kill rollup', _add_kill_rollup),
+    (7, 'event timestamp indexes for retention', [
+        'CREATE INDEX IF NOT EXISTS idx_player_kills_killed_at ON player_kills (killed_at)',
+        'CREATE INDEX IF NOT EXISTS idx_death_history_died_at ON death_history (died_at)',
+    ]),
+    (8, 'structured enemy identity', _structured_enemy_identity),
+    (9, 'per-objective quest progress', _normalize_quest_progress),
+    # Databases converted before unresolved names were kept don't have it
+    (10, 'legacy enemy names', [LEGACY_NAMES_SCHEMA]),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+async def get_schema_version(db: aiosqlite.Connection) -> int:
+    async with db.execute('PRAGMA user_version') as cursor:
+        row = await cursor.fetchone()
+    return row[0]
+
+
+async def migrate(db: aiosqlite.Connection) -> int:
+    """Apply every pending migration in a single transaction.
+
+    Returns the schema version the database is at afterwards. A database that
+    is already up to date costs one PRAGMA read.
+    """
+    current = await get_schema_version(db)
+    pending = [m for m in MIGRATIONS if m[0] > current]
+    if not pending:
+        return current
+
+    logger.info(f"Migrating database schema from version {current} to {LATEST_VERSION}")
+    await db.execute('BEGIN IMMEDIATE')
+    try:
+        for version, description, step in pending:
+            logger.info(f"Applying migration {version}: {description}")
+            if callable(step):
+                await step(db)
+            else:
+                for statement in step:
+                    await db.execute(statement)
+        # PRAGMA arguments can't be bound; the value comes from MIGRATIONS
+        await db.execute(f'PRAGMA user_version = {LATEST_VERSION}')
+        await db.commit()
+    except Exception:
+        await db.rollback()
+        logger.exception("Database migration failed, rolled back")
+        raise
+
+    return LATEST_VERSION
@@ -0,0 +1,111 @@
+import asyncio
+import contextvars
+import logging
+from contextlib import asynccontextmanager
+from typing import List, Optional
+
+import aiosqlite
+
+from src.db.storage import apply_storage_profile
+
+logger = logging.getLogger('willowbot.db')
+
+# Connection currently held by the running task, so nested acquires
+# (e.g. a manager called while a cog already holds a connection) reuse it
+# instead of waiting on the pool and deadlocking when it is exhausted.
+_held_connection = contextvars.ContextVar('willowbot_held_connection', default=None)
+
+
+class ConnectionPool:
+    """Fixed-size pool of long-lived aiosqlite connections.
+
+    Connections are opened with the storage profile applied (and warmed up)
+    once in ``open()`` and handed out with ``acquire()``. Any transaction left open by a caller is rolled back
+    when the connection is returned so the next user gets a clean connection.
+    """
+
+    def __init__(self, db_path: str, size: int = 4, cached_statements: int = 256, uri: bool = False):
+        self.db_path = db_path
+        # db_path is a SQLite URI filename (e.g. the in-memory backend)
+        self.uri = uri
+        self.size = max(1, size)
+        # Prepared statements kept per connection; large enough for every
+        # repository statement so none of them is re-prepared on a hot path
+        self.cached_statements = cached_statements
+        self._connections: List[aiosqlite.Connection] = []
+        self._idle: Optional[asyncio.Queue] = None
+
+    @property
+    def is_open(self) -> bool:
+        return self._idle is not None
+
+    async def _create_connection(self) -> aiosqlite.Connection:
+        db = await aiosqlite.connect(self.db_path, cached_statements=self.cached_statements, uri=self.uri)
+        await apply_storage_profile(db)
+        # Warm the connection up so the first real query doesn't pay for
+        # schema loading and page cache population.
+        async with db.execute('SELECT 1 FROM sqlite_master LIMIT 1') as cursor:
+            await cursor.fetchall()
+        return db
+
+    async def open(self):
+        """Open and warm up every connection in the pool"""
+        if self.is_open:
+            return
+
+        self._idle = asyncio.Queue()
+        for _ in range(self.size):
+            db = await self._create_connection()
+            self._connections.append(db)
+            self._idle.put_nowait(db)
+        logger.info(f"Opened database pool with {self.size} connections to {self.db_path}")
+
+    async def close(self):
+        """Close every connection in the pool"""
+        if not self.is_open:
+            return
+
+        for db in self._connections:
+            try:
+                await db.close()
+            except Exception as e:
+                logger.warning(f"Error closing pooled connection: {e}")
+        self._connections = []
+        self._idle = None
+        logger.info("Closed database pool")
+
+    @asynccontextmanager
+    async def acquire(self):
+        """Borrow a connection from the pool for the duration of the block"""
+        if not self.is_open:
+            await self.open()
+
+        task = asyncio.current_task()
+        held = _held_connection.get()
+        if held is not None and held[0] is task:
+            yield held[1]
+            return
+
+        db = await self._idle.get()
+        token = _held_connection.set((task, db))
+        try:
+            yield db
+        finally:
+            _held_connection.reset(token)
+            await self._release(db)
+
+    async def _release(self, db: aiosqlite.Connection):
+        """Return a connection to the pool, discarding any open transaction"""
+        try:
+            if db.in_transaction:
+                await db.rollback()
+        except Exception as e:
+            logger.warning(f"Replacing broken pooled connection: {e}")
+            self._connections.remove(db)
+            try:
+                await db.close()
+            except Exception:
+                pass
+            db = await self._create_connection()
+            self._connections.append(db)
+        self._idle.put_nowait(db)
@@ -0,0 +1,801 @@
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Sequence, Tuple, TypeVar
+
+import aiosqlite
+
+from src.db.contention import Attempts, BusyPolicy, retry_busy
+from src.db.pool import ConnectionPool
+from src.db.writer import GroupCommitWriter
+from src.models.combat import EnemyIdentity
+from src.models.equipment import EquipmentSlots
+from src.models.player import Player
+
+UNKNOWN_ENEMY = EnemyIdentity(0, 0)
+
+T = TypeVar('T')
+
+
+class Record:
+    """Base for slotted row objects.
+
+    ``from_row`` has the ``sqlite3`` row factory signature, so records are
+    built straight from the cursor instead of being unpacked by position.
+    """
+    __slots__ = ()
+
+    @classmethod
+    def from_row(cls, cursor, row):
+        return cls(*row)
+
+
+@dataclass(slots=True)
+class PlayerRow(Record):
+    id: int
+    name: str
+    level: int
+    xp: int
+    health: int
+    max_health: int
+    mana: int
+    max_mana: int
+    # Equipment totals, stored whenever equipment changes
+    damage_bonus: int
+    magic_damage_bonus: int
+    defense: int
+    magic_defense: int
+    crit_chance_bonus: float
+    flee_chance_bonus: float
+    health_bonus: int
+    mana_bonus: int
+
+    def to_player(self) -> Player:
+        return Player(
+            id=self.id, name=self.name, level=self.level, xp=self.xp,
+            health=self.health, max_health=self.max_health,
+            mana=self.mana, max_mana=self.max_mana,
+            damage_bonus=self.damage_bonus, magic_damage_bonus=self.magic_damage_bonus,
+            defense=self.defense, magic_defense=self.magic_defense,
+            crit_chance_bonus=self.crit_chance_bonus, flee_chance_bonus=self.flee_chance_bonus,
+            health_bonus=self.health_bonus, mana_bonus=self.mana_bonus
+        )
+
+
+@dataclass(slots=True)
+class PlayerStats(Record):
+    name: str
+    level: int
+    health: int
+    max_health: int
+    mana: int
+    max_mana: int
+    xp: int
+    gold: int
+    deaths: int
+    kills: int
+    damage_bonus: int
+    magic_damage_bonus: int
+    defense: int
+    magic_defense: int
+    crit_chance_bonus: float
+    health_bonus: int
+    mana_bonus: int
+    flee_chance_bonus: float
+
+
+@dataclass(slots=True)
+class Vitals(Record):
+    name: str
+    health: int
+    max_health: int
+    mana: int
+    max_mana: int
+
+
+@dataclass(slots=True)
+class Progression(Record):
+    level: int
+    xp: int
+    max_health: int
+    max_mana: int
+
+
+@dataclass(slots=True)
+class EquipmentRow(Record):
+    helmet_id: Optional[str]
+    armor_id: Optional[str]
+    pants_id: Optional[str]
+    boots_id: Optional[str]
+    weapon_id: Optional[str]
+    ring1_id: Optional[str]
+    ring2_id: Optional[str]
+    amulet_id: Optional[str]
+
+
+@dataclass(slots=True)
+class QuestStatus(Record):
+    quest_id: str
+    completed: bool
+    rewards_claimed: bool
+
+
+@dataclass(slots=True)
+class StatementStats:
+    calls: int = 0
+    total_seconds: float = 0.0
+    max_seconds: float = 0.0
+    # Lock contention: busy errors, time lost to them and calls that still failed
+    busy: int = 0
+    lock_wait_seconds: float = 0.0
+    gave_up: int = 0
+
+
+class StatementCache:
+    """SQL text of every repository statement, keyed by ``repo.name``.
+
+    Each statement is defined once, so every call site sends byte-identical
+    SQL and hits the connection's prepared statement cache. Calls are timed
+    per statement so slow queries can be found without tracing every
+    connection.
+    """
+
+    def __init__(self):
+        self._sql: Dict[str, str] = {}
+        self._stats: Dict[str, StatementStats] = {}
+
+    def register(self, namespace: str, statements: Dict[str, str]):
+        for name, sql in statements.items():
+            key = f'{namespace}.{name}'
+            self._sql[key] = sql
+            self._stats[key] = StatementStats()
+
+    def __len__(self) -> int:
+        return len(self._sql)
+
+    def sql(self, key: str) -> str:
+        return self._sql[key]
+
+    def record(self, key: str, elapsed: float, attempts: Optional[Attempts] = None):
+        stats = self._stats[key]
+        stats.calls += 1
+        stats.total_seconds += elapsed
+        if elapsed > stats.max_seconds:
+            stats.max_seconds = elapsed
+        if attempts is not None:
+            stats.busy += attempts.busy
+            stats.lock_wait_seconds += attempts.waited
+            stats.gave_up += attempts.gave_up
+
+    def snapshot(self) -> List[Tuple[str, StatementStats]]:
+        """Statements that have run, slowest total first"""
+        return sorted(
+            ((key, stats) for key, stats in self._stats.items() if stats.calls),
+            key=lambda item: item[1].total_seconds,
+            reverse=True
+        )
+
+    def contention(self) -> List[Tuple[str, StatementStats]]:
+        """Statements that have waited on locks, most lock wait first"""
+        return sorted(
+            ((key, stats) for key, stats in self._stats.items() if stats.lock_wait_seconds),
+            key=lambda item: item[1].lock_wait_seconds,
+            reverse=True
+        )
+
+
+class Repository:
+    """Named statements for one area of the schema.
+
+    Every method borrows a connection with ``pool.acquire()``, which reuses
+    the connection the calling task already holds, so repository calls
+    made inside ``Repositories.transaction()`` share its transaction.
+    Methods never commit.
+
+    A statement that starts outside a transaction and fails with
+    SQLITE_BUSY is retried with jittered backoff under ``busy_policy``; the
+    failed attempt changed nothing. Inside a transaction the error is only
+    counted and propagates, so the whole unit of work is rolled back.
+    """
+    NAMESPACE = ''
+    STATEMENTS: Dict[str, str] = {}
+
+    def __init__(self, pool: ConnectionPool, statements: StatementCache,
+                 busy_policy: Optional[BusyPolicy] = None):
+        self.pool = pool
+        self.statements = statements
+        self.busy_policy = busy_policy or BusyPolicy()
+        statements.register(self.NAMESPACE, self.STATEMENTS)
+
+    async def _run(self, name: str, operation: Callable[[aiosqlite.Connection, str], Awaitable[T]]) -> T:
+        """Run ``operation(db, sql)`` as the named statement, timed and retried on busy errors"""
+        key = f'{self.NAMESPACE}.{name}'
+        sql = self.statements.sql(key)
+        attempts = Attempts()
+        async with self.pool.acquire() as db:
+            retryable = not db.in_transaction
+
+            async def reset():
+                # sqlite3 opens a transaction before a write; drop it so the
+                # retry starts from a fresh snapshot
+                if db.in_transaction:
+                    await db.rollback()
+
+            start = time.perf_counter()
+            try:
+                return await retry_busy(
+                    lambda: operation(db, sql),
+                    self.busy_policy if retryable else None,
+                    attempts,
+                    reset
+                )
+            finally:
+                self.statements.record(key, time.perf_counter() - start, attempts)
+
+    async def _fetchone(self, name: str, params: Sequence = (), record: type = None):
+        async def fetch(db, sql):
+            async with db.execute(sql, params) as cursor:
+                if record:
+                    cursor.row_factory = record.from_row
+                return await cursor.fetchone()
+        return await self._run(name, fetch)
+
+    async def _fetchall(self, name: str, params: Sequence = (), record: type = None) -> list:
+        async def fetch(db, sql):
+            async with db.execute(sql, params) as cursor:
+                if record:
+                    cursor.row_factory = record.from_row
+                return await cursor.fetchall()
+        return await self._run(name, fetch)
+
+    async def _execute(self, name: str, params: Sequence = ()) -> int:
+        async def execute(db, sql):
+            async with db.execute(sql, params) as cursor:
+                return cursor.rowcount
+        return await self._run(name, execute)
+
+    async def _executemany(self, name: str, rows: Iterable[Sequence]):
+        # Materialise once so a retry sends the same rows
+        rows = list(rows)
+        await self._run(name, lambda db, sql: db.executemany(sql, rows))
+
+
+class PlayerRepo(Repository):
+    NAMESPACE = 'players'
+    STATEMENTS = {
+        'get': '''
+            SELECT id, name, level, xp, health, max_health, mana, max_mana,
+                   damage_bonus, magic_damage_bonus, defense, magic_defense,
+                   crit_chance_bonus, flee_chance_bonus, health_bonus, mana_bonus
+            FROM players WHERE id = ?
+        ''',
+        'level': 'SELECT level FROM players WHERE id = ?',
+        'stats': '''
+            SELECT name, level, health, max_health, mana, max_mana, xp, gold, deaths, kills,
+                   damage_bonus, magic_damage_bonus, defense, magic_defense, crit_chance_bonus,
+                   health_bonus, mana_bonus, flee_chance_bonus
+            FROM players WHERE id = ?
+        ''',
+        'vitals': 'SELECT name, health, max_health, mana, max_mana FROM players WHERE id = ?',
+        'progression': 'SELECT level, xp, max_health, max_mana FROM players WHERE id = ?',
+        'create': '''
+            INSERT INTO players (id, name, level, xp, health, max_health, mana, max_mana)
+            VALUES (?, ?, 1, 0, 100, 100, 100, 100)
+        ''',
+        'save': '''
+            INSERT INTO players (id, name, level, xp, health, max_health, mana, max_mana)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(id) DO UPDATE SET
+                name = excluded.name, level = excluded.level, xp = excluded.xp,
+                health = excluded.health, max_health = excluded.max_health,
+                mana = excluded.mana, max_mana = excluded.max_mana
+        ''',
+        'set_health': 'UPDATE players SET health = ? WHERE id = ?',
+        'set_vitals': 'UPDATE players SET health = ?, mana = ? WHERE id = ?',
+        'enter_combat': 'UPDATE players SET in_combat = TRUE, current_enemy_key = ? WHERE id = ?',
+        'reset_combat': 'UPDATE players SET in_combat = FALSE, current_enemy_key = NULL WHERE id = ?',
+        'save_combat_state': '''
+            UPDATE players SET health = ?, mana = ?, in_combat = ?, current_enemy_key = ?
+            WHERE id = ?
+        ''',
+        'leave_combat': '''
+            UPDATE players SET health = ?, mana = ?, in_combat = FALSE, current_enemy_key = NULL
+            WHERE id = ?
+        ''',
+        'save_progress': '''
+            UPDATE players SET health = ?, mana = ?, xp = ?, level = ?,
+                in_combat = FALSE, current_enemy_key = NULL
+            WHERE id = ?
+        ''',
+        'save_state': 'UPDATE players SET health = ?, mana = ?, xp = ?, level = ? WHERE id = ?',
+        'finish_victory': '''
+            UPDATE players
+            SET gold = gold + ?, health = ?, mana = ?, xp = ?, level = ?,
+                max_health = ?, max_mana = ?,
+                in_combat = FALSE, current_enemy_key = NULL
+            WHERE id = ?
+            RETURNING name, level, health, max_health, mana, max_mana, xp, gold, deaths, kills,
+                      damage_bonus, magic_damage_bonus, defense, magic_defense, crit_chance_bonus,
+                      health_bonus, mana_bonus, flee_chance_bonus
+        ''',
+        'respawn': '''
+            UPDATE players
+            SET health = ?, mana = ?, in_combat = FALSE, current_enemy_key = NULL, deaths = deaths + 1
+            WHERE id = ?
+            RETURNING deaths, kills
+        ''',
+        'rest': 'UPDATE players SET health = max_health, mana = max_mana WHERE id = ?',
+        'penalty_base': 'SELECT gold, xp FROM players WHERE id = ?',
+        'death_penalty': '''
+            UPDATE players
+            SET health = max_health, mana = max_mana, gold = MAX(0, gold - ?), xp = MAX(0, xp - ?)
+            WHERE id = ?
+            RETURNING max_health, max_mana
+        ''',
+        'level_up': '''
+            UPDATE players
+            SET level = ?, xp = ?, gold = gold + ?,
+                max_health = ?, health = ?, max_mana = ?, mana = ?
+            WHERE id = ?
+        ''',
+        'add_xp_gold': 'UPDATE players SET xp = ?, gold = gold + ? WHERE id = ?',
+        'apply_equipment_stats': '''
+            UPDATE players SET
+                max_health = ?,
+                max_mana = ?,
+                damage_bonus = ?,
+                magic_damage_bonus = ?,
+                defense = ?,
+                magic_defense = ?,
+                crit_chance_bonus = ?,
+                flee_chance_bonus = ?,
+                health_bonus = ?,
+                mana_bonus = ?
+            WHERE id = ?
+        ''',
+    }
+
+    async def get(self, player_id: int) -> Optional[PlayerRow]:
+        return await self._fetchone('get', (player_id,), PlayerRow)
+
+    async def load(self, player_id: int) -> Optional[Player]:
+        """The player as a ``Player`` model, or None if they don't exist"""
+        row = await self.get(player_id)
+        return row.to_player() if row else None
+
+    async def level(self, player_id: int) -> Optional[int]:
+        row = await self._fetchone('level', (player_id,))
+        return row[0] if row else None
+
+    async def stats(self, player_id: int) -> Optional[PlayerStats]:
+        return await self._fetchone('stats', (player_id,), PlayerStats)
+
+    async def vitals(self, player_id: int) -> Optional[Vitals]:
+        return await self._fetchone('vitals', (player_id,), Vitals)
+
+    async def progression(self, player_id: int) -> Optional[Progression]:
+        return await self._fetchone('progression', (player_id,), Progression)
+
+    async def create(self, player_id: int, name: str):
+        """Insert a new level 1 player"""
+        await self._execute('create', (player_id, name))
+
+    async def save(self, player: Player):
+        """Upsert the player's core stats, leaving every other column alone"""
+        await self._execute('save', (
+            player.id, player.name, player.level, player.xp,
+            player.health, player.max_health, player.mana, player.max_mana
+        ))
+
+    async def set_health(self, player_id: int, health: int):
+        await self._execute('set_health', (health, player_id))
+
+    async def set_vitals(self, player_id: int, health: int, mana: int):
+        await self._execute('set_vitals', (health, mana, player_id))
+
+    async def enter_combat(self, player_id: int, enemy_key: Optional[int]):
+        """Flag a player in combat with the enemy whose packed EnemyIdentity key is given"""
+        await self._execute('enter_combat', (enemy_key, player_id))
+
+    async def reset_combat(self, player_id: int):
+        await self._execute('reset_combat', (player_id,))
+
+    async def save_combat_state(self, player: Player):
+        """Save vitals and combat state mid-fight"""
+        enemy = player.current_enemy
+        await self._execute('save_combat_state', (
+            player.health, player.mana, player.in_combat,
+            enemy.identity.key if enemy and enemy.identity else None,
+            player.id
+        ))
+
+    async def leave_combat(self, player_id: int, health: int, mana: int):
+        await self._execute('leave_combat', (health, mana, player_id))
+
+    async def save_progress(self, player: Player):
+        """Save vitals, XP and level and leave combat"""
+        await self._execute('save_progress', (
+            player.health, player.mana, player.xp, player.level, player.id
+        ))
+
+    async def save_states(self, rows: Iterable[Tuple[int, int, int, int, int]]):
+        """Save (health, mana, xp, level, id) rows without touching the combat state"""
+        await self._executemany('save_state', rows)
+
+    async def finish_victory(self, player: Player, gold_dropped: int) -> Optional[PlayerStats]:
+        """Bank the loot gold, save the player's post-combat state and leave combat.
+
+        One UPDATE ... RETURNING replaces the gold update, the state update
+        and the read-back for the stats footer. Returns None if the player
+        doesn't exist.
+        """
+        return await self._fetchone('finish_victory', (
+            gold_dropped, player.health, player.mana, player.xp, player.level,
+            player.max_health, player.max_mana, player.id
+        ), PlayerStats)
+
+    async def respawn_after_death(self, player_id: int, health: int, mana: int) -> Tuple[int, int]:
+        """Respawn a defeated player, bump the death counter and leave combat.
+
+        Returns the player's (deaths, kills) counters.
+        """
+        row = await self._fetchone('respawn', (health, mana, player_id))
+        return tuple(row) if row else (0, 0)
+
+    async def rest(self, player_id: int) -> Optional[Vitals]:
+        """Restore a player to full health and mana.
+
+        Returns the vitals as they were before resting, or None if the
+        player doesn't exist. RETURNING only sees the new values, so the
+        previous ones are read first; nothing is written if the player is
+        already at full health and mana.
+        """
+        vitals = await self.vitals(player_id)
+        if vitals and (vitals.health < vitals.max_health or vitals.mana < vitals.max_mana):
+            await self._execute('rest', (player_id,))
+        return vitals
+
+    async def apply_death_penalty(self, player_id: int,
+                                  rate: float = 0.1) -> Optional[Tuple[int, int, int, int]]:
+        """Heal a player to full and take ``rate`` of their gold and XP.
+
+        Returns (max_health, max_mana, gold_penalty, xp_penalty), or None if
+        the player doesn't exist.
+        """
+        row = await self._fetchone('penalty_base', (player_id,))
+        if not row:
+            return None
+
+        gold, xp = row
+        gold_penalty = int(gold * rate)
+        xp_penalty = int(xp * rate)
+        max_health, max_mana = await self._fetchone(
+            'death_penalty', (gold_penalty, xp_penalty, player_id)
+        )
+        return max_health, max_mana, gold_penalty, xp_penalty
+
+    async def grant(self, player_id: int, progression: Progression, gold: int, leveled_up: bool):
+        """Store XP and level after a reward and add ``gold``.
+
+        Leveling up also restores health and mana to the new maximums.
+        """
+        if leveled_up:
+            await self._execute('level_up', (
+                progression.level, progression.xp, gold,
+                progression.max_health, progression.max_health,
+                progression.max_mana, progression.max_mana, player_id
+            ))
+        else:
+            await self._execute('add_xp_gold', (progression.xp, gold, player_id))
+
+    async def apply_equipment_stats(self, player_id: int, max_health: int, max_mana: int,
+                                    stats: Dict[str, float]):
+        """Store max health/mana and the bonuses granted by equipment"""
+        await self._execute('apply_equipment_stats', (
+            max_health, max_mana,
+            stats['damage'], stats['magic_damage'],
+            stats['defense'], stats['magic_defense'],
+            stats['crit_chance'], stats['flee_chance'],
+            stats['health_bonus'], stats['mana_bonus'],
+            player_id
+        ))
+
+
+class InventoryRepo(Repository):
+    NAMESPACE = 'inventory'
+    STATEMENTS = {
+        'items': 'SELECT item_id, count FROM inventory WHERE player_id = ?',
+        'stacks': '''
+            SELECT item_id, count FROM inventory
+            WHERE player_id = ? AND count > 0
+            ORDER BY item_id
+        ''',
+        'set_count': '''
+            INSERT INTO inventory (player_id, item_id, count)
+            VALUES (?, ?, ?)
+            ON CONFLICT(player_id, item_id) DO UPDATE SET
+            count = excluded.count
+        ''',
+        'add': '''
+            INSERT INTO inventory (player_id, item_id, count)
+            VALUES (?, ?, ?)
+            ON CONFLICT(player_id, item_id) DO UPDATE SET
+            count = count + excluded.count
+        ''',
+        'delete': 'DELETE FROM inventory WHERE player_id = ? AND item_id = ?',
+        'consume': 'UPDATE inventory SET count = count - 1 WHERE player_id = ? AND item_id = ?',
+        'delete_empty': 'DELETE FROM inventory WHERE player_id = ? AND item_id = ? AND count <= 0',
+        'equipment': '''
+            SELECT helmet_id, armor_id, pants_id, boots_id, weapon_id, ring1_id, ring2_id, amulet_id
+            FROM equipment WHERE player_id = ?
+        ''',
+        'create_equipment': 'INSERT INTO equipment (player_id) VALUES (?)',
+        'save_equipment': '''
+            INSERT OR REPLACE INTO equipment (
+                player_id, helmet_id, armor_id, pants_id, boots_id,
+                weapon_id, ring1_id, ring2_id, amulet_id
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''',
+    }
+
+    async def items(self, player_id: int) -> List[Tuple[str, int]]:
+        """Every (item_id, count) row of the player's inventory"""
+        return await self._fetchall('items', (player_id,))
+
+    async def stacks(self, player_id: int) -> List[Tuple[str, int]]:
+        """Non-empty (item_id, count) rows, ordered by item id"""
+        return await self._fetchall('stacks', (player_id,))
+
+    async def set_counts(self, player_id: int, counts: Iterable[Tuple[str, int]]):
+        await self._executemany('set_count', [(player_id, item_id, count) for item_id, count in counts])
+
+    async def add(self, player_id: int, items: Iterable[Tuple[str, int]]):
+        """Add ``count`` of each item on top of what the player already has"""
+        await self._executemany('add', [(player_id, item_id, count) for item_id, count in items])
+
+    async def delete(self, player_id: int, item_ids: Iterable[str]):
+        await self._executemany('delete', [(player_id, item_id) for item_id in item_ids])
+
+    async def consume(self, player_id: int, item_id: str):
+        """Use up one of an item, dropping the row when none are left"""
+        await self._execute('consume', (player_id, item_id))
+        await self._execute('delete_empty', (player_id, item_id))
+
+    async def equipment(self, player_id: int) -> Optional[EquipmentRow]:
+        return await self._fetchone('equipment', (player_id,), EquipmentRow)
+
+    async def create_equipment(self, player_id: int):
+        await self._execute('create_equipment', (player_id,))
+
+    async def save_equipment(self, player_id: int, equipment: EquipmentSlots):
+        await self._execute('save_equipment', (player_id, *(
+            item.id if item else None
+            for item in (
+                equipment.helmet, equipment.armor, equipment.pants, equipment.boots,
+                equipment.weapon, equipment.ring1, equipment.ring2, equipment.amulet
+            )
+        )))
+
+
+class QuestRepo(Repository):
+    NAMESPACE = 'quests'
+    STATEMENTS = {
+        'status': 'SELECT quest_id, completed, rewards_claimed FROM active_quests WHERE player_id = ?',
+        'quest_status': '''
+            SELECT quest_id, completed, rewards_claimed FROM active_quests
+            WHERE player_id = ? AND quest_id = ?
+        ''',
+        'current': '''
+            SELECT quest_id FROM active_quests
+            WHERE player_id = ? AND completed = FALSE
+            LIMIT 1
+        ''',
+        'completed_chains': 'SELECT chain_id FROM completed_quest_chains WHERE player_id = ?',
+        'progress': '''
+            SELECT objective_index, progress FROM quest_objective_progress
+            WHERE player_id = ? AND quest_id = ?
+        ''',
+        'active_progress': '''
+            SELECT p.quest_id, p.objective_index, p.progress
+            FROM active_quests AS q
+            JOIN quest_objective_progress AS p
+              ON p.player_id = q.player_id AND p.quest_id = q.quest_id
+            WHERE q.player_id = ? AND q.completed = FALSE
+        ''',
+        'insert': 'INSERT INTO active_quests (player_id, quest_id) VALUES (?, ?)',
+        'insert_objective': '''
+            INSERT OR IGNORE INTO quest_objective_progress (player_id, quest_id, objective_index)
+            VALUES (?, ?, ?)
+        ''',
+        'advance': '''
+            INSERT INTO quest_objective_progress (player_id, quest_id, objective_index, progress)
+            VALUES (?, ?, ?, 1)
+            ON CONFLICT(player_id, quest_id, objective_index) DO UPDATE SET
+            progress = progress + 1
+        ''',
+        'mark_claimed': '''
+            UPDATE active_quests
+            SET completed = 1, rewards_claimed = 1
+            WHERE player_id = ? AND quest_id = ? AND rewards_claimed = FALSE
+        ''',
+        'complete_chain': 'INSERT OR IGNORE INTO completed_quest_chains (player_id, chain_id) VALUES (?, ?)',
+        'add_title': 'INSERT OR IGNORE INTO player_titles (player_id, title_id) VALUES (?, ?)',
+    }
+
+    async def statuses(self, player_id: int) -> List[QuestStatus]:
+        return await self._fetchall('status', (player_id,), QuestStatus)
+
+    async def status(self, player_id: int, quest_id: str) -> Optional[QuestStatus]:
+        return await self._fetchone('quest_status', (player_id, quest_id), QuestStatus)
+
+    async def current(self, player_id: int) -> Optional[str]:
+        """Id of one of the player's unfinished quests"""
+        row = await self._fetchone('current', (player_id,))
+        return row[0] if row else None
+
+    async def completed_chains(self, player_id: int) -> set:
+        return {row[0] for row in await self._fetchall('completed_chains', (player_id,))}
+
+    async def progress(self, player_id: int, quest_id: str) -> Dict[int, int]:
+        """{objective_index: progress} of one quest"""
+        return dict(await self._fetchall('progress', (player_id, quest_id)))
+
+    async def active_progress(self, player_id: int) -> Dict[str, Dict[int, int]]:
+        """{quest_id: {objective_index: progress}} of every unfinished quest"""
+        progress: Dict[str, Dict[int, int]] = {}
+        for quest_id, index, value in await self._fetchall('active_progress', (player_id,)):
+            progress.setdefault(quest_id, {})[index] = value
+        return progress
+
+    async def insert(self, player_id: int, quest_id: str, objective_count: int):
+        """Add a quest and one progress row per objective"""
+        await self._execute('insert', (player_id, quest_id))
+        await self._executemany('insert_objective', [
+            (player_id, quest_id, index) for index in range(objective_count)
+        ])
+
+    async def advance(self, increments: Iterable[Tuple[int, str, int]]):
+        """Add one to each (player_id, quest_id, objective_index)"""
+        await self._executemany('advance', increments)
+
+    async def mark_claimed(self, player_id: int, quest_id: str) -> bool:
+        """Mark a quest completed and claimed; False if its rewards were already claimed"""
+        return await self._execute('mark_claimed', (player_id, quest_id)) > 0
+
+    async def complete_chain(self, player_id: int, chain_id: str):
+        await self._execute('complete_chain', (player_id, chain_id))
+
+    async def add_title(self, player_id: int, title_id: str):
+        await self._execute('add_title', (player_id, title_id))
+
+
+class KillRepo(Repository):
+    """Kill and death events together with the aggregates derived from them"""
+    NAMESPACE = 'kills'
+    STATEMENTS = {
+        'log_kill': '''
+            INSERT INTO player_kills (
+                player_id, enemy_type_id, enemy_name_id, enemy_prefix_id, enemy_suffix_id, enemy_level
+            ) VALUES (?, ?, ?, ?, ?, ?)
+        ''',
+        'count_kill': 'UPDATE players SET kills = kills + 1 WHERE id = ?',
+        'rollup_kill': '''
+            INSERT INTO player_kill_rollup (
+                player_id, enemy_type_id, enemy_name_id, enemy_prefix_id, enemy_suffix_id, enemy_level,
+                kill_count, first_killed_at, last_killed_at
+            ) VALUES (?, ?, ?, ?, ?, ?, 1, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)
+            ON CONFLICT(player_id, enemy_type_id, enemy_name_id, enemy_prefix_id, enemy_suffix_id, enemy_level)
+            DO UPDATE SET
+                kill_count = kill_count + 1,
+                last_killed_at = excluded.last_killed_at
+        ''',
+        'log_death': '''
+            INSERT INTO death_history (
+                player_id, enemy_type_id, enemy_name_id, enemy_prefix_id, enemy_suffix_id, enemy_level,
+                player_level, player_health, player_max_health,
+                player_mana, player_max_mana
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''',
+        'totals': 'SELECT deaths, kills FROM players WHERE id = ?',
+    }
+
+    async def record_kill(self, player_id: int, enemy: Optional[EnemyIdentity], enemy_level: int):
+        """Log a kill and update every aggregate derived from it.
+
+        The raw log, the player's kill counter and the per-enemy rollup are
+        written on the same connection so they commit (or roll back)
+        together.
+        """
+        row = (player_id, *(enemy or UNKNOWN_ENEMY).as_row(), enemy_level)
+        await self._execute('log_kill', row)
+        await self._execute('count_kill', (player_id,))
+        await self._execute('rollup_kill', row)
+
+    async def record_death(self, player_id: int, enemy: Optional[EnemyIdentity],
+                           enemy_level: int, player: Player):
+        """Log a death in death_history.
+
+        The caller bumps ``players.deaths`` in the same transaction with
+        ``PlayerRepo.respawn_after_death``.
+        """
+        await self._execute('log_death', (
+            player_id, *(enemy or UNKNOWN_ENEMY).as_row(), enemy_level,
+            player.level, 0, player.max_health,
+            player.mana, player.max_mana
+        ))
+
+    async def totals(self, player_id: int) -> Tuple[int, int]:
+        """The player's (deaths, kills) counters"""
+        row = await self._fetchone('totals', (player_id,))
+        return tuple(row) if row else (0, 0)
+
+
+class Repositories:
+    """Every repository over one connection pool, sharing one statement cache"""
+    # Transaction control, timed like the repository statements
+    TRANSACTION_STATEMENTS = {'begin': 'BEGIN IMMEDIATE', 'commit': 'COMMIT'}
+
+    def __init__(self, pool: ConnectionPool, busy_policy: Optional[BusyPolicy] = None,
+                 writer: Optional[Callable[['Repositories'], GroupCommitWriter]] = None):
+        self.pool = pool
+        self.busy_policy = busy_policy or BusyPolicy()
+        # Game-state writes go through one group-commit task once it is started
+        self.writer = (writer or GroupCommitWriter)(self)
+        self.statements = StatementCache()
+        self.statements.register('transaction', self.TRANSACTION_STATEMENTS)
+        self.players = PlayerRepo(pool, self.statements, self.busy_policy)
+        self.inventory = InventoryRepo(pool, self.statements, self.busy_policy)
+        self.quests = QuestRepo(pool, self.statements, self.busy_policy)
+        self.kills = KillRepo(pool, self.statements, self.busy_policy)
+
+    async def _control(self, name: str, operation: Callable[[], Awaitable]):
+        """Run BEGIN IMMEDIATE or COMMIT, retrying busy errors.
+
+        Both can be retried as they are: a failed BEGIN opened nothing and a
+        busy COMMIT leaves the transaction open. Time spent taking the write
+        lock in BEGIN IMMEDIATE counts as lock wait even when it succeeds.
+        """
+        key = f'transaction.{name}'
+        attempts = Attempts()
+        start = time.perf_counter()
+        try:
+            await retry_busy(operation, self.busy_policy, attempts)
+        finally:
+            elapsed = time.perf_counter() - start
+            if name == 'begin':
+                attempts.waited = elapsed
+            self.statements.record(key, elapsed, attempts)
+
+    async def write(self, work: Callable[[], Awaitable[T]]) -> T:
+        """Run a write intent and return its result once it is committed.
+
+        ``work`` is an async callable making repository calls (a lambda for
+        a single call). It is grouped with other intents by the writer
+        task when that is running, runs inline when called from inside
+        another intent, and otherwise gets its own immediate transaction.
+        """
+        if self.writer.in_writer():
+            return await work()
+        if self.writer.is_running:
+            return await self.writer.submit(work)
+        async with self.transaction(immediate=True):
+            return await work()
+
+    @asynccontextmanager
+    async def transaction(self, immediate: bool = False):
+        """Run the repository calls in the block as one unit of work.
+
+        Commits when the block finishes and rolls back if it raises. With
+        ``immediate`` the write lock is taken up front, so reads made in the
+        block can't be invalidated by another writer before the commit.
+        """
+        async with self.pool.acquire() as db:
+            if immediate:
+                await self._control('begin', lambda: db.execute('BEGIN IMMEDIATE'))
+            try:
+                yield db
+                await self._control('commit', db.commit)
+            except Exception:
+                if db.in_transaction:
+                    await db.rollback()
+                raise
@@ -0,0 +1,165 @@
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime, timedelta, timezone
+
+import aiosqlite
+
+from src.db.enemies import ENEMY_ID_COLUMNS, convert_enemy_name_column
+from src.db.pool import ConnectionPool
+from src.models.enemy import EnemyCatalog
+
+logger = logging.getLogger('willowbot.db')
+
+# Cold-storage copies of the append-only event tables. Rows keep their
+# original ids so a retried chunk can be de-duplicated with INSERT OR IGNORE.
+ARCHIVE_SCHEMA = [
+    '''
+    CREATE TABLE IF NOT EXISTS archive.player_kills (
+        id INTEGER PRIMARY KEY,
+        player_id INTEGER,
+        enemy_type_id INTEGER NOT NULL DEFAULT 0,
+        enemy_name_id INTEGER NOT NULL DEFAULT 0,
+        enemy_prefix_id INTEGER NOT NULL DEFAULT 0,
+        enemy_suffix_id INTEGER NOT NULL DEFAULT 0,
+        enemy_level INTEGER NOT NULL,
+        killed_at TIMESTAMP
+    )
+    ''',
+    'CREATE INDEX IF NOT EXISTS archive.idx_archived_kills_player ON player_kills (player_id)',
+    '''
+    CREATE TABLE IF NOT EXISTS archive.death_history (
+        id INTEGER PRIMARY KEY,
+        player_id INTEGER,
+        enemy_type_id INTEGER NOT NULL DEFAULT 0,
+        enemy_name_id INTEGER NOT NULL DEFAULT 0,
+        enemy_prefix_id INTEGER NOT NULL DEFAULT 0,
+        enemy_suffix_id INTEGER NOT NULL DEFAULT 0,
+        enemy_level INTEGER NOT NULL,
+        player_level INTEGER NOT NULL,
+        player_health INTEGER NOT NULL,
+        player_max_health INTEGER NOT NULL,
+        player_mana INTEGER NOT NULL,
+        player_max_mana INTEGER NOT NULL,
+        died_at TIMESTAMP
+    )
+    ''',
+    'CREATE INDEX IF NOT EXISTS archive.idx_archived_deaths_player ON death_history (player_id, died_at)',
+]
+
+_ENEMY_COLUMNS = ', '.join(ENEMY_ID_COLUMNS)
+
+# (table, timestamp column, copied columns) for each archived event log
+ARCHIVED_TABLES = (
+    ('player_kills', 'killed_at',
+     f'id, player_id, {_ENEMY_COLUMNS}, enemy_level, killed_at'),
+    ('death_history', 'died_at',
+     f'id, player_id, {_ENEMY_COLUMNS}, enemy_level, player_level, player_health, '
+     'player_max_health, player_mana, player_max_mana, died_at'),
+)
+
+
+def default_archive_path(db_path: str) -> str:
+    root, ext = os.path.splitext(db_path)
+    return os.environ.get('DATABASE_ARCHIVE_PATH', f"{root}_archive{ext or '.db'}")
+
+
+async def upgrade_archive(db: aiosqlite.Connection):
+    """Convert an attached archive written before enemy IDs replaced enemy names.
+
+    Does not commit; a no-op for archives that are already converted.
+    """
+    catalog = None
+    for table, _, _ in ARCHIVED_TABLES:
+        async with db.execute(f'PRAGMA archive.table_info({table})') as cursor:
+            columns = [row[1] for row in await cursor.fetchall()]
+        if 'enemy_name' not in columns:
+            continue
+        catalog = catalog or EnemyCatalog.load()
+        await convert_enemy_name_column(db, table, catalog, schema='archive')
+
+
+class EventArchiver:
+    """Moves old kill and death events from the hot database to an archive.
+
+    Only the raw event logs are moved. ``players.kills``/``deaths`` and the
+    kill rollup are maintained incrementally and never re-derived from the
+    logs at read time, so they stay correct after archiving.
+
+    Rows are moved in chunks of ``chunk_size``, each in its own short
+    transaction, yielding to the event loop in between so combat writes
+    never wait behind a long archival run.
+    """
+
+    def __init__(self, pool: ConnectionPool, archive_path: str,
+                 max_age_days: float = 90, chunk_size: int = 500):
+        self.pool = pool
+        self.archive_path = archive_path
+        self.max_age_days = max_age_days
+        self.chunk_size = max(1, chunk_size)
+
+    def cutoff(self) -> str:
+        """Timestamp in CURRENT_TIMESTAMP's format; older rows are archived"""
+        cutoff = datetime.now(timezone.utc) - timedelta(days=self.max_age_days)
+        return cutoff.strftime('%Y-%m-%d %H:%M:%S')
+
+    async def _move_chunk(self, db: aiosqlite.Connection, table: str, column: str,
+                          columns: str, cutoff: str) -> int:
+        async with db.execute(
+            f'SELECT id FROM main.{table} WHERE {column} < ? ORDER BY {column} LIMIT ?',
+            (cutoff, self.chunk_size)
+        ) as cursor:
+            ids = [row[0] for row in await cursor.fetchall()]
+        if not ids:
+            return 0
+
+        placeholders = ', '.join('?' * len(ids))
+        await db.execute('BEGIN IMMEDIATE')
+        try:
+            await db.execute(
+                f'INSERT OR IGNORE INTO archive.{table} ({columns}) '
+                f'SELECT {columns} FROM main.{table} WHERE id IN ({placeholders})',
+                ids
+            )
+            await db.execute(f'DELETE FROM main.{table} WHERE id IN ({placeholders})', ids)
+            await db.commit()
+        except Exception:
+            await db.rollback()
+            raise
+        return len(ids)
+
+    async def run(self) -> dict:
+        """Archive every row older than the retention window.
+
+        Returns the number of rows moved per table.
+        """
+        cutoff = self.cutoff()
+        moved = {table: 0 for table, _, _ in ARCHIVED_TABLES}
+        started = time.perf_counter()
+
+        async with self.pool.acquire() as db:
+            await db.execute('ATTACH DATABASE ? AS archive', (self.archive_path,))
+            try:
+                for statement in ARCHIVE_SCHEMA:
+                    await db.execute(statement)
+                await upgrade_archive(db)
+                await db.commit()
+
+                for table, column, columns in ARCHIVED_TABLES:
+                    while True:
+                        count = await self._move_chunk(db, table, column, columns, cutoff)
+                        moved[table] += count
+                        if count < self.chunk_size:
+                            break
+                        # Let queued combat writes in between chunks
+                        await asyncio.sleep(0)
+            finally:
+                await db.execute('DETACH DATABASE archive')
+
+        if any(moved.values()):
+            logger.info(
+                f"Archived {moved} events older than {cutoff} to {self.archive_path} "
+                f"in {(time.perf_counter() - started) * 1000:.1f}ms"
+            )
+        return moved
@@ -0,0 +1,37 @@
+import os
+import sqlite3
+from typing import List
+
+import aiosqlite
+
+
+def storage_pragmas() -> List[str]:
+    """PRAGMA statements applied to every connection when it is opened.
+
+    WAL lets the dashboard's readers and the bot's writers work on the file
+    at the same time; synchronous=NORMAL is durable across application
+    crashes in WAL mode and only risks the last commits on power loss.
+    Every value can be overridden from the environment.
+    """
+    return [
+        f"PRAGMA journal_mode = {os.environ.get('DATABASE_JOURNAL_MODE', 'WAL')}",
+        f"PRAGMA synchronous = {os.environ.get('DATABASE_SYNCHRONOUS', 'NORMAL')}",
+        # Negative cache_size is in KiB rather than pages
+        f"PRAGMA cache_size = {int(os.environ.get('DATABASE_CACHE_SIZE', '-8000'))}",
+        f"PRAGMA mmap_size = {int(os.environ.get('DATABASE_MMAP_SIZE', str(256 * 1024 * 1024)))}",
+        f"PRAGMA busy_timeout = {int(os.environ.get('DATABASE_BUSY_TIMEOUT_MS', '5000'))}",
+        'PRAGMA temp_store = MEMORY',
+    ]
+
+
+async def apply_storage_profile(db: aiosqlite.Connection):
+    """Apply the storage profile to an aiosqlite connection"""
+    for pragma in storage_pragmas():
+        async with db.execute(pragma) as cursor:
+            await cursor.fetchall()
+
+
+def apply_storage_profile_sync(db: sqlite3.Connection):
+    """Apply the storage profile to a plain sqlite3 connection (dashboard)"""
+    for pragma in storage_pragmas():
+        db.execute(pragma).fetchall()
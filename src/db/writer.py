@@ -0,0 +1,160 @@
+import asyncio
+import logging
+import os
+from dataclasses import dataclass
+from typing import Awaitable, Callable, List, Optional, Tuple
+
+logger = logging.getLogger('willowbot.db')
+
+# A write intent: an async callable making repository calls, never committing
+WriteWork = Callable[[], Awaitable]
+
+
+@dataclass(slots=True)
+class WriterStats:
+    batches: int = 0
+    intents: int = 0
+    failed: int = 0
+    largest_batch: int = 0
+
+    @property
+    def mean_batch(self) -> float:
+        return self.intents / self.batches if self.batches else 0.0
+
+
+class GroupCommitWriter:
+    """Single writer task that commits queued write intents in groups.
+
+    SQLite serialises writers anyway, so instead of every cog opening its
+    own transaction and paying for its own commit, intents go through a
+    queue to one task. It waits at most ``max_delay`` seconds after the
+    first intent for others to arrive, then runs up to ``max_batch`` of them
+    in one ``BEGIN IMMEDIATE`` transaction and commits once. Each intent
+    runs inside its own SAVEPOINT, so one failing intent is rolled back and
+    reported to its caller without affecting the rest of the group.
+
+    The intents run on the writer task, so repository calls made inside
+    them reuse the writer's connection (``pool.acquire()`` is re-entrant
+    per task).
+    """
+
+    def __init__(self, repos, max_delay: float = 0.005, max_batch: int = 64):
+        self.repos = repos
+        self.max_delay = max_delay
+        self.max_batch = max(1, max_batch)
+        self.stats = WriterStats()
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @classmethod
+    def from_env(cls, repos) -> 'GroupCommitWriter':
+        return cls(
+            repos,
+            max_delay=float(os.environ.get('DATABASE_GROUP_COMMIT_MS', '5')) / 1000,
+            max_batch=int(os.environ.get('DATABASE_GROUP_COMMIT_MAX', '64')),
+        )
+
+    @property
+    def is_running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def in_writer(self) -> bool:
+        """Whether the calling code is already running inside a write intent"""
+        return self.is_running and asyncio.current_task() is self._task
+
+    def start(self):
+        if self.is_running:
+            return
+        self._queue = asyncio.Queue()
+        self._task = asyncio.get_running_loop().create_task(self._run(), name='willowbot-writer')
+
+    async def stop(self):
+        """Commit everything already queued, then stop the task"""
+        if not self.is_running:
+            return
+        self._queue.put_nowait(None)
+        await self._task
+        self._task = None
+        self._queue = None
+
+    def submit(self, work: WriteWork) -> 'asyncio.Future':
+        """Queue a write intent; the future resolves to its result once committed"""
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((work, future))
+        return future
+
+    async def _next_batch(self) -> Tuple[List, bool]:
+        """Wait for an intent, then gather more until the latency bound.
+
+        Returns the batch and whether ``stop()`` was requested.
+        """
+        first = await self._queue.get()
+        if first is None:
+            return [], True
+        batch = [first]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.max_delay
+        while len(batch) < self.max_batch:
+            # Take whatever queued up while the last group was committing
+            # before waiting for stragglers
+            if self._queue.empty():
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+            else:
+                item = self._queue.get_nowait()
+            if item is None:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    async def _run(self):
+        stopping = False
+        while not stopping:
+            batch, stopping = await self._next_batch()
+            if batch:
+                await self._commit(batch)
+        # Intents submitted after stop() was requested still get written
+        while not self._queue.empty():
+            item = self._queue.get_nowait()
+            if item is not None:
+                await self._commit([item])
+
+    async def _commit(self, batch: List):
+        done = []
+        try:
+            async with self.repos.transaction(immediate=True) as db:
+                for work, future in batch:
+                    if future.cancelled():
+                        continue
+                    await db.execute('SAVEPOINT intent')
+                    try:
+                        result = await work()
+                    except Exception as e:
+                        await db.execute('ROLLBACK TO intent')
+                        await db.execute('RELEASE intent')
+                        self.stats.failed += 1
+                        # The caller may have been cancelled while its work ran
+                        if not future.done():
+                            future.set_exception(e)
+                        continue
+                    await db.execute('RELEASE intent')
+                    done.append((future, result))
+        except Exception as e:
+            # BEGIN or COMMIT failed; nothing in the group was written
+            logger.error(f"Group commit of {len(batch)} writes failed: {e}")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for future, result in done:
+            if not future.done():
+                future.set_result(result)
+        self.stats.batches += 1
+        self.stats.intents += len(batch)
+        self.stats.largest_batch = max(self.stats.largest_batch, len(batch))
@@ -40,8 +40,8 @@ class Attack:
         else:
             base_damage += attacker.damage_bonus
             
-        # Check for critical hit with equipment bonus
-        total_crit_chance = self.crit_chance * attacker.crit_chance_multiplier + attacker.crit_chance_bonus
+        # Check for critical hit with equipment bonus (in percentage points, like items.yaml)
+        total_crit_chance = self.crit_chance * attacker.crit_chance_multiplier + attacker.crit_chance_bonus / 100
         is_crit = random.random() < total_crit_chance
         damage = base_damage * 2 if is_crit else base_damage
 
@@ -68,6 +68,41 @@ class Attack:
             'is_crit': is_crit
         }
 
+# Largest ID one byte of a packed EnemyIdentity key holds
+MAX_ENEMY_ID = 0xFF
+
+@dataclass(frozen=True)
+class EnemyIdentity:
+    """Structured identity of a generated enemy.
+
+    Every ID is a 1-based ordinal position in enemies.yaml: ``type_id`` in
+    ``enemy_types``, ``name_id`` in that type's ``names`` and ``prefix_id`` /
+    ``suffix_id`` in the affix lists, where 0 means the affix is absent.
+    Each ID fits in a byte (up to ``MAX_ENEMY_ID``, checked when game data
+    is loaded), so the whole identity packs into one integer.
+    """
+    type_id: int
+    name_id: int
+    prefix_id: int = 0
+    suffix_id: int = 0
+
+    @property
+    def key(self) -> int:
+        return (self.type_id << 24) | (self.name_id << 16) | (self.prefix_id << 8) | self.suffix_id
+
+    @classmethod
+    def from_key(cls, key: int) -> 'EnemyIdentity':
+        return cls(
+            type_id=(key >> 24) & 0xFF,
+            name_id=(key >> 16) & 0xFF,
+            prefix_id=(key >> 8) & 0xFF,
+            suffix_id=key & 0xFF
+        )
+
+    def as_row(self) -> Tuple[int, int, int, int]:
+        """Values for the enemy_type_id/name_id/prefix_id/suffix_id columns"""
+        return (self.type_id, self.name_id, self.prefix_id, self.suffix_id)
+
 @dataclass
 class CombatEntity:
     name: str
@@ -82,13 +117,16 @@ class CombatEntity:
     miss_chance_multiplier: float = 1.0
     crit_chance_multiplier: float = 1.0
     
-    # Equipment bonuses
+    # Equipment bonuses; crit and flee chance are percentage points, like items.yaml
     damage_bonus: int = 0
     magic_damage_bonus: int = 0
     defense: int = 0
     magic_defense: int = 0
     crit_chance_bonus: float = 0
     flee_chance_bonus: float = 0
+    
+    # Set for generated enemies
+    identity: Optional[EnemyIdentity] = None
 
     def try_flee(self, base_flee_chance: float = 0.3) -> bool:
         """
@@ -98,7 +136,7 @@ class CombatEntity:
         Returns:
             bool: True if flee successful, False otherwise
         """
-        total_flee_chance = base_flee_chance + self.flee_chance_bonus
+        total_flee_chance = base_flee_chance + self.flee_chance_bonus / 100
         return random.random() < total_flee_chance
 
     def is_alive(self) -> bool:
@@ -1,14 +1,95 @@
 import yaml
 import random
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 from pathlib import Path
-from .combat import Attack, CombatEntity
+from .combat import Attack, CombatEntity, EnemyIdentity
+
+ENEMIES_CONFIG_PATH = Path(__file__).parent.parent / 'config' / 'enemies.yaml'
+
+def load_enemies_config() -> Dict:
+    with open(ENEMIES_CONFIG_PATH, 'r') as f:
+        return yaml.safe_load(f)
+
+class EnemyCatalog:
+    """Maps between EnemyIdentity IDs and the names in enemies.yaml.
+
+    IDs are ordinal positions, so new enemy types, names and affixes must be
+    appended to their lists to keep stored IDs meaningful.
+    """
+
+    def __init__(self, config: Dict):
+        self.types = [enemy_type['type'] for enemy_type in config['enemy_types']]
+        self.names = [list(enemy_type['names']) for enemy_type in config['enemy_types']]
+        self.prefixes = [affix['name'] for affix in config['affixes']['prefixes']]
+        self.suffixes = [affix['name'] for affix in config['affixes']['suffixes']]
+
+        self._type_ids = {name: i + 1 for i, name in enumerate(self.types)}
+        self._prefix_ids = {name: i + 1 for i, name in enumerate(self.prefixes)}
+        self._suffix_ids = {name: i + 1 for i, name in enumerate(self.suffixes)}
+
+    @classmethod
+    def load(cls) -> 'EnemyCatalog':
+        return cls(load_enemies_config())
+
+    def type_id(self, name: str) -> Optional[int]:
+        return self._type_ids.get(name)
+
+    def prefix_id(self, name: str) -> Optional[int]:
+        return self._prefix_ids.get(name)
+
+    def suffix_id(self, name: str) -> Optional[int]:
+        return self._suffix_ids.get(name)
+
+    def parts(self, identity: EnemyIdentity) -> Tuple[str, Optional[str], str, Optional[str]]:
+        """(type, prefix, base name, suffix) names for an identity"""
+        if not 0 < identity.type_id <= len(self.types):
+            return ('Unknown', None, 'Unknown', None)
+        names = self.names[identity.type_id - 1]
+        base_name = names[identity.name_id - 1] if 0 < identity.name_id <= len(names) else 'Unknown'
+        prefix = self.prefixes[identity.prefix_id - 1] if 0 < identity.prefix_id <= len(self.prefixes) else None
+        suffix = self.suffixes[identity.suffix_id - 1] if 0 < identity.suffix_id <= len(self.suffixes) else None
+        return (self.types[identity.type_id - 1], prefix, base_name, suffix)
+
+    def display_name(self, identity: EnemyIdentity) -> str:
+        _, prefix, base_name, suffix = self.parts(identity)
+        return ' '.join(part for part in (prefix, base_name, suffix) if part)
+
+    def parse(self, display_name: str) -> EnemyIdentity:
+        """Recover the identity of a legacy free-text enemy name.
+
+        Unrecognised names map to type 0, which displays as "Unknown".
+        """
+        remainder = display_name.strip()
+        prefix_id = 0
+        for i, prefix in enumerate(self.prefixes):
+            if remainder.startswith(prefix + ' '):
+                prefix_id = i + 1
+                remainder = remainder[len(prefix) + 1:]
+                break
+        suffix_id = 0
+        for i, suffix in enumerate(self.suffixes):
+            if remainder.endswith(' ' + suffix):
+                suffix_id = i + 1
+                remainder = remainder[:-(len(suffix) + 1)]
+                break
+        for type_index, names in enumerate(self.names):
+            if remainder in names:
+                return EnemyIdentity(type_index + 1, names.index(remainder) + 1, prefix_id, suffix_id)
+        return EnemyIdentity(0, 0, prefix_id, suffix_id)
+
+    def lookup_rows(self) -> List[Tuple[str, int, int, str]]:
+        """(kind, type_id, id, name) rows for the enemy_lookup table"""
+        rows = [('type', 0, i + 1, name) for i, name in enumerate(self.types)]
+        for type_index, names in enumerate(self.names):
+            rows.extend(('name', type_index + 1, i + 1, name) for i, name in enumerate(names))
+        rows.extend(('prefix', 0, i + 1, name) for i, name in enumerate(self.prefixes))
+        rows.extend(('suffix', 0, i + 1, name) for i, name in enumerate(self.suffixes))
+        return rows
 
 class EnemyGenerator:
-    def __init__(self):
-        config_path = Path(__file__).parent.parent / 'config' / 'enemies.yaml'
-        with open(config_path, 'r') as f:
-            self.config = yaml.safe_load(f)
+    def __init__(self, config: Optional[Dict] = None, catalog: Optional[EnemyCatalog] = None):
+        self.config = config if config is not None else load_enemies_config()
+        self.catalog = catalog or EnemyCatalog(self.config)
 
     def _apply_affixes(self, enemy_type: Dict, prefix: Optional[Dict] = None, suffix: Optional[Dict] = None) -> Dict[str, float]:
         """Apply prefix and suffix multipliers to the enemy"""
@@ -34,11 +115,17 @@ class EnemyGenerator:
     def generate_enemy(self, player_level: int) -> CombatEntity:
         """Generate a random enemy based on player level"""
         # Select random enemy type
-        enemy_type = random.choice(self.config['enemy_types'])
+        enemy_types = self.config['enemy_types']
+        type_index = random.randrange(len(enemy_types))
+        enemy_type = enemy_types[type_index]
         
         # Maybe apply affixes (70% chance)
-        prefix = random.choice(self.config['affixes']['prefixes']) if random.random() < 0.7 else None
-        suffix = random.choice(self.config['affixes']['suffixes']) if random.random() < 0.7 else None
+        prefixes = self.config['affixes']['prefixes']
+        suffixes = self.config['affixes']['suffixes']
+        prefix_index = random.randrange(len(prefixes)) if random.random() < 0.7 else None
+        suffix_index = random.randrange(len(suffixes)) if random.random() < 0.7 else None
+        prefix = prefixes[prefix_index] if prefix_index is not None else None
+        suffix = suffixes[suffix_index] if suffix_index is not None else None
 
         # Generate base stats
         base_stats = enemy_type['base_stats']
@@ -92,15 +179,16 @@ class EnemyGenerator:
                 ))
 
         # Generate name with affixes
-        name_parts = []
-        if prefix:
-            name_parts.append(prefix['name'])
-        name_parts.append(random.choice(enemy_type['names']))
-        if suffix:
-            name_parts.append(suffix['name'])
+        identity = EnemyIdentity(
+            type_id=type_index + 1,
+            name_id=random.randrange(len(enemy_type['names'])) + 1,
+            prefix_id=prefix_index + 1 if prefix_index is not None else 0,
+            suffix_id=suffix_index + 1 if suffix_index is not None else 0
+        )
 
         return CombatEntity(
-            name=' '.join(name_parts),
+            name=self.catalog.display_name(identity),
+            identity=identity,
             health=health,
             max_health=health,
             mana=mana,
@@ -2,6 +2,18 @@ from typing import Dict, Optional
 from dataclasses import dataclass
 from .inventory import Item, ItemType
 
+# Item type each equipment slot takes
+SLOT_TYPES = {
+    'helmet': ItemType.HELMET,
+    'armor': ItemType.ARMOR,
+    'pants': ItemType.PANTS,
+    'boots': ItemType.BOOTS,
+    'weapon': ItemType.WEAPON,
+    'ring1': ItemType.RING,
+    'ring2': ItemType.RING,
+    'amulet': ItemType.AMULET
+}
+
 @dataclass
 class EquipmentSlots:
     helmet: Optional[Item] = None
@@ -37,17 +49,7 @@ class EquipmentSlots:
 
     def can_equip(self, item: Item, slot_name: str) -> bool:
         """Check if an item can be equipped in the given slot"""
-        slot_type_map = {
-            'helmet': ItemType.HELMET,
-            'armor': ItemType.ARMOR,
-            'pants': ItemType.PANTS,
-            'boots': ItemType.BOOTS,
-            'weapon': ItemType.WEAPON,
-            'ring1': ItemType.RING,
-            'ring2': ItemType.RING,
-            'amulet': ItemType.AMULET
-        }
-        return item.type == slot_type_map.get(slot_name)
+        return item.type == SLOT_TYPES.get(slot_name)
 
     def equip(self, item: Item, slot_name: str) -> Optional[Item]:
         """
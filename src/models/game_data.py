@@ -0,0 +1,372 @@
+import hashlib
+import json
+import logging
+import mmap
+import os
+import pickle
+import struct
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from types import MappingProxyType
+from typing import Callable, Dict, List, Mapping, Optional, Tuple
+
+import yaml
+
+from .combat import MAX_ENEMY_ID
+from .enemy import EnemyCatalog
+from .inventory import Item, ItemEffect, ItemRarity, ItemType
+from .item_index import ItemIndex
+from .loot import DEFAULT_TABLE, AliasTable, LootBand, LootTables
+from .quest import Quest, QuestChain, QuestItem, QuestObjective, QuestReward, QuestType, ObjectiveType, Title
+
+logger = logging.getLogger('willowbot.game_data')
+
+CONFIG_DIR = Path(__file__).parent.parent / 'config'
+SOURCE_FILES = ('items.yaml', 'quests.yaml', 'enemies.yaml', 'loot.yaml')
+# Modules whose classes or parsing end up in the snapshot
+SOURCE_MODULES = ('game_data.py', 'inventory.py', 'quest.py', 'enemy.py', 'combat.py', 'loot.py')
+
+SNAPSHOT_NAME = 'game_data.snapshot'
+SNAPSHOT_MAGIC = b'WBGD'
+# Bump when the snapshot layout itself changes
+SNAPSHOT_FORMAT = 2
+# Format version and header length, followed by a JSON header and the pickle
+SNAPSHOT_PREFIX = '<HI'
+
+
+def _read_yaml(path: Path) -> Dict:
+    with open(path, 'r', encoding='utf-8') as f:
+        return yaml.safe_load(f)
+
+
+def parse_items(document: Dict) -> Dict[str, Item]:
+    """Items from an items.yaml document, keyed by item id"""
+    items = {}
+    for item_data in document['items'].values():
+        items[item_data['id']] = Item(
+            id=item_data['id'],
+            name=item_data['name'],
+            description=item_data['description'],
+            type=ItemType(item_data['type']),
+            rarity=ItemRarity(item_data['rarity']),
+            level_requirement=item_data['level_requirement'],
+            effects=[ItemEffect(**effect_data) for effect_data in item_data.get('effects', [])],
+            value=item_data['value'],
+            stackable=item_data.get('stackable', True),
+            max_stack=item_data.get('max_stack', 99)
+        )
+    return items
+
+
+def _resolve_enemy_filter(quest_id: str, kind: str, name: Optional[str],
+                          lookup: Callable[[str], Optional[int]]) -> Optional[int]:
+    """ID for an objective's enemy filter; -1 (never matches) if the name is unknown"""
+    if not name:
+        return None
+    enemy_id = lookup(name)
+    if enemy_id is None:
+        logger.warning(f"Quest {quest_id} filters on unknown enemy {kind} '{name}'")
+        return -1
+    return enemy_id
+
+
+def parse_quests(document: Dict, catalog: EnemyCatalog) -> Tuple[
+        Dict[str, QuestChain], Dict[str, Quest], Dict[str, QuestItem], Dict[str, Title]]:
+    """(chains, quests, quest items, titles) from a quests.yaml document"""
+    quest_chains, quests, quest_items, titles = {}, {}, {}, {}
+
+    # Quest items and titles are optional sections
+    for item_id, item_data in document.get('quest_items', {}).items():
+        quest_items[item_id] = QuestItem(
+            id=item_id,
+            name=item_data['name'],
+            description=item_data['description'],
+            effect=item_data['effect'],
+            value=item_data['value']
+        )
+
+    for title_id, title_data in document.get('titles', {}).items():
+        titles[title_id] = Title(
+            id=title_id,
+            name=title_data['name'],
+            description=title_data['description'],
+            bonuses=title_data['bonuses']
+        )
+
+    for chain_data in document['quest_chains']:
+        chain_quests = []
+        for quest_data in chain_data['quests']:
+            objectives = [
+                QuestObjective(
+                    type=ObjectiveType(obj['type']),
+                    description=obj['description'],
+                    count=obj['count'],
+                    enemy_type=obj.get('enemy_type'),
+                    enemy_prefix=obj.get('enemy_prefix'),
+                    enemy_suffix=obj.get('enemy_suffix'),
+                    attack_type=obj.get('attack_type'),
+                    enemy_type_id=_resolve_enemy_filter(
+                        quest_data['id'], 'type', obj.get('enemy_type'), catalog.type_id),
+                    enemy_prefix_id=_resolve_enemy_filter(
+                        quest_data['id'], 'prefix', obj.get('enemy_prefix'), catalog.prefix_id),
+                    enemy_suffix_id=_resolve_enemy_filter(
+                        quest_data['id'], 'suffix', obj.get('enemy_suffix'), catalog.suffix_id)
+                ) for obj in quest_data['objectives']
+            ]
+
+            quest = Quest(
+                id=quest_data['id'],
+                title=quest_data['title'],
+                description=quest_data['description'],
+                type=QuestType(quest_data['type']),
+                objectives=objectives,
+                rewards=QuestReward(
+                    xp=quest_data['rewards']['xp'],
+                    gold=quest_data['rewards']['gold'],
+                    items=quest_data['rewards'].get('items', []),
+                    title=quest_data['rewards'].get('title')
+                ),
+                requirements=quest_data.get('requirements', {}),
+                next_quest=quest_data.get('next_quest')
+            )
+            chain_quests.append(quest)
+            quests[quest.id] = quest
+
+        quest_chains[chain_data['id']] = QuestChain(
+            id=chain_data['id'],
+            name=chain_data['name'],
+            description=chain_data['description'],
+            quests=chain_quests,
+            requirements=chain_data.get('requirements')
+        )
+
+    return quest_chains, quests, quest_items, titles
+
+
+def parse_loot(document: Dict) -> LootTables:
+    """Loot bands from a loot.yaml document, compiled into alias tables"""
+    pools = document.get('pools', {})
+    tables = {}
+    for enemy_type, bands in document['tables'].items():
+        compiled = []
+        for band in sorted(bands, key=lambda band: band.get('max_level', float('inf'))):
+            drops = []
+            for drop in band.get('drops', []):
+                weights = {}
+                for name, weight in drop['weights'].items():
+                    members = pools.get(name, [name])
+                    for item_id in members:
+                        weights[item_id] = weights.get(item_id, 0) + weight / len(members)
+                chance = drop.get('chance', 1)
+                # The missing chance is drawn as "no item"
+                if chance < 1:
+                    total = sum(weights.values())
+                    weights = {**{item_id: weight * chance / total for item_id, weight in weights.items()},
+                               None: 1 - chance}
+                drops.append(AliasTable(list(weights), list(weights.values())))
+            compiled.append(LootBand(
+                max_level=band.get('max_level'),
+                gold_per_level=tuple(band['gold_per_level']),
+                drops=tuple(drops)
+            ))
+        tables[enemy_type] = tuple(compiled)
+    return LootTables(tables)
+
+
+def validate(data: 'GameData') -> List[str]:
+    """Cross-references between the config files that don't resolve"""
+    problems = []
+    for quest in data.quests.values():
+        for reward in quest.rewards.items:
+            if reward['id'] not in data.items:
+                problems.append(f"Quest {quest.id} rewards unknown item '{reward['id']}'")
+        if quest.rewards.title and quest.rewards.title not in data.titles:
+            problems.append(f"Quest {quest.id} rewards unknown title '{quest.rewards.title}'")
+        if quest.next_quest and quest.next_quest not in data.quests:
+            problems.append(f"Quest {quest.id} leads to unknown quest '{quest.next_quest}'")
+        previous = (quest.requirements or {}).get('previous_quest')
+        if previous and previous not in data.quests:
+            problems.append(f"Quest {quest.id} requires unknown quest '{previous}'")
+    for enemy_type, bands in data.loot.tables.items():
+        if enemy_type != DEFAULT_TABLE and data.enemy_catalog.type_id(enemy_type) is None:
+            problems.append(f"Loot table for unknown enemy type '{enemy_type}'")
+        if not bands or bands[-1].max_level is not None:
+            problems.append(f"Loot table '{enemy_type}' has no band without max_level")
+        for band in bands:
+            for table in band.drops:
+                for item_id in table.outcomes:
+                    if item_id is not None and item_id not in data.items:
+                        problems.append(f"Loot table '{enemy_type}' drops unknown item '{item_id}'")
+    if DEFAULT_TABLE not in data.loot.tables:
+        problems.append(f"Loot tables have no '{DEFAULT_TABLE}' entry")
+    # Enemy IDs are packed one byte each into players.current_enemy_key
+    catalog = data.enemy_catalog
+    lists = [('enemy types', catalog.types), ('prefixes', catalog.prefixes), ('suffixes', catalog.suffixes)]
+    lists.extend((f"names of enemy type '{enemy_type}'", names) for enemy_type, names in zip(catalog.types, catalog.names))
+    for kind, entries in lists:
+        if len(entries) > MAX_ENEMY_ID:
+            problems.append(f"enemies.yaml has {len(entries)} {kind}; enemy IDs go up to {MAX_ENEMY_ID}")
+    return problems
+
+
+def _source_paths(config_dir: Path) -> Dict[str, Path]:
+    """Everything a snapshot is built from: the YAML and the code parsing it"""
+    paths = {name: config_dir / name for name in SOURCE_FILES}
+    models = Path(__file__).parent
+    paths.update((f'models/{name}', models / name) for name in SOURCE_MODULES)
+    return paths
+
+
+def _source_stats(paths: Dict[str, Path]) -> Dict[str, List[int]]:
+    return {name: [(st := path.stat()).st_size, st.st_mtime_ns] for name, path in paths.items()}
+
+
+def source_stats(config_dir: Path = CONFIG_DIR) -> Dict[str, List[int]]:
+    """Size and mtime of each config file, to notice edits without reading them"""
+    return _source_stats({name: config_dir / name for name in SOURCE_FILES})
+
+
+def _source_hash(paths: Dict[str, Path]) -> str:
+    digest = hashlib.sha256(f'{SNAPSHOT_FORMAT}:{pickle.DEFAULT_PROTOCOL}'.encode())
+    for name, path in sorted(paths.items()):
+        digest.update(name.encode() + b'\0' + path.read_bytes() + b'\0')
+    return digest.hexdigest()
+
+
+def _write_snapshot(path: Path, header: Dict, payload: bytes):
+    """Write atomically, so a concurrent reader sees the old or the new file"""
+    encoded = json.dumps(header).encode()
+    partial = path.with_name(f'{path.name}.{os.getpid()}.partial')
+    with open(partial, 'wb') as f:
+        f.write(SNAPSHOT_MAGIC + struct.pack(SNAPSHOT_PREFIX, SNAPSHOT_FORMAT, len(encoded)))
+        f.write(encoded)
+        f.write(payload)
+    os.replace(partial, path)
+
+
+def _read_snapshot(path: Path, paths: Dict[str, Path]) -> Optional['GameData']:
+    """The snapshot's GameData if it was built from the current sources"""
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        prefix_end = len(SNAPSHOT_MAGIC) + struct.calcsize(SNAPSHOT_PREFIX)
+        if mm[:len(SNAPSHOT_MAGIC)] != SNAPSHOT_MAGIC:
+            return None
+        version, header_size = struct.unpack(SNAPSHOT_PREFIX, mm[len(SNAPSHOT_MAGIC):prefix_end])
+        if version != SNAPSHOT_FORMAT:
+            return None
+        header = json.loads(mm[prefix_end:prefix_end + header_size])
+        offset = prefix_end + header_size
+
+        # Unchanged sizes and mtimes skip hashing; touched files are hashed
+        stats = _source_stats(paths)
+        refresh = stats != header['sources']
+        if refresh and _source_hash(paths) != header['hash']:
+            return None
+        with memoryview(mm) as view, view[offset:] as payload:
+            data = pickle.loads(payload)
+            if refresh:
+                try:
+                    _write_snapshot(path, dict(header, sources=stats), payload)
+                except OSError as e:
+                    logger.warning(f"Could not refresh game data snapshot: {e}")
+    return data
+
+
+@dataclass(frozen=True, slots=True)
+class GameData:
+    """Items, quests, enemies and loot parsed from ``src/config``.
+
+    Built once at startup and shared by every cog and manager through
+    ``bot.game_data``, so constructing a manager never touches the disk.
+    The mappings are read-only views and the definitions in them are
+    shared, so callers copy anything they need to change. ``item_index``
+    answers type, rarity and level queries over ``items``.
+
+    ``compile()`` validates the YAML and writes a pickled snapshot next to
+    it; ``load()`` maps that snapshot instead of parsing the YAML again for
+    as long as the hash of the YAML and of the parsing code still matches.
+    """
+    items: Mapping[str, Item]
+    quests: Mapping[str, Quest]
+    quest_chains: Mapping[str, QuestChain]
+    quest_items: Mapping[str, QuestItem]
+    titles: Mapping[str, Title]
+    enemies: Mapping
+    enemy_catalog: EnemyCatalog
+    loot: LootTables
+    # Rebuilt from ``items`` rather than stored in the snapshot
+    item_index: ItemIndex = field(compare=False, repr=False)
+
+    @classmethod
+    def _from_dicts(cls, items: Dict, quests: Dict, quest_chains: Dict, quest_items: Dict,
+                    titles: Dict, enemies: Dict, enemy_catalog: EnemyCatalog,
+                    loot: LootTables) -> 'GameData':
+        return cls(
+            items=MappingProxyType(items),
+            quests=MappingProxyType(quests),
+            quest_chains=MappingProxyType(quest_chains),
+            quest_items=MappingProxyType(quest_items),
+            titles=MappingProxyType(titles),
+            enemies=MappingProxyType(enemies),
+            enemy_catalog=enemy_catalog,
+            loot=loot,
+            item_index=ItemIndex(items),
+        )
+
+    def __reduce__(self):
+        # Mapping proxies can't be pickled, so snapshots store the dicts behind them
+        return (GameData._from_dicts, (
+            dict(self.items), dict(self.quests), dict(self.quest_chains), dict(self.quest_items),
+            dict(self.titles), dict(self.enemies), self.enemy_catalog, self.loot
+        ))
+
+    @classmethod
+    def from_documents(cls, items: Dict, quests: Dict, enemies: Dict, loot: Dict) -> 'GameData':
+        """Build the registry from parsed items, quests, enemies and loot documents"""
+        catalog = EnemyCatalog(enemies)
+        quest_chains, quest_map, quest_items, titles = parse_quests(quests, catalog)
+        return cls._from_dicts(parse_items(items), quest_map, quest_chains, quest_items,
+                               titles, enemies, catalog, parse_loot(loot))
+
+    @classmethod
+    def parse(cls, config_dir: Path = CONFIG_DIR) -> 'GameData':
+        """Parse and validate the YAML, raising ValueError on broken references"""
+        data = cls.from_documents(*(_read_yaml(config_dir / name) for name in SOURCE_FILES))
+        if problems := validate(data):
+            raise ValueError('Invalid game data:\n' + '\n'.join(problems))
+        return data
+
+    @classmethod
+    def compile(cls, config_dir: Path = CONFIG_DIR) -> 'GameData':
+        """Parse the YAML and write the snapshot ``load()`` reads"""
+        paths = _source_paths(config_dir)
+        stats, digest = _source_stats(paths), _source_hash(paths)
+        data = cls.parse(config_dir)
+        try:
+            _write_snapshot(config_dir / SNAPSHOT_NAME, {'hash': digest, 'sources': stats},
+                            pickle.dumps(data, protocol=pickle.DEFAULT_PROTOCOL))
+        except OSError as e:
+            logger.warning(f"Could not write game data snapshot: {e}")
+        return data
+
+    @classmethod
+    def load(cls, config_dir: Path = CONFIG_DIR) -> 'GameData':
+        """The snapshot if it is current, otherwise a fresh ``compile()``"""
+        started = time.perf_counter()
+        source = 'snapshot'
+        data = None
+        try:
+            data = _read_snapshot(config_dir / SNAPSHOT_NAME, _source_paths(config_dir))
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable game data snapshot: {e}")
+        if data is None:
+            source = 'YAML'
+            data = cls.compile(config_dir)
+        logger.info(
+            f"Loaded {len(data.items)} items, {len(data.quests)} quests and "
+            f"{len(data.enemy_catalog.types)} enemy types from {source} "
+            f"in {(time.perf_counter() - started) * 1000:.1f} ms"
+        )
+        return data
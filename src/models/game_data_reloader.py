@@ -0,0 +1,93 @@
+import asyncio
+import logging
+import time
+from pathlib import Path
+from typing import List
+
+from discord.ext import tasks
+
+from ..db.enemies import sync_enemy_lookup
+from .enemy import EnemyCatalog
+from .game_data import CONFIG_DIR, GameData, source_stats
+
+logger = logging.getLogger('willowbot.game_data')
+
+
+def catalog_changes(old: EnemyCatalog, new: EnemyCatalog) -> List[str]:
+    """Edits to enemies.yaml that would change what stored enemy IDs mean"""
+    problems = []
+    for kind in ('types', 'prefixes', 'suffixes'):
+        before, after = getattr(old, kind), getattr(new, kind)
+        if after[:len(before)] != before:
+            problems.append(f"Enemy {kind} were reordered or removed; only appending is allowed")
+    for enemy_type, before, after in zip(old.types, old.names, new.names):
+        if after[:len(before)] != before:
+            problems.append(f"Names of enemy type '{enemy_type}' were reordered or removed")
+    return problems
+
+
+class GameDataReloader:
+    """Swaps a freshly loaded ``GameData`` into ``bot.game_data`` at runtime.
+
+    The YAML is parsed (or the snapshot mapped) in a worker thread, so the
+    event loop keeps serving combat while it loads. Replacing the attribute
+    is the whole swap: managers read ``bot.game_data`` on every use and
+    pick up the new generation at once, while combat sessions keep the
+    generation they started with until they end.
+
+    Enemy IDs stored in the database are positions in enemies.yaml, so a
+    reload that reorders or removes enemies is refused and the current
+    data stays in place. Appended enemies are added to enemy_lookup before
+    the swap.
+
+    With ``poll_seconds`` set, ``start()`` watches the source files and
+    reloads when one of them changes.
+    """
+
+    def __init__(self, bot, config_dir: Path = CONFIG_DIR, poll_seconds: float = 0):
+        self.bot = bot
+        self.config_dir = config_dir
+        self.poll_seconds = poll_seconds
+        self.generation = 1
+        self._lock = asyncio.Lock()
+        self._sources = None
+        if poll_seconds > 0:
+            self.watch.change_interval(seconds=poll_seconds)
+
+    async def reload(self) -> GameData:
+        """Load the config again and swap it in, raising ValueError if it is unusable"""
+        async with self._lock:
+            started = time.perf_counter()
+            self._sources = await asyncio.to_thread(source_stats, self.config_dir)
+            data = await asyncio.to_thread(GameData.load, self.config_dir)
+            if problems := catalog_changes(self.bot.game_data.enemy_catalog, data.enemy_catalog):
+                raise ValueError('Game data not reloaded:\n' + '\n'.join(problems))
+
+            async def sync():
+                async with self.bot.db_pool.acquire() as db:
+                    await sync_enemy_lookup(db, data.enemy_catalog)
+            await self.bot.repos.write(sync)
+
+            self.bot.game_data = data
+            self.generation += 1
+            logger.info(
+                f"Game data generation {self.generation} live after "
+                f"{(time.perf_counter() - started) * 1000:.1f} ms"
+            )
+            return data
+
+    def start(self):
+        if self.poll_seconds > 0 and not self.watch.is_running():
+            self._sources = source_stats(self.config_dir)
+            self.watch.start()
+
+    def stop(self):
+        self.watch.cancel()
+
+    @tasks.loop(seconds=5)
+    async def watch(self):
+        try:
+            if await asyncio.to_thread(source_stats, self.config_dir) != self._sources:
+                await self.reload()
+        except Exception as e:
+            logger.error(f"Game data reload failed: {e}")
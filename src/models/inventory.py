@@ -1,5 +1,5 @@
 from dataclasses import dataclass
-from typing import Dict, Optional
+from typing import Dict, List, Optional, Set, Tuple
 from enum import Enum
 
 class ItemType(Enum):
@@ -62,6 +62,8 @@ class Inventory:
         self.level = level
         self.slots: Dict[str, InventorySlot] = {}
         self.max_slots = self._calculate_max_slots(level)
+        # Item ids changed since the inventory was loaded or last saved
+        self._dirty: Set[str] = set()
 
     def _calculate_max_slots(self, level: int) -> int:
         """Calculate max inventory slots based on player level"""
@@ -95,6 +97,7 @@ class Inventory:
         if not self.can_add_item(item, count):
             return False
 
+        self._dirty.add(item.id)
         if item.id in self.slots:
             self.slots[item.id].count += count
             if self.slots[item.id].count > item.max_stack:
@@ -120,6 +123,7 @@ class Inventory:
             return False
 
         slot.count -= count
+        self._dirty.add(slot.item.id)
         if slot.count == 0:
             del self.slots[item_id]
 
@@ -129,6 +133,24 @@ class Inventory:
         """Get the count of a specific item"""
         return self.slots[item_id].count if item_id in self.slots else 0
 
+    def pending_changes(self) -> Tuple[List[Tuple[str, int]], List[str]]:
+        """(item_id, count) rows to upsert and item ids to delete since the last save.
+
+        Overflow stacks are stored under their item's id, so counts are summed
+        per item.
+        """
+        totals = {item_id: 0 for item_id in self._dirty}
+        for slot in self.slots.values():
+            if slot.item.id in totals:
+                totals[slot.item.id] += slot.count
+        upserts = [(item_id, count) for item_id, count in totals.items() if count > 0]
+        deletes = [item_id for item_id, count in totals.items() if count <= 0]
+        return upserts, deletes
+
+    def mark_clean(self):
+        """Forget pending changes once they have been persisted"""
+        self._dirty.clear()
+
     def update_max_slots(self, new_level: int):
         """Update inventory size when player levels up"""
         self.level = new_level
@@ -0,0 +1,115 @@
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+# Non-empty (item_id, count) rows, ordered by item id
+Stacks = Tuple[Tuple[str, int], ...]
+# Equipped item id per slot, in EquipmentSlots field order
+EquippedIds = Tuple[Optional[str], ...]
+
+
+@dataclass(slots=True)
+class CachedLoadout:
+    """What the cache knows about one player; either part may be unknown"""
+    stacks: Optional[Stacks] = None
+    equipment: Optional[EquippedIds] = None
+
+
+@dataclass(slots=True)
+class InventoryCacheStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    invalidations: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+class InventoryCache:
+    """Shared LRU cache of each player's inventory stacks and equipment.
+
+    One instance lives on the bot so every cog's ``InventoryManager`` sees
+    the same entries. It holds immutable rows rather than ``Inventory`` or
+    ``EquipmentSlots`` objects: callers mutate those freely, and anything
+    they change without saving must not leak into the next read.
+
+    Writers update or invalidate a player once their write has committed.
+    A read that missed only fills the cache if no write happened while it
+    was querying, so a slow read can never put back rows older than a
+    write that already landed.
+    """
+
+    def __init__(self, max_players: int = 1024):
+        self.max_players = max(1, max_players)
+        self.stats = InventoryCacheStats()
+        self._entries: 'OrderedDict[int, CachedLoadout]' = OrderedDict()
+        self._generation = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, player_id: int) -> bool:
+        return player_id in self._entries
+
+    @property
+    def generation(self) -> int:
+        """Take before a read-through query and pass to ``fill_*``"""
+        return self._generation
+
+    def _lookup(self, player_id: int, part: str):
+        entry = self._entries.get(player_id)
+        value = getattr(entry, part) if entry else None
+        if value is None:
+            self.stats.misses += 1
+            return None
+        self._entries.move_to_end(player_id)
+        self.stats.hits += 1
+        return value
+
+    def _entry(self, player_id: int) -> CachedLoadout:
+        entry = self._entries.get(player_id)
+        if entry is None:
+            entry = self._entries[player_id] = CachedLoadout()
+            while len(self._entries) > self.max_players:
+                self._entries.popitem(last=False)
+                self.stats.evictions += 1
+        else:
+            self._entries.move_to_end(player_id)
+        return entry
+
+    def stacks(self, player_id: int) -> Optional[Stacks]:
+        return self._lookup(player_id, 'stacks')
+
+    def equipment(self, player_id: int) -> Optional[EquippedIds]:
+        return self._lookup(player_id, 'equipment')
+
+    def fill_stacks(self, player_id: int, stacks: Stacks, generation: int):
+        if generation == self._generation:
+            self._entry(player_id).stacks = stacks
+
+    def fill_equipment(self, player_id: int, equipment: EquippedIds, generation: int):
+        if generation == self._generation:
+            self._entry(player_id).equipment = equipment
+
+    def put_stacks(self, player_id: int, stacks: Stacks):
+        """Replace a player's stacks with what a committed write stored"""
+        self._generation += 1
+        self._entry(player_id).stacks = stacks
+
+    def put_equipment(self, player_id: int, equipment: EquippedIds):
+        """Replace a player's equipment with what a committed write stored"""
+        self._generation += 1
+        self._entry(player_id).equipment = equipment
+
+    def invalidate(self, player_id: int):
+        """Drop a player after a write the cache cannot replay"""
+        self._generation += 1
+        if self._entries.pop(player_id, None) is not None:
+            self.stats.invalidations += 1
+
+    def clear(self):
+        self._generation += 1
+        self._entries.clear()
@@ -1,257 +1,177 @@
-import yaml
-import random
-from pathlib import Path
-from typing import List, Dict, Optional, Tuple
-from .inventory import Item, ItemType, ItemRarity, ItemEffect, Inventory, InventorySlot
-from .equipment import EquipmentSlots
-
-class LootTable:
-    def __init__(self, enemy_type: str, level: int):
-        self.enemy_type = enemy_type
-        self.level = level
-        
-        # Rarity chances based on level
-        self.rarity_chances = {
-            ItemRarity.COMMON: 0.6 - (level * 0.02),      # Decreases with level
-            ItemRarity.UNCOMMON: 0.25 + (level * 0.01),   # Increases slightly
-            ItemRarity.RARE: 0.1 + (level * 0.01),        # Increases slightly
-            ItemRarity.EPIC: 0.04 + (level * 0.005),      # Increases very slightly
-            ItemRarity.LEGENDARY: 0.01 + (level * 0.005)  # Increases very slightly
-        }
+import math
+from dataclasses import fields
+from typing import List, Dict, Mapping, Optional, Tuple
+from .inventory import Item, ItemType, ItemRarity, Inventory, InventorySlot
+from .equipment import SLOT_TYPES, EquipmentSlots
+from .inventory_cache import Stacks
+
+# EquipmentSlots fields, in the column order of the equipment table
+EQUIPMENT_SLOTS = tuple(slot.name for slot in fields(EquipmentSlots))
+EQUIPPABLE_TYPES = frozenset(SLOT_TYPES.values())
 
-        # Normalize probabilities
-        total = sum(self.rarity_chances.values())
-        for rarity in self.rarity_chances:
-            self.rarity_chances[rarity] /= total
-
-    def roll_rarity(self) -> ItemRarity:
-        """Roll for item rarity"""
-        roll = random.random()
-        cumulative = 0
-        for rarity, chance in self.rarity_chances.items():
-            cumulative += chance
-            if roll <= cumulative:
-                return rarity
-        return ItemRarity.COMMON
+# get_total_stats() keys and the players columns (and Player fields) storing them
+STAT_COLUMNS = {
+    'damage': 'damage_bonus',
+    'magic_damage': 'magic_damage_bonus',
+    'defense': 'defense',
+    'magic_defense': 'magic_defense',
+    'crit_chance': 'crit_chance_bonus',
+    'flee_chance': 'flee_chance_bonus',
+    'health_bonus': 'health_bonus',
+    'mana_bonus': 'mana_bonus',
+}
 
 class InventoryManager:
     def __init__(self, bot):
         self.bot = bot
-        self.items_cache = {}
-        self._load_items()
-
-    def _load_items(self):
-        """Load item data from YAML"""
-        config_path = Path(__file__).parent.parent / 'config' / 'items.yaml'
-        with open(config_path, 'r') as f:
-            data = yaml.safe_load(f)
-
-        self.items = {}
-        for item_id, item_data in data['items'].items():
-            effects = [
-                ItemEffect(**effect_data)
-                for effect_data in item_data.get('effects', [])
-            ]
-            
-            self.items[item_data['id']] = Item(
-                id=item_data['id'],
-                name=item_data['name'],
-                description=item_data['description'],
-                type=ItemType(item_data['type']),
-                rarity=ItemRarity(item_data['rarity']),
-                level_requirement=item_data['level_requirement'],
-                effects=effects,
-                value=item_data['value'],
-                stackable=item_data.get('stackable', True),
-                max_stack=item_data.get('max_stack', 99)
-            )
+
+    @property
+    def items(self) -> Mapping[str, Item]:
+        """Item definitions of the current game data generation"""
+        return self.bot.game_data.items
+
+    async def get_stacks(self, player_id: int) -> Stacks:
+        """Non-empty (item_id, count) rows of a player's inventory, read through the cache"""
+        cache = self.bot.inventory_cache
+        stacks = cache.stacks(player_id)
+        if stacks is None:
+            generation = cache.generation
+            stacks = tuple(await self.bot.repos.inventory.stacks(player_id))
+            cache.fill_stacks(player_id, stacks, generation)
+        return stacks
 
     async def get_inventory(self, player_id: int) -> Optional[Inventory]:
         """Get a player's inventory"""
-        async with await self.bot.db_connect() as db:
-            async with db.execute(
-                'SELECT level FROM players WHERE id = ?',
-                (player_id,)
-            ) as cursor:
-                row = await cursor.fetchone()
-                if not row:
-                    return None
-                
-                level = row[0]
-                inventory = Inventory(player_id, level)
+        level = await self.bot.repos.players.level(player_id)
+        if level is None:
+            return None
+        inventory = Inventory(player_id, level)
 
-            # Load inventory items
-            async with db.execute(
-                'SELECT item_id, count FROM inventory WHERE player_id = ?',
-                (player_id,)
-            ) as cursor:
-                async for row in cursor:
-                    item_id, count = row
-                    if item_id in self.items:
-                        inventory.slots[item_id] = InventorySlot(self.items[item_id], count)
+        # Load inventory items
+        for item_id, count in await self.get_stacks(player_id):
+            if item_id in self.items:
+                inventory.slots[item_id] = InventorySlot(self.items[item_id], count)
 
-            return inventory
+        return inventory
 
     async def save_inventory(self, inventory: Inventory):
-        """Save inventory to database"""
-        async with await self.bot.db_connect() as db:
-            await db.execute(
-                'DELETE FROM inventory WHERE player_id = ?',
-                (inventory.player_id,)
-            )
-
-            # Insert new inventory items
-            for slot in inventory.slots.values():
-                await db.execute(
-                    'INSERT INTO inventory (player_id, item_id, count) VALUES (?, ?, ?)',
-                    (inventory.player_id, slot.item.id, slot.count)
-                )
-            await db.commit()
+        """Save changed inventory slots to database
+
+        Only items touched since the inventory was loaded are written: one
+        batched upsert for changed counts and one batched delete for emptied
+        slots, as a single write intent.
+        """
+        upserts, deletes = inventory.pending_changes()
+        if not upserts and not deletes:
+            return
+
+        async def persist():
+            if upserts:
+                await self.bot.repos.inventory.set_counts(inventory.player_id, upserts)
+            if deletes:
+                await self.bot.repos.inventory.delete(inventory.player_id, deletes)
+
+        await self.bot.repos.write(persist)
+        inventory.mark_clean()
+        self.bot.inventory_cache.put_stacks(inventory.player_id, tuple(sorted(
+            (item_id, slot.count) for item_id, slot in inventory.slots.items() if slot.count > 0
+        )))
+
+    def invalidate(self, player_id: int):
+        """Forget cached inventory and equipment after writing them directly"""
+        self.bot.inventory_cache.invalidate(player_id)
 
     async def get_equipment(self, player_id: int) -> EquipmentSlots:
         """Get player's equipment"""
         equipment = EquipmentSlots()
-        
-        async with await self.bot.db_connect() as db:
-            async with db.execute(
-                'SELECT * FROM equipment WHERE player_id = ?',
-                (player_id,)
-            ) as cursor:
-                row = await cursor.fetchone()
-                if not row:
-                    # Create empty equipment entry if none exists
-                    await db.execute(
-                        'INSERT INTO equipment (player_id) VALUES (?)',
-                        (player_id,)
-                    )
-                    await db.commit()
-                    return equipment
-
-            # Load equipped items
-            columns = [desc[0] for desc in cursor.description]
-            for i, value in enumerate(row):
-                if value and columns[i].endswith('_id'):
-                    slot_name = columns[i][:-3]  # Remove '_id' suffix
-                    item = self.items.get(value)
-                    if item:
-                        setattr(equipment, slot_name, item)
+        cache = self.bot.inventory_cache
+
+        equipped = cache.equipment(player_id)
+        if equipped is None:
+            generation = cache.generation
+            row = await self.bot.repos.inventory.equipment(player_id)
+            if not row:
+                # Create empty equipment entry if none exists
+                await self.bot.repos.write(lambda: self.bot.repos.inventory.create_equipment(player_id))
+                cache.put_equipment(player_id, (None,) * len(EQUIPMENT_SLOTS))
+                return equipment
+            equipped = tuple(getattr(row, f'{slot}_id') for slot in EQUIPMENT_SLOTS)
+            cache.fill_equipment(player_id, equipped, generation)
+
+        # Load equipped items
+        for slot, item_id in zip(EQUIPMENT_SLOTS, equipped):
+            if item_id and (item := self.items.get(item_id)):
+                setattr(equipment, slot, item)
 
         return equipment
 
     async def save_equipment(self, player_id: int, equipment: EquipmentSlots):
         """Save player's equipment"""
-        async with await self.bot.db_connect() as db:
-            await db.execute('''
-                INSERT OR REPLACE INTO equipment (
-                    player_id, helmet_id, armor_id, pants_id, boots_id,
-                    weapon_id, ring1_id, ring2_id, amulet_id
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                player_id,
-                equipment.helmet.id if equipment.helmet else None,
-                equipment.armor.id if equipment.armor else None,
-                equipment.pants.id if equipment.pants else None,
-                equipment.boots.id if equipment.boots else None,
-                equipment.weapon.id if equipment.weapon else None,
-                equipment.ring1.id if equipment.ring1 else None,
-                equipment.ring2.id if equipment.ring2 else None,
-                equipment.amulet.id if equipment.amulet else None
-            ))
-            await db.commit()
+        await self.bot.repos.write(lambda: self.bot.repos.inventory.save_equipment(player_id, equipment))
+        self.bot.inventory_cache.put_equipment(player_id, tuple(
+            item.id if (item := getattr(equipment, slot)) else None for slot in EQUIPMENT_SLOTS
+        ))
 
         # Update player stats based on equipment
         await self.update_player_stats(player_id, equipment)
 
     async def update_player_stats(self, player_id: int, equipment: EquipmentSlots):
-        """Update player's stats based on equipment"""
+        """Store the stat totals granted by a player's equipment
+
+        Runs whenever equipment changes, so combat and the stat screens read
+        the totals from the players row instead of walking every slot.
+        """
+        # A player in combat may have leveled up since their row was written
+        if player := self.bot.player_states.get(player_id):
+            level = player.level
+        elif (level := await self.bot.repos.players.level(player_id)) is None:
+            return
+        max_health, max_mana, stats = self._equipment_totals(level, equipment)
+        await self.bot.repos.write(lambda: self.bot.repos.players.apply_equipment_stats(player_id, max_health, max_mana, stats))
+
+        # ... and keeps fighting with the new gear
+        if player:
+            player.max_health, player.max_mana = max_health, max_mana
+            for stat, column in STAT_COLUMNS.items():
+                setattr(player, column, stats[stat])
+
+    def _equipment_totals(self, level: int, equipment: EquipmentSlots) -> Tuple[int, int, Dict[str, float]]:
+        """Max health, max mana and equipment bonuses for a level and loadout"""
         stats = equipment.get_total_stats()
-        
-        async with await self.bot.db_connect() as db:
-            # Get base stats (level-based)
-            cursor = await db.execute(
-                'SELECT level, health, mana FROM players WHERE id = ?',
-                (player_id,)
-            )
-            row = await cursor.fetchone()
-            if not row:
-                return
-            
-            level, current_health, current_mana = row
-            
-            # Calculate base max stats (from level)
-            base_max_health = 100 + ((level - 1) * 10)
-            base_max_mana = 100 + ((level - 1) * 5)
-            
-            # Apply equipment bonuses
-            new_max_health = base_max_health + stats['health_bonus']
-            new_max_mana = base_max_mana + stats['mana_bonus']
-            
-            # Update all stats including max health/mana
-            await db.execute('''
-                UPDATE players SET
-                    max_health = ?,
-                    max_mana = ?,
-                    damage_bonus = ?,
-                    magic_damage_bonus = ?,
-                    defense = ?,
-                    magic_defense = ?,
-                    crit_chance_bonus = ?,
-                    flee_chance_bonus = ?,
-                    health_bonus = ?,
-                    mana_bonus = ?
-                WHERE id = ?
-            ''', (
-                new_max_health,
-                new_max_mana,
-                stats['damage'],
-                stats['magic_damage'],
-                stats['defense'],
-                stats['magic_defense'],
-                stats['crit_chance'],
-                stats['flee_chance'],
-                stats['health_bonus'],
-                stats['mana_bonus'],
-                player_id
-            ))
-            await db.commit()
-
-    def generate_loot(self, enemy_type: str, enemy_level: int, is_boss: bool = False) -> List[Tuple[Item, int]]:
-        """Generate loot drops based on enemy type and level"""
-        loot_table = LootTable(enemy_type, enemy_level)
-        num_items = random.randint(1, 3) if is_boss else random.randint(0, 2)
-        loot = []
-
-        for _ in range(num_items):
-            rarity = loot_table.roll_rarity()
-            
-            # Filter suitable items based on enemy type, level, and rarity
-            suitable_items = [
-                item for item in self.items.values()
-                if (item.level_requirement <= enemy_level + 2 and
-                    item.level_requirement >= enemy_level - 3 and
-                    item.rarity == rarity and
-                    (enemy_type.lower() in item.description.lower() or
-                     item.type in [ItemType.CONSUMABLE, ItemType.MATERIAL]))
-            ]
-
-            if suitable_items:
-                item = random.choice(suitable_items)
-                count = random.randint(1, 3) if item.stackable else 1
-                loot.append((item, count))
-
-        # Ensure boss always drops something
-        if is_boss and not loot:
-            # Get a rare or better item
-            boss_items = [
-                item for item in self.items.values()
-                if (item.level_requirement <= enemy_level + 2 and
-                    item.rarity in [ItemRarity.RARE, ItemRarity.EPIC, ItemRarity.LEGENDARY])
-            ]
-            if boss_items:
-                item = random.choice(boss_items)
-                loot.append((item, 1))
-
-        return loot
+
+        # Calculate base max stats (from level)
+        base_max_health = 100 + ((level - 1) * 10)
+        base_max_mana = 100 + ((level - 1) * 5)
+
+        # Apply equipment bonuses
+        return base_max_health + stats['health_bonus'], base_max_mana + stats['mana_bonus'], stats
+
+    async def check_player_stats(self, player_id: int, repair: bool = True) -> Optional[Dict[str, Tuple[float, float]]]:
+        """Recompute a player's equipment totals from scratch and compare them with the stored row
+
+        Returns None if the player doesn't exist, otherwise the columns that
+        drifted as ``{column: (stored, expected)}``. With ``repair`` the
+        recomputed totals are written back.
+        """
+        stored = await self.bot.repos.players.stats(player_id)
+        if not stored:
+            return None
+
+        # Read the equipment table itself, not what the cache remembers
+        self.invalidate(player_id)
+        equipment = await self.get_equipment(player_id)
+        max_health, max_mana, stats = self._equipment_totals(stored.level, equipment)
+
+        expected = {'max_health': max_health, 'max_mana': max_mana}
+        expected.update((column, stats[stat]) for stat, column in STAT_COLUMNS.items())
+        drift = {
+            column: (getattr(stored, column), value)
+            for column, value in expected.items()
+            if not math.isclose(getattr(stored, column), value, abs_tol=1e-9)
+        }
+        if drift and repair:
+            await self.update_player_stats(player_id, equipment)
+        return drift
 
     async def add_items(self, player_id: int, items: List[Tuple[Item, int]]) -> Tuple[List[Tuple[Item, int]], List[Tuple[Item, int]]]:
         """Add items to player's inventory, return (added_items, failed_items)"""
@@ -281,6 +201,15 @@ class InventoryManager:
         if not inventory:
             return
         
+        # Gear the player can use, grouped by the type of slot it fits, in one pass
+        usable: Dict[ItemType, List[Item]] = {}
+        for slot in inventory.slots.values():
+            item = slot.item
+            if item.type in EQUIPPABLE_TYPES and item.level_requirement <= inventory.level:
+                usable.setdefault(item.type, []).append(item)
+        if not usable:
+            return
+        
         # Check each equipment slot
         equipped_any = False
         for slot_name in ['weapon', 'helmet', 'armor', 'pants', 'boots', 'ring1', 'ring2', 'amulet']:
@@ -291,15 +220,7 @@ class InventoryManager:
             best_item = None
             best_score = self._calculate_item_score(current_item) if current_item else 0
             
-            for item_id, slot in inventory.slots.items():
-                item = slot.item
-                
-                # Check if item can go in this slot and player can use it
-                if not equipment.can_equip(item, slot_name):
-                    continue
-                if item.level_requirement > inventory.level:
-                    continue
-                
+            for item in usable.get(SLOT_TYPES[slot_name], ()):
                 # For rings, skip if it's already equipped in the other ring slot
                 if slot_name == 'ring2' and equipment.ring1 and equipment.ring1.id == item.id:
                     continue
@@ -319,12 +240,11 @@ class InventoryManager:
                 # Unequip current item back to inventory
                 if current_item:
                     inventory.add_item(current_item, 1)
+                    # A ring taken off ring1 may still suit ring2
+                    usable[current_item.type].append(current_item)
                 
                 # Remove new item from inventory
-                if inventory.slots[best_item.id].count > 1:
-                    inventory.slots[best_item.id].count -= 1
-                else:
-                    del inventory.slots[best_item.id]
+                inventory.remove_item(best_item.id, 1)
                 
                 # Equip the new item
                 equipment.equip(best_item, slot_name)
@@ -0,0 +1,53 @@
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from typing import Dict, List, Mapping, Optional, Tuple
+
+from .inventory import Item, ItemRarity, ItemType
+
+BucketKey = Tuple[Optional[ItemType], Optional[ItemRarity]]
+
+
+class ItemIndex:
+    """The item catalog bucketed by type and rarity, each bucket sorted by level.
+
+    Every combination of a type or any type with a rarity or any rarity
+    has its own bucket, so a lookup is one dict access and a level range
+    within it is two bisections.
+
+    Built alongside ``GameData`` and shared through it by the bot and the
+    dashboard. Treat the returned tuples and items as read-only.
+    """
+
+    def __init__(self, items: Mapping[str, Item]):
+        buckets: Dict[BucketKey, List[Item]] = defaultdict(list)
+        for item in items.values():
+            for key in ((item.type, item.rarity), (item.type, None), (None, item.rarity), (None, None)):
+                buckets[key].append(item)
+
+        self._buckets: Dict[BucketKey, Tuple[Item, ...]] = {}
+        self._levels: Dict[BucketKey, Tuple[int, ...]] = {}
+        for key, bucket in buckets.items():
+            bucket.sort(key=lambda item: (item.level_requirement, item.id))
+            self._buckets[key] = tuple(bucket)
+            self._levels[key] = tuple(item.level_requirement for item in bucket)
+
+        # Dashboard order: rarest first, then by level
+        rank = {rarity: i for i, rarity in enumerate(reversed(ItemRarity))}
+        self.catalog: Tuple[Item, ...] = tuple(sorted(
+            items.values(), key=lambda item: (rank[item.rarity], item.level_requirement)
+        ))
+
+    def __len__(self) -> int:
+        return len(self.catalog)
+
+    def find(self, item_type: Optional[ItemType] = None, rarity: Optional[ItemRarity] = None,
+             min_level: Optional[int] = None, max_level: Optional[int] = None) -> Tuple[Item, ...]:
+        """Items matching every given filter, in level order"""
+        key = (item_type, rarity)
+        bucket = self._buckets.get(key, ())
+        if min_level is None and max_level is None:
+            return bucket
+        levels = self._levels[key] if bucket else ()
+        start = bisect_left(levels, min_level) if min_level is not None else 0
+        end = bisect_right(levels, max_level) if max_level is not None else len(levels)
+        return bucket[start:end]
@@ -0,0 +1,117 @@
+import random
+from bisect import bisect_left
+from dataclasses import dataclass
+from typing import Dict, Generic, List, Optional, Sequence, Tuple, TypeVar
+
+T = TypeVar('T')
+
+# Loot tables used for enemy types without their own
+DEFAULT_TABLE = 'default'
+
+# Item ids and counts dropped by one enemy, and the gold
+Drop = Tuple[List[Tuple[str, int]], int]
+
+
+class AliasTable(Generic[T]):
+    """Weighted outcomes compiled for constant-time sampling (Vose's alias method).
+
+    Building the table is O(n); every draw after that costs one random
+    number and one comparison, however many outcomes there are.
+    """
+    __slots__ = ('outcomes', 'probabilities', 'aliases')
+
+    def __init__(self, outcomes: Sequence[T], weights: Sequence[float]):
+        weights = [max(0.0, float(weight)) for weight in weights]
+        total = sum(weights)
+        if not outcomes or len(outcomes) != len(weights) or total <= 0:
+            raise ValueError('An alias table needs outcomes with a positive total weight')
+
+        n = len(outcomes)
+        scaled = [weight * n / total for weight in weights]
+        probabilities = [1.0] * n
+        aliases = list(range(n))
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+        while small and large:
+            low, high = small.pop(), large.pop()
+            probabilities[low] = scaled[low]
+            aliases[low] = high
+            scaled[high] -= 1.0 - scaled[low]
+            (small if scaled[high] < 1.0 else large).append(high)
+        # Whatever is left over is 1 up to rounding and keeps probability 1
+
+        self.outcomes = tuple(outcomes)
+        self.probabilities = tuple(probabilities)
+        self.aliases = tuple(aliases)
+
+    def __len__(self) -> int:
+        return len(self.outcomes)
+
+    def draw(self, rng: random.Random = random) -> T:
+        # The integer part picks a column, the fraction decides between it and its alias
+        u = rng.random() * len(self.outcomes)
+        i = int(u)
+        return self.outcomes[i] if u - i < self.probabilities[i] else self.outcomes[self.aliases[i]]
+
+    def draw_many(self, count: int, rng: random.Random = random) -> List[T]:
+        outcomes, probabilities, aliases = self.outcomes, self.probabilities, self.aliases
+        n = len(outcomes)
+        draws = []
+        append = draws.append
+        for u in (rng.random() * n for _ in range(count)):
+            i = int(u)
+            append(outcomes[i] if u - i < probabilities[i] else outcomes[aliases[i]])
+        return draws
+
+
+@dataclass(frozen=True, slots=True)
+class LootBand:
+    """What an enemy drops up to ``max_level`` (no limit when None).
+
+    Each drop slot yields at most one item id; a slot with a chance below
+    one draws None for the rest.
+    """
+    max_level: Optional[int]
+    gold_per_level: Tuple[int, int]
+    drops: Tuple[AliasTable, ...]
+
+
+class LootTables:
+    """Compiled loot bands per enemy type, from loot.yaml.
+
+    Bands are sorted by level, so finding an enemy's band is a bisection
+    and each of its drops is one alias-table draw.
+    """
+
+    def __init__(self, tables: Dict[str, Tuple[LootBand, ...]]):
+        self.tables = tables
+        self._max_levels = {
+            enemy_type: [band.max_level for band in bands[:-1]] for enemy_type, bands in tables.items()
+        }
+
+    def band(self, enemy_type: Optional[str], level: int) -> LootBand:
+        if enemy_type not in self.tables:
+            enemy_type = DEFAULT_TABLE
+        bands = self.tables[enemy_type]
+        return bands[bisect_left(self._max_levels[enemy_type], level)]
+
+    def roll(self, enemy_type: Optional[str], level: int, rng: random.Random = random) -> Drop:
+        """Items and gold one defeated enemy drops"""
+        band = self.band(enemy_type, level)
+        items = [(item_id, 1) for table in band.drops if (item_id := table.draw(rng)) is not None]
+        low, high = band.gold_per_level
+        return items, rng.randint(low * level, high * level)
+
+    def roll_many(self, enemy_type: Optional[str], level: int, count: int,
+                  rng: random.Random = random) -> List[Drop]:
+        """``count`` independent drops from the same enemy, for simulations and balancing"""
+        band = self.band(enemy_type, level)
+        # One batch of draws per drop slot, then one row per enemy
+        rows = zip(*(table.draw_many(count, rng) for table in band.drops)) if band.drops else [()] * count
+        low, high = band.gold_per_level
+        span = (high - low) * level + 1
+        gold = [low * level + int(rng.random() * span) for _ in range(count)]
+        return [
+            ([(item_id, 1) for item_id in row if item_id is not None], amount)
+            for row, amount in zip(rows, gold)
+        ]
@@ -18,6 +18,7 @@ class Player:
     magic_damage_bonus: int = 0
     defense: int = 0
     magic_defense: int = 0
+    # Percentage points, like the crit_chance and flee_chance effects in items.yaml
     crit_chance_bonus: float = 0.0
     crit_chance_multiplier: float = 1.0
     flee_chance_bonus: float = 0.0
@@ -0,0 +1,110 @@
+import logging
+from typing import Dict, Optional, Tuple
+
+from discord.ext import tasks
+
+from .player import Player
+
+logger = logging.getLogger('willowbot.player_state')
+
+# Columns the cache writes back: (health, mana, xp, level)
+PlayerState = Tuple[int, int, int, int]
+
+
+class PlayerStateCache:
+    """Write-behind cache for the players currently in combat.
+
+    The ``Player`` held in a combat session is the authoritative state for
+    as long as the combat lasts, so turns change it in memory only and make
+    no database round trips. Players whose health, mana, XP or level differ
+    from what was last written are flushed every ``flush_seconds`` and at
+    shutdown, which bounds how many updates a crash can lose.
+
+    Combat ends either write the final state themselves and ``discard()``
+    the entry, or ``release()`` it, which flushes pending changes first.
+    Only these four columns are written back; gold, kills and the bonus
+    stats stay owned by the statements that change them.
+    """
+
+    def __init__(self, repos, flush_seconds: float = 5.0):
+        self.repos = repos
+        self.flush_seconds = flush_seconds
+        self._players: Dict[int, Player] = {}
+        self._flushed: Dict[int, PlayerState] = {}
+        self.run.change_interval(seconds=flush_seconds)
+
+    @staticmethod
+    def _state(player: Player) -> PlayerState:
+        return (player.health, player.mana, player.xp, player.level)
+
+    def __contains__(self, player_id: int) -> bool:
+        return player_id in self._players
+
+    def __len__(self) -> int:
+        return len(self._players)
+
+    def get(self, player_id: int) -> Optional[Player]:
+        """The in-combat player, if the cache holds one"""
+        return self._players.get(player_id)
+
+    async def load(self, player_id: int) -> Optional[Player]:
+        """Serve the in-combat player from memory, otherwise read the row"""
+        return self._players.get(player_id) or await self.repos.players.load(player_id)
+
+    def track(self, player: Player):
+        """Hold a player whose current state matches the database"""
+        self._players[player.id] = player
+        self._flushed[player.id] = self._state(player)
+
+    def dirty(self) -> Dict[int, PlayerState]:
+        """State of every held player that changed since it was last written"""
+        return {
+            player_id: state
+            for player_id, player in self._players.items()
+            if (state := self._state(player)) != self._flushed[player_id]
+        }
+
+    async def _write(self, states: Dict[int, PlayerState]):
+        rows = [(*state, player_id) for player_id, state in states.items()]
+        await self.repos.write(lambda: self.repos.players.save_states(rows))
+
+    async def flush(self) -> int:
+        """Write every changed player and return how many were written"""
+        states = self.dirty()
+        if not states:
+            return 0
+        await self._write(states)
+        for player_id, state in states.items():
+            # The player may have left combat while the write was queued
+            if player_id in self._flushed:
+                self._flushed[player_id] = state
+        return len(states)
+
+    def discard(self, player_id: int):
+        """Forget a player whose final state the caller is writing itself"""
+        self._players.pop(player_id, None)
+        self._flushed.pop(player_id, None)
+
+    async def release(self, player_id: int):
+        """Flush a player's pending changes and stop holding them"""
+        player = self._players.pop(player_id, None)
+        flushed = self._flushed.pop(player_id, None)
+        if player and (state := self._state(player)) != flushed:
+            await self._write({player_id: state})
+
+    def start(self):
+        if not self.run.is_running():
+            self.run.start()
+
+    async def close(self):
+        """Stop the timer and write everything still pending"""
+        self.run.cancel()
+        await self.flush()
+
+    @tasks.loop(seconds=5)
+    async def run(self):
+        try:
+            if count := await self.flush():
+                logger.debug(f"Flushed {count} in-combat players")
+        except Exception as e:
+            logger.error(f"Player state flush failed: {e}")
@@ -1,7 +1,41 @@
-from dataclasses import dataclass
-from typing import List, Dict, Optional
+from dataclasses import dataclass, field, fields
+from types import MappingProxyType
+from typing import Any, List, Mapping, Optional, Tuple
 from enum import Enum
 
+# Quest definitions are shared by every player through GameData, so they
+# are frozen all the way down; per-player progress lives in the database
+
+
+def _freeze(value):
+    """Lists as tuples and dicts as read-only mappings, recursively"""
+    if isinstance(value, Mapping):
+        return MappingProxyType({key: _freeze(item) for key, item in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
+def _thaw(value):
+    if isinstance(value, MappingProxyType):
+        return {key: _thaw(item) for key, item in value.items()}
+    if isinstance(value, tuple):
+        return tuple(_thaw(item) for item in value)
+    return value
+
+
+class Definition:
+    """Base for frozen definition dataclasses with read-only containers"""
+
+    def __post_init__(self):
+        for f in fields(self):
+            object.__setattr__(self, f.name, _freeze(getattr(self, f.name)))
+
+    def __reduce__(self):
+        # Mapping proxies can't be pickled, so snapshots store plain dicts
+        # and __post_init__ wraps them again
+        return (type(self), tuple(_thaw(getattr(self, f.name)) for f in fields(self)))
+
 class QuestType(Enum):
     COMBAT = "combat"
     BOSS_COMBAT = "boss_combat"
@@ -12,70 +46,84 @@ class ObjectiveType(Enum):
     COMBAT = "combat"
     COMBAT_WITH_ATTACK = "combat_with_attack"
 
-@dataclass
-class QuestObjective:
+@dataclass(frozen=True)
+class QuestObjective(Definition):
     type: ObjectiveType
     description: str
     count: int
-    current_progress: int = 0
     enemy_type: Optional[str] = None
     enemy_prefix: Optional[str] = None
     enemy_suffix: Optional[str] = None
     attack_type: Optional[str] = None
+    # Enemy filters resolved against enemies.yaml at load time (-1 = unknown name)
+    enemy_type_id: Optional[int] = None
+    enemy_prefix_id: Optional[int] = None
+    enemy_suffix_id: Optional[int] = None
 
-    def is_complete(self) -> bool:
-        return self.current_progress >= self.count
-
-    def update_progress(self, amount: int = 1):
-        self.current_progress = min(self.count, self.current_progress + amount)
-
-@dataclass
-class QuestReward:
+@dataclass(frozen=True)
+class QuestReward(Definition):
     xp: int
     gold: int
-    items: List[Dict[str, int]]  # List of {item_id: count}
+    items: Tuple[Mapping[str, Any], ...]  # {'id': item_id, 'count': count} each
     title: Optional[str] = None
 
-@dataclass
-class Quest:
+@dataclass(frozen=True)
+class Quest(Definition):
     id: str
     title: str
     description: str
     type: QuestType
-    objectives: List[QuestObjective]
+    objectives: Tuple[QuestObjective, ...]
     rewards: QuestReward
-    requirements: Dict[str, any]
+    requirements: Mapping[str, Any]
     next_quest: Optional[str] = None
-    
-    def is_complete(self) -> bool:
-        return all(obj.is_complete() for obj in self.objectives)
 
 @dataclass
-class QuestChain:
+class QuestProgressUpdate:
+    """An active quest advanced by a combat event"""
+    quest: Quest
+    progress: List[int]
+    completed: bool = False
+
+    def next_objective(self) -> Optional[Tuple[QuestObjective, int]]:
+        """First unfinished objective and its current progress"""
+        for objective, current in zip(self.quest.objectives, self.progress):
+            if current < objective.count:
+                return objective, current
+        return None
+
+@dataclass
+class QuestProgressResult:
+    """Everything a combat event changed in a player's quests"""
+    updates: List[QuestProgressUpdate] = field(default_factory=list)
+    rewards: List[QuestReward] = field(default_factory=list)
+    started_quests: List[Quest] = field(default_factory=list)
+    old_level: int = 0
+    new_level: int = 0
+
+    @property
+    def leveled_up(self) -> bool:
+        return self.new_level > self.old_level
+
+@dataclass(frozen=True)
+class QuestChain(Definition):
     id: str
     name: str
     description: str
-    quests: List[Quest]
-    requirements: Optional[Dict[str, any]] = None
-
-@dataclass
-class PlayerQuest:
-    quest_id: str
-    objectives: List[QuestObjective]
-    completed: bool = False
-    rewards_claimed: bool = False
+    quests: Tuple[Quest, ...]
+    requirements: Optional[Mapping[str, Any]] = None
 
-@dataclass
-class QuestItem:
+@dataclass(frozen=True)
+class QuestItem(Definition):
     id: str
     name: str
     description: str
-    effect: Dict[str, any]
+    effect: Mapping[str, Any]
     value: int
 
-@dataclass
-class Title:
+@dataclass(frozen=True)
+class Title(Definition):
     id: str
     name: str
     description: str
-    bonuses: Dict[str, float]
\ No newline at end of file
+    bonuses: Mapping[str, float]
\ No newline at end of file
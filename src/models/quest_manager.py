@@ -1,147 +1,68 @@
-import yaml
-from pathlib import Path
-import json
 import logging
-from typing import List, Dict, Optional, Tuple
+from typing import List, Dict, Mapping, Optional, Tuple
+from ..models.combat import EnemyIdentity
+from ..models.enemy import EnemyCatalog
 from ..models.quest import (
-    Quest, QuestChain, QuestObjective, QuestReward,
-    PlayerQuest, QuestItem, Title, QuestType, ObjectiveType
+    Quest, QuestChain, QuestItem, QuestObjective, QuestReward, QuestProgressResult,
+    QuestProgressUpdate, ObjectiveType, Title
 )
+from ..db.repository import Progression
 
 logger = logging.getLogger('willowbot.quest_manager')
 
 class QuestManager:
     def __init__(self, bot):
         self.bot = bot
-        self._load_quest_data()
-
-    def _load_quest_data(self):
-        """Load quest data from YAML files"""
-        config_path = Path(__file__).parent.parent / 'config' / 'quests.yaml'
-        with open(config_path, 'r') as f:
-            data = yaml.safe_load(f)
-            
-        # Parse quest chains
-        self.quest_chains = {}
-        self.quests = {}
-        self.items = {}
-        self.titles = {}
-
-        # Load items (optional - may not exist in all quest configs)
-        if 'quest_items' in data:
-            for item_id, item_data in data['quest_items'].items():
-                self.items[item_id] = QuestItem(
-                    id=item_id,
-                    name=item_data['name'],
-                    description=item_data['description'],
-                effect=item_data['effect'],
-                value=item_data['value']
-            )
 
-        # Load titles (optional section)
-        if 'titles' in data:
-            for title_id, title_data in data['titles'].items():
-                self.titles[title_id] = Title(
-                    id=title_id,
-                    name=title_data['name'],
-                    description=title_data['description'],
-                    bonuses=title_data['bonuses']
-                )
-
-        # Load quest chains and quests
-        for chain_data in data['quest_chains']:
-            chain_quests = []
-            for quest_data in chain_data['quests']:
-                # Create quest objectives
-                objectives = [
-                    QuestObjective(
-                        type=ObjectiveType(obj['type']),
-                        description=obj['description'],
-                        count=obj['count'],
-                        enemy_type=obj.get('enemy_type'),
-                        enemy_prefix=obj.get('enemy_prefix'),
-                        enemy_suffix=obj.get('enemy_suffix'),
-                        attack_type=obj.get('attack_type')
-                    ) for obj in quest_data['objectives']
-                ]
-
-                # Create quest rewards
-                rewards = QuestReward(
-                    xp=quest_data['rewards']['xp'],
-                    gold=quest_data['rewards']['gold'],
-                    items=quest_data['rewards'].get('items', []),
-                    title=quest_data['rewards'].get('title')
-                )
-
-                # Create quest
-                quest = Quest(
-                    id=quest_data['id'],
-                    title=quest_data['title'],
-                    description=quest_data['description'],
-                    type=QuestType(quest_data['type']),
-                    objectives=objectives,
-                    rewards=rewards,
-                    requirements=quest_data.get('requirements', {}),
-                    next_quest=quest_data.get('next_quest')
-                )
-                
-                chain_quests.append(quest)
-                self.quests[quest.id] = quest
-
-            # Create quest chain
-            chain = QuestChain(
-                id=chain_data['id'],
-                name=chain_data['name'],
-                description=chain_data['description'],
-                quests=chain_quests,
-                requirements=chain_data.get('requirements')
-            )
-            self.quest_chains[chain.id] = chain
+    # Definitions come from the current game data generation, so a reload
+    # reaches every manager without rebuilding it
+
+    @property
+    def enemy_catalog(self) -> EnemyCatalog:
+        return self.bot.game_data.enemy_catalog
+
+    @property
+    def quest_chains(self) -> Mapping[str, QuestChain]:
+        return self.bot.game_data.quest_chains
+
+    @property
+    def quests(self) -> Mapping[str, Quest]:
+        return self.bot.game_data.quests
+
+    @property
+    def items(self) -> Mapping[str, QuestItem]:
+        return self.bot.game_data.quest_items
+
+    @property
+    def titles(self) -> Mapping[str, Title]:
+        return self.bot.game_data.titles
 
     async def get_available_quests(self, player_id: int) -> List[Quest]:
         """Get all quests available to the player"""
         available_quests = []
         
         # Get player's level and create player if they don't exist
-        async with await self.bot.db_connect() as db:
-            async with db.execute(
-                'SELECT level FROM players WHERE id = ?', 
-                (player_id,)
-            ) as cursor:
-                result = await cursor.fetchone()
-                if result is None:
-                    # Get player's name from Discord
-                    guild = self.bot.guilds[0]  # Get first guild bot is in
-                    member = await guild.fetch_member(player_id)
-                    name = member.display_name if member else str(player_id)
-
-                    # Create new player
-                    await db.execute('''
-                        INSERT INTO players (id, name, level, xp, health, max_health, mana, max_mana)
-                        VALUES (?, ?, 1, 0, 100, 100, 100, 100)
-                    ''', (player_id, name))
-                    await db.commit()
-                    player_level = 1
-                else:
-                    player_level = result[0]
-                
-            # Get completed quest chains
-            async with db.execute(
-                'SELECT chain_id FROM completed_quest_chains WHERE player_id = ?',
-                (player_id,)
-            ) as cursor:
-                completed_chains = set(row[0] for row in await cursor.fetchall())
-
-            # Get active and completed quests with rewards claimed status
-            async with db.execute(
-                'SELECT quest_id, completed, rewards_claimed FROM active_quests WHERE player_id = ?',
-                (player_id,)
-            ) as cursor:
-                quest_data = await cursor.fetchall()
-                # Store quest status: {quest_id: (completed, rewards_claimed)}
-                quest_status = {row[0]: (row[1], row[2]) for row in quest_data}
-
-
+        repos = self.bot.repos
+        player_level = await repos.players.level(player_id)
+        if player_level is None:
+            # Get player's name from Discord
+            guild = self.bot.guilds[0]  # Get first guild bot is in
+            member = await guild.fetch_member(player_id)
+            name = member.display_name if member else str(player_id)
+
+            # Create new player
+            await repos.write(lambda: repos.players.create(player_id, name))
+            player_level = 1
+
+        # Get completed quest chains
+        completed_chains = await repos.quests.completed_chains(player_id)
+
+        # Get active and completed quests with rewards claimed status
+        # Store quest status: {quest_id: (completed, rewards_claimed)}
+        quest_status = {
+            status.quest_id: (status.completed, status.rewards_claimed)
+            for status in await repos.quests.statuses(player_id)
+        }
 
         for chain in self.quest_chains.values():
             # Check chain requirements
@@ -186,240 +107,216 @@ class QuestManager:
 
         return available_quests
 
+    async def get_objective_progress(self, player_id: int, quest_id: str) -> List[int]:
+        """Progress of each objective of a player's quest, in objective order"""
+        quest = self.quests.get(quest_id)
+        count = len(quest.objectives) if quest else 0
+        progress = [0] * count
+        for index, value in (await self.bot.repos.quests.progress(player_id, quest_id)).items():
+            if index < count:
+                progress[index] = value
+        return progress
+
     async def start_quest(self, player_id: int, quest_id: str) -> Optional[Quest]:
-        """Start a quest for a player"""
+        """Start a quest for a player, or return it if it is already active.
+
+        The quest is the shared definition; the player's progress comes from
+        ``get_objective_progress()``.
+        """
         quest = self.quests.get(quest_id)
         if not quest:
             return None
 
         # Check if quest is already active
-        async with await self.bot.db_connect() as db:
-            async with db.execute(
-                'SELECT objectives_progress FROM active_quests WHERE player_id = ? AND quest_id = ?',
-                (player_id, quest_id)
-            ) as cursor:
-                if row := await cursor.fetchone():
-                    # Quest is already active
-                    quest.objectives_progress = json.loads(row[0])
-                    return quest
-
-            # Initialize quest progress
-            objectives_progress = json.dumps([0] * len(quest.objectives))
-            await db.execute('''
-                INSERT INTO active_quests (player_id, quest_id, objectives_progress)
-                VALUES (?, ?, ?)
-            ''', (player_id, quest_id, objectives_progress))
-            await db.commit()
-
+        if await self.bot.repos.quests.status(player_id, quest_id):
             return quest
 
+        await self.bot.repos.write(lambda: self.bot.repos.quests.insert(player_id, quest.id, len(quest.objectives)))
+
+        return quest
+
+    def _objective_matches(self, objective: QuestObjective, enemy: Optional[EnemyIdentity],
+                           attack_type: Optional[str]) -> bool:
+        enemy_type_id = enemy.type_id if enemy else None
+        enemy_prefix_id = enemy.prefix_id if enemy else None
+        enemy_suffix_id = enemy.suffix_id if enemy else None
+
+        if objective.type == ObjectiveType.COMBAT:
+            return (
+                (objective.enemy_type_id is None or objective.enemy_type_id == enemy_type_id) and
+                (objective.enemy_prefix_id is None or objective.enemy_prefix_id == enemy_prefix_id) and
+                (objective.enemy_suffix_id is None or objective.enemy_suffix_id == enemy_suffix_id)
+            )
+        if objective.type == ObjectiveType.COMBAT_WITH_ATTACK:
+            return (
+                (objective.enemy_type_id is None or objective.enemy_type_id == enemy_type_id) and
+                objective.attack_type == attack_type
+            )
+        return False
+
     async def update_quest_progress(
-        self, player_id: int, 
-        enemy_type: Optional[str] = None,
-        enemy_prefix: Optional[str] = None,
-        enemy_suffix: Optional[str] = None,
+        self, player_id: int,
+        enemy: Optional[EnemyIdentity] = None,
         attack_type: Optional[str] = None
-    ) -> tuple[List[Tuple[Quest, bool]], int, int]:  # Returns [(Quest, was_completed)], old_level, new_level
+    ) -> QuestProgressResult:
         """Update quest progress after combat
-        
-        Returns:
-            tuple: (list of (Quest, was_completed) tuples, old_level, new_level)
+
+        Reading progress, advancing it, reward claims, level-ups, chain
+        completion and starting the next quest of a chain all run as one
+        write intent, so two combat events for the same player can't both
+        see a quest as one kill short and both complete it. The result
+        carries the progress of every advanced quest so callers don't need
+        to query it again.
         """
-        results = []
-        old_level = 0
-        new_level = 0
-        
-        # Get all active quests
-        async with await self.bot.db_connect() as db:
-            async with db.execute(
-                '''SELECT quest_id, objectives_progress 
-                   FROM active_quests 
-                   WHERE player_id = ? AND completed = FALSE''',
-                (player_id,)
-            ) as cursor:
-                active_quests = await cursor.fetchall()
-
-        for quest_id, objectives_progress in active_quests:
-            # Check if quest still exists in config
-            if quest_id not in self.quests:
-                logger.warning(f"Quest {quest_id} not found in config, skipping. Consider cleaning up database.")
-                continue
-                
-            quest = self.quests[quest_id]
-            progress = json.loads(objectives_progress)
-            was_completed = False
-            updated = False
-
-            # Check each objective
-            for i, objective in enumerate(quest.objectives):
-                if progress[i] >= objective.count:
+        repos = self.bot.repos
+        claimed: List[Quest] = []
+
+        async def advance() -> QuestProgressResult:
+            result = QuestProgressResult()
+            # Get the progress of every objective of every active quest
+            active_progress = await repos.quests.active_progress(player_id)
+
+            increments = []
+            for quest_id, progress in active_progress.items():
+                # Check if quest still exists in config
+                if quest_id not in self.quests:
+                    logger.warning(f"Quest {quest_id} not found in config, skipping. Consider cleaning up database.")
                     continue
 
-                matches = False
-                if objective.type == ObjectiveType.COMBAT:
-                    matches = (
-                        (not objective.enemy_type or objective.enemy_type == enemy_type) and
-                        (not objective.enemy_prefix or objective.enemy_prefix == enemy_prefix) and
-                        (not objective.enemy_suffix or objective.enemy_suffix == enemy_suffix)
-                    )
-                elif objective.type == ObjectiveType.COMBAT_WITH_ATTACK:
-                    matches = (
-                        (not objective.enemy_type or objective.enemy_type == enemy_type) and
-                        objective.attack_type == attack_type
-                    )
-
-                if matches:
-                    progress[i] += 1
-                    updated = True
-
-            if updated:
-                # Check if quest is now complete
-                is_complete = all(progress[i] >= obj.count for i, obj in enumerate(quest.objectives))
-                
-                # Update database
-                async with await self.bot.db_connect() as db:
-                    await db.execute('''
-                        UPDATE active_quests 
-                        SET objectives_progress = ?, completed = ?
-                        WHERE player_id = ? AND quest_id = ?
-                    ''', (json.dumps(progress), is_complete, player_id, quest_id))
-                    await db.commit()
-                
-                results.append((quest, is_complete))
-                was_completed = is_complete
-
-            if was_completed:
-                # Auto-claim rewards when quest is completed
-                reward_result, old_level, new_level = await self.claim_quest_rewards(player_id, quest_id)
-                logger.info(f"Auto-claimed rewards for quest {quest_id} for player {player_id}")
-                
-                # If this completes a chain, record it
-                async with await self.bot.db_connect() as db:
-                    for chain in self.quest_chains.values():
-                        if quest_id == chain.quests[-1].id:
-                            await db.execute('''
-                                INSERT OR IGNORE INTO completed_quest_chains (player_id, chain_id)
-                                VALUES (?, ?)
-                            ''', (player_id, chain.id))
-                    await db.commit()
-                
-                # Auto-start next quest in chain if it exists
-                if quest.next_quest:
-                    next_quest_id = quest.next_quest
-                    # Check if the next quest is available and not already active
-                    async with await self.bot.db_connect() as db:
-                        async with db.execute(
-                            'SELECT 1 FROM active_quests WHERE player_id = ? AND quest_id = ?',
-                            (player_id, next_quest_id)
-                        ) as cursor:
-                            already_active = await cursor.fetchone()
-                        
-                        if not already_active and next_quest_id in self.quests:
-                            next_quest = self.quests[next_quest_id]
-                            
-                            # Get player level for requirement checking
-                            async with db.execute(
-                                'SELECT level FROM players WHERE id = ?',
-                                (player_id,)
-                            ) as cursor:
-                                player_row = await cursor.fetchone()
-                                player_level = player_row[0] if player_row else 1
-                            
-                            # Check if player meets requirements (level only - previous quest is already complete)
-                            can_start = True
-                            if next_quest.requirements:
-                                if next_quest.requirements.get('level', 0) > player_level:
-                                    can_start = False
-                            
-                            if can_start:
-                                # Start the next quest automatically
-                                await self.start_quest(player_id, next_quest_id)
-                                logger.info(f"Auto-started next quest {next_quest_id} for player {player_id}")
-
-        return (results, old_level, new_level)
+                quest = self.quests[quest_id]
+                updated = False
+
+                # Check each objective
+                for i, objective in enumerate(quest.objectives):
+                    current = progress.get(i, 0)
+                    if current >= objective.count:
+                        continue
+                    if self._objective_matches(objective, enemy, attack_type):
+                        progress[i] = current + 1
+                        increments.append((player_id, quest_id, i))
+                        updated = True
+
+                if updated:
+                    values = [progress.get(i, 0) for i in range(len(quest.objectives))]
+                    is_complete = all(value >= obj.count for value, obj in zip(values, quest.objectives))
+                    result.updates.append(QuestProgressUpdate(quest, values, is_complete))
+
+            if not increments:
+                return result
+            await repos.quests.advance(increments)
+
+            for update in result.updates:
+                if update.completed and await self._complete_quest(player_id, update.quest, result):
+                    claimed.append(update.quest)
+            return result
+
+        result = await repos.write(advance)
+
+        for quest in claimed:
+            if quest.rewards.items:
+                self.bot.inventory_cache.invalidate(player_id)
+            logger.info(f"Auto-claimed rewards for quest {quest.id} for player {player_id}")
+        for quest in result.started_quests:
+            logger.info(f"Auto-started next quest {quest.id} for player {player_id}")
+
+        return result
+
+    async def _complete_quest(self, player_id: int, quest: Quest, result: QuestProgressResult) -> bool:
+        """Claim a finished quest's rewards, record its chain and start the next quest.
+
+        Runs inside the caller's transaction. Returns False without doing
+        anything if the rewards were already claimed.
+        """
+        levels = await self._apply_rewards(player_id, quest)
+        if levels is None:
+            return False
+        old_level, new_level = levels
+        result.rewards.append(quest.rewards)
+        if not result.old_level:
+            result.old_level = old_level
+        result.new_level = new_level
+
+        # If this completes a chain, record it
+        for chain in self.quest_chains.values():
+            if quest.id == chain.quests[-1].id:
+                await self.bot.repos.quests.complete_chain(player_id, chain.id)
+
+        # Auto-start next quest in chain if it exists and isn't already active
+        next_quest = self.quests.get(quest.next_quest) if quest.next_quest else None
+        if not next_quest:
+            return True
+        if await self.bot.repos.quests.status(player_id, next_quest.id):
+            return True
+
+        # Level only - the previous quest is already complete
+        if next_quest.requirements and next_quest.requirements.get('level', 0) > new_level:
+            return True
+        await self.bot.repos.quests.insert(player_id, next_quest.id, len(next_quest.objectives))
+        result.started_quests.append(next_quest)
+        return True
+
+    async def _apply_rewards(self, player_id: int, quest: Quest) -> Optional[Tuple[int, int]]:
+        """Mark a quest claimed, grant its rewards and apply level-ups.
+
+        Runs inside the caller's transaction. Returns (old_level, new_level),
+        or None without granting anything if the rewards were already claimed.
+        """
+        repos = self.bot.repos
+        # Mark quest as completed and rewards claimed (keep it in active_quests for quest chain tracking).
+        # The update only matches an unclaimed quest, so it decides which caller pays out.
+        if not await repos.quests.mark_claimed(player_id, quest.id):
+            return None
+
+        progression = await repos.players.progression(player_id) or Progression(1, 0, 100, 100)
+        old_level = progression.level
+
+        # Convert accumulated XP into level increases and update stats
+        progression.xp += quest.rewards.xp
+        while progression.xp >= (progression.level * 100):
+            progression.xp -= progression.level * 100
+            progression.level += 1
+            progression.max_health += 10
+            progression.max_mana += 5
+
+        # Leveling up restores health and mana
+        leveled_up = progression.level > old_level
+        await repos.players.grant(player_id, progression, quest.rewards.gold, leveled_up)
+        if leveled_up:
+            logger.info(f"Leveled up player {player_id} from level {old_level} to level {progression.level}")
+
+        # Add items to inventory
+        if quest.rewards.items:
+            await repos.inventory.add(player_id, [(item['id'], item['count']) for item in quest.rewards.items])
+
+        # Add title if any
+        if quest.rewards.title:
+            await repos.quests.add_title(player_id, quest.rewards.title)
+
+        return old_level, progression.level
 
     async def claim_quest_rewards(self, player_id: int, quest_id: str) -> tuple[Optional[QuestReward], int, int]:
         """Claim rewards for a completed quest
-        
+
         Returns:
             tuple: (QuestReward or None, old_level, new_level)
         """
-        # Check if quest is completed and rewards aren't claimed
-        async with await self.bot.db_connect() as db:
-            async with db.execute(
-                '''SELECT completed, rewards_claimed 
-                   FROM active_quests 
-                   WHERE player_id = ? AND quest_id = ?''',
-                (player_id, quest_id)
-            ) as cursor:
-                result = await cursor.fetchone()
-                if not result or not result[0] or result[1]:
-                    return (None, 0, 0)
-
-            quest = self.quests[quest_id]
-            
-            # Get current level before applying rewards
-            async with db.execute('SELECT level FROM players WHERE id = ?', (player_id,)) as cursor:
-                old_level_row = await cursor.fetchone()
-                old_level = old_level_row[0] if old_level_row else 1
-            
-            # Update player stats
-            await db.execute('''
-                UPDATE players 
-                SET xp = xp + ?, gold = gold + ?
-                WHERE id = ?
-            ''', (quest.rewards.xp, quest.rewards.gold, player_id))
-
-            # Add items to inventory
-            for item in quest.rewards.items:
-                await db.execute('''
-                    INSERT INTO inventory (player_id, item_id, count)
-                    VALUES (?, ?, ?)
-                    ON CONFLICT(player_id, item_id) DO UPDATE SET
-                    count = count + ?
-                ''', (player_id, item['id'], item['count'], item['count']))
-
-            # Add title if any
-            if quest.rewards.title:
-                await db.execute('''
-                    INSERT OR IGNORE INTO player_titles (player_id, title_id)
-                    VALUES (?, ?)
-                ''', (player_id, quest.rewards.title))
-
-            # Mark quest as completed and rewards claimed (keep it in active_quests for quest chain tracking)
-            await db.execute('''
-                UPDATE active_quests 
-                SET completed = 1, rewards_claimed = 1
-                WHERE player_id = ? AND quest_id = ?
-            ''', (player_id, quest_id))
-
-            await db.commit()
-            logger.info(f"Claimed rewards and marked quest {quest_id} as completed for player {player_id}")
-
-            # Handle level ups: convert accumulated XP into level increases and update stats
-            async with db.execute('SELECT level, xp, max_health, max_mana FROM players WHERE id = ?', (player_id,)) as cursor:
-                row = await cursor.fetchone()
-            if row:
-                cur_level, cur_xp, cur_max_health, cur_max_mana = row
-                leveled = False
-                # Apply level ups while XP threshold met
-                while cur_xp >= (cur_level * 100):
-                    xp_needed = cur_level * 100
-                    cur_xp -= xp_needed
-                    cur_level += 1
-                    cur_max_health += 10
-                    cur_max_mana += 5
-                    leveled = True
-
-                if leveled:
-                    # Update player's level and stats in DB
-                    await db.execute('''
-                        UPDATE players
-                        SET level = ?, xp = ?, max_health = ?, health = ?, max_mana = ?, mana = ?
-                        WHERE id = ?
-                    ''', (cur_level, cur_xp, cur_max_health, cur_max_health, cur_max_mana, cur_max_mana, player_id))
-                    await db.commit()
-                    logger.info(f"Leveled up player {player_id} from level {old_level} to level {cur_level}")
-                    return (quest.rewards, old_level, cur_level)
-
-            return (quest.rewards, old_level, old_level)
\ No newline at end of file
+        quest = self.quests.get(quest_id)
+        if not quest:
+            return (None, 0, 0)
+
+        async def claim() -> Optional[Tuple[int, int]]:
+            # Check if quest is completed and rewards aren't claimed
+            status = await self.bot.repos.quests.status(player_id, quest_id)
+            if not status or not status.completed or status.rewards_claimed:
+                return None
+            return await self._apply_rewards(player_id, quest)
+
+        levels = await self.bot.repos.write(claim)
+        if levels is None:
+            return (None, 0, 0)
+        old_level, new_level = levels
+        if quest.rewards.items:
+            self.bot.inventory_cache.invalidate(player_id)
+
+        logger.info(f"Claimed rewards and marked quest {quest_id} as completed for player {player_id}")
+        return (quest.rewards, old_level, new_level)
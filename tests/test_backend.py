@@ -0,0 +1,59 @@
+"""
+Unit tests for the storage backends
+"""
+import unittest
+import asyncio
+import os
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.db.backend import MemoryBackend, SQLiteBackend, create_backend
+from src.db.migrations import migrate
+
+
+class TestBackend(unittest.TestCase):
+    """Test backend selection and that in-memory databases behave like files"""
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+
+    def tearDown(self):
+        self.loop.close()
+
+    def test_create_backend(self):
+        sqlite = create_backend('sqlite', '/app/data/willowbot.db')
+        self.assertIsInstance(sqlite, SQLiteBackend)
+        self.assertEqual(sqlite.archive_path, '/app/data/willowbot_archive.db')
+        self.assertIsInstance(create_backend('MEMORY', '/app/data/willowbot.db'), MemoryBackend)
+        with self.assertRaises(ValueError):
+            create_backend('postgres', '/app/data/willowbot.db')
+
+    def test_memory_database_is_shared_and_isolated(self):
+        async def run():
+            storage, other = MemoryBackend(), MemoryBackend()
+            storage.open()
+            other.open()
+            pool = storage.create_pool(size=2)
+            async with pool.acquire() as db:
+                await migrate(db)
+                await db.execute("INSERT INTO players (id, name) VALUES (1, 'Ghost')")
+                await db.commit()
+            await pool.close()
+
+            # The data outlives the pool and is visible to new connections...
+            async with storage.connect() as db:
+                async with db.execute('SELECT name FROM players') as cursor:
+                    self.assertEqual(await cursor.fetchall(), [('Ghost',)])
+            # ...but not to another backend
+            async with other.connect() as db:
+                async with db.execute("SELECT name FROM sqlite_master WHERE type = 'table'") as cursor:
+                    self.assertEqual(await cursor.fetchall(), [])
+            storage.close()
+            other.close()
+
+        self.loop.run_until_complete(run())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+"""
+Unit tests for equipment stat totals stored on the players row
+"""
+import unittest
+import asyncio
+import os
+import random
+import sys
+from unittest.mock import Mock
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.db.backend import MemoryBackend
+from src.db.migrations import migrate
+from src.db.repository import Repositories
+from src.models.combat import CombatEntity
+from src.models.equipment import EquipmentSlots
+from src.models.game_data import GameData
+from src.models.inventory_cache import InventoryCache
+from src.models.inventory_manager import InventoryManager
+from src.models.player_state import PlayerStateCache
+
+
+class TestEquipmentStats(unittest.TestCase):
+    """Test that equipment totals are stored on change and checked on demand"""
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.storage = MemoryBackend()
+        self.storage.open()
+        self.bot = Mock()
+        self.bot.game_data = GameData.load()
+        self.bot.db_pool = self.storage.create_pool(size=2)
+        self.bot.repos = Repositories(self.bot.db_pool)
+        self.bot.inventory_cache = InventoryCache()
+        self.bot.player_states = PlayerStateCache(self.bot.repos)
+        self.manager = InventoryManager(self.bot)
+        self.weapon = self.manager.items['weapon_1']
+        self.loop.run_until_complete(self._init_db())
+
+    def tearDown(self):
+        self.loop.run_until_complete(self.bot.db_pool.close())
+        self.loop.close()
+        self.storage.close()
+
+    async def _init_db(self):
+        async with self.bot.db_pool.acquire() as db:
+            await migrate(db)
+            await db.execute("INSERT INTO players (id, name, level) VALUES (1, 'Knight', 3)")
+            await db.commit()
+
+    def test_totals_are_stored_and_loaded(self):
+        async def run():
+            equipment = EquipmentSlots()
+            equipment.equip(self.weapon, 'weapon')
+            await self.manager.save_equipment(1, equipment)
+
+            # Combat gets the totals straight from the row
+            player = await self.bot.repos.players.load(1)
+            self.assertEqual((player.damage_bonus, player.crit_chance_bonus), (5, 5))
+            self.assertEqual(player.max_health, 120)
+            self.assertEqual(await self.manager.check_player_stats(1), {})
+
+        self.loop.run_until_complete(run())
+
+    def test_checker_repairs_drift(self):
+        async def run():
+            equipment = EquipmentSlots()
+            equipment.equip(self.weapon, 'weapon')
+            await self.bot.repos.write(lambda: self.bot.repos.inventory.save_equipment(1, equipment))
+
+            # Equipment written without its totals
+            drift = await self.manager.check_player_stats(1)
+            self.assertEqual(drift['damage_bonus'], (0, 5))
+            self.assertEqual(drift['max_health'], (100, 120))
+            self.assertEqual((await self.bot.repos.players.load(1)).damage_bonus, 5)
+            self.assertEqual(await self.manager.check_player_stats(1), {})
+            self.assertIsNone(await self.manager.check_player_stats(2))
+
+        self.loop.run_until_complete(run())
+
+
+    def test_crit_bonus_is_a_percentage(self):
+        async def run():
+            equipment = EquipmentSlots()
+            equipment.equip(self.weapon, 'weapon')
+            await self.manager.save_equipment(1, equipment)
+            player = await self.bot.repos.players.load(1)
+            player.mana = 10 ** 6
+            slash = player.basic_attacks[0]
+            dummy = CombatEntity('Dummy', 10 ** 9, 10 ** 9, 0, 0, 1, [])
+
+            random.seed(5)
+            hits = [result for result in (slash.execute(player, dummy) for _ in range(4000)) if result['success']]
+            crit_rate = sum(result['is_crit'] for result in hits) / len(hits)
+            # 15% for the attack plus weapon_1's 5 points
+            self.assertLess(crit_rate, 1)
+            self.assertAlmostEqual(crit_rate, 0.20, delta=0.03)
+
+        self.loop.run_until_complete(run())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+"""
+Unit tests for the process-wide game data registry
+"""
+import unittest
+import os
+import shutil
+import sys
+import tempfile
+import yaml
+from dataclasses import FrozenInstanceError
+from pathlib import Path
+from unittest.mock import Mock, patch
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.models.combat import MAX_ENEMY_ID
+from src.models.enemy import EnemyGenerator
+from src.models.game_data import CONFIG_DIR, SNAPSHOT_NAME, SOURCE_FILES, GameData
+from src.models.inventory_manager import InventoryManager
+from src.models.quest_manager import QuestManager
+
+
+class TestGameData(unittest.TestCase):
+    """Test the read-only registry, its snapshot and manager construction without file I/O"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.game_data = GameData.load()
+
+    def test_registry_is_read_only(self):
+        self.assertIn('quest_1_1', self.game_data.quests)
+        self.assertTrue(self.game_data.items)
+        with self.assertRaises(TypeError):
+            self.game_data.items['new_item'] = None
+        with self.assertRaises(AttributeError):
+            self.game_data.quests = {}
+        # Shared definitions can't pick up one player's state
+        quest = self.game_data.quests['quest_1_1']
+        with self.assertRaises(FrozenInstanceError):
+            quest.objectives_progress = [1]
+        with self.assertRaises(TypeError):
+            quest.requirements['level'] = 99
+        self.assertIsInstance(quest.objectives, tuple)
+        self.assertIsInstance(self.game_data.quest_chains['chain_1'].quests, tuple)
+        reward = next(q.rewards for q in self.game_data.quests.values() if q.rewards.items)
+        with self.assertRaises(TypeError):
+            reward.items[0]['count'] = 99
+
+    def test_managers_share_it_without_reading_files(self):
+        bot = Mock()
+        bot.game_data = self.game_data
+        with patch('builtins.open', side_effect=AssertionError('config read from disk')):
+            inventory = InventoryManager(bot)
+            quests = QuestManager(bot)
+            enemies = EnemyGenerator(self.game_data.enemies, self.game_data.enemy_catalog)
+        self.assertIs(inventory.items, self.game_data.items)
+        self.assertIs(quests.quests, self.game_data.quests)
+        self.assertIs(enemies.catalog, self.game_data.enemy_catalog)
+        self.assertTrue(enemies.generate_enemy(3).is_alive())
+
+    def test_snapshot_is_used_until_sources_change(self):
+        config_dir = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, config_dir)
+        for name in SOURCE_FILES:
+            shutil.copy(CONFIG_DIR / name, config_dir / name)
+
+        compiled = GameData.compile(config_dir)
+        self.assertTrue((config_dir / SNAPSHOT_NAME).exists())
+        with patch('src.models.game_data._read_yaml', side_effect=AssertionError('YAML parsed')):
+            loaded = GameData.load(config_dir)
+        self.assertEqual(loaded.items, compiled.items)
+        self.assertEqual(loaded.quests, compiled.quests)
+        with self.assertRaises(TypeError):
+            loaded.quests['quest_1_1'].requirements['level'] = 99
+
+        # An edited source is parsed again and the snapshot rebuilt
+        items = config_dir / 'items.yaml'
+        items.write_text(items.read_text().replace(
+            f"name: {compiled.items['weapon_1'].name}", 'name: Renamed Blade', 1
+        ))
+        self.assertEqual(GameData.load(config_dir).items['weapon_1'].name, 'Renamed Blade')
+        with patch('src.models.game_data._read_yaml', side_effect=AssertionError('YAML parsed')):
+            self.assertEqual(GameData.load(config_dir).items['weapon_1'].name, 'Renamed Blade')
+
+
+    def test_enemy_ids_must_fit_the_packed_key(self):
+        config_dir = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, config_dir)
+        for name in SOURCE_FILES:
+            shutil.copy(CONFIG_DIR / name, config_dir / name)
+        enemies = yaml.safe_load((config_dir / 'enemies.yaml').read_text())
+        prefixes = enemies['affixes']['prefixes']
+        prefixes.extend(
+            dict(prefixes[0], name=f'Extra {i}') for i in range(MAX_ENEMY_ID + 1 - len(prefixes))
+        )
+        (config_dir / 'enemies.yaml').write_text(yaml.safe_dump(enemies))
+
+        with self.assertRaisesRegex(ValueError, f'{MAX_ENEMY_ID + 1} prefixes'):
+            GameData.parse(config_dir)
+
+if __name__ == '__main__':
+    unittest.main()
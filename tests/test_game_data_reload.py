@@ -0,0 +1,98 @@
+"""
+Unit tests for swapping in reloaded game data at runtime
+"""
+import unittest
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+from unittest.mock import Mock
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.db.backend import MemoryBackend
+from src.db.migrations import migrate
+from src.db.repository import Repositories
+from src.models.game_data import CONFIG_DIR, SOURCE_FILES, GameData
+from src.models.game_data_reloader import GameDataReloader
+from src.models.inventory_manager import InventoryManager
+
+
+class TestGameDataReload(unittest.TestCase):
+    """Test that a reload reaches the managers while open fights keep their data"""
+
+    def setUp(self):
+        self.config_dir = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.config_dir)
+        for name in SOURCE_FILES:
+            shutil.copy(CONFIG_DIR / name, self.config_dir / name)
+
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.storage = MemoryBackend()
+        self.storage.open()
+        self.bot = Mock()
+        self.bot.game_data = GameData.load(self.config_dir)
+        self.bot.db_pool = self.storage.create_pool(size=2)
+        self.bot.repos = Repositories(self.bot.db_pool)
+        self.reloader = GameDataReloader(self.bot, self.config_dir, poll_seconds=1)
+        self.loop.run_until_complete(self._init_db())
+
+    def tearDown(self):
+        self.loop.run_until_complete(self.bot.db_pool.close())
+        self.loop.close()
+        self.storage.close()
+
+    async def _init_db(self):
+        async with self.bot.db_pool.acquire() as db:
+            await migrate(db)
+            await db.commit()
+
+    def _edit(self, name: str, old: str, new: str):
+        path = self.config_dir / name
+        path.write_text(path.read_text().replace(old, new, 1))
+
+    async def _lookup_names(self):
+        async with self.bot.db_pool.acquire() as db:
+            async with db.execute(
+                "SELECT name FROM enemy_lookup WHERE kind = 'name' AND type_id = 1 ORDER BY id"
+            ) as cursor:
+                return [row[0] for row in await cursor.fetchall()]
+
+    def test_watcher_swaps_in_edits(self):
+        async def run():
+            manager = InventoryManager(self.bot)
+            # A fight keeps the generation it started with
+            session = {'game_data': self.bot.game_data}
+            name = manager.items['weapon_1'].name
+
+            self._edit('items.yaml', f'name: {name}', 'name: Rebalanced Blade')
+            self._edit('enemies.yaml', '  - Boar\n', '  - Boar\n  - Jackal\n')
+            await self.reloader.watch()
+
+            self.assertEqual(self.reloader.generation, 2)
+            self.assertEqual(manager.items['weapon_1'].name, 'Rebalanced Blade')
+            self.assertEqual(session['game_data'].items['weapon_1'].name, name)
+            self.assertEqual((await self._lookup_names())[-1], 'Jackal')
+
+            # Nothing changed since, so polling again does not reload
+            await self.reloader.watch()
+            self.assertEqual(self.reloader.generation, 2)
+
+        self.loop.run_until_complete(run())
+
+    def test_reordered_enemies_are_refused(self):
+        async def run():
+            current = self.bot.game_data
+            self._edit('enemies.yaml', '  - Wolf\n  - Bear\n', '  - Bear\n  - Wolf\n')
+            with self.assertRaises(ValueError):
+                await self.reloader.reload()
+            self.assertIs(self.bot.game_data, current)
+            self.assertEqual(self.reloader.generation, 1)
+
+        self.loop.run_until_complete(run())
+
+
+if __name__ == '__main__':
+    unittest.main()
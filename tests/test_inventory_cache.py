@@ -0,0 +1,107 @@
+"""
+Unit tests for the shared inventory and equipment cache
+"""
+import unittest
+import asyncio
+import os
+import sys
+from unittest.mock import Mock
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.db.backend import MemoryBackend
+from src.db.migrations import migrate
+from src.db.repository import Repositories
+from src.models.game_data import GameData
+from src.models.inventory_cache import InventoryCache
+from src.models.inventory_manager import InventoryManager
+
+
+class TestInventoryCache(unittest.TestCase):
+    """Test that managers share cached rows and writers keep them current"""
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.storage = MemoryBackend()
+        self.storage.open()
+        self.bot = Mock()
+        self.bot.game_data = GameData.load()
+        self.bot.db_pool = self.storage.create_pool(size=2)
+        self.bot.repos = Repositories(self.bot.db_pool)
+        self.bot.inventory_cache = InventoryCache(max_players=2)
+        # Each cog builds its own manager; both must see the same cache
+        self.combat = InventoryManager(self.bot)
+        self.inventory = InventoryManager(self.bot)
+        self.potion = next(item for item in self.combat.items.values() if item.stackable)
+        self.loop.run_until_complete(self._init_db())
+
+    def tearDown(self):
+        self.loop.run_until_complete(self.bot.db_pool.close())
+        self.loop.close()
+        self.storage.close()
+
+    async def _init_db(self):
+        async with self.bot.db_pool.acquire() as db:
+            await migrate(db)
+            await db.executemany(
+                'INSERT INTO players (id, name) VALUES (?, ?)',
+                [(1, 'Hoarder'), (2, 'Looter'), (3, 'Trader')]
+            )
+            await db.execute(
+                'INSERT INTO inventory (player_id, item_id, count) VALUES (1, ?, 2)', (self.potion.id,)
+            )
+            await db.commit()
+
+    def _reads(self):
+        stats = dict(self.bot.repos.statements.snapshot()).get('inventory.stacks')
+        return stats.calls if stats else 0
+
+    def test_reads_are_shared_and_saves_update(self):
+        async def run():
+            cache = self.bot.inventory_cache
+            self.assertEqual(await self.combat.get_stacks(1), ((self.potion.id, 2),))
+            inventory = await self.inventory.get_inventory(1)
+            self.assertEqual(inventory.get_item_count(self.potion.id), 2)
+            self.assertEqual((cache.stats.misses, cache.stats.hits, self._reads()), (1, 1, 1))
+
+            # A save replaces the cached rows instead of forcing a reload
+            inventory.add_item(self.potion, 3)
+            await self.inventory.save_inventory(inventory)
+            self.assertEqual(await self.combat.get_stacks(1), ((self.potion.id, 5),))
+            self.assertEqual(self._reads(), 1)
+
+            # Direct writes invalidate, and the next read goes to the database
+            await self.bot.repos.write(lambda: self.bot.repos.inventory.consume(1, self.potion.id))
+            self.combat.invalidate(1)
+            self.assertEqual(await self.inventory.get_stacks(1), ((self.potion.id, 4),))
+            self.assertEqual(self._reads(), 2)
+
+            equipment = await self.combat.get_equipment(1)
+            self.assertIsNone(equipment.weapon)
+            # Every caller gets its own objects to mutate
+            self.assertIsNot(await self.inventory.get_equipment(1), equipment)
+            self.assertEqual(cache.stats.hits, 3)
+
+        self.loop.run_until_complete(run())
+
+    def test_lru_eviction_and_stale_fills(self):
+        async def run():
+            cache = self.bot.inventory_cache
+            for player_id in (1, 2, 1, 3):
+                await self.combat.get_stacks(player_id)
+            # Player 1 was used more recently than 2, so 2 was evicted
+            self.assertIn(1, cache)
+            self.assertNotIn(2, cache)
+            self.assertEqual(cache.stats.evictions, 1)
+
+            # A read that raced a committed write must not overwrite it
+            generation = cache.generation
+            cache.put_stacks(2, (('fresh', 1),))
+            cache.fill_stacks(2, (('stale', 1),), generation)
+            self.assertEqual(cache.stacks(2), (('fresh', 1),))
+
+        self.loop.run_until_complete(run())
+
+
+if __name__ == '__main__':
+    unittest.main()
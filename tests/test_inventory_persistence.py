@@ -0,0 +1,79 @@
+"""
+Unit tests for delta-based inventory persistence
+"""
+import unittest
+import asyncio
+import os
+from unittest.mock import Mock
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.db.backend import MemoryBackend
+from src.db.migrations import migrate
+from src.db.repository import Repositories
+from src.models.game_data import GameData
+from src.models.inventory_cache import InventoryCache
+from src.models.inventory_manager import InventoryManager
+
+
+class TestInventoryPersistence(unittest.TestCase):
+    """Test that saving an inventory only writes the slots that changed"""
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.storage = MemoryBackend()
+        self.storage.open()
+        self.bot = Mock()
+        self.bot.game_data = GameData.load()
+        self.bot.db_pool = self.storage.create_pool(size=2)
+        self.bot.repos = Repositories(self.bot.db_pool)
+        self.bot.inventory_cache = InventoryCache()
+        self.manager = InventoryManager(self.bot)
+        self.potion, self.other = list(self.manager.items.values())[:2]
+        self.loop.run_until_complete(self._init_db())
+
+    def tearDown(self):
+        self.loop.run_until_complete(self.bot.db_pool.close())
+        self.loop.close()
+        self.storage.close()
+
+    async def _init_db(self):
+        async with self.bot.db_pool.acquire() as db:
+            await migrate(db)
+            await db.execute("INSERT INTO players (id, name) VALUES (1, 'Hoarder')")
+            await db.executemany(
+                'INSERT INTO inventory (player_id, item_id, count) VALUES (1, ?, ?)',
+                [(self.potion.id, 2), (self.other.id, 1)]
+            )
+            await db.commit()
+
+    async def _rows(self):
+        async with self.bot.db_pool.acquire() as db:
+            async with db.execute(
+                'SELECT item_id, count FROM inventory WHERE player_id = 1 ORDER BY item_id'
+            ) as cursor:
+                return dict(await cursor.fetchall())
+
+    def test_only_changed_slots_are_written(self):
+        async def run():
+            inventory = await self.manager.get_inventory(1)
+            self.assertEqual(inventory.pending_changes(), ([], []))
+
+            inventory.add_item(self.potion, 3)
+            inventory.remove_item(self.other.id, 1)
+            self.assertEqual(inventory.pending_changes(), ([(self.potion.id, 5)], [self.other.id]))
+
+            async with self.bot.db_pool.acquire() as db:
+                changes = db.total_changes
+                await self.manager.save_inventory(inventory)
+                self.assertEqual(db.total_changes - changes, 2)
+
+            self.assertEqual(await self._rows(), {self.potion.id: 5})
+            self.assertEqual(inventory.pending_changes(), ([], []))
+
+        self.loop.run_until_complete(run())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+"""
+Unit tests for the item index and the loot and gear code using it
+"""
+import unittest
+import asyncio
+import os
+import sys
+from unittest.mock import Mock
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.db.backend import MemoryBackend
+from src.db.migrations import migrate
+from src.db.repository import Repositories
+from src.models.game_data import GameData
+from src.models.inventory import ItemRarity, ItemType
+from src.models.inventory_cache import InventoryCache
+from src.models.inventory_manager import InventoryManager
+from src.models.player_state import PlayerStateCache
+
+
+class TestItemIndex(unittest.TestCase):
+    """Test index queries against a scan of the catalog"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.game_data = GameData.load()
+        cls.index = cls.game_data.item_index
+
+    def test_range_queries_match_a_scan(self):
+        items = self.game_data.items.values()
+        found = self.index.find(ItemType.WEAPON, ItemRarity.RARE, min_level=3, max_level=9)
+        self.assertEqual(
+            {item.id for item in found},
+            {item.id for item in items if item.type == ItemType.WEAPON and item.rarity == ItemRarity.RARE
+             and 3 <= item.level_requirement <= 9}
+        )
+        levels = [item.level_requirement for item in self.index.find(rarity=ItemRarity.EPIC)]
+        self.assertEqual(levels, sorted(levels))
+        self.assertEqual(len(self.index.find()), len(self.game_data.items))
+        self.assertEqual(self.index.catalog[0].rarity, ItemRarity.LEGENDARY)
+
+
+class TestAutoEquip(unittest.TestCase):
+    """Test that grouping the inventory by slot type still fills both ring slots"""
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.storage = MemoryBackend()
+        self.storage.open()
+        self.bot = Mock()
+        self.bot.game_data = GameData.load()
+        self.bot.db_pool = self.storage.create_pool(size=2)
+        self.bot.repos = Repositories(self.bot.db_pool)
+        self.bot.inventory_cache = InventoryCache()
+        self.bot.player_states = PlayerStateCache(self.bot.repos)
+        self.manager = InventoryManager(self.bot)
+        self.loop.run_until_complete(self._init_db())
+
+    def tearDown(self):
+        self.loop.run_until_complete(self.bot.db_pool.close())
+        self.loop.close()
+        self.storage.close()
+
+    async def _init_db(self):
+        async with self.bot.db_pool.acquire() as db:
+            await migrate(db)
+            await db.execute("INSERT INTO players (id, name, level) VALUES (1, 'Jeweler', 5)")
+            await db.executemany(
+                'INSERT INTO inventory (player_id, item_id, count) VALUES (1, ?, 1)',
+                [('ring_1',), ('ring_2',), ('ring_4',), ('weapon_1',)]
+            )
+            await db.commit()
+
+    def test_best_usable_gear_is_equipped(self):
+        async def run():
+            await self.manager.auto_equip_better_gear(1)
+            equipment = await self.manager.get_equipment(1)
+            self.assertEqual(equipment.weapon.id, 'weapon_1')
+            # ring_4 needs level 7
+            self.assertEqual({equipment.ring1.id, equipment.ring2.id}, {'ring_1', 'ring_2'})
+            inventory = await self.manager.get_inventory(1)
+            self.assertEqual(set(inventory.slots), {'ring_4'})
+
+        self.loop.run_until_complete(run())
+
+
+if __name__ == '__main__':
+    unittest.main()
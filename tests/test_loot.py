@@ -0,0 +1,77 @@
+"""
+Unit tests for alias-table sampling and the loot tables from loot.yaml
+"""
+import unittest
+import os
+import random
+import sys
+from collections import Counter
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.models.game_data import GameData, parse_loot, validate
+from src.models.loot import AliasTable
+
+
+class TestLoot(unittest.TestCase):
+    """Test the compiled tables against the weights they were built from"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.game_data = GameData.load()
+
+    def _implied(self, table: AliasTable) -> dict:
+        """Exact probability of each outcome encoded by the table"""
+        n = len(table)
+        implied = Counter()
+        for i, outcome in enumerate(table.outcomes):
+            implied[outcome] += table.probabilities[i] / n
+            implied[table.outcomes[table.aliases[i]]] += (1 - table.probabilities[i]) / n
+        return implied
+
+    def test_alias_table_encodes_the_weights(self):
+        table = AliasTable(['a', 'b', 'c', None], [5, 1, 0, 2])
+        for outcome, expected in {'a': 0.625, 'b': 0.125, 'c': 0.0, None: 0.25}.items():
+            self.assertAlmostEqual(self._implied(table)[outcome], expected)
+
+        draws = Counter(table.draw_many(40000, random.Random(7)))
+        self.assertNotIn('c', draws)
+        self.assertAlmostEqual(draws['a'] / 40000, 0.625, delta=0.01)
+        with self.assertRaises(ValueError):
+            AliasTable(['a'], [0])
+
+    def test_bands_pools_and_chances(self):
+        loot = parse_loot({
+            'pools': {'potions': ['consumable_1', 'consumable_2']},
+            'tables': {
+                'default': [
+                    {'gold_per_level': [2, 4], 'drops': [{'weights': {'weapon_2': 1}}]},
+                    {'max_level': 3, 'gold_per_level': [1, 1], 'drops': [
+                        {'chance': 0.5, 'weights': {'potions': 1}}
+                    ]},
+                ],
+                'Beast': [{'gold_per_level': [0, 0], 'drops': [{'weights': {'weapon_1': 1}}]}],
+            }
+        })
+        low = loot.band('Undead', 3)
+        self.assertEqual(low.max_level, 3)
+        implied = self._implied(low.drops[0])
+        self.assertAlmostEqual(implied['consumable_1'], 0.25)
+        self.assertAlmostEqual(implied[None], 0.5)
+        self.assertEqual(loot.roll('Undead', 4, random.Random(1))[0], [('weapon_2', 1)])
+        self.assertEqual(loot.roll('Beast', 9), ([('weapon_1', 1)], 0))
+
+        drops = loot.roll_many('Undead', 2, 1000, random.Random(3))
+        self.assertEqual({gold for _, gold in drops}, {2})
+        self.assertTrue(400 < sum(1 for items, _ in drops if items) < 600)
+
+    def test_shipped_tables(self):
+        self.assertEqual(validate(self.game_data), [])
+        for level in (1, 5, 12):
+            for items, gold in self.game_data.loot.roll_many('Beast', level, 200):
+                self.assertIn(len(items), (2, 3))
+                self.assertTrue(15 * level <= gold <= 30 * level)
+                self.assertTrue(all(item_id in self.game_data.items for item_id, _ in items))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,165 @@
+"""
+Unit tests for the versioned schema migrations
+"""
+import unittest
+import asyncio
+import os
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.db.backend import MemoryBackend
+from src.db.migrations import migrate, get_schema_version, LATEST_VERSION
+
+
+class TestMigrations(unittest.TestCase):
+    """Test schema creation and upgrades keyed on PRAGMA user_version"""
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.storage = MemoryBackend()
+        self.storage.open()
+
+    def tearDown(self):
+        self.loop.close()
+        self.storage.close()
+
+    async def _columns(self, db, table):
+        async with db.execute(f'PRAGMA table_info({table})') as cursor:
+            return [row[1] for row in await cursor.fetchall()]
+
+    async def _tables(self, db):
+        async with db.execute("SELECT name FROM sqlite_master WHERE type = 'table'") as cursor:
+            return {row[0] for row in await cursor.fetchall()}
+
+    def test_fresh_database(self):
+        """A new database gets the full schema and the latest version"""
+        async def run():
+            async with self.storage.connect() as db:
+                version = await migrate(db)
+                self.assertEqual(version, LATEST_VERSION)
+                self.assertEqual(await get_schema_version(db), LATEST_VERSION)
+                tables = await self._tables(db)
+                for table in ('players', 'inventory', 'equipment', 'active_quests',
+                              'player_kills', 'death_history', 'completed_quest_chains',
+                              'player_titles'):
+                    self.assertIn(table, tables)
+
+        self.loop.run_until_complete(run())
+
+    def test_legacy_database_is_upgraded(self):
+        """Databases created before gold/deaths existed get the columns added"""
+        async def run():
+            async with self.storage.connect() as db:
+                await db.execute('''
+                    CREATE TABLE players (
+                        id INTEGER PRIMARY KEY,
+                        name TEXT NOT NULL,
+                        level INTEGER DEFAULT 1
+                    )
+                ''')
+                await db.execute("INSERT INTO players (id, name) VALUES (1, 'Old')")
+                await db.commit()
+
+                await migrate(db)
+
+                columns = await self._columns(db, 'players')
+                for column in ('gold', 'current_title', 'deaths'):
+                    self.assertIn(column, columns)
+                async with db.execute('SELECT name, gold, deaths FROM players WHERE id = 1') as cursor:
+                    self.assertEqual(await cursor.fetchone(), ('Old', 0, 0))
+
+        self.loop.run_until_complete(run())
+
+    def test_kill_counter_is_backfilled(self):
+        """Existing kill history is folded into players.kills and the rollup"""
+        async def run():
+            async with self.storage.connect() as db:
+                await db.execute('''
+                    CREATE TABLE players (
+                        id INTEGER PRIMARY KEY,
+                        name TEXT NOT NULL
+                    )
+                ''')
+                await db.execute('''
+                    CREATE TABLE player_kills (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        player_id INTEGER,
+                        enemy_name TEXT NOT NULL,
+                        enemy_level INTEGER NOT NULL,
+                        killed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                    )
+                ''')
+                await db.execute("INSERT INTO players (id, name) VALUES (1, 'Grinder'), (2, 'Newbie')")
+                await db.executemany(
+                    'INSERT INTO player_kills (player_id, enemy_name, enemy_level) VALUES (?, ?, ?)',
+                    [(1, 'Fierce Bear', 1)] * 3 + [(1, 'Nameless Horror', 2)]
+                )
+                await db.commit()
+
+                await migrate(db)
+
+                async with db.execute('SELECT id, kills FROM players ORDER BY id') as cursor:
+                    self.assertEqual(await cursor.fetchall(), [(1, 4), (2, 0)])
+                # Legacy names are converted to enemy IDs; unknown names map to type 0
+                # and keep their text in enemy_legacy_names
+                self.assertNotIn('enemy_name', await self._columns(db, 'player_kills'))
+                async with db.execute('''
+                    SELECT player_id, enemy_type_id, enemy_name_id, enemy_prefix_id, enemy_suffix_id,
+                           enemy_level, kill_count
+                    FROM player_kill_rollup ORDER BY enemy_level
+                ''') as cursor:
+                    self.assertEqual(await cursor.fetchall(), [(1, 1, 2, 1, 0, 1, 3), (1, 0, 1, 0, 0, 2, 1)])
+                async with db.execute('''
+                    SELECT l.name FROM player_kills AS k
+                    JOIN enemy_legacy_names AS l ON k.enemy_type_id = 0 AND l.id = k.enemy_name_id
+                ''') as cursor:
+                    self.assertEqual(await cursor.fetchall(), [('Nameless Horror',)])
+
+        self.loop.run_until_complete(run())
+
+    def test_quest_progress_json_is_normalized(self):
+        """JSON objective progress becomes one row per objective"""
+        async def run():
+            async with self.storage.connect() as db:
+                await db.execute('''
+                    CREATE TABLE active_quests (
+                        player_id INTEGER,
+                        quest_id TEXT,
+                        completed BOOLEAN DEFAULT FALSE,
+                        rewards_claimed BOOLEAN DEFAULT FALSE,
+                        objectives_progress TEXT,
+                        PRIMARY KEY (player_id, quest_id)
+                    )
+                ''')
+                await db.execute('''
+                    INSERT INTO active_quests (player_id, quest_id, objectives_progress)
+                    VALUES (1, 'beast_hunt', '[2, 0]'), (1, 'broken', 'not json')
+                ''')
+                await db.commit()
+
+                await migrate(db)
+
+                self.assertNotIn('objectives_progress', await self._columns(db, 'active_quests'))
+                async with db.execute(
+                    'SELECT quest_id, objective_index, progress FROM quest_objective_progress'
+                ) as cursor:
+                    self.assertEqual(await cursor.fetchall(), [('beast_hunt', 0, 2), ('beast_hunt', 1, 0)])
+
+        self.loop.run_until_complete(run())
+
+    def test_up_to_date_database_is_untouched(self):
+        """Running migrations twice is a no-op"""
+        async def run():
+            async with self.storage.connect() as db:
+                await migrate(db)
+                changes = db.total_changes
+                self.assertEqual(await migrate(db), LATEST_VERSION)
+                self.assertEqual(db.total_changes, changes)
+                self.assertFalse(db.in_transaction)
+
+        self.loop.run_until_complete(run())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+"""
+Unit tests for the write-behind player state cache
+"""
+import unittest
+import asyncio
+import os
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.db.backend import MemoryBackend
+from src.db.migrations import migrate
+from src.db.repository import Repositories
+from src.models.player_state import PlayerStateCache
+
+
+class TestPlayerState(unittest.TestCase):
+    """Test that in-combat changes stay in memory until they are flushed"""
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.storage = MemoryBackend()
+        self.storage.open()
+        self.pool = self.storage.create_pool(size=2)
+        self.repos = Repositories(self.pool)
+        self.cache = PlayerStateCache(self.repos)
+        self.loop.run_until_complete(self._init_db())
+
+    def tearDown(self):
+        self.loop.run_until_complete(self.pool.close())
+        self.loop.close()
+        self.storage.close()
+
+    async def _init_db(self):
+        async with self.pool.acquire() as db:
+            await migrate(db)
+            await db.execute("INSERT INTO players (id, name) VALUES (1, 'Fighter'), (2, 'Mage')")
+            await db.commit()
+
+    def _writes(self):
+        return dict(self.repos.statements.snapshot()).get('players.save_state')
+
+    def test_turns_are_flushed_in_one_write(self):
+        async def run():
+            fighter = await self.cache.load(1)
+            mage = await self.cache.load(2)
+            self.cache.track(fighter)
+            self.cache.track(mage)
+            self.assertIs(await self.cache.load(1), fighter)
+
+            # Several turns change the fighter only, without touching the database
+            for _ in range(3):
+                fighter.health -= 10
+            fighter.mana = 40
+            self.assertIsNone(self._writes())
+            self.assertEqual((await self.repos.players.get(1)).health, 100)
+
+            self.assertEqual(await self.cache.flush(), 1)
+            row = await self.repos.players.get(1)
+            self.assertEqual((row.health, row.mana), (70, 40))
+            self.assertEqual(self._writes().calls, 1)
+
+            # Nothing changed since, so nothing is written
+            self.assertEqual(await self.cache.flush(), 0)
+
+        self.loop.run_until_complete(run())
+
+    def test_combat_end(self):
+        async def run():
+            fighter = await self.cache.load(1)
+            mage = await self.cache.load(2)
+            self.cache.track(fighter)
+            self.cache.track(mage)
+            fighter.health = 10
+            mage.health = 20
+
+            # Discarded players are written by their caller, released ones by the cache
+            self.cache.discard(1)
+            await self.cache.release(2)
+            self.assertEqual(len(self.cache), 0)
+            self.assertEqual(await self.cache.flush(), 0)
+            self.assertEqual((await self.repos.players.get(1)).health, 100)
+            self.assertEqual((await self.repos.players.get(2)).health, 20)
+
+        self.loop.run_until_complete(run())
+
+
+if __name__ == '__main__':
+    unittest.main()
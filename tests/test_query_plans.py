@@ -0,0 +1,163 @@
+"""
+Query-plan regression check for every SQL string in the codebase
+
+Each SQL literal found in the source tree is run through EXPLAIN QUERY PLAN
+against a freshly migrated schema. Any statement that falls back to a full
+table SCAN fails the test unless it is listed in ALLOWED_SCANS.
+"""
+import unittest
+import asyncio
+import ast
+import os
+import re
+import sqlite3
+from pathlib import Path
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.db.backend import MemoryBackend
+from src.db.migrations import migrate
+from src.db.retention import ARCHIVE_SCHEMA
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# The repo writes SQL keywords in upper case, which keeps prose such as
+# "Update inventory message" out of the candidate set.
+SQL_START = re.compile(r'^\s*(SELECT|INSERT|UPDATE|DELETE|WITH|REPLACE)\s')
+
+# Intentional full scans, keyed on (file, start of the whitespace-normalised SQL)
+ALLOWED_SCANS = {
+    ('clear_quests.py', 'SELECT COUNT(*) FROM active_quests'):
+        'one-off admin script reporting table size',
+    ('src/db/backup.py', 'SELECT 1 FROM sqlite_master'):
+        'opens the read snapshot a backup copies from',
+    ('src/db/pool.py', 'SELECT 1 FROM sqlite_master'):
+        'connection warmup, reads the schema on purpose',
+    ('webservice/app.py', 'SELECT p.*, COUNT(DISTINCT aq.quest_id)'):
+        'admin player list shows every player',
+    ('webservice/app.py', 'SELECT quest_id, SUM(CASE WHEN completed = 0'):
+        'admin quest overview aggregates over all players',
+}
+
+MIGRATION_FILES = {'src/db/migrations.py'}
+
+
+def _normalise(sql):
+    return ' '.join(sql.split())
+
+
+def _docstring_nodes(tree):
+    """Constant nodes that are docstrings rather than SQL"""
+    nodes = set()
+    for node in ast.walk(tree):
+        if isinstance(node, (ast.Module, ast.ClassDef, ast.FunctionDef, ast.AsyncFunctionDef)):
+            body = node.body
+            if body and isinstance(body[0], ast.Expr) and isinstance(body[0].value, ast.Constant):
+                nodes.add(id(body[0].value))
+    return nodes
+
+
+def collect_sql():
+    """Yield (relative path, line number, sql) for every SQL literal"""
+    for path in sorted(ROOT.rglob('*.py')):
+        relative = path.relative_to(ROOT)
+        if relative.parts[0] in ('tests', '.git') or '__pycache__' in relative.parts:
+            continue
+        # Migration steps run once against the schema of their own version
+        if relative.as_posix() in MIGRATION_FILES:
+            continue
+        tree = ast.parse(path.read_text(encoding='utf-8'))
+        docstrings = _docstring_nodes(tree)
+        for node in ast.walk(tree):
+            if (isinstance(node, ast.Constant) and isinstance(node.value, str)
+                    and id(node) not in docstrings and SQL_START.match(node.value)):
+                yield relative.as_posix(), node.lineno, node.value
+
+
+def explain(db, sql):
+    """Return the query plan details, binding NULL for every parameter.
+
+    Returns None for fragments that are completed at runtime (e.g. a dynamic
+    SET clause).
+    """
+    params = 0
+    while True:
+        try:
+            rows = db.execute('EXPLAIN QUERY PLAN ' + sql, (None,) * params).fetchall()
+            return [row[3] for row in rows]
+        except sqlite3.ProgrammingError as e:
+            match = re.search(r'uses (\d+)', str(e))
+            if not match or int(match.group(1)) == params:
+                raise
+            params = int(match.group(1))
+        except sqlite3.OperationalError as e:
+            if 'incomplete input' in str(e):
+                return None
+            raise
+
+
+class TestQueryPlans(unittest.TestCase):
+    """Every hot query must be served by an index"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.storage = MemoryBackend()
+        cls.storage.open()
+
+        async def init():
+            async with cls.storage.connect() as db:
+                await migrate(db)
+
+        loop = asyncio.new_event_loop()
+        loop.run_until_complete(init())
+        loop.close()
+        cls.db = cls.storage.connect_sync()
+        # Queries that read archived events expect the archive attached
+        cls.db.execute("ATTACH DATABASE ':memory:' AS archive")
+        for statement in ARCHIVE_SCHEMA:
+            cls.db.execute(statement)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.db.close()
+        cls.storage.close()
+
+    def test_sql_is_found(self):
+        """Sanity check that the collector sees the codebase's queries"""
+        statements = [_normalise(sql) for _, _, sql in collect_sql()]
+        self.assertIn('SELECT item_id, count FROM inventory WHERE player_id = ?', statements)
+
+    def test_no_full_table_scans(self):
+        failures = []
+        used_allowances = set()
+        for path, lineno, sql in collect_sql():
+            try:
+                plan = explain(self.db, sql)
+            except sqlite3.Error as e:
+                failures.append(f"{path}:{lineno}: {e}")
+                continue
+            if plan is None:
+                continue
+
+            scans = [detail for detail in plan if detail.startswith('SCAN')]
+            if not scans:
+                continue
+
+            normalised = _normalise(sql)
+            allowance = next(
+                (key for key in ALLOWED_SCANS
+                 if key[0] == path and normalised.startswith(key[1])),
+                None
+            )
+            if allowance:
+                used_allowances.add(allowance)
+            else:
+                failures.append(f"{path}:{lineno}: {'; '.join(scans)} in {normalised[:100]}")
+
+        self.assertEqual(failures, [], 'Queries without a usable index:\n' + '\n'.join(failures))
+        self.assertEqual(set(ALLOWED_SCANS) - used_allowances, set(),
+                         'Stale ALLOWED_SCANS entries')
+
+
+if __name__ == '__main__':
+    unittest.main()
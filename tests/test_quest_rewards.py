@@ -3,13 +3,18 @@ Unit tests for quest reward claiming and level-up logic
 """
 import unittest
 import asyncio
-import aiosqlite
 import os
-import tempfile
+from dataclasses import replace
 from unittest.mock import Mock, AsyncMock, MagicMock
 import sys
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
+from src.db.backend import MemoryBackend
+from src.db.migrations import migrate
+from src.db.repository import Repositories
+from src.commands.combat import CombatCommands
+from src.models.combat import CombatEntity
+from src.models.game_data import GameData
 from src.models.quest_manager import QuestManager
 from src.models.quest import Quest, QuestReward, QuestType, QuestObjective, ObjectiveType
 
@@ -22,24 +27,24 @@ class TestQuestRewards(unittest.TestCase):
         self.loop = asyncio.new_event_loop()
         asyncio.set_event_loop(self.loop)
         
-        # Create temporary database
-        self.db_fd, self.db_path = tempfile.mkstemp()
+        # Create in-memory database
+        self.storage = MemoryBackend()
+        self.storage.open()
         
         # Mock bot
         self.bot = Mock()
-        self.bot.db_path = self.db_path
+        self.bot.game_data = GameData.load()
+        self.bot.db_path = self.storage.database
         
-        async def mock_db_connect():
-            return await aiosqlite.connect(self.db_path)
-        
-        self.bot.db_connect = mock_db_connect
+        self.bot.db_pool = self.storage.create_pool(size=2)
+        self.bot.repos = Repositories(self.bot.db_pool)
         
         # Initialize database
         self.loop.run_until_complete(self._init_db())
+        self.loop.run_until_complete(self.bot.db_pool.open())
         
         # Create quest manager with mock quest data
-        self.quest_manager = QuestManager(self.bot)
-        self.quest_manager.quests = {
+        quests = {
             'test_quest_1': Quest(
                 id='test_quest_1',
                 title='Test Quest 1',
@@ -80,68 +85,35 @@ class TestQuestRewards(unittest.TestCase):
                 requirements={'level': 2, 'previous_quest': 'test_quest_1'}
             )
         }
+        self.bot.game_data = replace(self.bot.game_data, quests=quests)
+        self.quest_manager = QuestManager(self.bot)
     
     async def _init_db(self):
         """Initialize test database schema"""
-        async with await aiosqlite.connect(self.db_path) as db:
-            # Create players table
-            await db.execute('''
-                CREATE TABLE IF NOT EXISTS players (
-                    id INTEGER PRIMARY KEY,
-                    name TEXT NOT NULL,
-                    level INTEGER DEFAULT 1,
-                    xp INTEGER DEFAULT 0,
-                    health INTEGER DEFAULT 100,
-                    max_health INTEGER DEFAULT 100,
-                    mana INTEGER DEFAULT 100,
-                    max_mana INTEGER DEFAULT 100,
-                    gold INTEGER DEFAULT 0
-                )
-            ''')
-            
-            # Create active_quests table
-            await db.execute('''
-                CREATE TABLE IF NOT EXISTS active_quests (
-                    player_id INTEGER,
-                    quest_id TEXT,
-                    objectives_progress TEXT,
-                    completed BOOLEAN DEFAULT FALSE,
-                    rewards_claimed BOOLEAN DEFAULT FALSE,
-                    PRIMARY KEY (player_id, quest_id)
-                )
-            ''')
-            
-            # Create inventory table
-            await db.execute('''
-                CREATE TABLE IF NOT EXISTS inventory (
-                    player_id INTEGER,
-                    item_id TEXT,
-                    count INTEGER DEFAULT 0,
-                    PRIMARY KEY (player_id, item_id)
-                )
-            ''')
-            
+        async with self.bot.db_pool.acquire() as db:
+            await migrate(db)
             await db.commit()
     
     def tearDown(self):
         """Clean up test database"""
+        self.loop.run_until_complete(self.bot.repos.writer.stop())
+        self.loop.run_until_complete(self.bot.db_pool.close())
         self.loop.close()
-        os.close(self.db_fd)
-        os.unlink(self.db_path)
+        self.storage.close()
     
     def test_reward_claim_single_level_up(self):
         """Test that claiming rewards with 150 XP levels player from 1 to 2"""
         async def run_test():
             # Create test player at level 1 with 0 XP
-            async with await aiosqlite.connect(self.db_path) as db:
+            async with self.storage.connect() as db:
                 await db.execute(
                     'INSERT INTO players (id, name, level, xp, gold) VALUES (?, ?, ?, ?, ?)',
                     (12345, 'TestPlayer', 1, 0, 0)
                 )
                 # Mark quest as completed but not claimed
                 await db.execute(
-                    'INSERT INTO active_quests (player_id, quest_id, objectives_progress, completed, rewards_claimed) VALUES (?, ?, ?, ?, ?)',
-                    (12345, 'test_quest_1', '[1]', True, False)
+                    'INSERT INTO active_quests (player_id, quest_id, completed, rewards_claimed) VALUES (?, ?, ?, ?)',
+                    (12345, 'test_quest_1', True, False)
                 )
                 await db.commit()
             
@@ -154,7 +126,7 @@ class TestQuestRewards(unittest.TestCase):
             self.assertEqual(new_level, 2, "Player should level up from 1 to 2 with 150 XP")
             
             # Verify database state
-            async with await aiosqlite.connect(self.db_path) as db:
+            async with self.storage.connect() as db:
                 cursor = await db.execute('SELECT level, xp, gold, max_health, max_mana FROM players WHERE id = ?', (12345,))
                 row = await cursor.fetchone()
                 self.assertEqual(row[0], 2, "Level should be 2")
@@ -169,15 +141,15 @@ class TestQuestRewards(unittest.TestCase):
         """Test that claiming rewards with enough XP can trigger multiple level-ups"""
         async def run_test():
             # Create test player at level 1 with 50 XP
-            async with await aiosqlite.connect(self.db_path) as db:
+            async with self.storage.connect() as db:
                 await db.execute(
                     'INSERT INTO players (id, name, level, xp, gold) VALUES (?, ?, ?, ?, ?)',
                     (12346, 'TestPlayer2', 1, 50, 0)
                 )
                 # Mark a large XP quest as completed
                 await db.execute(
-                    'INSERT INTO active_quests (player_id, quest_id, objectives_progress, completed, rewards_claimed) VALUES (?, ?, ?, ?, ?)',
-                    (12346, 'test_quest_2', '[2]', True, False)
+                    'INSERT INTO active_quests (player_id, quest_id, completed, rewards_claimed) VALUES (?, ?, ?, ?)',
+                    (12346, 'test_quest_2', True, False)
                 )
                 await db.commit()
             
@@ -191,7 +163,7 @@ class TestQuestRewards(unittest.TestCase):
             self.assertEqual(new_level, 3, "Player should level up from 1 to 3 with 300 total XP")
             
             # Verify database state
-            async with await aiosqlite.connect(self.db_path) as db:
+            async with self.storage.connect() as db:
                 cursor = await db.execute('SELECT level, xp, max_health, max_mana FROM players WHERE id = ?', (12346,))
                 row = await cursor.fetchone()
                 self.assertEqual(row[0], 3, "Level should be 3")
@@ -205,7 +177,7 @@ class TestQuestRewards(unittest.TestCase):
         """Test that claiming small rewards doesn't level up player"""
         async def run_test():
             # Create test player at level 1 with 25 XP
-            async with await aiosqlite.connect(self.db_path) as db:
+            async with self.storage.connect() as db:
                 await db.execute(
                     'INSERT INTO players (id, name, level, xp, gold) VALUES (?, ?, ?, ?, ?)',
                     (12347, 'TestPlayer3', 1, 25, 0)
@@ -223,8 +195,8 @@ class TestQuestRewards(unittest.TestCase):
                 self.quest_manager.quests['small_quest'] = small_quest
                 
                 await db.execute(
-                    'INSERT INTO active_quests (player_id, quest_id, objectives_progress, completed, rewards_claimed) VALUES (?, ?, ?, ?, ?)',
-                    (12347, 'small_quest', '[1]', True, False)
+                    'INSERT INTO active_quests (player_id, quest_id, completed, rewards_claimed) VALUES (?, ?, ?, ?)',
+                    (12347, 'small_quest', True, False)
                 )
                 await db.commit()
             
@@ -237,7 +209,7 @@ class TestQuestRewards(unittest.TestCase):
             self.assertEqual(new_level, 1, "Player should stay at level 1 with only 55 XP")
             
             # Verify database state
-            async with await aiosqlite.connect(self.db_path) as db:
+            async with self.storage.connect() as db:
                 cursor = await db.execute('SELECT level, xp FROM players WHERE id = ?', (12347,))
                 row = await cursor.fetchone()
                 self.assertEqual(row[0], 1, "Level should still be 1")
@@ -248,15 +220,15 @@ class TestQuestRewards(unittest.TestCase):
     def test_reward_claim_already_claimed(self):
         """Test that already claimed rewards return None"""
         async def run_test():
-            async with await aiosqlite.connect(self.db_path) as db:
+            async with self.storage.connect() as db:
                 await db.execute(
                     'INSERT INTO players (id, name, level, xp) VALUES (?, ?, ?, ?)',
                     (12348, 'TestPlayer4', 1, 0)
                 )
                 # Quest already claimed
                 await db.execute(
-                    'INSERT INTO active_quests (player_id, quest_id, objectives_progress, completed, rewards_claimed) VALUES (?, ?, ?, ?, ?)',
-                    (12348, 'test_quest_1', '[1]', True, True)
+                    'INSERT INTO active_quests (player_id, quest_id, completed, rewards_claimed) VALUES (?, ?, ?, ?)',
+                    (12348, 'test_quest_1', True, True)
                 )
                 await db.commit()
             
@@ -270,6 +242,70 @@ class TestQuestRewards(unittest.TestCase):
         
         self.loop.run_until_complete(run_test())
 
+    def test_concurrent_completion_pays_once(self):
+        """Test that racing combat events and claims grant a quest's rewards once"""
+        async def run_test():
+            async with self.storage.connect() as db:
+                await db.execute(
+                    'INSERT INTO players (id, name, level, xp, gold) VALUES (?, ?, ?, ?, ?)',
+                    (12349, 'TestPlayer5', 1, 0, 0)
+                )
+                await db.commit()
+            repos = self.bot.repos
+            await repos.write(lambda: repos.quests.insert(12349, 'test_quest_1', 1))
+
+            repos.writer.start()
+            results = await asyncio.gather(
+                self.quest_manager.update_quest_progress(12349),
+                self.quest_manager.update_quest_progress(12349),
+                self.quest_manager.claim_quest_rewards(12349, 'test_quest_1'),
+            )
+            self.assertEqual(sum(len(result.rewards) for result in results[:2]), 1)
+            self.assertIsNone(results[2][0])
+
+            # The payout itself is guarded too
+            quest = self.quest_manager.quests['test_quest_1']
+            self.assertIsNone(await repos.write(lambda: self.quest_manager._apply_rewards(12349, quest)))
+
+            async with self.storage.connect() as db:
+                cursor = await db.execute('SELECT level, xp, gold FROM players WHERE id = ?', (12349,))
+                self.assertEqual(await cursor.fetchone(), (2, 50, 50))
+                cursor = await db.execute(
+                    'SELECT progress FROM quest_objective_progress WHERE player_id = ? AND quest_id = ?',
+                    (12349, 'test_quest_1')
+                )
+                self.assertEqual((await cursor.fetchone())[0], 1)
+
+        self.loop.run_until_complete(run_test())
+
+    def test_victory_keeps_quest_rewards(self):
+        """Test that a victory completing a quest saves the quest XP and level with the fight's XP"""
+        async def run_test():
+            async with self.storage.connect() as db:
+                await db.execute(
+                    'INSERT INTO players (id, name, level, xp, gold, health) VALUES (?, ?, ?, ?, ?, ?)',
+                    (12350, 'TestPlayer6', 1, 0, 0, 40)
+                )
+                await db.commit()
+            repos = self.bot.repos
+            await repos.write(lambda: repos.quests.insert(12350, 'test_quest_1', 1))
+            # The in-combat player, as loaded when the fight started
+            player = (await repos.players.get(12350)).to_player()
+            enemy = CombatEntity('Rat', 0, 10, 0, 0, 1, [])
+
+            quest_result = await self.quest_manager.update_quest_progress(12350)
+            self.assertEqual((quest_result.old_level, quest_result.new_level), (1, 2))
+            combat = CombatCommands(self.bot)
+            xp_gained, old_level = await combat.award_victory_xp(player, enemy, quest_result)
+            self.assertEqual((xp_gained, old_level), (60, 2))
+            stats = await repos.write(lambda: repos.players.finish_victory(player, 10))
+
+            # 150 quest XP levels 1 -> 2 with 50 left, then the fight adds 60
+            self.assertEqual((stats.level, stats.xp, stats.gold), (2, 110, 60))
+            # The quest level-up restored health
+            self.assertEqual((stats.health, stats.max_health), (110, 110))
+
+        self.loop.run_until_complete(run_test())
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,161 @@
+"""
+Unit tests for the typed repository layer
+"""
+import unittest
+import asyncio
+import os
+from unittest.mock import patch
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.db.backend import MemoryBackend
+from src.db.migrations import migrate
+from src.db.repository import PlayerRow, PlayerStats, Repositories
+from src.models.combat import EnemyIdentity
+from src.models.player import Player
+
+
+class TestRepository(unittest.TestCase):
+    """Test that repositories return slotted records and time their statements"""
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.storage = MemoryBackend()
+        self.storage.open()
+        self.pool = self.storage.create_pool(size=2)
+        self.repos = Repositories(self.pool)
+        self.loop.run_until_complete(self._init_db())
+
+    def tearDown(self):
+        self.loop.run_until_complete(self.pool.close())
+        self.loop.close()
+        self.storage.close()
+
+    async def _init_db(self):
+        async with self.pool.acquire() as db:
+            await migrate(db)
+            await db.execute("INSERT INTO players (id, name, gold, kills) VALUES (1, 'Typed', 40, 7)")
+            await db.commit()
+
+    def test_player_round_trip(self):
+        async def run():
+            row = await self.repos.players.get(1)
+            self.assertIsInstance(row, PlayerRow)
+            self.assertFalse(hasattr(row, '__dict__'))
+            self.assertEqual((row.name, row.level, row.health), ('Typed', 1, 100))
+
+            player = row.to_player()
+            player.xp = 30
+            player.health = 60
+            async with self.repos.transaction():
+                await self.repos.players.save(player)
+
+            # Saving the core stats leaves gold and the counters alone
+            stats = await self.repos.players.stats(1)
+            self.assertEqual((stats.xp, stats.health, stats.gold, stats.kills), (30, 60, 40, 7))
+            self.assertIsNone(await self.repos.players.get(2))
+
+            calls = {key: stats.calls for key, stats in self.repos.statements.snapshot()}
+            self.assertEqual(calls, {
+                'players.get': 2, 'players.save': 1, 'players.stats': 1, 'transaction.commit': 1
+            })
+
+        self.loop.run_until_complete(run())
+
+    def _calls(self):
+        return {key: stats.calls for key, stats in self.repos.statements.snapshot()}
+
+    def _calls_since(self, before):
+        return {key: calls - before.get(key, 0) for key, calls in self._calls().items() if calls != before.get(key, 0)}
+
+    def test_victory_is_one_update_returning(self):
+        async def run():
+            async with self.repos.transaction():
+                await self.repos.players.enter_combat(1, EnemyIdentity(1, 2).key)
+            player = (await self.repos.players.get(1)).to_player()
+            player.health, player.mana, player.xp = 70, 40, 90
+
+            before = self._calls()
+            async with self.repos.transaction():
+                stats = await self.repos.players.finish_victory(player, 25)
+            self.assertEqual(self._calls_since(before), {'players.finish_victory': 1, 'transaction.commit': 1})
+
+            # The returned row is the state after the update
+            self.assertIsInstance(stats, PlayerStats)
+            self.assertEqual((stats.name, stats.health, stats.mana, stats.xp, stats.gold, stats.kills),
+                             ('Typed', 70, 40, 90, 65, 7))
+            async with self.pool.acquire() as db:
+                async with db.execute('SELECT gold, in_combat, current_enemy_key FROM players WHERE id = 1') as cursor:
+                    self.assertEqual(tuple(await cursor.fetchone()), (65, 0, None))
+            async with self.repos.transaction():
+                self.assertIsNone(await self.repos.players.finish_victory(Player(id=2, name='Ghost'), 5))
+
+        self.loop.run_until_complete(run())
+
+    def test_defeat_is_two_statements(self):
+        async def run():
+            player = (await self.repos.players.get(1)).to_player()
+            player.health = 0
+
+            before = self._calls()
+            async with self.repos.transaction():
+                await self.repos.kills.record_death(1, EnemyIdentity(1, 2), 3, player)
+                counters = await self.repos.players.respawn_after_death(1, 50, 60)
+            self.assertEqual(self._calls_since(before), {
+                'kills.log_death': 1, 'players.respawn': 1, 'transaction.commit': 1
+            })
+
+            self.assertEqual(counters, (1, 7))
+            row = await self.repos.players.get(1)
+            self.assertEqual((row.health, row.mana), (50, 60))
+            self.assertEqual(await self.repos.kills.totals(1), (1, 7))
+            async with self.pool.acquire() as db:
+                async with db.execute('SELECT enemy_type_id, enemy_name_id, enemy_level FROM death_history') as cursor:
+                    self.assertEqual([tuple(r) for r in await cursor.fetchall()], [(1, 2, 3)])
+            async with self.repos.transaction():
+                self.assertEqual(await self.repos.players.respawn_after_death(2, 50, 60), (0, 0))
+
+        self.loop.run_until_complete(run())
+
+    def test_transaction_rolls_back_on_error(self):
+        async def run():
+            with self.assertRaises(RuntimeError):
+                async with self.repos.transaction():
+                    await self.repos.players.set_health(1, 5)
+                    raise RuntimeError('boom')
+            self.assertEqual((await self.repos.players.get(1)).health, 100)
+
+        self.loop.run_until_complete(run())
+
+    def test_busy_writes_are_retried(self):
+        async def run():
+            # Reopen the pool so SQLite reports the lock straight away
+            # instead of waiting on it itself
+            await self.pool.close()
+            await self.pool.open()
+
+            # Another connection holds the write lock for a moment
+            async with self.storage.connect() as other:
+                await other.execute('BEGIN IMMEDIATE')
+                release = asyncio.get_running_loop().call_later(
+                    0.05, lambda: asyncio.ensure_future(other.commit())
+                )
+                async with self.repos.transaction():
+                    await self.repos.players.set_health(1, 5)
+                release.cancel()
+                await other.commit()
+            self.assertEqual((await self.repos.players.get(1)).health, 5)
+
+            [(key, stats)] = self.repos.statements.contention()
+            self.assertEqual(key, 'players.set_health')
+            self.assertGreater(stats.busy, 0)
+            self.assertGreaterEqual(stats.lock_wait_seconds, 0.04)
+            self.assertEqual(stats.gave_up, 0)
+
+        with patch.dict(os.environ, {'DATABASE_BUSY_TIMEOUT_MS': '0'}):
+            self.loop.run_until_complete(run())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+"""
+Unit tests for archiving old kill and death events
+"""
+import unittest
+import asyncio
+import aiosqlite
+import os
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.db.backend import MemoryBackend
+from src.db.migrations import migrate
+from src.db.repository import Repositories
+from src.db.retention import EventArchiver
+from src.models.combat import EnemyIdentity
+
+
+class TestRetention(unittest.TestCase):
+    """Test that old events move to the archive without touching aggregates"""
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.storage = MemoryBackend()
+        self.storage.open()
+        self.archive_path = self.storage.archive_path
+        self.pool = self.storage.create_pool(size=2)
+        self.loop.run_until_complete(self._init_db())
+
+    def tearDown(self):
+        self.loop.run_until_complete(self.pool.close())
+        self.loop.close()
+        self.storage.close()
+
+    async def _init_db(self):
+        repos = Repositories(self.pool)
+        async with self.pool.acquire() as db:
+            await migrate(db)
+            await db.execute("INSERT INTO players (id, name) VALUES (1, 'Veteran')")
+            for _ in range(5):
+                await repos.kills.record_kill(1, EnemyIdentity(1, 1), 1)
+            await db.execute('''
+                INSERT INTO death_history (
+                    player_id, enemy_type_id, enemy_name_id, enemy_level, player_level, player_health,
+                    player_max_health, player_mana, player_max_mana
+                ) VALUES (1, 2, 3, 3, 2, 0, 110, 20, 105)
+            ''')
+            # Age three of the kills and the death past the retention window
+            await db.execute(
+                "UPDATE player_kills SET killed_at = '2020-01-01 00:00:00' WHERE id <= 3"
+            )
+            await db.execute("UPDATE death_history SET died_at = '2020-01-01 00:00:00'")
+            await db.commit()
+
+    async def _fetchall(self, db, sql):
+        async with db.execute(sql) as cursor:
+            return await cursor.fetchall()
+
+    def test_old_events_are_archived_in_chunks(self):
+        async def run():
+            archiver = EventArchiver(self.pool, self.archive_path, max_age_days=30, chunk_size=2)
+            moved = await archiver.run()
+            self.assertEqual(moved, {'player_kills': 3, 'death_history': 1})
+
+            async with self.pool.acquire() as db:
+                self.assertEqual(await self._fetchall(db, 'SELECT id FROM player_kills ORDER BY id'),
+                                 [(4,), (5,)])
+                self.assertEqual(await self._fetchall(db, 'SELECT COUNT(*) FROM death_history'), [(0,)])
+                # Aggregates are untouched by archiving
+                self.assertEqual(await self._fetchall(db, 'SELECT kills FROM players WHERE id = 1'), [(5,)])
+                self.assertEqual(
+                    await self._fetchall(db, 'SELECT kill_count FROM player_kill_rollup WHERE player_id = 1'),
+                    [(5,)]
+                )
+
+            async with aiosqlite.connect(self.archive_path, uri=True) as archive:
+                self.assertEqual(await self._fetchall(archive, 'SELECT id FROM player_kills ORDER BY id'),
+                                 [(1,), (2,), (3,)])
+                self.assertEqual(
+                    await self._fetchall(archive, 'SELECT enemy_type_id, enemy_name_id FROM death_history'),
+                    [(2, 3)]
+                )
+
+            # A second run has nothing left to move
+            self.assertEqual(await archiver.run(), {'player_kills': 0, 'death_history': 0})
+
+        self.loop.run_until_complete(run())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+"""
+Unit tests for the connection storage profile and WAL maintenance
+"""
+import unittest
+import asyncio
+import os
+import sqlite3
+import tempfile
+from unittest.mock import patch
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.db.backend import SQLiteBackend
+from src.db.maintenance import DatabaseMaintenance
+from src.db.migrations import migrate
+from src.db.storage import apply_storage_profile_sync
+
+
+class TestStorage(unittest.TestCase):
+    """Test that connections get the profile and the WAL is checkpointed"""
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        # WAL needs a real file
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, 'willowbot.db')
+        self.storage = SQLiteBackend(self.path)
+        self.pool = self.storage.create_pool(size=2)
+
+    def tearDown(self):
+        self.loop.run_until_complete(self.pool.close())
+        self.loop.close()
+        self.tmpdir.cleanup()
+
+    async def _pragma(self, db, name):
+        async with db.execute(f'PRAGMA {name}') as cursor:
+            return (await cursor.fetchone())[0]
+
+    def test_pooled_connections_get_the_profile(self):
+        async def run():
+            async with self.pool.acquire() as db:
+                self.assertEqual(await self._pragma(db, 'journal_mode'), 'wal')
+                # NORMAL
+                self.assertEqual(await self._pragma(db, 'synchronous'), 1)
+                self.assertEqual(await self._pragma(db, 'cache_size'), -8000)
+                self.assertEqual(await self._pragma(db, 'busy_timeout'), 5000)
+                # MEMORY
+                self.assertEqual(await self._pragma(db, 'temp_store'), 2)
+
+        self.loop.run_until_complete(run())
+
+    def test_environment_overrides_the_profile(self):
+        with patch.dict(os.environ, {'DATABASE_SYNCHRONOUS': 'FULL', 'DATABASE_BUSY_TIMEOUT_MS': '250'}):
+            db = sqlite3.connect(self.path)
+            try:
+                apply_storage_profile_sync(db)
+                self.assertEqual(db.execute('PRAGMA synchronous').fetchone()[0], 2)
+                self.assertEqual(db.execute('PRAGMA busy_timeout').fetchone()[0], 250)
+                self.assertEqual(db.execute('PRAGMA journal_mode').fetchone()[0], 'wal')
+            finally:
+                db.close()
+
+    def test_checkpoint_truncates_the_wal(self):
+        async def run():
+            async with self.pool.acquire() as db:
+                await migrate(db)
+                await db.executemany(
+                    'INSERT INTO players (id, name) VALUES (?, ?)',
+                    [(i, f'Player {i}') for i in range(1, 201)]
+                )
+                await db.commit()
+            wal = self.path + '-wal'
+            self.assertGreater(os.path.getsize(wal), 0)
+
+            maintenance = DatabaseMaintenance(self.pool, interval_minutes=1)
+            with self.assertLogs('willowbot.db', level='INFO') as logs:
+                await maintenance.checkpoint()
+                self.assertEqual(os.path.getsize(wal), 0)
+                await maintenance.optimize()
+            self.assertTrue(any('WAL checkpoint of' in line for line in logs.output))
+            self.assertTrue(any('PRAGMA optimize took' in line for line in logs.output))
+
+        self.loop.run_until_complete(run())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,115 @@
+"""
+Unit tests for the group-commit writer
+"""
+import unittest
+import asyncio
+import os
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.db.backend import MemoryBackend
+from src.db.migrations import migrate
+from src.db.repository import Repositories
+
+
+class TestWriter(unittest.TestCase):
+    """Test that queued writes are committed in groups and fail independently"""
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.storage = MemoryBackend()
+        self.storage.open()
+        self.pool = self.storage.create_pool(size=2)
+        self.repos = Repositories(self.pool)
+        self.loop.run_until_complete(self._init_db())
+
+    def tearDown(self):
+        self.loop.run_until_complete(self.repos.writer.stop())
+        self.loop.run_until_complete(self.pool.close())
+        self.loop.close()
+        self.storage.close()
+
+    async def _init_db(self):
+        async with self.pool.acquire() as db:
+            await migrate(db)
+            await db.executemany(
+                'INSERT INTO players (id, name) VALUES (?, ?)',
+                [(i, f'Player {i}') for i in range(1, 21)]
+            )
+            await db.commit()
+
+    def test_concurrent_writes_share_commits(self):
+        async def run():
+            self.repos.writer.start()
+            await asyncio.gather(*(
+                self.repos.write(lambda i=i: self.repos.players.set_health(i, i))
+                for i in range(1, 21)
+            ))
+            for i in (1, 20):
+                self.assertEqual((await self.repos.players.get(i)).health, i)
+
+            stats = self.repos.writer.stats
+            self.assertEqual(stats.intents, 20)
+            self.assertLess(stats.batches, 20)
+            commits = dict(self.repos.statements.snapshot())['transaction.commit'].calls
+            self.assertEqual(commits, stats.batches)
+
+        self.loop.run_until_complete(run())
+
+    def test_failed_intent_is_rolled_back_alone(self):
+        async def broken():
+            await self.repos.players.set_health(2, 1)
+            raise ValueError('bad intent')
+
+        async def nested():
+            # A write made from inside an intent joins it instead of queueing
+            await self.repos.write(lambda: self.repos.players.set_health(3, 3))
+            return 'done'
+
+        async def run():
+            self.repos.writer.start()
+            results = await asyncio.gather(
+                self.repos.write(lambda: self.repos.players.set_health(1, 7)),
+                self.repos.write(broken),
+                self.repos.write(nested),
+                return_exceptions=True
+            )
+            self.assertIsInstance(results[1], ValueError)
+            self.assertEqual(results[2], 'done')
+            healths = [(await self.repos.players.get(i)).health for i in (1, 2, 3)]
+            self.assertEqual(healths, [7, 100, 3])
+            self.assertEqual(self.repos.writer.stats.failed, 1)
+
+        self.loop.run_until_complete(run())
+
+
+    def test_caller_cancelled_mid_batch(self):
+        started = asyncio.Event()
+        release = asyncio.Event()
+
+        async def slow_then_broken():
+            await self.repos.players.set_health(2, 1)
+            started.set()
+            await release.wait()
+            raise ValueError('bad intent')
+
+        async def run():
+            self.repos.writer.start()
+            first = asyncio.ensure_future(self.repos.write(lambda: self.repos.players.set_health(1, 7)))
+            cancelled = asyncio.ensure_future(self.repos.write(slow_then_broken))
+            last = asyncio.ensure_future(self.repos.write(lambda: self.repos.players.set_health(3, 3)))
+            await started.wait()
+            cancelled.cancel()
+            release.set()
+
+            await asyncio.gather(first, last)
+            self.assertTrue(cancelled.cancelled())
+            healths = [(await self.repos.players.get(i)).health for i in (1, 2, 3)]
+            self.assertEqual(healths, [7, 100, 3])
+            self.assertEqual(self.repos.writer.stats.failed, 1)
+
+        self.loop.run_until_complete(run())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,52 +2,40 @@
 Test verification script to simulate quest completion and inspect database
 """
 import asyncio
-import aiosqlite
 import os
 import sys
+from typing import Optional
 
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
-async def verify_quest_rewards():
-    """Simulate quest completion and verify level-up logic"""
-    db_path = 'data/test_verification.db'
-    
-    # Clean up old test database
-    if os.path.exists(db_path):
-        os.remove(db_path)
+from src.db.backend import MemoryBackend, SQLiteBackend
+from src.db.migrations import migrate
+
+# Columns in the order the checks below index them
+PLAYER_ROW = 'SELECT id, name, level, xp, health, max_health, mana, max_mana, gold FROM players WHERE id = ?'
+
+async def verify_quest_rewards(db_path: Optional[str] = None):
+    """Simulate quest completion and verify level-up logic
+
+    Runs against an in-memory database unless db_path is given, in which
+    case the database is written there so it can be inspected afterwards.
+    """
+    if db_path:
+        # Clean up old test database
+        if os.path.exists(db_path):
+            os.remove(db_path)
+        storage = SQLiteBackend(db_path)
+    else:
+        storage = MemoryBackend()
+    storage.open()
     
     print("=" * 60)
     print("Quest Reward & Level-Up Verification Test")
     print("=" * 60)
     
-    # Create test database
-    async with aiosqlite.connect(db_path) as db:
-        # Create schema
-        await db.execute('''
-            CREATE TABLE IF NOT EXISTS players (
-                id INTEGER PRIMARY KEY,
-                name TEXT NOT NULL,
-                level INTEGER DEFAULT 1,
-                xp INTEGER DEFAULT 0,
-                health INTEGER DEFAULT 100,
-                max_health INTEGER DEFAULT 100,
-                mana INTEGER DEFAULT 100,
-                max_mana INTEGER DEFAULT 100,
-                gold INTEGER DEFAULT 0
-            )
-        ''')
-        
-        await db.execute('''
-            CREATE TABLE IF NOT EXISTS active_quests (
-                player_id INTEGER,
-                quest_id TEXT,
-                objectives_progress TEXT,
-                completed BOOLEAN DEFAULT FALSE,
-                rewards_claimed BOOLEAN DEFAULT FALSE,
-                PRIMARY KEY (player_id, quest_id)
-            )
-        ''')
-        
+    # Create test database with the bot's own schema
+    async with storage.connect() as db:
+        await migrate(db)
         await db.commit()
         print("\n✓ Database schema created")
         
@@ -63,7 +51,7 @@ async def verify_quest_rewards():
         )
         await db.commit()
         
-        cursor = await db.execute('SELECT * FROM players WHERE id = ?', (player_id,))
+        cursor = await db.execute(PLAYER_ROW, (player_id,))
         row = await cursor.fetchone()
         print(f"\nBefore rewards:")
         print(f"  Level: {row[2]}, XP: {row[3]}, Gold: {row[8]}")
@@ -100,7 +88,7 @@ async def verify_quest_rewards():
             ''', (cur_level, cur_xp, cur_max_health, cur_max_health, cur_max_mana, cur_max_mana, player_id))
             await db.commit()
         
-        cursor = await db.execute('SELECT * FROM players WHERE id = ?', (player_id,))
+        cursor = await db.execute(PLAYER_ROW, (player_id,))
         row = await cursor.fetchone()
         print(f"\nAfter rewards & level-up:")
         print(f"  Level: {row[2]} (✓ Expected: 2)")
@@ -127,7 +115,7 @@ async def verify_quest_rewards():
         )
         await db.commit()
         
-        cursor = await db.execute('SELECT * FROM players WHERE id = ?', (player_id,))
+        cursor = await db.execute(PLAYER_ROW, (player_id,))
         row = await cursor.fetchone()
         print(f"\nBefore rewards:")
         print(f"  Level: {row[2]}, XP: {row[3]}")
@@ -159,7 +147,7 @@ async def verify_quest_rewards():
         ''', (cur_level, cur_xp, cur_max_health, cur_max_health, cur_max_mana, cur_max_mana, player_id))
         await db.commit()
         
-        cursor = await db.execute('SELECT * FROM players WHERE id = ?', (player_id,))
+        cursor = await db.execute(PLAYER_ROW, (player_id,))
         row = await cursor.fetchone()
         print(f"\nAfter rewards & level-ups:")
         print(f"  Level: {row[2]} (✓ Expected: 3)")
@@ -185,7 +173,7 @@ async def verify_quest_rewards():
         )
         await db.commit()
         
-        cursor = await db.execute('SELECT * FROM players WHERE id = ?', (player_id,))
+        cursor = await db.execute(PLAYER_ROW, (player_id,))
         row = await cursor.fetchone()
         print(f"\nBefore rewards:")
         print(f"  Level: {row[2]}, XP: {row[3]}")
@@ -205,7 +193,7 @@ async def verify_quest_rewards():
         else:
             print(f"✓ No level-up (XP {cur_xp} < threshold {cur_level * 100})")
         
-        cursor = await db.execute('SELECT * FROM players WHERE id = ?', (player_id,))
+        cursor = await db.execute(PLAYER_ROW, (player_id,))
         row = await cursor.fetchone()
         print(f"\nAfter rewards:")
         print(f"  Level: {row[2]} (✓ Expected: 1)")
@@ -218,8 +206,10 @@ async def verify_quest_rewards():
     print("\n" + "=" * 60)
     print("ALL TESTS PASSED! ✓")
     print("=" * 60)
-    print(f"\nTest database saved at: {os.path.abspath(db_path)}")
-    print("You can inspect it with: sqlite3 data/test_verification.db")
+    storage.close()
+    if db_path:
+        print(f"\nTest database saved at: {os.path.abspath(db_path)}")
+        print(f"You can inspect it with: sqlite3 {db_path}")
 
 if __name__ == '__main__':
-    asyncio.run(verify_quest_rewards())
+    asyncio.run(verify_quest_rewards(sys.argv[1] if len(sys.argv) > 1 else None))
@@ -4,7 +4,6 @@ from flask import Flask, render_template, jsonify, request, redirect, url_for, s
 import sqlite3
 from threading import Thread
 import sys
-import yaml
 from dotenv import load_dotenv
 import requests
 from functools import wraps
@@ -14,6 +13,12 @@ load_dotenv()
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from src.bot import WillowBot
+from src.db.backup import DatabaseBackup, default_backup_dir
+from src.db.contention import BusyPolicy, retry_busy_sync
+from src.db.retention import default_archive_path
+from src.db.storage import apply_storage_profile_sync
+from src.models.combat import EnemyIdentity
+from src.models.game_data import GameData
 
 app = Flask(__name__)
 app.secret_key = os.getenv('FLASK_SECRET_KEY', os.urandom(24))  # For session management
@@ -42,33 +47,20 @@ DISCORD_USER_URL = f'{DISCORD_API_BASE}/users/@me'
 bot_instance = None
 bot_thread = None
 
-# Load items data
-def load_items():
-    items_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'src', 'config', 'items.yaml')
-    try:
-        with open(items_path, 'r', encoding='utf-8') as f:
-            data = yaml.safe_load(f)
-            return data.get('items', {})
-    except FileNotFoundError:
-        return {}
-
-# Load quests data
-def load_quests():
-    quests_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'src', 'config', 'quests.yaml')
-    try:
-        with open(quests_path, 'r', encoding='utf-8') as f:
-            data = yaml.safe_load(f)
-            # Flatten quest chains into a dict with quest_id as key
-            quests_dict = {}
-            for chain in data.get('quest_chains', []):
-                for quest in chain.get('quests', []):
-                    quests_dict[quest['id']] = quest
-            return quests_dict
-    except FileNotFoundError:
-        return {}
-
-ITEMS_DATA = load_items()
-QUESTS_DATA = load_quests()
+# Items, quests and enemies, shared with the bot started below
+GAME_DATA = GameData.load()
+
+def game_data():
+    """The running bot's current game data, which a reload may have replaced"""
+    return bot_instance.game_data if bot_instance is not None else GAME_DATA
+
+def enemy_display_name(row):
+    """Display name for a row carrying the four enemy ID columns and legacy_name"""
+    if row['legacy_name']:
+        return row['legacy_name']
+    return game_data().enemy_catalog.display_name(EnemyIdentity(
+        row['enemy_type_id'], row['enemy_name_id'], row['enemy_prefix_id'], row['enemy_suffix_id']
+    ))
 
 # Authentication decorators
 def login_required(f):
@@ -94,7 +86,7 @@ def admin_required(f):
 def start_bot_if_not_running():
     global bot_instance, bot_thread
     if bot_instance is None or not bot_instance.is_ready():
-        bot_instance = WillowBot()
+        bot_instance = WillowBot(game_data=GAME_DATA)
         token = os.getenv('DISCORD_TOKEN')
         if token:
             bot_thread = Thread(target=lambda: bot_instance.run(token))
@@ -103,9 +95,17 @@ def start_bot_if_not_running():
 def get_db():
     db_path = os.environ.get('DATABASE_PATH', '/app/data/willowbot.db')
     db = sqlite3.connect(db_path)
+    apply_storage_profile_sync(db)
     db.row_factory = sqlite3.Row
     return db
 
+def get_backup():
+    """The running bot's backup manager, so dashboard and scheduled backups never overlap"""
+    if bot_instance is not None:
+        return bot_instance.db_backup
+    db_path = os.environ.get('DATABASE_PATH', '/app/data/willowbot.db')
+    return DatabaseBackup.from_env(db_path, default_backup_dir(db_path))
+
 # Start bot when Flask starts
 with app.app_context():
     start_bot_if_not_running()
@@ -202,7 +202,7 @@ def bot_status():
 def start_bot():
     global bot_instance, bot_thread
     if bot_instance is None or not bot_instance.is_ready():
-        bot_instance = WillowBot()
+        bot_instance = WillowBot(game_data=GAME_DATA)
         token = os.getenv('DISCORD_TOKEN')
         if not token:
             return jsonify({'status': 'error', 'message': 'Discord token not found in environment variables'})
@@ -214,10 +214,12 @@ def start_bot():
 @app.route('/api/bot/stop', methods=['POST'])
 @admin_required
 def stop_bot():
-    global bot_instance, bot_thread
+    global bot_instance, bot_thread, GAME_DATA
     if bot_instance and bot_instance.is_ready():
         asyncio.run_coroutine_threadsafe(bot_instance.close(), bot_instance.loop)
         bot_thread.join()
+        # A restarted bot continues from the last data reloaded in Discord
+        GAME_DATA = bot_instance.game_data
         bot_instance = None
         bot_thread = None
         return jsonify({'status': 'stopped'})
@@ -258,53 +260,85 @@ def get_player_details(player_id):
     ''', [player_id]).fetchall()
     
     quests = db.execute('''
-        SELECT quest_id, objectives_progress, completed, rewards_claimed
+        SELECT quest_id, completed, rewards_claimed
         FROM active_quests
         WHERE player_id = ?
     ''', [player_id]).fetchall()
     
-    kills = db.execute('''
-        SELECT enemy_name, enemy_level, killed_at, COUNT(*) as count
-        FROM player_kills
+    objective_progress = {}
+    for row in db.execute('''
+        SELECT quest_id, objective_index, progress
+        FROM quest_objective_progress
         WHERE player_id = ?
-        GROUP BY enemy_name, enemy_level
-        ORDER BY killed_at DESC
-    ''', [player_id]).fetchall()
-    
-    total_kills = db.execute('''
-        SELECT COUNT(*) as total FROM player_kills WHERE player_id = ?
-    ''', [player_id]).fetchone()
+        ORDER BY quest_id, objective_index
+    ''', [player_id]):
+        objective_progress.setdefault(row['quest_id'], []).append(row['progress'])
     
-    deaths = db.execute('''
-        SELECT enemy_name, enemy_level, player_level, 
-               player_health, player_max_health, player_mana, player_max_mana, died_at
-        FROM death_history
+    kills = db.execute('''
+        SELECT enemy_type_id, enemy_name_id, enemy_prefix_id, enemy_suffix_id, enemy_level,
+               last_killed_at as killed_at, kill_count as count, l.name AS legacy_name
+        FROM player_kill_rollup
+        LEFT JOIN enemy_legacy_names AS l ON enemy_type_id = 0 AND l.id = enemy_name_id
         WHERE player_id = ?
-        ORDER BY died_at DESC
+        ORDER BY last_killed_at DESC
     ''', [player_id]).fetchall()
     
+    # Archived deaths live in a separate database and are only read on request
+    archive_path = default_archive_path(os.environ.get('DATABASE_PATH', '/app/data/willowbot.db'))
+    include_archived = request.args.get('include_archived') == '1' and os.path.exists(archive_path)
+    if include_archived:
+        db.execute('ATTACH DATABASE ? AS archive', [archive_path])
+        deaths = db.execute('''
+            SELECT enemy_type_id, enemy_name_id, enemy_prefix_id, enemy_suffix_id, enemy_level, player_level,
+                   player_health, player_max_health, player_mana, player_max_mana, died_at, l.name AS legacy_name
+            FROM main.death_history
+            LEFT JOIN main.enemy_legacy_names AS l ON enemy_type_id = 0 AND l.id = enemy_name_id
+            WHERE player_id = ?
+            UNION ALL
+            SELECT enemy_type_id, enemy_name_id, enemy_prefix_id, enemy_suffix_id, enemy_level, player_level,
+                   player_health, player_max_health, player_mana, player_max_mana, died_at, l.name AS legacy_name
+            FROM archive.death_history
+            LEFT JOIN main.enemy_legacy_names AS l ON enemy_type_id = 0 AND l.id = enemy_name_id
+            WHERE player_id = ?
+            ORDER BY died_at DESC
+        ''', [player_id, player_id]).fetchall()
+    else:
+        deaths = db.execute('''
+            SELECT enemy_type_id, enemy_name_id, enemy_prefix_id, enemy_suffix_id, enemy_level, player_level,
+                   player_health, player_max_health, player_mana, player_max_mana, died_at, l.name AS legacy_name
+            FROM death_history
+            LEFT JOIN enemy_legacy_names AS l ON enemy_type_id = 0 AND l.id = enemy_name_id
+            WHERE player_id = ?
+            ORDER BY died_at DESC
+        ''', [player_id]).fetchall()
+    
+    # Enrich kills and deaths with enemy names
+    kills = [dict(row, enemy_name=enemy_display_name(row)) for row in kills]
+    deaths = [dict(row, enemy_name=enemy_display_name(row)) for row in deaths]
+
     # Enrich inventory with item details
+    data = game_data()
     inventory_with_details = []
     for inv_item in inventory:
-        item_data = ITEMS_DATA.get(inv_item['item_id'], {})
+        item = data.items.get(inv_item['item_id'])
         inventory_with_details.append({
             'item_id': inv_item['item_id'],
             'count': inv_item['count'],
-            'name': item_data.get('name', inv_item['item_id']),
-            'type': item_data.get('type', 'unknown'),
-            'rarity': item_data.get('rarity', 'common'),
-            'effects': item_data.get('effects', [])
+            'name': item.name if item else inv_item['item_id'],
+            'type': item.type.value if item else 'unknown',
+            'rarity': item.rarity.value if item else 'common',
+            'effects': item.effects if item else []
         })
     
     # Enrich quests with quest details
     quests_with_details = []
     for quest_row in quests:
-        quest_data = QUESTS_DATA.get(quest_row['quest_id'], {})
+        quest = data.quests.get(quest_row['quest_id'])
         quests_with_details.append({
             'quest_id': quest_row['quest_id'],
-            'quest_name': quest_data.get('title', quest_row['quest_id']),
-            'description': quest_data.get('description', ''),
-            'objectives_progress': quest_row['objectives_progress'],
+            'quest_name': quest.title if quest else quest_row['quest_id'],
+            'description': quest.description if quest else '',
+            'objectives_progress': objective_progress.get(quest_row['quest_id'], []),
             'completed': quest_row['completed'],
             'rewards_claimed': quest_row['rewards_claimed']
         })
@@ -315,8 +349,9 @@ def get_player_details(player_id):
         inventory=inventory_with_details,
         quests=quests_with_details,
         kills=kills,
-        total_kills=total_kills['total'] if total_kills else 0,
+        total_kills=(player['kills'] or 0) if player else 0,
         deaths=deaths,
+        include_archived=include_archived,
         user=session.get('discord_user'),
         is_admin=session.get('is_admin', False)
     )
@@ -324,49 +359,25 @@ def get_player_details(player_id):
 @app.route('/api/items')
 @admin_required
 def get_items():
-    # Load items from YAML config
+    # The index keeps the catalog sorted by rarity, then level
     items_list = []
-    for item_id, item_data in ITEMS_DATA.items():
+    for item in game_data().item_index.catalog:
         items_list.append({
-            'id': item_id,
-            'name': item_data.get('name', item_id),
-            'type': item_data.get('type', 'unknown'),
-            'rarity': item_data.get('rarity', 'common'),
-            'level_requirement': item_data.get('level_requirement', 1),
-            'value': item_data.get('value', 0),
-            'description': item_data.get('description', ''),
-            'effects': item_data.get('effects', [])
+            'id': item.id,
+            'name': item.name,
+            'type': item.type.value,
+            'rarity': item.rarity.value,
+            'level_requirement': item.level_requirement,
+            'value': item.value,
+            'description': item.description,
+            'effects': item.effects
         })
     
-    # Sort by rarity (legendary > rare > uncommon > common) then by level
-    rarity_order = {'legendary': 0, 'rare': 1, 'uncommon': 2, 'common': 3}
-    items_list.sort(key=lambda x: (rarity_order.get(x['rarity'], 4), x['level_requirement']))
-    
     return render_template('items.html', items=items_list)
 
 @app.route('/api/quests')
 @admin_required
 def get_quests():
-    # Load quests from YAML config
-    quests_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'src', 'config', 'quests.yaml')
-    
-    try:
-        with open(quests_path, 'r', encoding='utf-8') as f:
-            quests_data = yaml.safe_load(f)
-    except FileNotFoundError as e:
-        quests_data = {}
-    except Exception as e:
-        quests_data = {}
-    
-    # Load items for name lookups
-    items_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'src', 'config', 'items.yaml')
-    try:
-        with open(items_path, 'r', encoding='utf-8') as f:
-            items_data = yaml.safe_load(f)
-            items_dict = items_data.get('items', {})
-    except:
-        items_dict = {}
-    
     # Get active quest stats from database
     db = get_db()
     quest_stats = {}
@@ -384,47 +395,35 @@ def get_quests():
             'completed_players': row[2] or 0
         }
     
-    # Extract quests from quest_chains structure
+    data = game_data()
     quests_list = []
-    quest_chains = quests_data.get('quest_chains', [])
-    
-    # Build a mapping of quest IDs to titles for next_quest lookups
-    quest_id_to_title = {}
-    for chain in quest_chains:
-        for quest in chain.get('quests', []):
-            quest_id_to_title[quest.get('id', '')] = quest.get('title', '')
-    
-    for chain in quest_chains:
-        for quest in chain.get('quests', []):
-            quest_id = quest.get('id', '')
-            stats = quest_stats.get(quest_id, {'active_players': 0, 'completed_players': 0})
-            next_quest_id = quest.get('next_quest', '')
+    for chain in data.quest_chains.values():
+        for quest in chain.quests:
+            stats = quest_stats.get(quest.id, {'active_players': 0, 'completed_players': 0})
+            next_quest = data.quests.get(quest.next_quest) if quest.next_quest else None
             
             # Enrich item rewards with names
-            rewards = quest.get('rewards', {})
-            if 'items' in rewards:
-                enriched_items = []
-                for item in rewards['items']:
-                    item_id = item.get('id', '')
-                    item_data = items_dict.get(item_id, {})
-                    enriched_items.append({
-                        'id': item_id,
-                        'name': item_data.get('name', item_id),
-                        'count': item.get('count', 1)
+            rewards = {'xp': quest.rewards.xp, 'gold': quest.rewards.gold, 'title': quest.rewards.title}
+            if quest.rewards.items:
+                rewards['items'] = []
+                for reward in quest.rewards.items:
+                    item = data.items.get(reward.get('id', ''))
+                    rewards['items'].append({
+                        'id': reward.get('id', ''),
+                        'name': item.name if item else reward.get('id', ''),
+                        'count': reward.get('count', 1)
                     })
-                rewards = dict(rewards)  # Make a copy
-                rewards['items'] = enriched_items
             
             quests_list.append({
-                'id': quest_id,
-                'title': quest.get('title', ''),
-                'description': quest.get('description', ''),
-                'type': quest.get('type', ''),
-                'objectives': quest.get('objectives', []),
+                'id': quest.id,
+                'title': quest.title,
+                'description': quest.description,
+                'type': quest.type.value,
+                'objectives': quest.objectives,
                 'rewards': rewards,
-                'requirements': quest.get('requirements', {}),
-                'next_quest': quest.get('next_quest', ''),
-                'next_quest_title': quest_id_to_title.get(next_quest_id, next_quest_id) if next_quest_id else '',
+                'requirements': quest.requirements,
+                'next_quest': quest.next_quest or '',
+                'next_quest_title': (next_quest.title if next_quest else quest.next_quest) or '',
                 'active_players': stats['active_players'],
                 'completed_players': stats['completed_players']
             })
@@ -434,23 +433,120 @@ def get_quests():
 @app.route('/api/players/reset', methods=['POST'])
 @admin_required
 def reset_all_players():
-    try:
+    def reset():
         db = get_db()
-        
-        # Delete all player-related data
-        db.execute('DELETE FROM death_history')
-        db.execute('DELETE FROM player_kills')
-        db.execute('DELETE FROM active_quests')
-        db.execute('DELETE FROM inventory')
-        db.execute('DELETE FROM equipment')
-        db.execute('DELETE FROM players')
-        
-        db.commit()
-        db.close()
-        
+        try:
+            # Take the write lock up front so the bot's writers queue behind
+            # one short transaction instead of failing halfway through it
+            db.execute('BEGIN IMMEDIATE')
+            
+            # Delete all player-related data
+            db.execute('DELETE FROM death_history')
+            db.execute('DELETE FROM player_kills')
+            db.execute('DELETE FROM player_kill_rollup')
+            db.execute('DELETE FROM quest_objective_progress')
+            db.execute('DELETE FROM active_quests')
+            db.execute('DELETE FROM inventory')
+            db.execute('DELETE FROM equipment')
+            db.execute('DELETE FROM players')
+            
+            db.commit()
+        finally:
+            db.close()
+    
+    try:
+        retry_busy_sync(reset, BusyPolicy.from_env())
+        if bot_instance is not None and bot_instance.loop.is_running():
+            # The bot caches inventories; let its own loop drop them
+            bot_instance.loop.call_soon_threadsafe(bot_instance.inventory_cache.clear)
         return jsonify({'status': 'success', 'message': 'All players have been reset'})
     except Exception as e:
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
+@app.route('/api/game-data/reload', methods=['POST'])
+@admin_required
+def reload_game_data():
+    """Swap edited config into the running bot; fights under way keep their data"""
+    global GAME_DATA
+    try:
+        if bot_instance is not None and bot_instance.loop.is_running():
+            reloader = bot_instance.game_data_reloader
+            data = asyncio.run_coroutine_threadsafe(reloader.reload(), bot_instance.loop).result(timeout=60)
+            generation = reloader.generation
+        else:
+            data, generation = GameData.load(), None
+        GAME_DATA = data
+        return jsonify({
+            'status': 'success',
+            'generation': generation,
+            'items': len(data.items),
+            'quests': len(data.quests),
+            'enemy_types': len(data.enemy_catalog.types),
+        })
+    except Exception as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+@app.route('/api/db/statements')
+@admin_required
+def get_statement_stats():
+    """Per-statement timings and lock contention from the running bot"""
+    if bot_instance is None:
+        return jsonify({'statements': [], 'contention': [], 'writer': None, 'inventory_cache': None})
+    
+    def describe(key, stats):
+        return {
+            'statement': key,
+            'calls': stats.calls,
+            'avg_ms': round(stats.total_seconds / stats.calls * 1000, 3) if stats.calls else 0,
+            'max_ms': round(stats.max_seconds * 1000, 3),
+            'busy': stats.busy,
+            'lock_wait_ms': round(stats.lock_wait_seconds * 1000, 3),
+            'gave_up': stats.gave_up,
+        }
+    
+    statements = bot_instance.repos.statements
+    writer = bot_instance.repos.writer.stats
+    inventory = bot_instance.inventory_cache
+    return jsonify({
+        'statements': [describe(key, stats) for key, stats in statements.snapshot()],
+        'contention': [describe(key, stats) for key, stats in statements.contention()],
+        'writer': {
+            'batches': writer.batches,
+            'intents': writer.intents,
+            'failed': writer.failed,
+            'mean_batch': round(writer.mean_batch, 2),
+            'largest_batch': writer.largest_batch,
+        },
+        'inventory_cache': {
+            'players': len(inventory),
+            'hits': inventory.stats.hits,
+            'misses': inventory.stats.misses,
+            'hit_rate': round(inventory.stats.hit_rate, 3),
+            'evictions': inventory.stats.evictions,
+        },
+    })
+
+@app.route('/api/db/backups')
+@admin_required
+def list_backups():
+    backup = get_backup()
+    return jsonify({
+        'snapshots': [
+            {'path': path, 'size': os.path.getsize(path)}
+            for path in reversed(backup.snapshots())
+        ],
+        'last': backup.last_report.to_dict() if backup.last_report else None
+    })
+
+@app.route('/api/db/backup', methods=['POST'])
+@admin_required
+def create_backup():
+    # Runs in this request's thread; the bot's event loop keeps serving combat
+    try:
+        report = get_backup().backup_sync()
+        return jsonify({'status': 'success', 'backup': report.to_dict()})
+    except Exception as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5000)
\ No newline at end of file